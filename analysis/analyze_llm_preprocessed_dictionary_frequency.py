@@ -7,25 +7,21 @@ outcome_llm_preprocessed 테이블의 measure_code 검출 빈도수를 분석합
 """
 
 import os
+import sys
 import platform
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
 import seaborn as sns
 from datetime import datetime
 from typing import Dict, List
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
 load_dotenv()
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection
 
 # 한글 폰트 설정
 def setup_korean_font():
@@ -82,11 +78,6 @@ KOREAN_FONT_PROP = get_korean_font_prop()
 sns.set_style("whitegrid")
 
 
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
-
-
 def get_measure_code_frequency_by_outcome(conn):
     """Outcome 기준 measure_code 검출 빈도수 (outcome_llm_preprocessed)"""
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
@@ -8,6 +8,7 @@ raw.json에서 overallStatus를 추출하고 통계를 분석합니다.
 """
 
 import os
+import sys
 import json
 import platform
 import matplotlib.pyplot as plt
@@ -15,19 +16,14 @@ import matplotlib.font_manager as fm
 import seaborn as sns
 from datetime import datetime
 from typing import Dict, List, Optional
-import psycopg2
 from psycopg2.extras import RealDictCursor, execute_batch
 from dotenv import load_dotenv
 
 load_dotenv()
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection
 
 RAW_JSON_PATH = 'data/raw.json'
 
@@ -86,11 +82,6 @@ KOREAN_FONT_PROP = get_korean_font_prop()
 sns.set_style("whitegrid")
 
 
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
-
-
 def create_status_table(conn):
     """study_status_raw 테이블 생성"""
     with conn.cursor() as cur:
@@ -4,28 +4,19 @@ SQL 쿼리 결과를 Markdown 보고서로 변환
 """
 
 import os
+import sys
 from dotenv import load_dotenv
 
 # 환경변수 로드
 load_dotenv()
 
-import psycopg2
 from psycopg2.extras import RealDictCursor
 import pandas as pd
 from datetime import datetime
 
-# DB 연결 설정
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
-
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection
 
 def execute_statistics_query(conn):
     """통계 쿼리 실행"""
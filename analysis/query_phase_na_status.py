@@ -3,24 +3,15 @@ Phase NA인 항목들의 OverallStatus 분포 조회
 """
 
 import os
-import psycopg2
+import sys
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
 load_dotenv()
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
-
-
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection
 
 
 def main():
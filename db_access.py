@@ -0,0 +1,249 @@
+"""
+공유 데이터베이스 접근 계층
+
+수집기(preprocessing/), 정규화, LLM 파이프라인(llm/), 분석 스크립트(analysis/)가 공통으로 사용하는
+PostgreSQL 연결 풀입니다. 스크립트마다 DB_CONFIG / get_db_connection()을 따로 두고 매번 새 연결을 여는 대신
+프로세스 안에서 스레드 안전한 풀(psycopg2 ThreadedConnectionPool)의 연결을 재사용합니다.
+
+- get_db_connection(): 풀에서 연결을 빌림. conn.close()를 호출하면 실제로 닫지 않고 풀에 반환
+  (기존 스크립트의 conn.close() 호출을 그대로 사용, 중복 close도 안전)
+- 동시에 빌릴 수 있는 연결은 DB_POOL_MAX개. 모두 사용 중이면 DB_POOL_TIMEOUT초까지 대기 (연결 폭주 방지)
+- DB_STATEMENT_TIMEOUT(ms)으로 모든 연결의 statement_timeout 설정 (0이면 서버 기본값)
+- execute_prepared_batch(): 반복 실행되는 INSERT/UPDATE를 연결당 한 번만 PREPARE하고 EXECUTE로 재사용
+- create_async_pool(): asyncpg가 설치된 경우 같은 설정의 비동기 풀 (선택)
+
+스크립트에서 사용:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # llm/, preprocessing/, analysis/
+    from db_access import get_db_connection
+
+환경변수 (.env 파일):
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+    DB_POOL_MIN=1              # 유지할 유휴 연결 수
+    DB_POOL_MAX=10             # 최대 동시 연결 수
+    DB_POOL_TIMEOUT=60         # 연결 대기 시간 (초)
+    DB_STATEMENT_TIMEOUT=0     # 문장 실행 제한 시간 (ms, 0=제한 없음)
+"""
+
+import os
+import re
+import atexit
+import threading
+from typing import Dict, Optional, Sequence, Union
+import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import execute_batch
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': os.getenv('DB_PORT', '5432'),
+    'database': os.getenv('DB_NAME', 'clinicaltrials'),
+    'user': os.getenv('DB_USER', 'postgres'),
+    'password': os.getenv('DB_PASSWORD', '')
+}
+
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '60'))
+DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', '0'))
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_slots = None
+_shutting_down = False
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """close()가 실제 연결을 닫지 않고 풀에 반환하는 연결"""
+
+    _in_use = False
+    _force_close = False
+    _timeout_overridden = False
+
+    def close(self):
+        if _shutting_down:
+            # closeall()이 풀 잠금을 잡은 상태이므로 반환하지 않고 바로 닫음
+            self._in_use = False
+            super().close()
+        elif self._in_use:
+            self._in_use = False
+            _release_connection(self)
+        elif self._force_close or _pool is None:
+            super().close()
+        # 이미 풀에 반환된 연결의 중복 close는 무시
+
+
+def _connect_kwargs() -> Dict:
+    kwargs = dict(DB_CONFIG, connection_factory=PooledConnection)
+    if DB_STATEMENT_TIMEOUT > 0:
+        kwargs['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT}'
+    return kwargs
+
+
+def get_pool() -> ThreadedConnectionPool:
+    """프로세스 공용 연결 풀 (처음 호출 시 생성)"""
+    global _pool, _pool_slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                max_conn = max(DB_POOL_MAX, 1)
+                _pool_slots = threading.BoundedSemaphore(max_conn)
+                _pool = ThreadedConnectionPool(min(DB_POOL_MIN, max_conn), max_conn, **_connect_kwargs())
+    return _pool
+
+
+def get_db_connection(statement_timeout: Optional[int] = None) -> PooledConnection:
+    """
+    풀에서 PostgreSQL 연결을 빌림 (conn.close() 시 풀에 반환)
+
+    Args:
+        statement_timeout: 이 연결에만 적용할 statement_timeout (ms). 반환 시 기본값으로 복원
+
+    Returns:
+        psycopg2 연결
+    """
+    pool = get_pool()
+    if not _pool_slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise PoolError(
+            f"DB 연결 대기 시간 초과 ({DB_POOL_TIMEOUT:.0f}초, 최대 {DB_POOL_MAX}개 사용 중)"
+        )
+    try:
+        conn = pool.getconn()
+        # 서버 재시작 등으로 끊긴 유휴 연결은 버리고 새로 연결
+        while conn.closed:
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+    except Exception:
+        _pool_slots.release()
+        raise
+
+    conn._in_use = True
+    conn._timeout_overridden = False
+    if statement_timeout is not None:
+        with conn.cursor() as cur:
+            cur.execute("SET statement_timeout = %s", (int(statement_timeout),))
+        conn.commit()
+        conn._timeout_overridden = True
+    return conn
+
+
+def _release_connection(conn: PooledConnection):
+    """연결을 풀에 반환 (진행 중인 트랜잭션은 롤백, 연결별 설정 복원)"""
+    try:
+        if _pool is None or _pool.closed:
+            conn._force_close = True
+            conn.close()
+            return
+        if not conn.closed and conn._timeout_overridden:
+            try:
+                conn.rollback()
+                with conn.cursor() as cur:
+                    cur.execute("RESET statement_timeout")
+                conn.commit()
+            except psycopg2.Error:
+                conn._force_close = True
+        # 풀이 초과분/오류 상태 연결을 닫을 때는 실제로 닫히도록 표시
+        closing = conn._force_close
+        conn._force_close = True
+        try:
+            _pool.putconn(conn, close=closing)
+        finally:
+            conn._force_close = False
+    finally:
+        _pool_slots.release()
+
+
+def close_pool():
+    """풀의 모든 연결 종료 (프로세스 종료 시 자동 호출)"""
+    global _pool, _shutting_down
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _shutting_down = True
+            try:
+                _pool.closeall()
+            finally:
+                _shutting_down = False
+        _pool = None
+
+
+atexit.register(close_pool)
+
+
+_NAMED_PARAM = re.compile(r'%\((\w+)\)s|%s|%%')
+
+
+def _to_prepared(sql: str):
+    """
+    psycopg2 플레이스홀더 SQL → (PREPARE 본문, EXECUTE 인자 템플릿)
+
+    자리표시자 하나마다 $n 하나를 부여합니다. 같은 이름이 여러 번 나와도 위치마다 따로 타입을 추론하므로
+    각 자리표시자는 컬럼 대입, 비교, ::캐스트처럼 타입이 정해지는 위치에 있어야 합니다.
+    """
+    args = []
+
+    def replace(match):
+        token = match.group(0)
+        if token == '%%':
+            return '%'
+        args.append(token)
+        return f'${len(args)}'
+
+    return _NAMED_PARAM.sub(replace, sql), ', '.join(args)
+
+
+def prepare_statement(conn, name: str, sql: str) -> str:
+    """
+    SQL을 연결당 한 번만 PREPARE하고, execute/execute_batch에 넘길 EXECUTE 문을 반환
+
+    풀의 연결은 재사용되므로 같은 연결을 다시 빌린 다음 배치에서도 계획이 재사용됩니다.
+    """
+    prepared = getattr(conn, '_prepared_statements', None)
+    if prepared is None:
+        prepared = conn._prepared_statements = {}
+    if name not in prepared:
+        body, args = _to_prepared(sql)
+        with conn.cursor() as cur:
+            cur.execute(f"PREPARE {name} AS {body}")
+        prepared[name] = f"EXECUTE {name} ({args})" if args else f"EXECUTE {name}"
+    return prepared[name]
+
+
+def execute_prepared_batch(cur, name: str, sql: str, params_list: Sequence[Union[Dict, Sequence]],
+                           page_size: int = 100):
+    """execute_batch와 같지만 SQL을 서버에 준비된 문장으로 재사용"""
+    if not params_list:
+        return
+    execute_batch(cur, prepare_statement(cur.connection, name, sql), params_list, page_size=page_size)
+
+
+# 비동기 접근 (선택: pip install asyncpg)
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+
+async def create_async_pool(min_size: Optional[int] = None, max_size: Optional[int] = None):
+    """
+    같은 DB 설정의 asyncpg 연결 풀 생성 (asyncpg 미설치 시 ImportError)
+
+    asyncpg는 $1, $2 자리표시자와 서버 측 prepared statement 캐시를 사용합니다.
+    """
+    if asyncpg is None:
+        raise ImportError("비동기 DB 접근에는 asyncpg가 필요합니다: pip install asyncpg")
+    server_settings = {}
+    if DB_STATEMENT_TIMEOUT > 0:
+        server_settings['statement_timeout'] = str(DB_STATEMENT_TIMEOUT)
+    return await asyncpg.create_pool(
+        host=DB_CONFIG['host'],
+        port=int(DB_CONFIG['port']),
+        database=DB_CONFIG['database'],
+        user=DB_CONFIG['user'],
+        password=DB_CONFIG['password'],
+        min_size=DB_POOL_MIN if min_size is None else min_size,
+        max_size=DB_POOL_MAX if max_size is None else max_size,
+        server_settings=server_settings
+    )
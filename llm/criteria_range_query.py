@@ -0,0 +1,211 @@
+"""
+Inclusion/Exclusion 숫자 기준 구간 조회
+
+sql/create_inclusion_exclusion_criteria_ranges.sql의 inclusion_exclusion_criteria_range
+(연구 × feature별 허용 구간, NUMRANGE + GiST 인덱스)로 임계값/코호트 조회를 처리합니다.
+JSONB 전개나 값 캐스팅 없이 구간 연산자(&&, @>, <@, &<, &>)로 인덱스를 탑니다.
+
+- find_trials_overlapping: 허용 구간이 [low, high]와 겹치는 연구 (이 범위의 환자 일부가 통과 가능)
+- find_trials_containing: 허용 구간이 value를 포함하는 연구 (이 값의 환자가 통과)
+- find_trials_within: 허용 구간 전체가 [low, high] 안에 있는 연구
+- find_trials_by_bound: 하한/상한 조건 ("MMSE 하한 ≤ 20" → lower_max=20, "나이 상한 ≥ 85" → upper_min=85)
+- cohort_feasibility: 코호트 범위 {feature: (low, high)}와 모든 feature가 겹치는 연구
+  (구간이 없는 feature는 제약이 없는 것으로 보고 통과)
+
+feature는 표준 feature 사전(criterion_feature_dict)으로 매핑해 feature_id로 조회하고,
+사전에 없는 feature는 기준 팩트 테이블과 같은 규칙(소문자, 공백 정리)으로 정규화한 문자열로 조회합니다.
+low/high가 None이면 그쪽은 무한대입니다.
+
+사용법:
+    python llm/criteria_range_query.py <feature=low:high> [feature=low:high ...]
+
+    예: python llm/criteria_range_query.py age=60:75 mmse=18:24
+        python llm/criteria_range_query.py "age=85:"    (85세 이상이 통과 가능한 연구)
+"""
+
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+from psycopg2.extras import RealDictCursor, NumericRange
+from dotenv import load_dotenv
+
+from llm_feature_normalizer import FeatureNormalizer, normalize_feature
+
+load_dotenv()
+
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection
+
+_RANGE_COLUMNS = """
+    r.nct_id,
+    r.feature,
+    r.feature_id,
+    r.value_range::text AS value_range,
+    lower(r.value_range) AS lower_value,
+    upper(r.value_range) AS upper_value,
+    r.unit
+"""
+
+_normalizer = None  # 첫 조회 때 로드하는 FeatureNormalizer
+
+
+def _numeric_range(low: Optional[float], high: Optional[float], bounds: str = '[]') -> NumericRange:
+    """조회 구간 (None은 무한대)"""
+    if low is not None and high is not None and low > high:
+        raise ValueError(f"구간 하한이 상한보다 큽니다: [{low}, {high}]")
+    return NumericRange(low, high, bounds)
+
+
+def _feature_condition(conn, feature: str) -> Tuple[str, object]:
+    """조회 feature → (조건 SQL, 파라미터): 표준 feature면 feature_id, 아니면 정규화된 feature"""
+    global _normalizer
+    if _normalizer is None:
+        _normalizer = FeatureNormalizer.load(conn)
+    feature_id = _normalizer.feature_id(feature)
+    if feature_id is not None:
+        return "r.feature_id = %s", feature_id
+    return "r.feature = %s", normalize_feature(feature)
+
+
+def _query(conn, feature: str, where: str, params: Tuple) -> List[Dict]:
+    feature_sql, feature_param = _feature_condition(conn, feature)
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(f"""
+            SELECT {_RANGE_COLUMNS}
+            FROM inclusion_exclusion_criteria_range r
+            WHERE {feature_sql} AND {where}
+            ORDER BY r.nct_id
+        """, (feature_param,) + tuple(params))
+        return cur.fetchall()
+
+
+def find_trials_overlapping(conn, feature: str, low: Optional[float] = None,
+                            high: Optional[float] = None, bounds: str = '[]') -> List[Dict]:
+    """허용 구간이 [low, high]와 겹치는 연구"""
+    return _query(conn, feature, "r.value_range && %s", (_numeric_range(low, high, bounds),))
+
+
+def find_trials_containing(conn, feature: str, value: float) -> List[Dict]:
+    """허용 구간이 value를 포함하는 연구"""
+    return _query(conn, feature, "r.value_range @> %s::numeric", (value,))
+
+
+def find_trials_within(conn, feature: str, low: Optional[float] = None,
+                       high: Optional[float] = None, bounds: str = '[]') -> List[Dict]:
+    """허용 구간 전체가 [low, high] 안에 있는 연구 (빈 구간 제외)"""
+    return _query(conn, feature, "r.value_range <@ %s AND NOT isempty(r.value_range)",
+                  (_numeric_range(low, high, bounds),))
+
+
+def find_trials_by_bound(conn, feature: str,
+                         lower_max: Optional[float] = None, lower_min: Optional[float] = None,
+                         upper_min: Optional[float] = None, upper_max: Optional[float] = None) -> List[Dict]:
+    """
+    하한/상한 조건으로 연구 조회 (하한/상한이 실제로 있는 연구만)
+
+    lower_max: 하한 ≤ lower_max   lower_min: 하한 ≥ lower_min
+    upper_min: 상한 ≥ upper_min   upper_max: 상한 ≤ upper_max
+    """
+    conditions = ["NOT isempty(r.value_range)"]
+    params = []
+    if lower_max is not None or lower_min is not None:
+        conditions.append("NOT lower_inf(r.value_range)")
+    if upper_min is not None or upper_max is not None:
+        conditions.append("NOT upper_inf(r.value_range)")
+    # 비어 있지 않은 구간에서: 하한 ≤ x ⇔ (-∞, x]와 겹침, 하한 ≥ x ⇔ [x, ∞)의 왼쪽으로 넘지 않음
+    if lower_max is not None:
+        conditions.append("r.value_range && %s")
+        params.append(_numeric_range(None, lower_max, '(]'))
+    if lower_min is not None:
+        conditions.append("r.value_range &> %s")
+        params.append(_numeric_range(lower_min, None, '[)'))
+    if upper_min is not None:
+        conditions.append("r.value_range && %s")
+        params.append(_numeric_range(upper_min, None, '[)'))
+    if upper_max is not None:
+        conditions.append("r.value_range &< %s")
+        params.append(_numeric_range(None, upper_max, '(]'))
+    return _query(conn, feature, " AND ".join(conditions), tuple(params))
+
+
+def cohort_feasibility(conn, cohort: Dict[str, Tuple[Optional[float], Optional[float]]]) -> List[str]:
+    """
+    코호트 범위와 모든 feature의 허용 구간이 겹치는 연구 (llm_status = 'SUCCESS' 연구 중)
+
+    cohort: {feature: (low, high)}. 연구에 해당 feature 구간이 없으면 제약이 없는 것으로 봅니다.
+    """
+    if not cohort:
+        raise ValueError("코호트 범위가 비어 있습니다")
+
+    conditions = []
+    params = []
+    for feature, (low, high) in cohort.items():
+        feature_sql, feature_param = _feature_condition(conn, feature)
+        conditions.append(f"({feature_sql} AND NOT r.value_range && %s)")
+        params.extend([feature_param, _numeric_range(low, high)])
+
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT iep.nct_id
+            FROM inclusion_exclusion_llm_preprocessed iep
+            WHERE iep.llm_status = 'SUCCESS'
+              AND NOT EXISTS (
+                  SELECT 1
+                  FROM inclusion_exclusion_criteria_range r
+                  WHERE r.nct_id = iep.nct_id
+                    AND ({' OR '.join(conditions)})
+              )
+            ORDER BY iep.nct_id
+        """, tuple(params))
+        return [row[0] for row in cur.fetchall()]
+
+
+def _parse_cohort_arg(arg: str) -> Tuple[str, Tuple[Optional[float], Optional[float]]]:
+    """'age=60:75' → ('age', (60.0, 75.0)), 빈 쪽은 None"""
+    feature, sep, bounds = arg.rpartition('=')
+    low, colon, high = bounds.partition(':')
+    if not sep or not colon or not feature.strip():
+        raise ValueError(f"형식이 잘못되었습니다 (feature=low:high): {arg}")
+    return feature, (float(low) if low.strip() else None, float(high) if high.strip() else None)
+
+
+def main():
+    """메인 함수"""
+    if len(sys.argv) < 2:
+        print("사용법: python llm/criteria_range_query.py <feature=low:high> [feature=low:high ...]")
+        sys.exit(1)
+
+    try:
+        cohort = dict(_parse_cohort_arg(arg) for arg in sys.argv[1:])
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    print("=" * 80)
+    print("[START] 코호트 적합성 조회 (숫자 기준 구간)")
+    print("=" * 80)
+
+    conn = get_db_connection()
+    try:
+        for feature, (low, high) in cohort.items():
+            started = time.perf_counter()
+            rows = find_trials_overlapping(conn, feature, low, high)
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"[INFO] {_normalizer.canonical_key(feature)} [{low if low is not None else '-∞'}, "
+                  f"{high if high is not None else '∞'}]: 구간이 겹치는 연구 {len(rows):,}개 ({elapsed:.1f}ms)")
+
+        started = time.perf_counter()
+        nct_ids = cohort_feasibility(conn, cohort)
+        elapsed = (time.perf_counter() - started) * 1000
+    finally:
+        conn.close()
+
+    print(f"\n[OK] 모든 범위를 통과할 수 있는 연구: {len(nct_ids):,}개 ({elapsed:.1f}ms)")
+    if nct_ids:
+        print(f"  {', '.join(nct_ids[:50])}" + (f" ... 외 {len(nct_ids) - 50:,}개" if len(nct_ids) > 50 else ''))
+
+
+if __name__ == "__main__":
+    main()
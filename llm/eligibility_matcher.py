@@ -0,0 +1,439 @@
+"""
+환자-임상시험 적격성 매칭 엔진
+
+llm_preprocess_inclusion_exclusion.py가 만든 구조화 기준(inclusion_criteria/exclusion_criteria)을
+연구 전체에 대해 한 번 평탄화된 numpy 배열로 컴파일하고, 환자 프로필을 벡터 연산으로 평가합니다.
+연구 수천 개 × 프로필 여러 개를 (프로필 × 조건) 2차원 배열 연산 몇 번으로 판정합니다.
+
+- 기준 항목: {feature, operator, value, unit} 또는 {conditions: [...], logic_operator: AND|OR} (중첩 가능, test.json 형식)
+- 조건 평가는 3값 논리: FAIL(0) < UNKNOWN(1) < PASS(2). AND = 최솟값, OR = 최댓값
+  (프로필에 없는 feature, 비교할 수 없는 값은 UNKNOWN)
+- Inclusion 기준은 조건을 만족하면 PASS, Exclusion 기준은 조건을 만족하면 FAIL
+- 연구 판정: 모든 기준 PASS → ELIGIBLE, 하나라도 FAIL → INELIGIBLE, 그 외 UNKNOWN
+
+환자 프로필: {feature: 값}
+    {"age": 67, "gender": "female", "mmse": 22, "condition": ["alzheimer's disease"]}
+    - feature와 문자열 값은 소문자/공백 정리 후 비교 (기준 팩트 테이블의 normalize_criterion_feature와 같은 규칙)
+    - feature_normalizer를 주면 feature를 표준 feature로 묶어 비교 ("MMSE" 프로필 = "Mini-Mental State Exam score" 기준)
+    - 숫자는 기준 단위 그대로 비교. {"value": 18, "unit": "months"}처럼 단위를 주면 시간 단위(일/주/월/년)는 환산
+    - 값 목록은 모든 값을 가진 것으로 처리 (condition, medication 등)
+    - 문자열 불일치는 closed_features(기본: gender, sex)만 FAIL, 나머지는 UNKNOWN
+      (자유 텍스트 기준은 표현이 달라도 같은 의미일 수 있음)
+    - 기준 값 "10-22"(범위)는 >= 10 AND <= 22, "male or female"은 대안 OR로 컴파일
+
+사용법:
+    python llm/eligibility_matcher.py <profile.json> [limit] [--show-unknown]
+
+    profile.json: 프로필 하나 또는 프로필 목록
+    limit: 매칭할 연구 수 제한 (기본: llm_status = 'SUCCESS'인 전체 연구)
+"""
+
+import os
+import re
+import sys
+import json
+import time
+from typing import Dict, List, Optional, Sequence, Set
+import numpy as np
+from psycopg2.extras import RealDictCursor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection
+from llm_feature_normalizer import FeatureNormalizer, normalize_feature
+
+FAIL, UNKNOWN, PASS = 0, 1, 2
+CRITERION_STATUS = {FAIL: 'FAIL', UNKNOWN: 'UNKNOWN', PASS: 'PASS'}
+TRIAL_STATUS = {FAIL: 'INELIGIBLE', UNKNOWN: 'UNKNOWN', PASS: 'ELIGIBLE'}
+
+DEFAULT_CLOSED_FEATURES = frozenset({'gender', 'sex'})
+PROFILE_CHUNK_SIZE = 64  # 한 번에 평가할 프로필 수 ((프로필 × 조건) 배열 메모리 제한)
+
+# 조건 연산 코드
+OP_UNKNOWN, OP_EQ, OP_NE, OP_LT, OP_LE, OP_GT, OP_GE, OP_STR_EQ, OP_STR_NE = range(9)
+_OPERATORS = {
+    '=': OP_EQ, '==': OP_EQ, '!=': OP_NE, '<>': OP_NE,
+    '<': OP_LT, '<=': OP_LE, '≤': OP_LE, '>': OP_GT, '>=': OP_GE, '≥': OP_GE
+}
+_TIME_UNIT_DAYS = {
+    'day': 1.0, 'days': 1.0, 'd': 1.0,
+    'week': 7.0, 'weeks': 7.0, 'wk': 7.0, 'wks': 7.0,
+    'month': 30.4375, 'months': 30.4375, 'mo': 30.4375,
+    'year': 365.25, 'years': 365.25, 'yr': 365.25, 'yrs': 365.25, 'y': 365.25
+}
+_NUMBER = re.compile(r'^\s*[-+]?(\d+\.?\d*|\.\d+)\s*$')
+_RANGE = re.compile(r'^\s*([-+]?\d+(?:\.\d+)?)\s*(?:-|–|~|to)\s*([-+]?\d+(?:\.\d+)?)\s*$', re.IGNORECASE)
+_ALTERNATIVES = re.compile(r'\s+or\s+|\s*/\s*', re.IGNORECASE)
+
+
+def normalize_text(value: str) -> str:
+    """문자열 값 정규화 (비교용)"""
+    return re.sub(r'\s+', ' ', value.strip()).lower()
+
+
+def _parse_criteria(criteria) -> List:
+    if isinstance(criteria, str):
+        try:
+            criteria = json.loads(criteria)
+        except ValueError:
+            return []
+    return criteria if isinstance(criteria, list) else []
+
+
+class _Levels:
+    """같은 깊이의 AND/OR 그룹 (자식 값 인덱스를 CSR 형태로 보관)"""
+
+    def __init__(self, groups: List[tuple], base: int):
+        self.steps = []
+        for is_or in (False, True):
+            selected = [(index, children) for index, (logic_or, children) in groups if logic_or == is_or]
+            if not selected:
+                continue
+            lengths = np.array([len(children) for _, children in selected])
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            self.steps.append((
+                is_or,
+                np.array([base + index for index, _ in selected], dtype=np.int64),
+                np.concatenate([children for _, children in selected]).astype(np.int64),
+                starts.astype(np.int64)
+            ))
+
+
+class TrialMatcher:
+    """연구 기준을 컴파일해 두고 환자 프로필을 평가하는 매칭 엔진"""
+
+    def __init__(self, trials: Sequence[Dict], closed_features: Set[str] = DEFAULT_CLOSED_FEATURES,
+                 feature_normalizer: Optional[FeatureNormalizer] = None):
+        """
+        Args:
+            trials: [{'nct_id', 'inclusion_criteria', 'exclusion_criteria'}, ...] (기준은 리스트 또는 JSON 문자열)
+            closed_features: 문자열 불일치를 FAIL로 판정할 feature (값 목록이 닫혀 있는 feature)
+            feature_normalizer: 표준 feature 사전 (없으면 정규화된 feature 문자열로 비교)
+        """
+        self._feature_key = feature_normalizer.canonical_key if feature_normalizer else normalize_feature
+        self.closed_features = {self._feature_key(f) for f in closed_features}
+        self._features = {}
+        self._pairs = {}  # (feature 인덱스, 정규화 문자열) → 문자열 조건 ID
+        # 조건(leaf) 배열
+        self._leaf_feature, self._leaf_op, self._leaf_num, self._leaf_pair, self._leaf_unit = [], [], [], [], []
+        # 그룹: (깊이, OR 여부, 자식 참조)
+        self._groups = []
+        self.nct_ids = []
+        self.criteria = []  # (trial 인덱스, criteria_type, criterion_id, original_text)
+        crit_nodes = []
+
+        for trial in trials:
+            trial_index = len(self.nct_ids)
+            self.nct_ids.append(trial['nct_id'])
+            for criteria_type, key in (('INCLUSION', 'inclusion_criteria'), ('EXCLUSION', 'exclusion_criteria')):
+                for item in _parse_criteria(trial.get(key)):
+                    node, _ = self._compile_node(item)
+                    crit_nodes.append(node)
+                    self.criteria.append((
+                        trial_index, criteria_type,
+                        item.get('criterion_id') if isinstance(item, dict) else None,
+                        item.get('original_text') if isinstance(item, dict) else None
+                    ))
+        self._finalize(crit_nodes)
+
+    # ------------------------------------------------------------------ 컴파일
+
+    def _leaf(self, feature: Optional[str], op: int, num: float = np.nan, text: Optional[str] = None,
+              unit=None) -> tuple:
+        f = self._features.setdefault(feature, len(self._features)) if feature else 0
+        self._leaf_feature.append(f)
+        self._leaf_op.append(op if feature else OP_UNKNOWN)
+        self._leaf_num.append(num)
+        self._leaf_pair.append(self._pairs.setdefault((f, text), len(self._pairs)) if text is not None else 0)
+        self._leaf_unit.append(_TIME_UNIT_DAYS.get(normalize_text(unit), np.nan) if isinstance(unit, str) else np.nan)
+        return ('leaf', len(self._leaf_op) - 1), 0
+
+    def _group(self, is_or: bool, children: List[tuple]) -> tuple:
+        if len(children) == 1:
+            return children[0]
+        depth = 1 + max(depth for _, depth in children)
+        self._groups.append((depth, is_or, [ref for ref, _ in children]))
+        return ('group', len(self._groups) - 1), depth
+
+    def _compile_node(self, item) -> tuple:
+        """기준 항목 → (노드 참조, 깊이)"""
+        if not isinstance(item, dict):
+            return self._leaf(None, OP_UNKNOWN)
+
+        if isinstance(item.get('conditions'), list):
+            children = [self._compile_node(condition) for condition in item['conditions']]
+            if not children:
+                return self._leaf(None, OP_UNKNOWN)
+            is_or = str(item.get('logic_operator') or 'AND').strip().upper() == 'OR'
+            return self._group(is_or, children)
+
+        feature = self._feature_key(item.get('feature'))
+        op = _OPERATORS.get(str(item.get('operator') or '').strip())
+        value = item.get('value')
+        unit = item.get('unit')
+        if feature is None or op is None or value is None:
+            return self._leaf(None, OP_UNKNOWN)
+
+        if isinstance(value, (bool, int, float)):
+            return self._leaf(feature, op, float(value), unit=unit)
+        if not isinstance(value, str):
+            return self._leaf(None, OP_UNKNOWN)
+        if _NUMBER.match(value):
+            return self._leaf(feature, op, float(value), unit=unit)
+
+        value_range = _RANGE.match(value)
+        if value_range and op in (OP_EQ, OP_NE):
+            low, high = sorted(float(bound) for bound in value_range.groups())
+            if op == OP_EQ:
+                return self._group(False, [self._leaf(feature, OP_GE, low, unit=unit),
+                                           self._leaf(feature, OP_LE, high, unit=unit)])
+            return self._group(True, [self._leaf(feature, OP_LT, low, unit=unit),
+                                      self._leaf(feature, OP_GT, high, unit=unit)])
+
+        if op not in (OP_EQ, OP_NE):
+            return self._leaf(None, OP_UNKNOWN)
+        alternatives = [normalize_text(text) for text in _ALTERNATIVES.split(value) if text.strip()]
+        if not alternatives:
+            return self._leaf(None, OP_UNKNOWN)
+        # "male or female" = 대안 중 하나, "!= a or b" = 어느 것도 아님
+        str_op = OP_STR_EQ if op == OP_EQ else OP_STR_NE
+        return self._group(op == OP_EQ, [self._leaf(feature, str_op, text=text) for text in alternatives])
+
+    def _finalize(self, crit_nodes: List[tuple]):
+        leaf_count = len(self._leaf_op)
+        self.leaf_feature = np.array(self._leaf_feature, dtype=np.int64)
+        self.leaf_op = np.array(self._leaf_op, dtype=np.int8)
+        self.leaf_num = np.array(self._leaf_num, dtype=np.float64)
+        self.leaf_pair = np.array(self._leaf_pair, dtype=np.int64)
+        self.leaf_unit = np.array(self._leaf_unit, dtype=np.float64)
+
+        # 연산별 조건 인덱스 (평가 시 해당 열만 비교)
+        self._numeric_ops = [(op, np.flatnonzero(self.leaf_op == op)) for op in (OP_EQ, OP_NE, OP_LT, OP_LE, OP_GT, OP_GE)]
+        self._numeric_ops = [(op, index) for op, index in self._numeric_ops if len(index)]
+        self._text_index = np.flatnonzero((self.leaf_op == OP_STR_EQ) | (self.leaf_op == OP_STR_NE))
+        self._text_negated = self.leaf_op[self._text_index] == OP_STR_NE
+        feature_names = sorted(self._features, key=self._features.get)
+        self._text_closed = np.array(
+            [feature_names[f] in self.closed_features for f in self.leaf_feature[self._text_index]], dtype=bool
+        )
+
+        def resolve(ref):
+            kind, index = ref
+            return index if kind == 'leaf' else leaf_count + index
+
+        # 자식이 먼저 계산되도록 깊이 순으로 평가
+        by_depth = {}
+        for index, (depth, is_or, children) in enumerate(self._groups):
+            by_depth.setdefault(depth, []).append((index, (is_or, [resolve(child) for child in children])))
+        self.levels = [_Levels(by_depth[depth], leaf_count) for depth in sorted(by_depth)]
+        self.node_count = leaf_count + len(self._groups)
+
+        self.crit_node = np.array([resolve(node) for node in crit_nodes], dtype=np.int64)
+        self.crit_exclusion = np.array([criteria_type == 'EXCLUSION' for _, criteria_type, _, _ in self.criteria], dtype=bool)
+        crit_trial = np.array([trial for trial, _, _, _ in self.criteria], dtype=np.int64)
+        counts = np.bincount(crit_trial, minlength=len(self.nct_ids)) if len(crit_trial) else np.zeros(len(self.nct_ids), dtype=np.int64)
+        self.trial_starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+        self.trial_ends = self.trial_starts + counts
+        self.trial_has_criteria = counts > 0
+        self._trial_index = {nct_id: index for index, nct_id in enumerate(self.nct_ids)}
+
+        # 컴파일용 임시 리스트 정리
+        del self._leaf_feature, self._leaf_op, self._leaf_num, self._leaf_pair, self._leaf_unit, self._groups
+
+    # ------------------------------------------------------------------ 평가
+
+    def _encode_profiles(self, profiles: Sequence[Dict]) -> tuple:
+        """프로필 → (숫자 값, 단위(일), 문자열 보유 여부, (feature, 문자열) 일치 여부) 배열"""
+        feature_count = max(len(self._features), 1)
+        numbers = np.full((len(profiles), feature_count), np.nan)
+        units = np.full((len(profiles), feature_count), np.nan)
+        has_text = np.zeros((len(profiles), feature_count), dtype=bool)
+        matched = np.zeros((len(profiles), max(len(self._pairs), 1)), dtype=bool)
+        for p, profile in enumerate(profiles):
+            for name, raw in profile.items():
+                f = self._features.get(self._feature_key(name))
+                if f is None:
+                    continue
+                value, unit = (raw.get('value'), raw.get('unit')) if isinstance(raw, dict) else (raw, None)
+                if isinstance(unit, str):
+                    units[p, f] = _TIME_UNIT_DAYS.get(normalize_text(unit), np.nan)
+                for v in value if isinstance(value, (list, tuple, set)) else [value]:
+                    if isinstance(v, (bool, int, float)):
+                        numbers[p, f] = float(v)
+                    elif isinstance(v, str) and _NUMBER.match(v):
+                        numbers[p, f] = float(v)
+                    elif isinstance(v, str) and v.strip():
+                        has_text[p, f] = True
+                        pair = self._pairs.get((f, normalize_text(v)))
+                        if pair is not None:
+                            matched[p, pair] = True
+        return numbers, units, has_text, matched
+
+    def _evaluate_leaves(self, profiles: Sequence[Dict]) -> np.ndarray:
+        numbers, units, has_text, matched = self._encode_profiles(profiles)
+        result = np.full((len(profiles), len(self.leaf_op)), UNKNOWN, dtype=np.int8)
+        convert_units = not np.isnan(units).all()
+
+        # 숫자 비교 (단위가 양쪽 다 시간 단위면 기준 값을 프로필 단위로 환산)
+        compare = {OP_EQ: np.equal, OP_NE: np.not_equal, OP_LT: np.less, OP_LE: np.less_equal,
+                   OP_GT: np.greater, OP_GE: np.greater_equal}
+        for op, index in self._numeric_ops:
+            columns = self.leaf_feature[index]
+            x = numbers[:, columns]
+            threshold = np.broadcast_to(self.leaf_num[index], x.shape)
+            if convert_units:
+                profile_unit = units[:, columns]
+                leaf_unit = self.leaf_unit[index]
+                threshold = np.where(np.isnan(profile_unit) | np.isnan(leaf_unit), threshold,
+                                     threshold * leaf_unit / profile_unit)
+            with np.errstate(invalid='ignore'):
+                truth = compare[op](x, threshold)
+            result[:, index] = np.where(np.isnan(x), UNKNOWN, np.where(truth, PASS, FAIL))
+
+        # 문자열 일치: 일치 PASS, 닫힌 feature 불일치 FAIL, 그 외 UNKNOWN (!= 는 반대)
+        if len(self._text_index):
+            index = self._text_index
+            text = np.where(
+                matched[:, self.leaf_pair[index]], PASS,
+                np.where(has_text[:, self.leaf_feature[index]] & self._text_closed, FAIL, UNKNOWN)
+            )
+            result[:, index] = np.where(self._text_negated, PASS - text, text)
+        return result
+
+    def _evaluate_chunk(self, profiles: Sequence[Dict]) -> tuple:
+        values = np.empty((len(profiles), self.node_count), dtype=np.int8)
+        leaf_count = len(self.leaf_op)
+        values[:, :leaf_count] = self._evaluate_leaves(profiles)
+        for level in self.levels:
+            for is_or, targets, children, starts in level.steps:
+                reduce = np.maximum if is_or else np.minimum
+                values[:, targets] = reduce.reduceat(values[:, children], starts, axis=1)
+
+        criterion = values[:, self.crit_node]
+        criterion = np.where(self.crit_exclusion, PASS - criterion, criterion).astype(np.int8)
+        trials = np.full((len(profiles), len(self.nct_ids)), PASS, dtype=np.int8)
+        if criterion.shape[1]:
+            with_criteria = self.trial_has_criteria
+            trials[:, with_criteria] = np.minimum.reduceat(criterion, self.trial_starts[with_criteria], axis=1)
+        return trials, criterion
+
+    def match(self, profiles: Sequence[Dict]) -> 'MatchResult':
+        """프로필 목록을 전체 연구에 대해 평가"""
+        trial_parts, criterion_parts = [], []
+        for start in range(0, len(profiles), PROFILE_CHUNK_SIZE):
+            trials, criterion = self._evaluate_chunk(profiles[start:start + PROFILE_CHUNK_SIZE])
+            trial_parts.append(trials)
+            criterion_parts.append(criterion)
+        if not trial_parts:
+            trial_parts = [np.empty((0, len(self.nct_ids)), dtype=np.int8)]
+            criterion_parts = [np.empty((0, len(self.criteria)), dtype=np.int8)]
+        return MatchResult(self, np.vstack(trial_parts), np.vstack(criterion_parts))
+
+    def match_profile(self, profile: Dict) -> 'MatchResult':
+        """프로필 하나를 평가"""
+        return self.match([profile])
+
+
+class MatchResult:
+    """매칭 결과 (trial_status: 프로필 × 연구, criterion_status: 프로필 × 기준, 값은 FAIL/UNKNOWN/PASS)"""
+
+    def __init__(self, matcher: TrialMatcher, trial_status: np.ndarray, criterion_status: np.ndarray):
+        self.matcher = matcher
+        self.trial_status = trial_status
+        self.criterion_status = criterion_status
+
+    def trials(self, profile_index: int = 0, status: str = 'ELIGIBLE') -> List[str]:
+        """판정이 status(ELIGIBLE/INELIGIBLE/UNKNOWN)인 연구의 nct_id 목록"""
+        code = {name: code for code, name in TRIAL_STATUS.items()}[status]
+        return [self.matcher.nct_ids[i] for i in np.flatnonzero(self.trial_status[profile_index] == code)]
+
+    def summary(self, profile_index: int = 0) -> Dict[str, int]:
+        """판정별 연구 수"""
+        counts = np.bincount(self.trial_status[profile_index], minlength=3)
+        return {TRIAL_STATUS[code]: int(counts[code]) for code in (PASS, UNKNOWN, FAIL)}
+
+    def explain(self, nct_id: str, profile_index: int = 0) -> Dict:
+        """연구 하나의 판정과 기준별 PASS/FAIL/UNKNOWN"""
+        matcher = self.matcher
+        trial = matcher._trial_index[nct_id]
+        criteria = []
+        for index in range(matcher.trial_starts[trial], matcher.trial_ends[trial]):
+            _, criteria_type, criterion_id, original_text = matcher.criteria[index]
+            criteria.append({
+                'criteria_type': criteria_type,
+                'criterion_id': criterion_id,
+                'original_text': original_text,
+                'status': CRITERION_STATUS[int(self.criterion_status[profile_index, index])]
+            })
+        return {
+            'nct_id': nct_id,
+            'status': TRIAL_STATUS[int(self.trial_status[profile_index, trial])],
+            'criteria': criteria
+        }
+
+
+def load_trials(conn, limit: Optional[int] = None) -> List[Dict]:
+    """전처리 성공(llm_status = 'SUCCESS') 연구의 구조화 기준 조회"""
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        query = """
+            SELECT nct_id, inclusion_criteria, exclusion_criteria
+            FROM inclusion_exclusion_llm_preprocessed
+            WHERE llm_status = 'SUCCESS'
+            ORDER BY nct_id
+        """
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        cur.execute(query)
+        return cur.fetchall()
+
+
+def main():
+    """메인 함수"""
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    show_unknown = '--show-unknown' in sys.argv[1:]
+    if not args:
+        print("사용법: python llm/eligibility_matcher.py <profile.json> [limit] [--show-unknown]")
+        sys.exit(1)
+
+    with open(args[0], 'r', encoding='utf-8') as f:
+        profiles = json.load(f)
+    if isinstance(profiles, dict):
+        profiles = [profiles]
+    limit = int(args[1]) if len(args) > 1 else None
+
+    print("=" * 80)
+    print("[START] 환자-임상시험 적격성 매칭")
+    print("=" * 80)
+
+    conn = get_db_connection()
+    try:
+        trials = load_trials(conn, limit)
+        normalizer = FeatureNormalizer.load(conn)
+    finally:
+        conn.close()
+
+    started = time.perf_counter()
+    matcher = TrialMatcher(trials, feature_normalizer=normalizer)
+    compiled = time.perf_counter()
+    result = matcher.match(profiles)
+    matched = time.perf_counter()
+
+    print(f"[INFO] 연구 {len(matcher.nct_ids):,}개, 기준 {len(matcher.criteria):,}개, 조건 {len(matcher.leaf_op):,}개 컴파일 "
+          f"({(compiled - started) * 1000:.1f}ms)")
+    print(f"[INFO] 프로필 {len(profiles):,}개 매칭 ({(matched - compiled) * 1000:.1f}ms)")
+
+    for index, profile in enumerate(profiles):
+        summary = result.summary(index)
+        print(f"\n[프로필 {index + 1}] {json.dumps(profile, ensure_ascii=False)}")
+        print(f"  ELIGIBLE: {summary['ELIGIBLE']:,}개, UNKNOWN: {summary['UNKNOWN']:,}개, INELIGIBLE: {summary['INELIGIBLE']:,}개")
+        for status in (['ELIGIBLE', 'UNKNOWN'] if show_unknown else ['ELIGIBLE']):
+            nct_ids = result.trials(index, status)
+            if nct_ids:
+                print(f"  {status}: {', '.join(nct_ids[:50])}" + (f" ... 외 {len(nct_ids) - 50:,}개" if len(nct_ids) > 50 else ''))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,31 +5,22 @@ Inclusion/Exclusion 전처리 및 Validation 종합 보고서 생성 스크립
 """
 
 import os
+import sys
 import json
 from datetime import datetime
 from typing import Dict, List, Optional
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
 load_dotenv()
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
-
-
 def get_preprocessing_stats(conn) -> Dict:
     """전처리 통계 조회"""
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
@@ -42,6 +33,7 @@ def get_preprocessing_stats(conn) -> Dict:
                 COUNT(CASE WHEN llm_status = 'EXCLUSION_FAILED' THEN 1 END) as exclusion_failed,
                 COUNT(CASE WHEN llm_status = 'BOTH_FAILED' THEN 1 END) as both_failed,
                 COUNT(CASE WHEN llm_status = 'API_FAILED' THEN 1 END) as api_failed,
+                COUNT(CASE WHEN llm_status = 'PARSE_ERROR' THEN 1 END) as parse_error,
                 COUNT(inclusion_criteria) as with_inclusion,
                 COUNT(exclusion_criteria) as with_exclusion,
                 COUNT(CASE WHEN inclusion_criteria IS NOT NULL AND exclusion_criteria IS NOT NULL THEN 1 END) as complete
@@ -207,49 +199,27 @@ def get_validation_stats(conn) -> Dict:
 
 
 def get_feature_distribution(conn, limit: int = 20) -> List[Dict]:
-    """Feature 분포 조회 (상위 N개)"""
+    """Feature 분포 조회 (상위 N개, 표준 feature(feature_id)로 묶고 매핑 안 된 feature는 문자열별로 집계)"""
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute("""
+            WITH feature_counts AS (
+                SELECT 
+                    feature_id,
+                    CASE WHEN feature_id IS NULL THEN feature END as feature,
+                    COUNT(*) as usage_count
+                FROM inclusion_exclusion_criteria
+                WHERE feature IS NOT NULL
+                GROUP BY 1, 2
+            )
             SELECT 
-                inclusion_criteria,
-                exclusion_criteria
-            FROM inclusion_exclusion_llm_preprocessed
-            WHERE llm_status = 'SUCCESS'
-        """)
-        all_data = cur.fetchall()
-        
-        # Python에서 feature 추출
-        feature_counts = {}
-        for row in all_data:
-            # Inclusion features
-            if row['inclusion_criteria']:
-                try:
-                    inc = json.loads(row['inclusion_criteria']) if isinstance(row['inclusion_criteria'], str) else row['inclusion_criteria']
-                    if isinstance(inc, list):
-                        for item in inc:
-                            if isinstance(item, dict):
-                                feature = item.get('feature')
-                                if feature and feature.strip():
-                                    feature_counts[feature] = feature_counts.get(feature, 0) + 1
-                except:
-                    pass
-            
-            # Exclusion features
-            if row['exclusion_criteria']:
-                try:
-                    exc = json.loads(row['exclusion_criteria']) if isinstance(row['exclusion_criteria'], str) else row['exclusion_criteria']
-                    if isinstance(exc, list):
-                        for item in exc:
-                            if isinstance(item, dict):
-                                feature = item.get('feature')
-                                if feature and feature.strip():
-                                    feature_counts[feature] = feature_counts.get(feature, 0) + 1
-                except:
-                    pass
-        
-        # 상위 N개 반환
-        sorted_features = sorted(feature_counts.items(), key=lambda x: x[1], reverse=True)[:limit]
-        return [{'feature': f, 'usage_count': c} for f, c in sorted_features]
+                COALESCE(d.canonical_name, fc.feature) as feature,
+                fc.usage_count
+            FROM feature_counts fc
+            LEFT JOIN criterion_feature_dict d ON d.feature_id = fc.feature_id
+            ORDER BY fc.usage_count DESC, 1
+            LIMIT %s
+        """, (limit,))
+        return [dict(row) for row in cur.fetchall()]
 
 
 def get_sample_results(conn, status: str = 'SUCCESS', limit: int = 3) -> List[Dict]:
@@ -268,7 +238,7 @@ def get_sample_results(conn, status: str = 'SUCCESS', limit: int = 3) -> List[Di
                 llm_validation_notes,
                 validation_consistency_score,
                 needs_manual_review
-            FROM inclusion_exclusion_llm_preprocessed
+            FROM inclusion_exclusion_llm_preprocessed_with_raw
             WHERE llm_status = %s
             ORDER BY nct_id
             LIMIT %s
@@ -356,6 +326,7 @@ def generate_report(output_dir: Optional[str] = None) -> str:
                 f.write(f'- **Exclusion 실패**: {stats["exclusion_failed"]:,}개 ({stats["exclusion_failed"]/stats["total"]*100:.2f}%)\n')
                 f.write(f'- **둘 다 실패**: {stats["both_failed"]:,}개 ({stats["both_failed"]/stats["total"]*100:.2f}%)\n')
                 f.write(f'- **API 실패**: {stats["api_failed"]:,}개 ({stats["api_failed"]/stats["total"]*100:.2f}%)\n')
+                f.write(f'- **응답 파싱 실패**: {stats["parse_error"]:,}개 ({stats["parse_error"]/stats["total"]*100:.2f}%)\n')
             f.write('\n')
             
             f.write('### 1.2 Validation 요약\n\n')
@@ -6,9 +6,9 @@ outcome_llm_preprocessed 테이블에서 llm_status = 'SUCCESS'인 항목들의
 """
 
 import os
+import sys
 from datetime import datetime
 from typing import Dict, List
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
@@ -16,18 +16,9 @@ load_dotenv()
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
-
-
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, ROOT_DIR)
+from db_access import get_db_connection
 
 
 def get_validation_stats(conn):
@@ -125,7 +116,7 @@ def get_time_unit_stats(conn):
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute("""
             SELECT 
-                llm_time_unit,
+                COALESCE(llm_time_unit_norm, llm_time_unit) as llm_time_unit,
                 COUNT(*) as total_count,
                 COUNT(*) FILTER (WHERE llm_validation_status = 'VERIFIED') as verified_count,
                 ROUND(
@@ -133,11 +124,12 @@ def get_time_unit_stats(conn):
                     COUNT(*)::NUMERIC * 100, 
                     2
                 ) as verified_rate,
-                AVG(llm_time_value) FILTER (WHERE llm_validation_status = 'VERIFIED') as avg_time_value
+                AVG(llm_time_value) FILTER (WHERE llm_validation_status = 'VERIFIED') as avg_time_value,
+                AVG(llm_time_value_days) FILTER (WHERE llm_validation_status = 'VERIFIED') as avg_time_days
             FROM outcome_llm_preprocessed
             WHERE llm_status = 'SUCCESS'
               AND llm_time_unit IS NOT NULL
-            GROUP BY llm_time_unit
+            GROUP BY 1
             ORDER BY total_count DESC
         """)
         return cur.fetchall()
@@ -249,11 +241,12 @@ def generate_report(conn, output_dir=None):
         # 5. Time Unit별 통계
         f.write('## 5. Time Unit별 통계\n\n')
         if time_unit_stats:
-            f.write('| Time Unit | 전체 개수 | VERIFIED 개수 | VERIFIED 비율 | 평균 Time Value |\n')
-            f.write('|----------|----------|--------------|-------------|----------------|\n')
+            f.write('| Time Unit | 전체 개수 | VERIFIED 개수 | VERIFIED 비율 | 평균 Time Value | 평균 기간 (일) |\n')
+            f.write('|----------|----------|--------------|-------------|----------------|---------------|\n')
             for stat in time_unit_stats:
                 avg_value = float(stat['avg_time_value']) if stat['avg_time_value'] else 0
-                f.write(f"| {stat['llm_time_unit']} | {stat['total_count']:,} | {stat['verified_count']:,} | {stat['verified_rate']:.2f}% | {avg_value:.1f} |\n")
+                avg_days = f"{float(stat['avg_time_days']):.1f}" if stat['avg_time_days'] is not None else '-'
+                f.write(f"| {stat['llm_time_unit']} | {stat['total_count']:,} | {stat['verified_count']:,} | {stat['verified_rate']:.2f}% | {avg_value:.1f} | {avg_days} |\n")
         f.write('\n')
         
         # 6. 검증 방법 설명
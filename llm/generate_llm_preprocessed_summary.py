@@ -5,9 +5,9 @@ outcome_llm_preprocessed 테이블의 통계를 조회하여 MD 파일로 저장
 """
 
 import os
+import sys
 from datetime import datetime
 from typing import Dict, List
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
@@ -15,18 +15,9 @@ load_dotenv()
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
-
-
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, ROOT_DIR)
+from db_access import get_db_connection
 
 
 def get_total_stats(conn):
@@ -36,9 +27,9 @@ def get_total_stats(conn):
             SELECT 
                 COUNT(*) as total_outcomes,
                 COUNT(*) FILTER (WHERE llm_status = 'SUCCESS') as success_count,
-                COUNT(*) FILTER (WHERE llm_status IN ('MEASURE_FAILED', 'TIMEFRAME_FAILED', 'BOTH_FAILED', 'API_FAILED')) as failed_count,
+                COUNT(*) FILTER (WHERE llm_status IN ('MEASURE_FAILED', 'TIMEFRAME_FAILED', 'BOTH_FAILED', 'API_FAILED', 'PARSE_ERROR')) as failed_count,
                 ROUND(COUNT(*) FILTER (WHERE llm_status = 'SUCCESS')::NUMERIC / COUNT(*)::NUMERIC * 100, 2) as success_rate,
-                ROUND(COUNT(*) FILTER (WHERE llm_status IN ('MEASURE_FAILED', 'TIMEFRAME_FAILED', 'BOTH_FAILED', 'API_FAILED'))::NUMERIC / COUNT(*)::NUMERIC * 100, 2) as failed_rate
+                ROUND(COUNT(*) FILTER (WHERE llm_status IN ('MEASURE_FAILED', 'TIMEFRAME_FAILED', 'BOTH_FAILED', 'API_FAILED', 'PARSE_ERROR'))::NUMERIC / COUNT(*)::NUMERIC * 100, 2) as failed_rate
             FROM outcome_llm_preprocessed
         """)
         return cur.fetchone()
@@ -109,14 +100,15 @@ def get_time_unit_stats(conn):
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute("""
             SELECT 
-                llm_time_unit,
+                COALESCE(llm_time_unit_norm, llm_time_unit) as llm_time_unit,
                 COUNT(*) as total_count,
                 COUNT(*) FILTER (WHERE llm_status = 'SUCCESS') as success_count,
                 ROUND(COUNT(*) FILTER (WHERE llm_status = 'SUCCESS')::NUMERIC / COUNT(*)::NUMERIC * 100, 2) as success_rate,
-                AVG(llm_time_value) FILTER (WHERE llm_status = 'SUCCESS') as avg_time_value
+                AVG(llm_time_value) FILTER (WHERE llm_status = 'SUCCESS') as avg_time_value,
+                AVG(llm_time_value_days) FILTER (WHERE llm_status = 'SUCCESS') as avg_time_days
             FROM outcome_llm_preprocessed
             WHERE llm_time_unit IS NOT NULL
-            GROUP BY llm_time_unit
+            GROUP BY 1
             ORDER BY total_count DESC
         """)
         return cur.fetchall()
@@ -165,7 +157,7 @@ def get_phase_stats(conn):
                 COUNT(*) as total_count,
                 COUNT(*) FILTER (WHERE llm_status = 'SUCCESS') as success_count,
                 ROUND(COUNT(*) FILTER (WHERE llm_status = 'SUCCESS')::NUMERIC / COUNT(*)::NUMERIC * 100, 2) as success_rate
-            FROM outcome_llm_preprocessed
+            FROM outcome_llm_preprocessed_with_raw
             WHERE phase IS NOT NULL
             GROUP BY phase
             ORDER BY total_count DESC
@@ -250,11 +242,12 @@ def generate_summary_report(conn, output_dir=None):
         # 4. Time Unit별 통계
         f.write('## 4. Time Unit별 통계\n\n')
         if time_unit_stats:
-            f.write('| Time Unit | 전체 개수 | 성공 개수 | 성공률 (%) | 평균 Time Value |\n')
-            f.write('|----------|----------|----------|-----------|----------------|\n')
+            f.write('| Time Unit | 전체 개수 | 성공 개수 | 성공률 (%) | 평균 Time Value | 평균 기간 (일) |\n')
+            f.write('|----------|----------|----------|-----------|----------------|---------------|\n')
             for stat in time_unit_stats:
                 avg_value = float(stat['avg_time_value']) if stat['avg_time_value'] else 0
-                f.write(f"| {stat['llm_time_unit']} | {stat['total_count']:,} | {stat['success_count']:,} | {float(stat['success_rate']):.2f} | {avg_value:.1f} |\n")
+                avg_days = f"{float(stat['avg_time_days']):.1f}" if stat['avg_time_days'] is not None else '-'
+                f.write(f"| {stat['llm_time_unit']} | {stat['total_count']:,} | {stat['success_count']:,} | {float(stat['success_rate']):.2f} | {avg_value:.1f} | {avg_days} |\n")
             f.write('\n')
         
         # 5. 검증 상태별 통계 (SUCCESS 항목 기준)
@@ -0,0 +1,190 @@
+"""
+LLM 배치 응답 정렬 (Inclusion/Exclusion 전처리)
+
+LLM 응답 객체를 요청 항목에 순서와 무관하게 매칭합니다. 모든 단계는 선형 시간입니다.
+1. 명시적 키: 응답의 nct_id가 요청 항목의 nct_id와 일치
+2. 순번 토큰: nct_id가 없거나 잘못된 응답은 에코된 item_no로 매칭
+   (원문 대조 점수가 낮으면 순번이 밀린 것으로 보고 매칭하지 않음)
+3. 원문 대조: 남은 응답의 original_text 토큰이 원본 eligibility_criteria_raw에 포함되는 비율로 매칭
+   (배치 내 여러 항목에 공통으로 나오는 토큰은 낮은 가중치)
+
+확실하게 매칭되지 않은 요청 항목은 unmatched로 반환하여 재시도 대상으로 처리합니다.
+배열 위치만으로는 매칭하지 않습니다 (항목이 누락되면 이후 항목이 모두 밀리기 때문).
+"""
+
+import re
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+# 원문 대조만으로 매칭할 최소 점수와 2순위 후보와의 최소 차이
+TEXT_MATCH_THRESHOLD = 0.8
+TEXT_MATCH_MARGIN = 0.1
+# 순번으로 매칭할 때 요구하는 최소 원문 대조 점수 (original_text가 있는 경우만)
+ORDINAL_VERIFY_THRESHOLD = 0.7
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def normalize_tokens(text: str) -> Set[str]:
+    """소문자 영숫자 토큰 집합 (1글자 토큰 제외)"""
+    if not text:
+        return set()
+    return {t for t in TOKEN_PATTERN.findall(text.lower()) if len(t) > 1}
+
+
+def result_text_tokens(result: Dict) -> Set[str]:
+    """응답의 inclusion/exclusion original_text 토큰 집합"""
+    tokens = set()
+    for field in ('inclusion_criteria', 'exclusion_criteria'):
+        criteria = result.get(field)
+        if not isinstance(criteria, list):
+            continue
+        for criterion in criteria:
+            if isinstance(criterion, dict):
+                tokens |= normalize_tokens(str(criterion.get('original_text') or ''))
+    return tokens
+
+
+def token_weights(item_token_sets: List[Set[str]]) -> Dict[str, float]:
+    """배치 내 문서 빈도 기반 토큰 가중치 (여러 항목에 나오는 토큰일수록 낮음)"""
+    n = len(item_token_sets)
+    df = Counter(token for tokens in item_token_sets for token in tokens)
+    return {token: math.log(1 + n / count) for token, count in df.items()}
+
+
+def text_score(result_tokens: Set[str], item_tokens: Set[str], weights: Dict[str, float], default_weight: float) -> Optional[float]:
+    """응답 토큰 가중치 중 원문에 포함된 비율 (응답에 original_text가 없으면 None)"""
+    if not result_tokens:
+        return None
+    total = sum(weights.get(t, default_weight) for t in result_tokens)
+    hit = sum(weights.get(t, default_weight) for t in result_tokens & item_tokens)
+    return hit / total
+
+
+def _normalize_key(value) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    value = value.strip().upper()
+    return value or None
+
+
+def _parse_ordinal(value) -> Optional[int]:
+    try:
+        return int(str(value).strip().lstrip('#'))
+    except (TypeError, ValueError):
+        return None
+
+
+def align_results(
+    items: List[Dict],
+    results: List,
+    item_key: str = 'nct_id',
+    text_field: str = 'eligibility_criteria_raw',
+    ordinal_key: str = 'item_no'
+) -> Tuple[Dict[str, Dict], List[Dict], Dict[str, int]]:
+    """
+    응답 객체를 요청 항목에 정렬
+
+    Args:
+        items: 요청 항목 리스트 (프롬프트에 1부터 순번을 붙인 순서)
+        results: LLM 응답 객체 리스트
+        item_key: 요청/응답 공통 키 (nct_id)
+        text_field: 원문 대조에 사용할 요청 항목 필드
+        ordinal_key: 응답에 에코된 순번 필드
+
+    Returns:
+        (matched, unmatched_items, stats)
+        - matched: {요청 키: 응답 객체} (응답 객체의 키는 요청 키로 교정됨)
+        - unmatched_items: 매칭되지 않은 요청 항목 (재시도 대상)
+        - stats: 단계별 매칭 수 {'key', 'ordinal', 'text', 'duplicate', 'rejected'}
+    """
+    stats = {'key': 0, 'ordinal': 0, 'text': 0, 'duplicate': 0, 'rejected': 0}
+    key_to_index = {}
+    for index, item in enumerate(items):
+        key = _normalize_key(item.get(item_key))
+        if key and key not in key_to_index:
+            key_to_index[key] = index
+
+    matched_index = {}  # 요청 인덱스 -> 응답 객체
+    leftovers = []
+    item_token_sets = None
+    weights = {}
+    # 배치 어느 항목에도 없는 토큰의 가중치 (가장 높음)
+    default_weight = math.log(1 + len(items)) if items else 1.0
+
+    def item_tokens(index):
+        nonlocal item_token_sets, weights
+        if item_token_sets is None:
+            item_token_sets = [normalize_tokens(str(item.get(text_field) or '')) for item in items]
+            weights = token_weights(item_token_sets)
+        return item_token_sets[index]
+
+    # 1단계: 명시적 키
+    for r in results:
+        if not isinstance(r, dict):
+            continue
+        index = key_to_index.get(_normalize_key(r.get(item_key)))
+        if index is None:
+            leftovers.append(r)
+        elif index in matched_index:
+            stats['duplicate'] += 1
+        else:
+            matched_index[index] = r
+            stats['key'] += 1
+
+    # 2단계: 순번 토큰 (원문 대조로 검증)
+    remaining = []
+    for r in leftovers:
+        ordinal = _parse_ordinal(r.get(ordinal_key))
+        index = ordinal - 1 if ordinal is not None else None
+        if index is None or not 0 <= index < len(items) or index in matched_index:
+            remaining.append(r)
+            continue
+        score = text_score(result_text_tokens(r), item_tokens(index), weights, default_weight)
+        if score is not None and score < ORDINAL_VERIFY_THRESHOLD:
+            remaining.append(r)
+            continue
+        matched_index[index] = r
+        stats['ordinal'] += 1
+
+    # 3단계: 원문 대조 (남은 요청 항목의 토큰 역색인으로 후보 탐색)
+    if remaining:
+        open_indices = [i for i in range(len(items)) if i not in matched_index]
+        postings = {}
+        for index in open_indices:
+            for token in item_tokens(index):
+                postings.setdefault(token, []).append(index)
+
+        for r in remaining:
+            tokens = result_text_tokens(r)
+            if not tokens:
+                stats['rejected'] += 1
+                continue
+            total = sum(weights.get(t, default_weight) for t in tokens)
+            overlap = Counter()
+            for token in tokens:
+                for index in postings.get(token, ()):
+                    if index not in matched_index:
+                        overlap[index] += weights[token]
+            ranked = overlap.most_common(2)
+            if not ranked:
+                stats['rejected'] += 1
+                continue
+            best_index, best_weight = ranked[0]
+            best_score = best_weight / total
+            second_score = ranked[1][1] / total if len(ranked) > 1 else 0.0
+            if best_score >= TEXT_MATCH_THRESHOLD and best_score - second_score >= TEXT_MATCH_MARGIN:
+                matched_index[best_index] = r
+                stats['text'] += 1
+            else:
+                stats['rejected'] += 1
+
+    matched = {}
+    for index, r in matched_index.items():
+        key = items[index].get(item_key)
+        r[item_key] = key
+        matched[key] = r
+
+    unmatched_items = [item for index, item in enumerate(items) if index not in matched_index]
+    return matched, unmatched_items, stats
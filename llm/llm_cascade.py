@@ -0,0 +1,168 @@
+"""
+LLM 모델 캐스케이드 (저비용 → 고성능)
+
+배치를 먼저 가장 빠르고 저렴한 모델(LLM_CASCADE_MODELS 첫 번째)로 처리하고,
+신뢰도가 CASCADE_CONFIDENCE_THRESHOLD 미만이거나 파싱에 실패했거나 검증 결과가 UNCERTAIN인 항목만
+다음 모델로 다시 처리합니다. 쉬운 항목은 첫 단계에서 끝나므로 쿼터 단위당 처리량이 늘어납니다.
+
+- 각 결과에 실제로 사용한 모델을 model_key(기본 'llm_model')로 기록
+- API_FAILED 항목은 승격하지 않음 (모델 문제가 아니므로 재시도 큐 llm_retry에서 처리)
+- 상위 모델 호출이 API/파싱 실패로 끝나면 하위 모델 결과를 유지
+- LLM_CASCADE_MODELS가 비어 있으면 GEMINI_MODEL 단일 단계로 동작 (기존과 동일)
+"""
+
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+import llm_config
+from llm_config import GEMINI_MODEL, LLM_CASCADE_MODELS, CASCADE_CONFIDENCE_THRESHOLD
+from llm_retry import classify_failure, FAILURE_API, FAILURE_PARSE
+
+# 단계별 처리/승격 항목 수 {모델: {'processed', 'escalated'}}
+_stats = {}
+
+
+def get_model_tiers() -> List[str]:
+    """캐스케이드 모델 순서 (저비용 → 고성능)"""
+    return list(LLM_CASCADE_MODELS) or [GEMINI_MODEL]
+
+
+def get_active_model() -> str:
+    """현재 호출에 사용되는 모델"""
+    return llm_config._active_model or GEMINI_MODEL
+
+
+def can_escalate() -> bool:
+    """현재 모델보다 상위 단계가 남아 있는지"""
+    tiers = get_model_tiers()
+    model = get_active_model()
+    return model in tiers and tiers.index(model) < len(tiers) - 1
+
+
+@contextmanager
+def use_model(model: str):
+    """블록 안의 generate_text 호출을 지정한 모델로 실행"""
+    previous = llm_config._active_model
+    llm_config._active_model = model
+    try:
+        yield
+    finally:
+        llm_config._active_model = previous
+
+
+def _is_low_confidence(confidence) -> bool:
+    try:
+        return confidence is None or float(confidence) < CASCADE_CONFIDENCE_THRESHOLD
+    except (TypeError, ValueError):
+        return True
+
+
+def needs_preprocess_escalation(result: Dict) -> bool:
+    """전처리 결과 승격 여부: 파싱 실패 또는 신뢰도 미달 (API 실패, LLM 없이 만든 결과 제외)"""
+    if 'llm_model' in result and result['llm_model'] is None:
+        return False
+    kind = classify_failure(result)
+    if kind == FAILURE_API:
+        return False
+    if kind == FAILURE_PARSE:
+        return True
+    return _is_low_confidence(result.get('llm_confidence'))
+
+
+def needs_validation_escalation(result: Dict) -> bool:
+    """검증 결과(1회 실행) 승격 여부: UNCERTAIN, 파싱 실패 또는 신뢰도 미달 (API 실패/키 소진 제외)"""
+    notes = result.get('notes') or ''
+    if '[API_FAILED]' in notes or '[API_KEYS_EXHAUSTED]' in notes:
+        return False
+    if result.get('status') == 'UNCERTAIN' or '[PARSE_ERROR]' in notes:
+        return True
+    return _is_low_confidence(result.get('confidence'))
+
+
+def process_with_cascade(
+    items: List[Dict],
+    process_batch_fn: Callable,
+    item_key: str,
+    needs_escalation_fn: Callable[[Dict], bool],
+    result_key: Optional[str] = None,
+    notes_key: str = 'llm_notes',
+    model_key: str = 'llm_model'
+) -> Dict:
+    """
+    배치를 캐스케이드 순서로 처리하고 승격 조건에 해당하는 항목만 다음 모델로 재처리
+
+    Args:
+        items: 처리할 원본 항목 리스트
+        process_batch_fn: 배치 처리 함수. 결과 리스트(result_key 필요) 또는 {키: 결과} 딕셔너리 반환
+        item_key: 원본 항목의 키 이름 (예: 'id', 'nct_id')
+        needs_escalation_fn: 결과를 받아 상위 모델로 승격할지 판정하는 함수
+        result_key: 결과 리스트 항목의 키 이름 (예: 'outcome_id')
+        notes_key: 실패 유형 판정에 사용할 노트 필드
+        model_key: 사용한 모델을 기록할 결과 필드 (모델 없이 만들어진 결과는 미리 None으로 설정)
+
+    Returns:
+        {키: 결과} (원본 항목 순서)
+    """
+    tiers = get_model_tiers()
+    final_results = {}
+    pending = list(items)
+
+    for tier_index, model in enumerate(tiers):
+        with use_model(model):
+            batch_results = process_batch_fn(pending)
+        if not isinstance(batch_results, dict):
+            batch_results = {r.get(result_key): r for r in batch_results}
+
+        stats = _stats.setdefault(model, {'processed': 0, 'escalated': 0})
+        stats['processed'] += len(pending)
+        escalated = []
+        for item in pending:
+            key = item.get(item_key)
+            result = batch_results.get(key)
+            if result is None:
+                continue
+            result.setdefault(model_key, model)
+            previous = final_results.get(key)
+            # 상위 모델 호출/파싱 실패 시 하위 모델 결과 유지
+            if previous is not None and (llm_config._all_keys_exhausted or classify_failure(result, notes_key)):
+                continue
+            final_results[key] = result
+            if tier_index < len(tiers) - 1 and needs_escalation_fn(result):
+                escalated.append(item)
+
+        if not escalated or llm_config._all_keys_exhausted:
+            break
+        stats['escalated'] += len(escalated)
+        print(f"  [CASCADE] {len(escalated)}/{len(pending)}개 항목을 {tiers[tier_index + 1]} 모델로 승격")
+        pending = escalated
+
+    return {item.get(item_key): final_results[item.get(item_key)] for item in items if item.get(item_key) in final_results}
+
+
+def cascade_batch_fn(
+    process_batch_fn: Callable[[List[Dict]], List[Dict]],
+    item_key: str,
+    result_key: str,
+    needs_escalation_fn: Callable[[Dict], bool] = needs_preprocess_escalation
+) -> Callable[[List[Dict]], List[Dict]]:
+    """process_with_retry에 넘길 수 있는 캐스케이드 배치 함수 (리스트 → 리스트)"""
+    def run(batch: List[Dict]) -> List[Dict]:
+        return list(process_with_cascade(
+            batch, process_batch_fn, item_key, needs_escalation_fn, result_key=result_key
+        ).values())
+    return run
+
+
+def get_cascade_stats() -> Dict[str, Dict[str, int]]:
+    """단계별 처리/승격 항목 수"""
+    return {model: dict(stats) for model, stats in _stats.items()}
+
+
+def print_cascade_stats():
+    """캐스케이드 사용 시 단계별 처리 통계 출력"""
+    if len(get_model_tiers()) < 2 or not _stats:
+        return
+    print("\n[CASCADE] 모델 단계별 처리 항목")
+    for model in get_model_tiers():
+        stats = _stats.get(model)
+        if stats:
+            print(f"  {model}: 처리 {stats['processed']:,}개, 상위 모델로 승격 {stats['escalated']:,}개")
@@ -0,0 +1,277 @@
+"""
+공유 Gemini 호출 계층
+
+LLM 스크립트들이 공통으로 사용하는 API 키 로테이션 로직입니다.
+- 호출 전에 쿼터 원장(llm_quota_ledger)을 확인하여 소진된 키는 건너뜀
+- 성공 요청/토큰/429를 원장에 기록하여 다른 프로세스와 공유
+- 키별 서킷 브레이커(llm_key_health): 타임아웃/5xx가 반복되는 키는 차단하고 빠른 키 우선 사용
+- 헤지 요청(HEDGE_ENABLED): 응답이 지연 시간 백분위수보다 늦으면 다른 키로 중복 요청, 먼저 온 응답 사용
+- LLM_BACKEND=mock 이면 실제 API 대신 로컬 대체 백엔드(llm_mock_backend) 사용
+- 모델 캐스케이드(llm_cascade) 실행 중에는 현재 단계 모델로 호출
+- LLM_RECORD_PATH 설정 시 응답 기록, LLM_BACKEND=replay 이면 기록된 응답 재생 (llm_record_replay)
+- 응답 텍스트만 반환하며, JSON 파싱/복구는 각 스크립트에서 수행
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures, FIRST_COMPLETED
+from typing import Dict, Optional, Tuple
+from google import genai
+import llm_config
+import llm_quota_ledger
+import llm_key_health
+import llm_record_replay
+from llm_config import (
+    get_api_keys, GEMINI_MODEL, LLM_BACKEND,
+    HEDGE_ENABLED, HEDGE_PERCENTILE, HEDGE_MIN_DELAY, HEDGE_MIN_SAMPLES
+)
+
+# 모든 키가 분당 한도로만 막혀 있을 때 기다릴 최대 시간 (초)
+MAX_LEDGER_WAIT = 65
+
+# 헤지 요청용 스레드 풀 (먼저 끝난 요청을 사용하고, 늦은 요청은 결과만 버림)
+_executor = None
+
+
+def is_rate_limit_error(error_str: str) -> bool:
+    """429 (RESOURCE_EXHAUSTED) 에러 여부"""
+    return "429" in error_str or "RESOURCE_EXHAUSTED" in error_str.upper()
+
+
+def get_token_count(response) -> int:
+    """응답의 usage_metadata에서 총 토큰 수 추출 (없으면 0)"""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return 0
+    return getattr(usage, 'total_token_count', 0) or 0
+
+
+def pick_key_index(api_keys, start_index: int, exclude: set) -> Tuple[Optional[int], Optional[float]]:
+    """
+    쿼터 원장과 서킷 브레이커 기준으로 지금 사용 가능한 키 선택
+
+    서킷이 OPEN이 아닌 키를 상태 점수 순으로 확인하며, 점수가 같으면 start_index부터 순서대로 확인합니다.
+
+    Returns:
+        (key_index, earliest_ready_at)
+        - 사용 가능한 키가 있으면 (인덱스, None)
+        - 없으면 (None, 가장 빨리 사용 가능해지는 시각)
+    """
+    now = time.time()
+    earliest = None
+    rotation = [(start_index + offset) % len(api_keys) for offset in range(len(api_keys))]
+    candidates = [index for index in rotation if index not in exclude]
+    ranked = llm_key_health.rank_key_indices(candidates)
+
+    for index in ranked:
+        ready_at = llm_quota_ledger.available_at(api_keys[index], now)
+        if ready_at <= now:
+            return index, None
+        earliest = ready_at if earliest is None else min(earliest, ready_at)
+
+    # 서킷이 OPEN인 키는 HALF_OPEN 전환 시각과 쿼터 기준 시각 중 늦은 쪽
+    for index in candidates:
+        if index in ranked:
+            continue
+        ready_at = max(llm_key_health.ready_at(index), llm_quota_ledger.available_at(api_keys[index], now))
+        earliest = ready_at if earliest is None else min(earliest, ready_at)
+    return None, earliest
+
+
+def create_client(api_key: str):
+    """LLM_BACKEND 설정에 따른 클라이언트 생성"""
+    if LLM_BACKEND == 'mock':
+        import llm_mock_backend
+        return llm_mock_backend.Client(api_key=api_key)
+    if LLM_BACKEND == 'replay':
+        return llm_record_replay.ReplayClient(api_key=api_key)
+    return genai.Client(api_key=api_key)
+
+
+def _call_key(api_key: str, key_index: int, model: str, prompt: str, config: Dict):
+    """
+    단일 키로 generate_content 호출 후 키 상태/쿼터 원장 기록
+
+    Returns:
+        (key_index, response, error) - 성공 시 error는 None
+    """
+    llm_key_health.on_dispatch(key_index)
+    started = time.time()
+    try:
+        client = create_client(api_key)
+        kwargs = {'model': model, 'contents': prompt}
+        if config:
+            kwargs['config'] = config
+        response = client.models.generate_content(**kwargs)
+    except Exception as e:
+        error_str = str(e)
+        if is_rate_limit_error(error_str):
+            llm_quota_ledger.record_rate_limited(api_key, error_str)
+        elif llm_key_health.is_transient_error(error_str):
+            llm_key_health.record_failure(key_index)
+        return key_index, None, e
+    else:
+        latency = time.time() - started
+        llm_key_health.record_success(key_index, latency)
+        # 재생은 실제 쿼터를 쓰지 않으므로 원장에 기록하지 않음
+        if LLM_BACKEND != 'replay':
+            llm_quota_ledger.record_request(api_key, get_token_count(response))
+        if llm_record_replay.is_recording():
+            llm_record_replay.record(model, prompt, config, response.text or '', latency, get_token_count(response))
+        return key_index, response, None
+    finally:
+        # 429/요청 오류는 성공/실패로 기록하지 않으므로 HALF_OPEN 탐색 표시가 남지 않도록 항상 해제
+        llm_key_health.record_probe_done(key_index)
+
+
+def get_hedge_delay() -> Optional[float]:
+    """
+    헤지 요청을 보낼 대기 시간 (초)
+
+    전체 키의 최근 성공 지연 시간 HEDGE_PERCENTILE 백분위수 (최소 HEDGE_MIN_DELAY).
+    표본이 HEDGE_MIN_SAMPLES개 미만이면 None (헤지하지 않음)
+    """
+    latencies = llm_key_health.get_all_latencies()
+    if len(latencies) < HEDGE_MIN_SAMPLES:
+        return None
+    return max(llm_key_health.percentile(latencies, HEDGE_PERCENTILE), HEDGE_MIN_DELAY)
+
+
+def _dispatch_hedged(api_keys, key_index: int, tried: set, model: str, prompt: str, config: Dict):
+    """
+    1차 요청이 헤지 지연 시간 안에 끝나지 않으면 다른 키로 중복 요청을 보내고 먼저 성공한 응답 사용
+
+    두 요청 모두 각자 쿼터 원장에 기록됩니다. 이미 전송된 늦은 요청은 중단할 수 없으므로
+    결과만 버립니다 (아직 시작 전이면 취소).
+
+    Returns:
+        (key_index, response, error) - 둘 다 실패하면 마지막 실패
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='llm-hedge')
+
+    api_key = api_keys[key_index]
+    primary = _executor.submit(_call_key, api_key, key_index, model, prompt, config)
+    delay = get_hedge_delay()
+    if delay is None:
+        return primary.result()
+
+    done, _ = wait_futures([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    hedge_index, _ = pick_key_index(api_keys, key_index + 1, tried | {key_index})
+    if hedge_index is None:
+        return primary.result()
+
+    tried.add(hedge_index)
+    print(f"  [HEDGE] 키 {key_index + 1} 응답이 {delay:.1f}초 이상 지연되어 키 {hedge_index + 1}로 중복 요청합니다.")
+    hedge = _executor.submit(_call_key, api_keys[hedge_index], hedge_index, model, prompt, config)
+
+    pending = {primary, hedge}
+    last = None
+    while pending:
+        done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            last = future.result()
+            if last[2] is None:
+                for loser in pending:
+                    loser.cancel()
+                return last
+    return last
+
+
+def generate_text(prompt: str, config: Dict = None, model: str = None) -> Optional[str]:
+    """
+    Gemini API 호출 (쿼터 원장 확인 후 키 로테이션, 429 에러 시 자동 전환)
+
+    Args:
+        prompt: 프롬프트
+        config: generate_content config (예: {'temperature': 0.0})
+        model: 사용할 모델 (None이면 캐스케이드 현재 모델 또는 GEMINI_MODEL)
+
+    Returns:
+        응답 텍스트. 실패 시 None (llm_config._last_failure_kind / _all_keys_exhausted 설정)
+    """
+    api_keys = get_api_keys()
+    if not api_keys:
+        print("[ERROR] GEMINI_API_KEY가 설정되지 않았습니다!")
+        llm_config._last_failure_kind = 'API_ERROR'
+        return None
+
+    llm_config._last_failure_kind = None
+    # 모델 캐스케이드(llm_cascade.use_model) 실행 중이면 현재 단계 모델 사용
+    model = model or llm_config._active_model or GEMINI_MODEL
+    start_key_index = llm_config._current_key_index
+    tried = set()
+    waited = False
+    last_error = None
+
+    while True:
+        key_index, ready_at = pick_key_index(api_keys, start_key_index, tried)
+
+        if key_index is None:
+            # 분당 한도로만 막힌 경우 한 번만 기다렸다가 전체 키를 다시 시도
+            if not waited:
+                if len(tried) == len(api_keys):
+                    _, ready_at = pick_key_index(api_keys, start_key_index, set())
+                if ready_at is None or ready_at - time.time() <= MAX_LEDGER_WAIT:
+                    wait = max((ready_at or time.time()) - time.time(), 0)
+                    if wait > 0:
+                        print(f"[INFO] 사용 가능한 키가 없어 {wait:.0f}초 대기합니다 (쿼터 원장/서킷 브레이커).")
+                        time.sleep(wait)
+                        llm_config._key_wait_seconds += wait
+                    tried = set()
+                    waited = True
+                    continue
+
+            # 쿼터는 남아 있고 서킷 브레이커/일시적 오류로만 막힌 경우: 이번 호출만 실패 처리 (실행은 계속)
+            if any(llm_quota_ledger.is_available(api_key) for api_key in api_keys):
+                print(f"[ERROR] 사용 가능한 API 키가 없습니다 (서킷 OPEN 또는 일시적 오류). 마지막 에러: {str(last_error)}")
+                llm_config._last_failure_kind = 'API_ERROR'
+                return None
+
+            if last_error is not None:
+                print(f"[ERROR] 모든 API 키({len(api_keys)}개) 시도 실패. 마지막 에러: {str(last_error)}")
+            else:
+                print(f"[ERROR] 쿼터 원장 기준 모든 API 키({len(api_keys)}개)가 소진되었습니다.")
+            llm_config._previous_key_index = llm_config._current_key_index
+            llm_config._all_keys_exhausted = True
+            llm_config._last_failure_kind = 'API_ERROR'
+            return None
+
+        tried.add(key_index)
+
+        if HEDGE_ENABLED and len(api_keys) > 1:
+            key_index, response, error = _dispatch_hedged(api_keys, key_index, tried, model, prompt, config)
+        else:
+            key_index, response, error = _call_key(api_keys[key_index], key_index, model, prompt, config)
+
+        if error is None:
+            # 성공 시 전역 인덱스 업데이트
+            if llm_config._current_key_index != key_index:
+                llm_config._previous_key_index = llm_config._current_key_index
+                llm_config._current_key_index = key_index
+
+            return response.text or ''
+
+        error_str = str(error)
+        last_error = error
+
+        if is_rate_limit_error(error_str):
+            print(f"⚠️  API 키 {key_index + 1}/{len(api_keys)}에서 429 에러 발생: {error_str}")
+            print("🔄 쿼터 원장에 기록하고 다음 API 키로 전환합니다.")
+            continue
+
+        if llm_key_health.is_transient_error(error_str):
+            # 타임아웃/5xx: 키 상태에 실패로 기록됨, 다른 키로 재시도
+            print(f"[WARN] API 키 {key_index + 1}/{len(api_keys)} 일시적 오류: {error_str}")
+            if len(tried) < len(api_keys):
+                print("🔄 다음 API 키로 재시도합니다.")
+                continue
+            llm_config._last_failure_kind = 'API_ERROR'
+            return None
+
+        print(f"[ERROR] Gemini API 오류 (키 {key_index + 1}/{len(api_keys)}): {error_str}")
+        llm_config._last_failure_kind = 'API_ERROR'
+        return None
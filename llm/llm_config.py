@@ -14,6 +14,9 @@ _current_key_index = 0
 _previous_key_index = -1  # 이전 키 인덱스 추적 (규칙 캐싱용)
 _client = None
 _all_keys_exhausted = False  # 모든 키가 소진되었는지 플래그
+_last_failure_kind = None  # 마지막 API 호출 실패 유형: None, 'API_ERROR', 'PARSE_ERROR' (재시도 큐용)
+_active_model = None  # 모델 캐스케이드가 현재 사용 중인 모델 (None이면 GEMINI_MODEL)
+_key_wait_seconds = 0.0  # 사용 가능한 키가 없어 대기한 누적 시간(초) (부하 테스트 리포트용)
 
 
 def get_api_keys():
@@ -96,6 +99,13 @@ def switch_to_next_api_key():
 
 # 모델 설정
 GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
+# 모델 캐스케이드 (llm_cascade.py): 쉼표로 구분한 저비용 → 고성능 모델 순서 (비어 있으면 GEMINI_MODEL 단일 모델)
+# 예: LLM_CASCADE_MODELS=gemini-1.5-flash-8b,gemini-1.5-flash,gemini-1.5-pro
+LLM_CASCADE_MODELS = [m.strip() for m in os.getenv('LLM_CASCADE_MODELS', '').split(',') if m.strip()]
+# 이 신뢰도 미만이거나 파싱 실패/UNCERTAIN인 항목만 다음 모델로 승격
+CASCADE_CONFIDENCE_THRESHOLD = float(os.getenv('CASCADE_CONFIDENCE_THRESHOLD', '0.80'))
+# structured output (llm_schemas.py): 작업별 응답 스키마를 함께 보내 순수 JSON 응답을 받음 (기본 꺼짐, STRUCTURED_OUTPUT=true로 사용)
+STRUCTURED_OUTPUT_ENABLED = os.getenv('STRUCTURED_OUTPUT', 'false').lower() in ('1', 'true', 'yes')
 
 # API 호출 제한 설정
 MAX_REQUESTS_PER_MINUTE = int(os.getenv('MAX_REQUESTS_PER_MINUTE', '15'))
@@ -105,6 +115,66 @@ MAX_REQUESTS_PER_MINUTE = int(os.getenv('MAX_REQUESTS_PER_MINUTE', '15'))
 BATCH_SIZE = int(os.getenv('BATCH_SIZE', '100'))
 MAX_RETRIES = int(os.getenv('MAX_RETRIES', '3'))
 RETRY_DELAY = float(os.getenv('RETRY_DELAY', '2.0'))
+# 재시도 큐 설정: 지수 백오프 상한(초)과 PARSE_ERROR 시 분할할 최소 서브 배치 크기
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '60.0'))
+RETRY_MIN_BATCH_SIZE = int(os.getenv('RETRY_MIN_BATCH_SIZE', '5'))
+
+# 다중 검증 판정 임계값 (Confidence + Consistency 필터링)
+# 검증기와 recompute_validation_verdicts.py(이력 기반 재판정)가 같은 값을 사용
+VALIDATION_HIGH_CONSISTENCY = float(os.getenv('VALIDATION_HIGH_CONSISTENCY', '0.67'))
+VALIDATION_HIGH_CONFIDENCE = float(os.getenv('VALIDATION_HIGH_CONFIDENCE', '0.80'))
+VALIDATION_LOW_CONFIDENCE = float(os.getenv('VALIDATION_LOW_CONFIDENCE', '0.50'))
+
+# 쿼터 원장 설정 (프로세스 간 공유 SQLite 파일)
+# 일일 요청 한도: 0이면 제한 없음 (429 응답으로만 판단)
+MAX_REQUESTS_PER_DAY = int(os.getenv('MAX_REQUESTS_PER_DAY', '0'))
+QUOTA_LEDGER_PATH = os.getenv(
+    'QUOTA_LEDGER_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.llm_quota_ledger.sqlite3')
+)
+# 제공자 일일 쿼터 리셋 기준 시간대 (Gemini: 태평양 시간 자정)
+QUOTA_RESET_TZ = os.getenv('QUOTA_RESET_TZ', 'America/Los_Angeles')
+
+# 키별 서킷 브레이커 설정 (타임아웃/5xx 연속 실패 시 키 일시 차단)
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '3'))
+BREAKER_OPEN_SECONDS = float(os.getenv('BREAKER_OPEN_SECONDS', '30'))
+BREAKER_MAX_OPEN_SECONDS = float(os.getenv('BREAKER_MAX_OPEN_SECONDS', '600'))
+# 오류율/지연 시간 백분위수 계산에 사용할 최근 호출 수
+KEY_HEALTH_WINDOW = int(os.getenv('KEY_HEALTH_WINDOW', '50'))
+
+# 헤지 요청 설정 (기본 비활성화): 응답이 최근 지연 시간 백분위수보다 늦으면 다른 키로 중복 요청
+HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '0.95'))
+HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', '5.0'))
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', '10'))
+
+# LLM 백엔드: gemini (실제 API), mock (로컬 대체 백엔드, llm_mock_backend.py), replay (기록된 응답 재생)
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini').lower()
+# mock 백엔드 설정: 지연 시간(로그정규 분포 중앙값/시그마), 오류/응답 손상 주입 비율, 난수 시드
+MOCK_LATENCY_MEDIAN = float(os.getenv('MOCK_LATENCY_MEDIAN', '0.05'))
+MOCK_LATENCY_SIGMA = float(os.getenv('MOCK_LATENCY_SIGMA', '0.5'))
+MOCK_429_RATE = float(os.getenv('MOCK_429_RATE', '0.0'))
+# mock 429 후 키 차단 시간(초): 실제 API처럼 다음 분 윈도우까지 막으면 부하 테스트가 대기 시간만 측정하게 됨
+MOCK_429_BLOCK_SECONDS = float(os.getenv('MOCK_429_BLOCK_SECONDS', '1.0'))
+MOCK_5XX_RATE = float(os.getenv('MOCK_5XX_RATE', '0.0'))
+MOCK_TRUNCATE_RATE = float(os.getenv('MOCK_TRUNCATE_RATE', '0.0'))
+MOCK_MALFORMED_RATE = float(os.getenv('MOCK_MALFORMED_RATE', '0.0'))
+MOCK_SEED = int(os.getenv('MOCK_SEED', '42'))
+
+# 응답 기록/재생 설정 (llm_record_replay.py)
+# LLM_RECORD_PATH: 설정 시 성공한 호출을 gzip JSON Lines 아카이브에 기록
+LLM_RECORD_PATH = os.getenv('LLM_RECORD_PATH', '')
+# LLM_REPLAY_PATH: LLM_BACKEND=replay 일 때 재생할 아카이브
+LLM_REPLAY_PATH = os.getenv('LLM_REPLAY_PATH', '')
+# LLM_REPLAY_TIMING: original (기록된 지연 시간 재현) 또는 fast (즉시 반환)
+LLM_REPLAY_TIMING = os.getenv('LLM_REPLAY_TIMING', 'fast').lower()
+
+# 결과 지연 쓰기 설정 (llm_write_buffer.py)
+# 누적 항목 수가 WRITE_BUFFER_FLUSH_SIZE 이상이거나 마지막 저장 후 WRITE_BUFFER_FLUSH_INTERVAL초가 지나면 일괄 저장
+WRITE_BUFFER_FLUSH_SIZE = int(os.getenv('WRITE_BUFFER_FLUSH_SIZE', '1000'))
+WRITE_BUFFER_FLUSH_INTERVAL = float(os.getenv('WRITE_BUFFER_FLUSH_INTERVAL', '5.0'))
+# 저장 대기열에 쌓을 수 있는 최대 배치 수 (가득 차면 API 루프가 대기)
+WRITE_BUFFER_MAX_QUEUE = int(os.getenv('WRITE_BUFFER_MAX_QUEUE', '100'))
 
 # 프롬프트는 llm_prompts.py에서 import
 from llm_prompts import (
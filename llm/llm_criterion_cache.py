@@ -0,0 +1,141 @@
+"""
+Inclusion/Exclusion 기준 줄 구조화 결과 캐시
+
+분할 입력(--segmented)에서 기준 줄 텍스트를 정규화한 키로 LLM 구조화 결과를 저장하고,
+같은 줄이 다른 연구에 다시 나오면 LLM에 보내지 않고 저장된 결과를 재사용합니다.
+
+- 실행 시작 시 처리할 연구의 기준 줄에 해당하는 캐시만 메모리로 로드 (load_cache)
+- 배치 처리 중 새로 구조화된 줄과 재사용 횟수를 모아 두었다가 배치 저장 시 함께 반영 (flush_cache)
+- 섹션 미지정(UNSPECIFIED) 줄은 Inclusion/Exclusion 판단이 연구 문맥에 따라 달라지므로 캐시하지 않음
+- 하위 줄(parent_seq 있음)은 상위 줄 문맥으로 구조화되므로 캐시하지 않음 (같은 "a. within 12 months"라도 상위 줄마다 의미가 다름)
+"""
+
+import os
+import re
+import json
+import hashlib
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional
+from psycopg2.extras import execute_batch
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 캐시에 저장하지 않는 필드 (연구별로 다시 채움)
+PER_STUDY_FIELDS = ('criterion_id', 'original_text', 'line')
+
+_cache = None           # {criterion_key: criteria 배열} (load_cache 전에는 None: 캐시 비활성)
+_pending = {}           # {criterion_key: 새로 저장할 항목}
+_hits = Counter()       # {criterion_key: 이번 배치 재사용 횟수}
+_stats = {'hit': 0, 'miss': 0, 'stored': 0}
+
+
+def normalize_criterion_text(text: str) -> str:
+    """캐시 키용 정규화 (유니코드 정규화, 소문자, 공백 정리, 끝 구두점 제거)"""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text.rstrip(' .;,')
+
+
+def criterion_key(text: str) -> str:
+    """정규화된 기준 줄 텍스트의 SHA-256"""
+    return hashlib.sha256(normalize_criterion_text(text).encode('utf-8')).hexdigest()
+
+
+def is_enabled() -> bool:
+    return _cache is not None
+
+
+def ensure_cache_table(conn):
+    """inclusion_exclusion_criterion_cache 테이블 생성 (없는 경우)"""
+    sql_file = os.path.join(ROOT_DIR, 'sql', 'create_inclusion_exclusion_criterion_cache.sql')
+    with open(sql_file, 'r', encoding='utf-8') as f:
+        sql_content = f.read()
+    with conn.cursor() as cur:
+        cur.execute(sql_content)
+        conn.commit()
+
+
+def load_cache(conn, texts: List[str]) -> int:
+    """
+    기준 줄 텍스트 목록에 해당하는 캐시 항목을 메모리로 로드하고 캐시 활성화
+
+    Returns:
+        로드된 캐시 항목 수
+    """
+    global _cache
+    _cache = {}
+    keys = list({criterion_key(text) for text in texts if text})
+    with conn.cursor() as cur:
+        for start in range(0, len(keys), 1000):
+            cur.execute("""
+                SELECT criterion_key, criteria
+                FROM inclusion_exclusion_criterion_cache
+                WHERE criterion_key = ANY(%s)
+            """, (keys[start:start + 1000],))
+            for key, criteria in cur.fetchall():
+                _cache[key] = criteria if isinstance(criteria, list) else json.loads(criteria)
+    return len(_cache)
+
+
+def lookup(text: str) -> Optional[List[Dict]]:
+    """캐시된 구조화 결과 복사본 반환 (없거나 캐시 비활성이면 None)"""
+    if _cache is None:
+        return None
+    key = criterion_key(text)
+    criteria = _cache.get(key)
+    if criteria is None:
+        _stats['miss'] += 1
+        return None
+    _stats['hit'] += 1
+    _hits[key] += 1
+    return [dict(c) for c in criteria]
+
+
+def store(text: str, criteria: List[Dict], nct_id: str = None, model: str = None):
+    """새로 구조화된 기준 줄 결과를 캐시에 추가 (DB 반영은 flush_cache)"""
+    if _cache is None:
+        return
+    key = criterion_key(text)
+    if key in _cache:
+        return
+    cleaned = [{k: v for k, v in c.items() if k not in PER_STUDY_FIELDS} for c in criteria if isinstance(c, dict)]
+    _cache[key] = cleaned
+    _pending[key] = {
+        'criterion_key': key,
+        'normalized_text': normalize_criterion_text(text),
+        'criteria': json.dumps(cleaned, ensure_ascii=False),
+        'source_nct_id': nct_id,
+        'model': model
+    }
+    _stats['stored'] += 1
+
+
+def flush_cache(conn):
+    """새 캐시 항목과 재사용 횟수를 DB에 반영"""
+    if _cache is None or (not _pending and not _hits):
+        return
+    with conn.cursor() as cur:
+        if _pending:
+            execute_batch(cur, """
+                INSERT INTO inclusion_exclusion_criterion_cache (
+                    criterion_key, normalized_text, criteria, source_nct_id, model
+                ) VALUES (
+                    %(criterion_key)s, %(normalized_text)s, %(criteria)s::jsonb, %(source_nct_id)s, %(model)s
+                )
+                ON CONFLICT (criterion_key) DO NOTHING
+            """, list(_pending.values()), page_size=100)
+        if _hits:
+            execute_batch(cur, """
+                UPDATE inclusion_exclusion_criterion_cache
+                SET hit_count = hit_count + %s, last_used_at = CURRENT_TIMESTAMP
+                WHERE criterion_key = %s
+            """, [(count, key) for key, count in _hits.items()], page_size=100)
+    conn.commit()
+    _pending.clear()
+    _hits.clear()
+
+
+def get_cache_stats() -> Dict:
+    """이번 실행의 캐시 적중/미스/저장 수"""
+    return dict(_stats)
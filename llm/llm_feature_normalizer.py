@@ -0,0 +1,330 @@
+"""
+Inclusion/Exclusion feature 표준화 (criterion_feature_dict)
+
+LLM이 자유 형식으로 내는 feature("MMSE", "Mini-Mental State Exam score", "AGE", "Global CDR")를
+표준 feature 사전(criterion_feature_dict)의 feature_id로 매핑합니다.
+사전은 한 번 메모리로 로드해 정확 일치 dict와 키워드 정규식으로 컴파일하고, 결과는 feature 문자열별로 캐시합니다.
+
+매칭 순서 (outcome_measure_dict의 match_measure_code와 같은 우선순위):
+    1. feature_code / abbreviation / canonical_name / keywords 정확 일치 (구두점/대소문자 무시)
+    2. 끝의 score, total, level 등을 뗀 뒤 다시 정확 일치
+    3. 키워드 포함 (4자 이상 키워드, 키워드가 feature 단어의 절반 이상일 때만)
+
+전처리 결과 저장 시(register_features) 새 feature를 criterion_feature_alias에 등록합니다.
+매칭되지 않은 feature는 review_status = 'PENDING'으로 쌓여 criterion_feature_review_queue 뷰에서 검토합니다.
+팩트 테이블(inclusion_exclusion_criteria)의 feature_id는 DB 트리거가 별칭 테이블에서 채웁니다.
+
+사용법:
+    python llm/llm_feature_normalizer.py [--rematch] [--review N]
+
+    팩트 테이블에서 별칭이 없는 feature를 등록하고 검토 큐 상위 N개(기본 20)를 출력합니다.
+    --rematch: 사전을 고친 뒤 자동 매칭(AUTO)/검토 대기(PENDING) 별칭을 다시 매칭 (MAPPED/IGNORED는 유지)
+"""
+
+import os
+import re
+import sys
+import json
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from psycopg2.extras import RealDictCursor, execute_batch
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection
+
+FEATURE_MAX_LENGTH = 200  # inclusion_exclusion_criteria.feature VARCHAR(200)
+MIN_CONTAINED_KEYWORD_LENGTH = 4
+# 끝에 붙어도 같은 feature로 보는 단어 ("MMSE total score" = "MMSE")
+_TRAILING_NOISE = ('total score', 'scores', 'score', 'total', 'levels', 'level', 'value', 'values', 'result', 'results')
+
+_normalizer = None  # FeatureNormalizer (load_normalizer 전에는 None: 등록 비활성)
+_known = set()      # 별칭 테이블에 이미 있는 feature
+
+
+def normalize_feature(feature) -> Optional[str]:
+    """feature 정규화 (앞뒤 공백 제거, 연속 공백 정리, 소문자) - SQL normalize_criterion_feature와 같은 규칙"""
+    if not isinstance(feature, str):
+        return None
+    return re.sub(r'\s+', ' ', feature.strip()).lower() or None
+
+
+def _match_key(text: str) -> str:
+    """매칭용 키 (유니코드 정규화, 소문자, 아포스트로피 제거, 구두점 → 공백)"""
+    text = unicodedata.normalize('NFKC', text or '').lower().replace("'", '').replace('’', '')
+    return re.sub(r'[\W_]+', ' ', text).strip()
+
+
+def _strip_noise(key: str) -> str:
+    changed = True
+    while changed:
+        changed = False
+        for noise in _TRAILING_NOISE:
+            if key.endswith(' ' + noise):
+                key = key[:-len(noise) - 1].rstrip()
+                changed = True
+    return key
+
+
+class FeatureNormalizer:
+    """표준 feature 사전을 컴파일한 메모리 매처"""
+
+    def __init__(self, entries: Iterable[Dict]):
+        """
+        Args:
+            entries: criterion_feature_dict 행 [{'feature_id', 'feature_code', 'canonical_name', 'abbreviation', 'keywords'}, ...]
+        """
+        self.features = {}  # feature_id → 사전 행
+        self._exact = {}    # 매칭 키 → (feature_id, match_type, match_keyword)
+        contained = {}      # 포함 매칭 키워드 → (feature_id, keyword)
+        entries = list(entries)
+        for entry in entries:
+            self.features[entry['feature_id']] = entry
+
+        # 우선순위 순서로 채우고 먼저 들어간 매칭을 유지
+        for match_type, field in (('FEATURE_CODE', 'feature_code'), ('ABBREVIATION', 'abbreviation'),
+                                  ('CANONICAL_NAME', 'canonical_name')):
+            for entry in entries:
+                key = _match_key(entry.get(field) or '')
+                if key:
+                    self._exact.setdefault(key, (entry['feature_id'], match_type, entry[field]))
+        for entry in entries:
+            for keyword in (entry.get('keywords') or '').split(';'):
+                key = _match_key(keyword)
+                if not key:
+                    continue
+                self._exact.setdefault(key, (entry['feature_id'], 'KEYWORD', keyword.strip()))
+                if len(key) >= MIN_CONTAINED_KEYWORD_LENGTH:
+                    contained.setdefault(key, (entry['feature_id'], keyword.strip()))
+
+        self._contained = contained
+        # 긴 키워드부터 시도 (cdr sum of boxes가 cdr보다 먼저)
+        self._pattern = re.compile(
+            r'\b(?:' + '|'.join(re.escape(k) for k in sorted(contained, key=len, reverse=True)) + r')\b'
+        ) if contained else None
+        self._cache = {}
+
+    @classmethod
+    def load(cls, conn) -> 'FeatureNormalizer':
+        """criterion_feature_dict 전체를 로드해 컴파일"""
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT feature_id, feature_code, canonical_name, abbreviation, keywords
+                FROM criterion_feature_dict
+                ORDER BY feature_id
+            """)
+            return cls(cur.fetchall())
+
+    def resolve(self, feature) -> Tuple[Optional[int], Optional[str], Optional[str]]:
+        """
+        feature → 표준 feature
+
+        Returns:
+            (feature_id, match_type, match_keyword), 매칭 실패 시 (None, None, None)
+        """
+        if not isinstance(feature, str):
+            return None, None, None
+        cached = self._cache.get(feature)
+        if cached is None:
+            cached = self._resolve(_match_key(feature))
+            self._cache[feature] = cached
+        return cached
+
+    def _resolve(self, key: str) -> Tuple[Optional[int], Optional[str], Optional[str]]:
+        if not key:
+            return None, None, None
+        for candidate in (key, _strip_noise(key)):
+            if candidate in self._exact:
+                return self._exact[candidate]
+        if self._pattern is not None:
+            match = self._pattern.search(key)
+            # 긴 문장 속의 짧은 키워드("history of stroke"의 stroke)는 검토 대상으로 남김
+            if match and len(match.group(0).split()) * 2 >= len(_strip_noise(key).split()):
+                feature_id, keyword = self._contained[match.group(0)]
+                return feature_id, 'KEYWORD', keyword
+        return None, None, None
+
+    def feature_id(self, feature) -> Optional[int]:
+        return self.resolve(feature)[0]
+
+    def canonical_key(self, feature) -> Optional[str]:
+        """비교/집계용 키: 표준 feature면 소문자 feature_code, 아니면 정규화된 feature"""
+        feature_id = self.feature_id(feature)
+        if feature_id is not None:
+            return self.features[feature_id]['feature_code'].lower()
+        return normalize_feature(feature)
+
+
+def is_enabled() -> bool:
+    return _normalizer is not None
+
+
+def load_normalizer(conn) -> FeatureNormalizer:
+    """사전을 메모리로 로드하고 저장 시 feature 등록 활성화"""
+    global _normalizer, _known
+    _normalizer = FeatureNormalizer.load(conn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT feature FROM criterion_feature_alias")
+        _known = {row[0] for row in cur.fetchall()}
+    return _normalizer
+
+
+def _alias_row(normalizer: FeatureNormalizer, feature: str) -> Tuple:
+    feature_id, match_type, match_keyword = normalizer.resolve(feature)
+    return feature, feature_id, match_type, match_keyword, 'AUTO' if feature_id is not None else 'PENDING'
+
+
+def _insert_aliases(cur, rows: List[Tuple]):
+    execute_batch(cur, """
+        INSERT INTO criterion_feature_alias (feature, feature_id, match_type, match_keyword, review_status)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (feature) DO NOTHING
+    """, rows, page_size=500)
+
+
+def _collect_features(criteria) -> List[str]:
+    if isinstance(criteria, str):
+        try:
+            criteria = json.loads(criteria)
+        except ValueError:
+            return []
+    if not isinstance(criteria, list):
+        return []
+    features = []
+    for item in criteria:
+        if isinstance(item, dict):
+            feature = normalize_feature(item.get('feature'))
+            if feature:
+                features.append(feature[:FEATURE_MAX_LENGTH])
+    return features
+
+
+def register_features(conn, results: List[Dict]) -> Set[str]:
+    """
+    SUCCESS 결과의 새 feature를 별칭 테이블에 등록 (커밋은 호출자가 결과 저장과 함께)
+
+    결과 INSERT 전에 호출해야 팩트 테이블 트리거가 feature_id를 채웁니다.
+    롤백되면 다시 등록해야 하므로 커밋 후 반환값을 mark_known()에 넘기세요.
+
+    Returns:
+        이번에 등록한 feature 집합
+    """
+    if _normalizer is None or not results:
+        return set()
+    new_features = set()
+    for result in results:
+        if result.get('llm_status') != 'SUCCESS':
+            continue
+        for field in ('inclusion_criteria', 'exclusion_criteria'):
+            new_features.update(f for f in _collect_features(result.get(field)) if f not in _known)
+    if not new_features:
+        return set()
+    with conn.cursor() as cur:
+        _insert_aliases(cur, [_alias_row(_normalizer, feature) for feature in sorted(new_features)])
+    return new_features
+
+
+def mark_known(features: Iterable[str]):
+    """커밋된 별칭 feature를 등록 완료로 기록 (이후 register_features에서 건너뜀)"""
+    _known.update(features)
+
+
+def sync_aliases(conn, normalizer: FeatureNormalizer, rematch: bool = False) -> Dict[str, int]:
+    """
+    팩트 테이블에서 별칭이 없는 feature 등록, rematch면 AUTO/PENDING 별칭 다시 매칭
+
+    Returns:
+        {'registered': 새로 등록한 수, 'rematched': 매핑이 바뀐 수}
+    """
+    stats = {'registered': 0, 'rematched': 0}
+    registered = []
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT DISTINCT c.feature
+            FROM inclusion_exclusion_criteria c
+            LEFT JOIN criterion_feature_alias a ON a.feature = c.feature
+            WHERE c.feature IS NOT NULL
+              AND a.feature IS NULL
+        """)
+        rows = [_alias_row(normalizer, row[0]) for row in cur.fetchall()]
+        if rows:
+            _insert_aliases(cur, rows)
+            registered = [row[0] for row in rows]
+            stats['registered'] = len(rows)
+
+        if rematch:
+            cur.execute("""
+                SELECT feature, feature_id, review_status
+                FROM criterion_feature_alias
+                WHERE review_status IN ('AUTO', 'PENDING')
+            """)
+            updates = []
+            for feature, feature_id, review_status in cur.fetchall():
+                row = _alias_row(normalizer, feature)
+                if (row[1], row[4]) != (feature_id, review_status):
+                    updates.append(row[1:] + (feature,))
+            if updates:
+                execute_batch(cur, """
+                    UPDATE criterion_feature_alias
+                    SET feature_id = %s, match_type = %s, match_keyword = %s, review_status = %s,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE feature = %s
+                """, updates, page_size=500)
+                stats['rematched'] = len(updates)
+    conn.commit()
+    mark_known(registered)
+    return stats
+
+
+def main():
+    """메인 함수"""
+    args = sys.argv[1:]
+    rematch = '--rematch' in args
+    review_limit = 20
+    if '--review' in args:
+        try:
+            review_limit = int(args[args.index('--review') + 1])
+        except (IndexError, ValueError):
+            print("사용법: python llm/llm_feature_normalizer.py [--rematch] [--review N]")
+            sys.exit(1)
+
+    print("=" * 80)
+    print("[START] Inclusion/Exclusion feature 표준화")
+    print("=" * 80)
+
+    conn = get_db_connection()
+    try:
+        normalizer = FeatureNormalizer.load(conn)
+        print(f"[INFO] 표준 feature {len(normalizer.features):,}개 로드")
+        stats = sync_aliases(conn, normalizer, rematch)
+        print(f"[OK] 새 feature 등록: {stats['registered']:,}개" +
+              (f", 다시 매칭되어 바뀐 feature: {stats['rematched']:,}개" if rematch else ''))
+
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT
+                    COUNT(*) FILTER (WHERE c.feature_id IS NOT NULL) AS mapped,
+                    COUNT(*) AS total
+                FROM inclusion_exclusion_criteria c
+                WHERE c.feature IS NOT NULL
+            """)
+            coverage = cur.fetchone()
+            cur.execute("SELECT * FROM criterion_feature_review_queue LIMIT %s", (review_limit,))
+            queue = cur.fetchall()
+    finally:
+        conn.close()
+
+    if coverage['total']:
+        print(f"[INFO] 표준 feature 매핑 기준: {coverage['mapped']:,}/{coverage['total']:,}개 "
+              f"({coverage['mapped'] / coverage['total'] * 100:.1f}%)")
+    if queue:
+        print(f"\n[검토 대기] 상위 {len(queue)}개 (criterion_feature_alias에서 feature_id 지정 후 review_status = 'MAPPED')")
+        for row in queue:
+            print(f"  {row['usage_count']:>6,}회 ({row['study_count']:,}개 연구)  {row['feature']}")
+
+
+if __name__ == "__main__":
+    main()
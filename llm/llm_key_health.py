@@ -0,0 +1,201 @@
+"""
+API 키 상태 점수 및 서킷 브레이커
+
+키별로 최근 호출 결과(성공/실패)와 지연 시간을 추적합니다.
+- CLOSED: 정상. 연속 실패가 BREAKER_FAILURE_THRESHOLD회에 도달하면 OPEN
+- OPEN: 호출 차단. BREAKER_OPEN_SECONDS 경과 후 HALF_OPEN (반복 OPEN 시 대기 시간 2배, 최대 BREAKER_MAX_OPEN_SECONDS)
+- HALF_OPEN: 탐색 호출 1건만 허용. 성공 시 CLOSED, 실패 시 다시 OPEN
+  (429/요청 오류처럼 판정할 수 없는 결과면 HALF_OPEN 유지, 다음 호출이 다시 탐색)
+
+키 선택 시 오류율과 지연 시간(p50)이 낮은 키를 우선합니다.
+429(쿼터)는 쿼터 원장에서 처리하므로 여기서는 실패로 집계하지 않습니다.
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+from llm_config import (
+    KEY_HEALTH_WINDOW, BREAKER_FAILURE_THRESHOLD,
+    BREAKER_OPEN_SECONDS, BREAKER_MAX_OPEN_SECONDS
+)
+
+STATE_CLOSED = 'CLOSED'
+STATE_OPEN = 'OPEN'
+STATE_HALF_OPEN = 'HALF_OPEN'
+
+# 지연 시간 기록이 없는 키의 기본 점수용 지연 시간 (초)
+DEFAULT_LATENCY = 10.0
+
+_TRANSIENT_MARKERS = (
+    '500', '502', '503', '504', 'INTERNAL', 'UNAVAILABLE', 'DEADLINE_EXCEEDED',
+    'TIMEOUT', 'TIMED OUT', 'CONNECTION'
+)
+
+
+def is_transient_error(error_str: str) -> bool:
+    """타임아웃/5xx 등 다른 키로 재시도할 만한 일시적 오류 여부"""
+    upper = error_str.upper()
+    return any(marker in upper for marker in _TRANSIENT_MARKERS)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """단순 백분위수 (nearest-rank)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(q * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class KeyHealth:
+    """단일 API 키의 상태 추적 및 서킷 브레이커"""
+
+    def __init__(self, window: int = KEY_HEALTH_WINDOW):
+        self.outcomes = deque(maxlen=window)   # True: 성공, False: 실패
+        self.latencies = deque(maxlen=window)  # 성공 호출 지연 시간 (초)
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.open_count = 0
+        self.opened_until = 0.0
+        self.probe_in_flight = False
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def latency_p50(self) -> Optional[float]:
+        return percentile(list(self.latencies), 0.50)
+
+    def latency_p95(self) -> Optional[float]:
+        return percentile(list(self.latencies), 0.95)
+
+    def score(self) -> float:
+        """낮을수록 우선 (p50 지연 시간 × (1 + 오류율 × 4))"""
+        p50 = self.latency_p50()
+        if p50 is None:
+            p50 = DEFAULT_LATENCY
+        return p50 * (1 + self.error_rate() * 4)
+
+    def allow_request(self, now: float) -> bool:
+        """현재 호출 허용 여부 (OPEN 만료 시 HALF_OPEN으로 전환)"""
+        if self.state == STATE_OPEN:
+            if now < self.opened_until:
+                return False
+            self.state = STATE_HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == STATE_HALF_OPEN:
+            return not self.probe_in_flight
+        return True
+
+    def on_dispatch(self):
+        if self.state == STATE_HALF_OPEN:
+            self.probe_in_flight = True
+
+    def on_probe_done(self):
+        """호출 종료 (성공/실패로 판정하지 않은 경우에도 탐색 표시 해제)"""
+        self.probe_in_flight = False
+
+    def on_success(self, latency: float):
+        self.outcomes.append(True)
+        self.latencies.append(latency)
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+        if self.state != STATE_CLOSED:
+            self.state = STATE_CLOSED
+            self.open_count = 0
+
+    def on_failure(self, now: float):
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == STATE_HALF_OPEN or self.consecutive_failures >= BREAKER_FAILURE_THRESHOLD:
+            self.open_count += 1
+            open_seconds = min(BREAKER_OPEN_SECONDS * (2 ** (self.open_count - 1)), BREAKER_MAX_OPEN_SECONDS)
+            self.state = STATE_OPEN
+            self.opened_until = now + open_seconds
+
+
+_health: Dict[int, KeyHealth] = {}
+_lock = threading.Lock()
+
+
+def _get(key_index: int) -> KeyHealth:
+    if key_index not in _health:
+        _health[key_index] = KeyHealth()
+    return _health[key_index]
+
+
+def allow_request(key_index: int) -> bool:
+    """서킷 브레이커 기준으로 키 호출 허용 여부"""
+    with _lock:
+        return _get(key_index).allow_request(time.time())
+
+
+def on_dispatch(key_index: int):
+    """호출 직전 기록 (HALF_OPEN 탐색 호출 표시)"""
+    with _lock:
+        _get(key_index).on_dispatch()
+
+
+def record_probe_done(key_index: int):
+    """호출 종료 기록 (모든 종료 경로에서 호출, HALF_OPEN 탐색 표시 해제)"""
+    with _lock:
+        _get(key_index).on_probe_done()
+
+
+def record_success(key_index: int, latency: float):
+    """성공 호출과 지연 시간 기록"""
+    with _lock:
+        _get(key_index).on_success(latency)
+
+
+def record_failure(key_index: int):
+    """타임아웃/5xx 등 실패 기록 (임계치 도달 시 서킷 OPEN)"""
+    with _lock:
+        health = _get(key_index)
+        was_open = health.state == STATE_OPEN
+        health.on_failure(time.time())
+        if health.state == STATE_OPEN and not was_open:
+            print(f"  [CIRCUIT] 키 {key_index + 1} 서킷 OPEN ({health.opened_until - time.time():.0f}초 후 HALF_OPEN)")
+
+
+def ready_at(key_index: int) -> float:
+    """서킷이 OPEN인 키가 HALF_OPEN으로 전환되는 시각 (그 외에는 현재 시각)"""
+    with _lock:
+        health = _get(key_index)
+        if health.state == STATE_OPEN:
+            return health.opened_until
+        return time.time()
+
+
+def rank_key_indices(key_indices: List[int]) -> List[int]:
+    """
+    호출 허용된 키를 상태 점수 순(빠르고 오류 적은 키 우선)으로 정렬
+
+    점수가 같으면 입력 순서(로테이션 순서)를 유지합니다.
+    """
+    with _lock:
+        now = time.time()
+        allowed = [i for i in key_indices if _get(i).allow_request(now)]
+        return sorted(allowed, key=lambda i: _get(i).score())
+
+
+def get_all_latencies() -> List[float]:
+    """전체 키의 최근 성공 지연 시간 (헤지 지연 시간 계산용)"""
+    with _lock:
+        return [latency for health in _health.values() for latency in health.latencies]
+
+
+def get_health_summary() -> List[Dict]:
+    """키별 상태 요약 (로그 출력용)"""
+    with _lock:
+        return [{
+            'key_index': index,
+            'state': health.state,
+            'error_rate': health.error_rate(),
+            'latency_p50': health.latency_p50(),
+            'latency_p95': health.latency_p95(),
+            'calls': len(health.outcomes)
+        } for index, health in sorted(_health.items())]
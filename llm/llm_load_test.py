@@ -0,0 +1,329 @@
+"""
+LLM 파이프라인 부하 테스트 (로컬 mock 백엔드 사용)
+
+실제 API 키/쿼터 없이 배치 구성, 응답 파싱/복구, DB 쓰기 오버헤드를 측정합니다.
+- 합성 입력 데이터를 생성하여 각 파이프라인의 배치 처리 함수를 그대로 실행
+- LLM_BACKEND=mock 으로 llm_mock_backend를 사용 (지연 시간/429/5xx/JSON 손상 주입 가능)
+- items/sec, 파싱 복구율, DB 쓰기 시간 리포트
+- 주입된 429는 키를 --block-429초만 차단하고, 키 대기 시간은 처리량과 따로 리포트
+
+--db 옵션 사용 시 결과 테이블과 같은 구조의 임시 테이블(CREATE TEMP TABLE ... LIKE)을 만들어
+그곳에 씁니다. 임시 테이블이 같은 이름의 실제 테이블보다 우선하므로 실제 데이터는 변경되지 않습니다.
+(id 시퀀스 기본값은 복사되므로 실제 시퀀스 값은 증가할 수 있습니다.)
+
+사용법:
+  python llm_load_test.py --pipeline all --items 500 --batch-size 50
+  python llm_load_test.py --pipeline ie_preprocess --truncate-rate 0.1 --malformed-rate 0.1
+  python llm_load_test.py --pipeline outcome_preprocess --db
+  python llm_load_test.py --record /tmp/llm_archive.jsonl.gz      # mock 응답 기록
+  python llm_load_test.py --replay /tmp/llm_archive.jsonl.gz      # 기록된 응답으로 재실행
+"""
+
+import os
+import time
+import argparse
+import tempfile
+from collections import Counter
+from typing import Dict, List
+
+PIPELINES = ['outcome_preprocess', 'outcome_validate', 'ie_preprocess', 'ie_validate']
+
+# --db 사용 시 임시 테이블로 가릴 결과 테이블
+TEMP_TABLES = {
+    'outcome_preprocess': ['outcome_llm_preprocessed'],
+    'outcome_validate': ['outcome_llm_preprocessed', 'outcome_llm_validation_history'],
+    'ie_preprocess': ['inclusion_exclusion_llm_preprocessed'],
+    'ie_validate': ['inclusion_exclusion_llm_preprocessed', 'inclusion_exclusion_llm_validation_history'],
+}
+
+MEASURE_SAMPLES = [
+    ('ADAS-Cog 11 total score', 'Change from baseline in ADAS-Cog 11', 'Baseline, Week 12, Week 24'),
+    ('MMSE score', 'Mini-Mental State Examination total score', '26 weeks'),
+    ('CDR-SB', 'Clinical Dementia Rating Sum of Boxes', 'Baseline and Month 18'),
+    ('Number of participants with adverse events', None, 'Up to 52 weeks'),
+    ('Plasma concentration of study drug', 'Pharmacokinetics', 'Day 1, Day 7, Day 28'),
+]
+
+CRITERIA_SAMPLE = """Inclusion Criteria:
+
+* Age 50 to 85 years
+* Diagnosis of probable Alzheimer's disease (NINCDS-ADRDA)
+* MMSE score between 16 and 26, inclusive
+* Has a reliable study partner
+
+Exclusion Criteria:
+
+1. History of stroke or TIA within the last 12 months
+2. Use of investigational drug within 30 days
+3. Clinically significant laboratory abnormalities"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='LLM 파이프라인 부하 테스트 (로컬 mock 백엔드)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+사용 예시:
+  python llm_load_test.py --pipeline all --items 500
+  python llm_load_test.py --pipeline outcome_preprocess --latency-median 2 --latency-sigma 0.8
+  python llm_load_test.py --pipeline ie_preprocess --truncate-rate 0.1 --malformed-rate 0.1 --rate-429 0.05
+        """
+    )
+    parser.add_argument('--pipeline', choices=PIPELINES + ['all'], default='all', help='실행할 파이프라인 (기본값: all)')
+    parser.add_argument('--items', type=int, default=200, help='합성 항목 수 (기본값: 200)')
+    parser.add_argument('--batch-size', type=int, default=50, metavar='SIZE', help='배치 크기 (기본값: 50)')
+    parser.add_argument('--runs', type=int, default=3, help='검증 파이프라인의 검증 횟수 (기본값: 3)')
+    parser.add_argument('--latency-median', type=float, default=0.05, help='mock 응답 지연 시간 중앙값(초)')
+    parser.add_argument('--latency-sigma', type=float, default=0.5, help='mock 응답 지연 시간 로그정규 시그마')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='429 주입 비율')
+    parser.add_argument('--block-429', type=float, default=1.0, metavar='SECONDS', help='주입된 429 후 키 차단 시간(초) (기본값: 1.0)')
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help='5xx 주입 비율')
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help='잘린 JSON 응답 비율')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='잘못된 JSON 응답 비율')
+    parser.add_argument('--seed', type=int, default=42, help='난수 시드')
+    parser.add_argument('--db', action='store_true', help='임시 테이블에 결과를 써서 DB 쓰기 시간 측정')
+    parser.add_argument('--record', metavar='PATH', default=None, help='응답을 아카이브에 기록')
+    parser.add_argument('--replay', metavar='PATH', default=None, help='mock 대신 기록된 아카이브 응답 재생')
+    parser.add_argument('--replay-timing', choices=['fast', 'original'], default='fast', help='재생 시 지연 시간 재현 여부')
+    return parser.parse_args()
+
+
+def configure_mock_env(args):
+    """llm_config import 전에 mock(또는 재생) 백엔드 환경 변수 설정"""
+    os.environ['LLM_BACKEND'] = 'replay' if args.replay else 'mock'
+    os.environ['LLM_REPLAY_PATH'] = args.replay or ''
+    os.environ['LLM_REPLAY_TIMING'] = args.replay_timing
+    os.environ['LLM_RECORD_PATH'] = args.record or ''
+    os.environ['MOCK_LATENCY_MEDIAN'] = str(args.latency_median)
+    os.environ['MOCK_LATENCY_SIGMA'] = str(args.latency_sigma)
+    os.environ['MOCK_429_RATE'] = str(args.rate_429)
+    os.environ['MOCK_429_BLOCK_SECONDS'] = str(args.block_429)
+    os.environ['MOCK_5XX_RATE'] = str(args.rate_5xx)
+    os.environ['MOCK_TRUNCATE_RATE'] = str(args.truncate_rate)
+    os.environ['MOCK_MALFORMED_RATE'] = str(args.malformed_rate)
+    os.environ['MOCK_SEED'] = str(args.seed)
+    # 배치 간/검증 회차 간 대기를 사실상 제거
+    os.environ['MAX_REQUESTS_PER_MINUTE'] = '100000'
+    os.environ['RETRY_DELAY'] = '0.01'
+    # 실제 쿼터 원장/키와 분리
+    os.environ['QUOTA_LEDGER_PATH'] = os.path.join(tempfile.mkdtemp(prefix='llm_load_test_'), 'ledger.sqlite3')
+    os.environ['GEMINI_API_KEY'] = 'mock-key-1'
+    os.environ['GEMINI_API_KEY_2'] = 'mock-key-2'
+
+
+def make_outcomes(n: int, validated: bool = False) -> List[Dict]:
+    """합성 outcome 항목 생성 (검증용이면 전처리 결과 컬럼 포함)"""
+    outcomes = []
+    for i in range(1, n + 1):
+        measure, description, time_frame = MEASURE_SAMPLES[i % len(MEASURE_SAMPLES)]
+        outcome = {
+            'id': i,
+            'nct_id': f'NCT9{i:07d}',
+            'outcome_type': 'PRIMARY',
+            'outcome_order': 1,
+            'measure_raw': measure,
+            'description_raw': description,
+            'time_frame_raw': time_frame,
+            'phase': 'PHASE2'
+        }
+        if validated:
+            outcome.update({
+                'llm_measure_code': measure.split()[0].upper(),
+                'llm_time_value': 12,
+                'llm_time_unit': 'weeks',
+                'llm_time_points': None
+            })
+        outcomes.append(outcome)
+    return outcomes
+
+
+def make_eligibility(n: int, validated: bool = False) -> List[Dict]:
+    """합성 eligibility 항목 생성 (검증용이면 전처리 결과 컬럼 포함)"""
+    eligibility_list = []
+    for i in range(1, n + 1):
+        eligibility = {
+            'nct_id': f'NCT9{i:07d}',
+            'eligibility_criteria_raw': CRITERIA_SAMPLE,
+            'phase': 'PHASE2'
+        }
+        if validated:
+            eligibility.update({
+                'inclusion_criteria': [{'criterion_id': 1, 'original_text': 'Age 50 to 85 years', 'feature': 'age', 'operator': '>=', 'value': 50, 'unit': 'years'}],
+                'exclusion_criteria': [{'criterion_id': 1, 'original_text': 'History of stroke', 'feature': 'patient', 'operator': '=', 'value': 'stroke', 'unit': None}]
+            })
+        eligibility_list.append(eligibility)
+    return eligibility_list
+
+
+def instrument_parse_recovery(module, counters: Counter):
+    """call_gemini_api를 감싸 mock이 손상시킨 응답의 복구 여부 집계"""
+    import llm_mock_backend
+    original = module.call_gemini_api
+
+    def wrapped(*args, **kwargs):
+        llm_mock_backend.last_fault = None
+        result = original(*args, **kwargs)
+        counters['llm_calls'] += 1
+        if llm_mock_backend.last_fault in ('TRUNCATED', 'MALFORMED'):
+            counters['corrupted'] += 1
+            if result:
+                counters['recovered'] += 1
+        return result
+
+    module.call_gemini_api = wrapped
+    return original
+
+
+def create_temp_tables(conn, pipeline: str):
+    """결과 테이블과 같은 구조의 임시 테이블 생성 (실제 테이블을 가림)"""
+    with conn.cursor() as cur:
+        for table in TEMP_TABLES[pipeline]:
+            cur.execute(f"DROP TABLE IF EXISTS pg_temp.{table}")
+            cur.execute(f"CREATE TEMP TABLE {table} (LIKE public.{table} INCLUDING ALL)")
+    conn.commit()
+
+
+def run_pipeline(pipeline: str, args) -> Dict:
+    """파이프라인 1개 실행 후 측정값 반환"""
+    import llm_config
+    import llm_mock_backend
+    from llm_retry import process_with_retry
+
+    llm_config._all_keys_exhausted = False
+    llm_config._key_wait_seconds = 0.0
+    llm_mock_backend.reset_stats()
+
+    if pipeline == 'outcome_preprocess':
+        import llm_preprocess_full as module
+        items = make_outcomes(args.items)
+    elif pipeline == 'ie_preprocess':
+        import llm_preprocess_inclusion_exclusion as module
+        items = make_eligibility(args.items)
+    elif pipeline == 'outcome_validate':
+        import llm_validate_preprocessed_success as module
+        items = make_outcomes(args.items, validated=True)
+    else:
+        import llm_validate_inclusion_exclusion as module
+        items = make_eligibility(args.items, validated=True)
+
+    counters = Counter()
+    original_call = instrument_parse_recovery(module, counters)
+
+    conn = None
+    if args.db:
+        conn = module.get_db_connection()
+        create_temp_tables(conn, pipeline)
+
+    statuses = Counter()
+    dead_letter_count = 0
+    llm_seconds = 0.0
+    db_seconds = 0.0
+
+    try:
+        for start in range(0, len(items), args.batch_size):
+            batch = items[start:start + args.batch_size]
+
+            started = time.time()
+            if pipeline == 'outcome_preprocess':
+                results, dead_letters = process_with_retry(batch, module.preprocess_batch_outcomes, item_key='id', result_key='outcome_id')
+                dead_letter_count += len(dead_letters)
+            elif pipeline == 'ie_preprocess':
+                results, dead_letters = process_with_retry(batch, module.preprocess_batch_eligibility, item_key='nct_id', result_key='nct_id')
+                dead_letter_count += len(dead_letters)
+            elif pipeline == 'outcome_validate':
+                results, validation_results_by_run = module.validate_batch_outcomes(batch, args.runs)
+            else:
+                results, validation_results_by_run = module.validate_batch_eligibility(batch, args.runs)
+            llm_seconds += time.time() - started
+
+            for r in results:
+                statuses[r.get('llm_status') or r.get('final_status') or 'UNKNOWN'] += 1
+
+            if conn is not None:
+                started = time.time()
+                if pipeline in ('outcome_preprocess', 'ie_preprocess'):
+                    module.insert_llm_results(conn, batch, results)
+                else:
+                    module.update_validation_results(conn, results, validation_results_by_run)
+                db_seconds += time.time() - started
+    finally:
+        module.call_gemini_api = original_call
+        if conn is not None:
+            conn.close()
+
+    return {
+        'pipeline': pipeline,
+        'items': len(items),
+        'llm_calls': counters['llm_calls'],
+        'llm_seconds': llm_seconds,
+        'key_wait_seconds': llm_config._key_wait_seconds,
+        'db_seconds': db_seconds if args.db else None,
+        'corrupted': counters['corrupted'],
+        'recovered': counters['recovered'],
+        'statuses': statuses,
+        'dead_letters': dead_letter_count,
+        'mock_stats': llm_mock_backend.get_stats()
+    }
+
+
+def print_report(report: Dict):
+    """측정 결과 출력"""
+    items = report['items']
+    total = report['llm_seconds'] + (report['db_seconds'] or 0)
+    print("\n" + "-" * 80)
+    print(f"[RESULT] {report['pipeline']}")
+    print("-" * 80)
+    print(f"  항목 수: {items}개, LLM 호출: {report['llm_calls']}회 (mock 요청 {report['mock_stats']['requests']}회)")
+    print(f"  처리 시간 (LLM+파싱): {report['llm_seconds']:.2f}초 → {items / report['llm_seconds'] if report['llm_seconds'] else 0:.1f} items/sec")
+    if report['key_wait_seconds']:
+        busy = report['llm_seconds'] - report['key_wait_seconds']
+        print(f"  키 대기 시간 (429 차단/쿼터): {report['key_wait_seconds']:.2f}초 → 대기 제외 {items / busy if busy > 0 else 0:.1f} items/sec")
+    if report['db_seconds'] is not None:
+        per_item_ms = report['db_seconds'] / items * 1000 if items else 0
+        print(f"  DB 쓰기 시간: {report['db_seconds']:.2f}초 ({per_item_ms:.2f}ms/item)")
+        print(f"  전체: {total:.2f}초 → {items / total if total else 0:.1f} items/sec")
+    if report['corrupted']:
+        rate = report['recovered'] / report['corrupted'] * 100
+        print(f"  파싱 복구율: {report['recovered']}/{report['corrupted']} ({rate:.1f}%)")
+    else:
+        print("  파싱 복구율: 손상된 응답 없음")
+    injected = {k: v for k, v in report['mock_stats'].items() if k != 'requests' and v}
+    if injected:
+        print(f"  주입된 장애: {dict(injected)}")
+    print(f"  상태 분포: {dict(report['statuses'])}")
+    if report['dead_letters']:
+        print(f"  dead-letter: {report['dead_letters']}개")
+
+
+def main():
+    """메인 함수"""
+    args = parse_args()
+    configure_mock_env(args)
+
+    pipelines = PIPELINES if args.pipeline == 'all' else [args.pipeline]
+
+    print("=" * 80)
+    print("[START] LLM 파이프라인 부하 테스트 (mock 백엔드)")
+    print("=" * 80)
+    print(f"[INFO] 파이프라인: {', '.join(pipelines)}")
+    print(f"[INFO] 항목 수: {args.items}개, 배치 크기: {args.batch_size}개")
+    print(f"[INFO] 지연 시간: 중앙값 {args.latency_median}초 (시그마 {args.latency_sigma})")
+    print(f"[INFO] 장애 주입: 429 {args.rate_429:.0%} (키 차단 {args.block_429}초), 5xx {args.rate_5xx:.0%}, "
+          f"잘린 JSON {args.truncate_rate:.0%}, 잘못된 JSON {args.malformed_rate:.0%}")
+    print(f"[INFO] DB 쓰기 측정: {'예 (임시 테이블)' if args.db else '아니오'}")
+    if args.replay:
+        print(f"[INFO] 재생 모드: {args.replay} (타이밍: {args.replay_timing})")
+    if args.record:
+        print(f"[INFO] 응답 기록: {args.record}")
+
+    for pipeline in pipelines:
+        print(f"\n[INFO] {pipeline} 실행 중...")
+        print_report(run_pipeline(pipeline, args))
+
+    print("\n" + "=" * 80)
+    print("[OK] 부하 테스트 완료")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
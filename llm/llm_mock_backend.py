@@ -0,0 +1,322 @@
+"""
+로컬 Gemini 대체 백엔드 (부하 테스트/오프라인 실행용)
+
+LLM_BACKEND=mock 으로 설정하면 llm_client가 실제 API 대신 이 모듈의 Client를 사용합니다.
+- 지연 시간: 로그정규 분포 (MOCK_LATENCY_MEDIAN, MOCK_LATENCY_SIGMA)
+- 오류 주입: 429 (MOCK_429_RATE), 5xx (MOCK_5XX_RATE)
+- 응답 손상: 잘린 JSON (MOCK_TRUNCATE_RATE), 잘못된 JSON (MOCK_MALFORMED_RATE)
+  (config에 response_schema가 있으면 structured output으로 보고 잘못된 JSON은 주입하지 않음, 잘림은 유지)
+- 응답: 프롬프트 종류를 판별하여 입력 항목을 되돌려주는 결정적(echo) 응답
+
+genai.Client와 같은 형태(client.models.generate_content)로 호출합니다.
+"""
+
+import re
+import json
+import math
+import time
+import random
+import threading
+from typing import Dict, List, Optional
+from llm_config import (
+    MOCK_LATENCY_MEDIAN, MOCK_LATENCY_SIGMA,
+    MOCK_429_RATE, MOCK_5XX_RATE, MOCK_TRUNCATE_RATE, MOCK_MALFORMED_RATE,
+    MOCK_SEED
+)
+
+PROMPT_OUTCOME_PREPROCESS = 'outcome_preprocess'
+PROMPT_OUTCOME_VALIDATE = 'outcome_validate'
+PROMPT_IE_PREPROCESS = 'ie_preprocess'
+PROMPT_IE_SEGMENTED = 'ie_segmented'
+PROMPT_IE_VALIDATE = 'ie_validate'
+
+OUTCOME_ITEM_PATTERN = re.compile(r'^(\d+)(\|.*)?$')
+# 전처리 프롬프트는 [item_no]|[nct_id]|..., 검증 프롬프트는 [nct_id]|...
+IE_ITEM_PATTERN = re.compile(r'^(?:(\d+)\|)?(NCT\d{8})\|', re.MULTILINE)
+# "12 weeks" 또는 "Week 12" 형태
+TIME_PATTERN = re.compile(
+    r'(\d+(?:\.\d+)?)\s*(hour|day|week|month|year)s?|(hour|day|week|month|year)s?\s*(\d+(?:\.\d+)?)',
+    re.IGNORECASE
+)
+# 분할 입력: [item_no]|[nct_id] 줄과 [라벨]: [기준 텍스트] 줄
+IE_SEGMENTED_HEADER_PATTERN = re.compile(r'^(\d+)\|(NCT\d{8})\s*$')
+IE_SEGMENTED_LINE_PATTERN = re.compile(r'^\s*([IEU])(\d+):\s*(.*)$')
+BULLET_PATTERN = re.compile(r'^\s*(?:[*\-•]|\d+[.)])\s*')
+
+_rng = random.Random(MOCK_SEED)
+_lock = threading.Lock()
+
+# 마지막 응답에 주입된 장애 유형 (None, '429', '5XX', 'TRUNCATED', 'MALFORMED')
+last_fault = None
+_stats = {'requests': 0, '429': 0, '5XX': 0, 'TRUNCATED': 0, 'MALFORMED': 0}
+
+
+def detect_prompt_kind(prompt: str) -> Optional[str]:
+    """프롬프트 문구로 파이프라인 종류 판별"""
+    if 'MEASURE_FAILED|TIMEFRAME_FAILED' in prompt:
+        return PROMPT_OUTCOME_VALIDATE
+    if 'INCLUSION_FAILED|EXCLUSION_FAILED' in prompt:
+        return PROMPT_IE_VALIDATE
+    if '분할된 Inclusion/Exclusion Criteria 줄을 구조화' in prompt:
+        return PROMPT_IE_SEGMENTED
+    if 'Inclusion/Exclusion Criteria를 구조화' in prompt:
+        return PROMPT_IE_PREPROCESS
+    if 'measure_code와 time 정보를 추출' in prompt:
+        return PROMPT_OUTCOME_PREPROCESS
+    return None
+
+
+def parse_outcome_items(prompt: str) -> List[Dict]:
+    """[outcome_id]|M:..|D:..|T:.. 형식의 항목 추출"""
+    items = []
+    for line in prompt.splitlines():
+        match = OUTCOME_ITEM_PATTERN.match(line.strip())
+        if not match:
+            continue
+        fields = {'id': int(match.group(1))}
+        for part in (match.group(2) or '').split('|')[1:]:
+            if len(part) > 2 and part[1] == ':':
+                fields[part[0]] = part[2:]
+        items.append(fields)
+    return items
+
+
+def parse_ie_items(prompt: str) -> List[Dict]:
+    """[item_no]|[nct_id]|[eligibility_criteria_raw] 형식의 항목 추출 (원문은 여러 줄일 수 있음)"""
+    matches = list(IE_ITEM_PATTERN.finditer(prompt))
+    items = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(prompt)
+        body = prompt[match.end():end]
+        # 마지막 항목 뒤의 규칙 문구 제거
+        rules_at = body.find('\n규칙:')
+        if rules_at >= 0:
+            body = body[:rules_at]
+        items.append({
+            'item_no': int(match.group(1)) if match.group(1) else None,
+            'nct_id': match.group(2),
+            'text': body.strip()
+        })
+    return items
+
+
+def parse_ie_segmented_items(prompt: str) -> List[Dict]:
+    """[item_no]|[nct_id] 줄 아래의 라벨 줄을 항목별로 추출"""
+    items = []
+    for line in prompt.splitlines():
+        header = IE_SEGMENTED_HEADER_PATTERN.match(line.strip())
+        if header:
+            items.append({'item_no': int(header.group(1)), 'nct_id': header.group(2), 'lines': []})
+            continue
+        labelled = IE_SEGMENTED_LINE_PATTERN.match(line)
+        if labelled and items:
+            items[-1]['lines'].append((labelled.group(1) + labelled.group(2), labelled.group(3)))
+    return items
+
+
+def echo_outcome_preprocess(item: Dict) -> Dict:
+    """measure_raw 첫 단어를 measure_code로, time_frame_raw의 마지막 시점을 time으로 사용"""
+    measure = item.get('M', '')
+    words = re.findall(r'[A-Za-z0-9]+', measure)
+    measure_code = words[0].upper() if words else None
+
+    time_points = []
+    for value_first, unit_after, unit_first, value_after in TIME_PATTERN.findall(item.get('T', '')):
+        value = value_first or value_after
+        unit = (unit_after or unit_first).lower() + 's'
+        time_points.append({'value': float(value) if '.' in value else int(value), 'unit': unit})
+    last = time_points[-1] if time_points else None
+    return {
+        'outcome_id': item['id'],
+        'measure_code': measure_code,
+        'time_value': last['value'] if last else None,
+        'time_unit': last['unit'] if last else None,
+        'time_points': time_points if len(time_points) > 1 else None,
+        'confidence': 0.9,
+        'notes': '[MOCK] echo'
+    }
+
+
+def split_criteria_lines(text: str) -> Dict[str, List[str]]:
+    """Inclusion/Exclusion 제목 기준으로 섹션을 나누고 불릿 단위로 분리"""
+    sections = {'inclusion': [], 'exclusion': []}
+    current = 'inclusion'
+    for line in text.splitlines():
+        stripped = line.strip()
+        lowered = stripped.lower()
+        if lowered.startswith('inclusion criteria'):
+            current = 'inclusion'
+            continue
+        if lowered.startswith('exclusion criteria'):
+            current = 'exclusion'
+            continue
+        stripped = BULLET_PATTERN.sub('', stripped).strip()
+        if stripped:
+            sections[current].append(stripped)
+    return sections
+
+
+def echo_ie_preprocess(item: Dict) -> Dict:
+    """각 불릿을 feature=patient, operator='=', value=원문 형태의 criterion으로 변환"""
+    sections = split_criteria_lines(item['text'])
+
+    def to_criteria(lines):
+        return [{
+            'criterion_id': i,
+            'original_text': line,
+            'feature': 'patient',
+            'operator': '=',
+            'value': line,
+            'unit': None,
+            'confidence': 0.9
+        } for i, line in enumerate(lines, 1)]
+
+    return {
+        'item_no': item['item_no'],
+        'nct_id': item['nct_id'],
+        'inclusion_criteria': to_criteria(sections['inclusion']),
+        'exclusion_criteria': to_criteria(sections['exclusion'])
+    }
+
+
+def echo_ie_segmented(item: Dict) -> Dict:
+    """각 라벨 줄을 line 라벨만 포함한 criterion으로 변환 (E 라벨은 exclusion, 나머지는 inclusion)"""
+    sections = {'inclusion': [], 'exclusion': []}
+    for label, text in item['lines']:
+        sections['exclusion' if label.startswith('E') else 'inclusion'].append((label, text))
+
+    def to_criteria(lines):
+        return [{
+            'criterion_id': i,
+            'line': label,
+            'feature': 'patient',
+            'operator': '=',
+            'value': text,
+            'unit': None,
+            'confidence': 0.9
+        } for i, (label, text) in enumerate(lines, 1)]
+
+    return {
+        'item_no': item['item_no'],
+        'nct_id': item['nct_id'],
+        'inclusion_criteria': to_criteria(sections['inclusion']),
+        'exclusion_criteria': to_criteria(sections['exclusion'])
+    }
+
+
+def build_echo_response(prompt: str) -> str:
+    """프롬프트 종류별 결정적 JSON 응답 생성"""
+    kind = detect_prompt_kind(prompt)
+    if kind == PROMPT_OUTCOME_PREPROCESS:
+        result = [echo_outcome_preprocess(item) for item in parse_outcome_items(prompt)]
+    elif kind == PROMPT_OUTCOME_VALIDATE:
+        result = [{
+            'outcome_id': item['id'], 'status': 'VERIFIED', 'confidence': 0.9, 'notes': '[VERIFIED] mock'
+        } for item in parse_outcome_items(prompt)]
+    elif kind == PROMPT_IE_PREPROCESS:
+        result = [echo_ie_preprocess(item) for item in parse_ie_items(prompt)]
+    elif kind == PROMPT_IE_SEGMENTED:
+        result = [echo_ie_segmented(item) for item in parse_ie_segmented_items(prompt)]
+    elif kind == PROMPT_IE_VALIDATE:
+        result = [{
+            'nct_id': item['nct_id'], 'status': 'VERIFIED', 'confidence': 0.9, 'notes': '[VERIFIED] mock'
+        } for item in parse_ie_items(prompt)]
+    else:
+        result = []
+    return json.dumps(result, ensure_ascii=False, indent=2)
+
+
+def corrupt_malformed(text: str, rng: random.Random) -> str:
+    """복구 로직이 처리해야 하는 형태로 JSON 손상 (코드 블록 감싸기, 후행 쉼표, 쉼표 누락)"""
+    variant = rng.choice(['code_fence', 'trailing_comma', 'missing_comma'])
+    if variant == 'code_fence':
+        return f"다음은 결과입니다.\n```json\n{text}\n```\n"
+    if variant == 'trailing_comma':
+        return text[:text.rfind(']')] + ',\n]'
+    return text.replace('},\n  {', '}\n  {', 1)
+
+
+class _Usage:
+    def __init__(self, prompt: str, text: str):
+        # 대략 4자당 1토큰으로 추정
+        self.prompt_token_count = len(prompt) // 4
+        self.candidates_token_count = len(text) // 4
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count
+
+
+class _Response:
+    def __init__(self, prompt: str, text: str):
+        self.text = text
+        self.usage_metadata = _Usage(prompt, text)
+
+
+class _Models:
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    def generate_content(self, model: str, contents, config=None):
+        global last_fault
+        prompt = contents if isinstance(contents, str) else str(contents)
+
+        with _lock:
+            latency = MOCK_LATENCY_MEDIAN * math.exp(_rng.gauss(0, MOCK_LATENCY_SIGMA)) if MOCK_LATENCY_MEDIAN > 0 else 0
+            roll = _rng.random()
+            corrupt_roll = _rng.random()
+            cut_ratio = _rng.uniform(0.5, 0.95)
+            corrupt_rng = random.Random(_rng.random())
+            _stats['requests'] += 1
+
+        time.sleep(latency)
+
+        structured = isinstance(config, dict) and 'response_schema' in config
+        if roll < MOCK_429_RATE:
+            fault = '429'
+        elif roll < MOCK_429_RATE + MOCK_5XX_RATE:
+            fault = '5XX'
+        elif corrupt_roll < MOCK_TRUNCATE_RATE:
+            fault = 'TRUNCATED'
+        elif corrupt_roll < MOCK_TRUNCATE_RATE + MOCK_MALFORMED_RATE and not structured:
+            fault = 'MALFORMED'
+        else:
+            fault = None
+
+        # 동시 호출에서 통계/마지막 장애가 어긋나지 않도록 잠금 안에서 기록
+        with _lock:
+            last_fault = fault
+            if fault:
+                _stats[fault] += 1
+
+        if fault == '429':
+            raise Exception('429 RESOURCE_EXHAUSTED (mock) GenerateRequestsPerMinutePerProjectPerModel')
+        if fault == '5XX':
+            raise Exception('503 UNAVAILABLE (mock) The model is overloaded.')
+
+        text = build_echo_response(prompt)
+        if fault == 'TRUNCATED':
+            text = text[:int(len(text) * cut_ratio)]
+        elif fault == 'MALFORMED':
+            text = corrupt_malformed(text, corrupt_rng)
+
+        return _Response(prompt, text)
+
+
+class Client:
+    """genai.Client 대체 (models.generate_content만 지원)"""
+
+    def __init__(self, api_key: str = None, **kwargs):
+        self.models = _Models(api_key)
+
+
+def get_stats() -> Dict:
+    """주입된 장애 통계"""
+    with _lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    """통계 초기화"""
+    global last_fault
+    with _lock:
+        for key in _stats:
+            _stats[key] = 0
+        last_fault = None
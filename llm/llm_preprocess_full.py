@@ -6,201 +6,154 @@ outcome_llm_preprocessed 테이블에 저장합니다.
 """
 
 import os
+import sys
 import json
 import time
 from typing import Dict, Optional, List
-import psycopg2
-from psycopg2.extras import RealDictCursor, execute_batch
+from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 from llm_config import (
-    get_api_keys, GEMINI_MODEL,
+    get_api_keys,
     MAX_REQUESTS_PER_MINUTE, BATCH_SIZE, MAX_RETRIES, RETRY_DELAY
 )
+from llm_client import generate_text
+from llm_quota_ledger import get_usage_summary, purge_old_windows
 from llm_prompts import get_preprocess_initial_prompt
+from llm_retry import process_with_retry, split_completed_rows, ensure_dead_letter_table, save_dead_letters
+from llm_cascade import cascade_batch_fn, get_model_tiers, print_cascade_stats
+from llm_schemas import TASK_OUTCOME_PREPROCESS, get_response_config, parse_structured_response
+from llm_write_buffer import WriteBehindBuffer
 
 load_dotenv()
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
-
-
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection, execute_prepared_batch
+from run_checkpoint import RunCheckpoint, after_watermark, install_signal_handlers
 
 
 def call_gemini_api(prompt: str) -> Optional[Dict]:
-    """Gemini API 호출 (여러 API 키를 순차적으로 시도, 429 에러 시 자동 전환)"""
-    api_keys = get_api_keys()
-    if not api_keys:
-        print("[ERROR] GEMINI_API_KEY가 설정되지 않았습니다!")
+    """Gemini API 호출 (공유 클라이언트: 쿼터 원장 확인 후 키 로테이션, 429 에러 시 자동 전환)"""
+    import llm_config
+    
+    response_text = generate_text(prompt, config=get_response_config(TASK_OUTCOME_PREPROCESS))
+    if response_text is None:
         return None
     
-    # 현재 전역 키 인덱스부터 시작
-    import llm_config
-    start_key_index = llm_config._current_key_index
+    # structured output: 스키마 검증을 통과한 항목을 그대로 사용 (JSON으로 읽히지 않으면 아래 복구 경로)
+    parsed = parse_structured_response(TASK_OUTCOME_PREPROCESS, response_text)
+    if parsed is not None:
+        return parsed or None
+    
+    # 응답 텍스트 추출
+    content = response_text.strip()
+    
+    # 코드 블록 제거 (```json 또는 ```로 감싸진 경우)
+    if '```' in content:
+        # ```json 또는 ```로 시작하는 블록 찾기
+        import re
+        # 코드 블록 패턴 매칭
+        code_block_pattern = r'```(?:json)?\s*\n(.*?)\n```'
+        match = re.search(code_block_pattern, content, re.DOTALL)
+        if match:
+            content = match.group(1).strip()
+        else:
+            # 단순히 ``` 제거
+            content = re.sub(r'```(?:json)?', '', content).strip()
+    
+    # JSON 배열 시작 부분 찾기 (첫 번째 '[' 위치)
+    json_start = content.find('[')
+    if json_start >= 0:
+        content = content[json_start:]
+    else:
+        # '['가 없으면 JSON 객체로 시작하는지 확인
+        json_start = content.find('{')
+        if json_start >= 0:
+            # 단일 객체를 배열로 감싸기
+            content = '[' + content[json_start:]
+            # 마지막 '}' 뒤에 ']' 추가
+            json_end = content.rfind('}')
+            if json_end >= 0:
+                content = content[:json_end + 1] + ']'
     
-    last_error = None
+    # JSON 배열 끝 부분 찾기 (마지막 ']' 위치)
+    json_end = content.rfind(']')
+    if json_end >= 0:
+        content = content[:json_end + 1]
     
-    # 모든 키를 시도
-    for attempt in range(len(api_keys)):
-        key_index = (start_key_index + attempt) % len(api_keys)
+    # 앞뒤 공백 및 불필요한 텍스트 제거
+    content = content.strip()
+    
+    try:
+        parsed = json.loads(content)
+        # 배열이 아닌 경우 배열로 변환
+        if not isinstance(parsed, list):
+            parsed = [parsed]
+        return parsed
+    except json.JSONDecodeError as e:
+        # JSON 파싱 실패 시 부분 파싱 시도
+        print(f"[WARN] JSON 파싱 실패 (키 {llm_config._current_key_index + 1}): {e}")
+        print(f"  응답 내용 (처음 500자): {content[:500]}")
         
+        # 잘린 JSON 복구 시도
         try:
-            # 특정 키로 클라이언트 생성
-            from google import genai
-            client = genai.Client(api_key=api_keys[key_index])
-            response = client.models.generate_content(
-                model=GEMINI_MODEL,
-                contents=prompt
-            )
+            import re
+            # 중첩된 JSON 객체를 포함한 패턴 (더 정교한 매칭)
+            # 각 객체를 찾되, 중첩된 구조도 처리
+            parsed_items = []
+            brace_count = 0
+            start_pos = -1
+            current_obj = ""
             
-            # 성공 시 전역 인덱스 업데이트
-            if llm_config._current_key_index != key_index:
-                llm_config._previous_key_index = llm_config._current_key_index
-                llm_config._current_key_index = key_index
-            else:
-                llm_config._current_key_index = key_index
-            
-            # 응답 텍스트 추출
-            content = response.text.strip()
-            
-            # 코드 블록 제거 (```json 또는 ```로 감싸진 경우)
-            if '```' in content:
-                # ```json 또는 ```로 시작하는 블록 찾기
-                import re
-                # 코드 블록 패턴 매칭
-                code_block_pattern = r'```(?:json)?\s*\n(.*?)\n```'
-                match = re.search(code_block_pattern, content, re.DOTALL)
-                if match:
-                    content = match.group(1).strip()
-                else:
-                    # 단순히 ``` 제거
-                    content = re.sub(r'```(?:json)?', '', content).strip()
+            # '{'와 '}'를 추적하여 완전한 JSON 객체 찾기
+            for i, char in enumerate(content):
+                if char == '{':
+                    if brace_count == 0:
+                        start_pos = i
+                    brace_count += 1
+                    current_obj += char
+                elif char == '}':
+                    current_obj += char
+                    brace_count -= 1
+                    if brace_count == 0:
+                        # 완전한 객체 발견
+                        try:
+                            obj = json.loads(current_obj)
+                            if isinstance(obj, dict) and 'outcome_id' in obj:
+                                parsed_items.append(obj)
+                        except json.JSONDecodeError:
+                            pass
+                        current_obj = ""
+                        start_pos = -1
+                elif start_pos >= 0:
+                    current_obj += char
             
-            # JSON 배열 시작 부분 찾기 (첫 번째 '[' 위치)
-            json_start = content.find('[')
-            if json_start >= 0:
-                content = content[json_start:]
-            else:
-                # '['가 없으면 JSON 객체로 시작하는지 확인
-                json_start = content.find('{')
-                if json_start >= 0:
-                    # 단일 객체를 배열로 감싸기
-                    content = '[' + content[json_start:]
-                    # 마지막 '}' 뒤에 ']' 추가
-                    json_end = content.rfind('}')
-                    if json_end >= 0:
-                        content = content[:json_end + 1] + ']'
-            
-            # JSON 배열 끝 부분 찾기 (마지막 ']' 위치)
-            json_end = content.rfind(']')
-            if json_end >= 0:
-                content = content[:json_end + 1]
+            # 정규식으로도 시도 (간단한 경우)
+            if not parsed_items:
+                json_objects = re.findall(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
+                for obj_str in json_objects:
+                    try:
+                        obj = json.loads(obj_str)
+                        if isinstance(obj, dict) and 'outcome_id' in obj:
+                            parsed_items.append(obj)
+                    except json.JSONDecodeError:
+                        continue
             
-            # 앞뒤 공백 및 불필요한 텍스트 제거
-            content = content.strip()
-            
-            try:
-                parsed = json.loads(content)
-                # 배열이 아닌 경우 배열로 변환
-                if not isinstance(parsed, list):
-                    parsed = [parsed]
-                return parsed
-            except json.JSONDecodeError as e:
-                # JSON 파싱 실패 시 부분 파싱 시도
-                print(f"[WARN] JSON 파싱 실패 (키 {key_index + 1}/{len(api_keys)}): {e}")
-                print(f"  응답 내용 (처음 500자): {content[:500]}")
-                
-                # 잘린 JSON 복구 시도
-                try:
-                    import re
-                    # 중첩된 JSON 객체를 포함한 패턴 (더 정교한 매칭)
-                    # 각 객체를 찾되, 중첩된 구조도 처리
-                    parsed_items = []
-                    brace_count = 0
-                    start_pos = -1
-                    current_obj = ""
-                    
-                    # '{'와 '}'를 추적하여 완전한 JSON 객체 찾기
-                    for i, char in enumerate(content):
-                        if char == '{':
-                            if brace_count == 0:
-                                start_pos = i
-                            brace_count += 1
-                            current_obj += char
-                        elif char == '}':
-                            current_obj += char
-                            brace_count -= 1
-                            if brace_count == 0:
-                                # 완전한 객체 발견
-                                try:
-                                    obj = json.loads(current_obj)
-                                    if isinstance(obj, dict) and 'outcome_id' in obj:
-                                        parsed_items.append(obj)
-                                except json.JSONDecodeError:
-                                    pass
-                                current_obj = ""
-                                start_pos = -1
-                        elif start_pos >= 0:
-                            current_obj += char
-                    
-                    # 정규식으로도 시도 (간단한 경우)
-                    if not parsed_items:
-                        json_objects = re.findall(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
-                        for obj_str in json_objects:
-                            try:
-                                obj = json.loads(obj_str)
-                                if isinstance(obj, dict) and 'outcome_id' in obj:
-                                    parsed_items.append(obj)
-                            except json.JSONDecodeError:
-                                continue
-                    
-                    if parsed_items:
-                        print(f"  [복구] {len(parsed_items)}개 항목을 부분 파싱하여 복구했습니다.")
-                        # 복구된 항목에 복구 표시 추가
-                        for item in parsed_items:
-                            if 'notes' in item:
-                                item['notes'] = f"[PARTIAL_RECOVERED] {item.get('notes', '')}"
-                            else:
-                                item['notes'] = '[PARTIAL_RECOVERED] JSON 파싱 실패 후 부분 복구 성공.'
-                        return parsed_items
-                except Exception as recover_error:
-                    print(f"  [복구 실패] {recover_error}")
-                
-                # 복구 실패 시 None 반환
-                return None
-            
-        except Exception as e:
-            error_str = str(e)
-            last_error = e
-            
-            # 429 에러 (RESOURCE_EXHAUSTED) 체크
-            if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str.upper():
-                print(f"⚠️  API 키 {key_index + 1}/{len(api_keys)}에서 429 에러 발생 (시도 {attempt + 1}/{len(api_keys)}): {error_str}")
-                
-                if attempt == len(api_keys) - 1:
-                    print(f"[ERROR] 모든 API 키({len(api_keys)}개)가 소진되었습니다.")
-                    llm_config._previous_key_index = llm_config._current_key_index
-                    llm_config._current_key_index = key_index
-                    llm_config._all_keys_exhausted = True
-                    return None
-                else:
-                    next_key_index = (start_key_index + attempt + 1) % len(api_keys)
-                    print(f"🔄 다음 API 키로 전환합니다 (키 {next_key_index + 1}/{len(api_keys)})")
-                    continue
-            else:
-                print(f"[ERROR] Gemini API 오류 (키 {key_index + 1}/{len(api_keys)}): {error_str}")
-                return None
-    
-    print(f"[ERROR] 모든 API 키({len(api_keys)}개) 시도 실패. 마지막 에러: {str(last_error)}")
-    llm_config._all_keys_exhausted = True
-    return None
+            if parsed_items:
+                print(f"  [복구] {len(parsed_items)}개 항목을 부분 파싱하여 복구했습니다.")
+                # 복구된 항목에 복구 표시 추가
+                for item in parsed_items:
+                    if 'notes' in item:
+                        item['notes'] = f"[PARTIAL_RECOVERED] {item.get('notes', '')}"
+                    else:
+                        item['notes'] = '[PARTIAL_RECOVERED] JSON 파싱 실패 후 부분 복구 성공.'
+                return parsed_items
+        except Exception as recover_error:
+            print(f"  [복구 실패] {recover_error}")
+        
+        # 복구 실패 시 None 반환 (재시도 큐에서 서브 배치로 분할)
+        llm_config._last_failure_kind = 'PARSE_ERROR'
+        return None
 
 
 def determine_llm_status(measure_code, time_value, time_unit, notes: str = None, has_time_frame_raw: bool = True) -> tuple:
@@ -284,7 +237,14 @@ def preprocess_batch_outcomes(outcomes: List[Dict]) -> List[Dict]:
     result = call_gemini_api(prompt)
     
     if not result:
-        # API 실패 시 모두 null 처리
+        # API 실패 시 모두 null 처리 (응답 JSON 파싱 실패는 PARSE_ERROR로 구분)
+        import llm_config
+        if llm_config._last_failure_kind == 'PARSE_ERROR':
+            notes = '[PARSE_ERROR] LLM 응답 JSON 파싱 실패.'
+            failed_status = 'PARSE_ERROR'
+        else:
+            notes = '[API_FAILED] LLM API 호출 실패.'
+            failed_status = 'API_FAILED'
         return [{
             'outcome_id': outcome.get('id'),
             'llm_measure_code': None,
@@ -292,9 +252,9 @@ def preprocess_batch_outcomes(outcomes: List[Dict]) -> List[Dict]:
             'llm_time_unit': None,
             'llm_time_points': None,
             'llm_confidence': None,
-            'llm_notes': '[API_FAILED] LLM API 호출 실패.',
-            'llm_status': 'API_FAILED',
-            'failure_reason': 'API_FAILED'
+            'llm_notes': notes,
+            'llm_status': failed_status,
+            'failure_reason': failed_status
         } for outcome in outcomes]
     
     # 결과 파싱 (배열로 응답 받음)
@@ -429,10 +389,6 @@ def insert_llm_results(conn, outcomes: List[Dict], results: List[Dict]):
             'nct_id': outcome.get('nct_id'),
             'outcome_type': outcome.get('outcome_type'),
             'outcome_order': outcome.get('outcome_order'),
-            'measure_raw': outcome.get('measure_raw'),
-            'description_raw': outcome.get('description_raw'),
-            'time_frame_raw': outcome.get('time_frame_raw'),
-            'phase': outcome.get('phase'),
             'llm_measure_code': llm_measure_code,
             'llm_time_value': result.get('llm_time_value'),
             'llm_time_unit': llm_time_unit,
@@ -440,21 +396,20 @@ def insert_llm_results(conn, outcomes: List[Dict], results: List[Dict]):
             'llm_confidence': result.get('llm_confidence'),
             'llm_notes': result.get('llm_notes'),
             'llm_status': llm_status,
-            'failure_reason': failure_reason
+            'failure_reason': failure_reason,
+            'llm_model': result.get('llm_model')
         })
     
     insert_sql = """
         INSERT INTO outcome_llm_preprocessed (
             nct_id, outcome_type, outcome_order,
-            measure_raw, description_raw, time_frame_raw, phase,
             llm_measure_code, llm_time_value, llm_time_unit, llm_time_points,
-            llm_confidence, llm_notes, llm_status, failure_reason, parsing_method
+            llm_confidence, llm_notes, llm_status, failure_reason, parsing_method, llm_model
         ) VALUES (
             %(nct_id)s, %(outcome_type)s, %(outcome_order)s,
-            %(measure_raw)s, %(description_raw)s, %(time_frame_raw)s, %(phase)s,
             %(llm_measure_code)s, %(llm_time_value)s, %(llm_time_unit)s, 
             %(llm_time_points)s::jsonb, %(llm_confidence)s, %(llm_notes)s, 
-            %(llm_status)s, %(failure_reason)s, 'LLM'
+            %(llm_status)s, %(failure_reason)s, 'LLM', %(llm_model)s
         )
         ON CONFLICT (nct_id, outcome_type, outcome_order) 
         DO UPDATE SET
@@ -490,6 +445,10 @@ def insert_llm_results(conn, outcomes: List[Dict], results: List[Dict]):
                 WHEN outcome_llm_preprocessed.llm_status = 'SUCCESS' THEN outcome_llm_preprocessed.failure_reason
                 ELSE EXCLUDED.failure_reason
             END,
+            llm_model = CASE 
+                WHEN outcome_llm_preprocessed.llm_status = 'SUCCESS' THEN outcome_llm_preprocessed.llm_model
+                ELSE EXCLUDED.llm_model
+            END,
             updated_at = CASE 
                 WHEN outcome_llm_preprocessed.llm_status = 'SUCCESS' THEN outcome_llm_preprocessed.updated_at
                 ELSE CURRENT_TIMESTAMP
@@ -497,12 +456,17 @@ def insert_llm_results(conn, outcomes: List[Dict], results: List[Dict]):
     """
     
     with conn.cursor() as cur:
-        execute_batch(cur, insert_sql, insert_data, page_size=100)
+        execute_prepared_batch(cur, 'outcome_llm_preprocessed_upsert', insert_sql, insert_data, page_size=100)
         conn.commit()
 
 
+def write_result_rows(conn, rows: List[tuple]):
+    """저장 버퍼용: 여러 배치의 (outcome, result) 행을 한 번에 upsert"""
+    insert_llm_results(conn, [outcome for outcome, _ in rows], [result for _, result in rows if result])
+
+
 def create_table_if_not_exists(conn):
-    """outcome_llm_preprocessed 테이블 생성 (없는 경우)"""
+    """outcome_llm_preprocessed 테이블 생성 (없는 경우) 및 원본 조회 뷰 재생성"""
     with conn.cursor() as cur:
         # 테이블 존재 여부 확인
         cur.execute("""
@@ -530,6 +494,12 @@ def create_table_if_not_exists(conn):
         else:
             print("[INFO] outcome_llm_preprocessed 테이블이 이미 존재합니다.")
 
+        # *_with_raw 뷰는 r.*가 생성 시점 컬럼으로 고정되므로 매번 다시 생성 (멱등)
+        views_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sql', 'create_llm_preprocessed_views.sql')
+        with open(views_file, 'r', encoding='utf-8') as f:
+            cur.execute(f.read())
+        conn.commit()
+
 
 def main():
     """메인 함수"""
@@ -546,11 +516,16 @@ def main():
         sys.exit(1)
     
     print(f"\n[INFO] 사용 가능한 API 키: {len(api_keys)}개")
-    print(f"[INFO] 사용 모델: {GEMINI_MODEL}")
+    purge_old_windows()
+    blocked_keys = [k for k in get_usage_summary(api_keys) if k['blocked_until']]
+    print(f"[INFO] 쿼터 원장: 차단된 키 {len(blocked_keys)}/{len(api_keys)}개 (일일 리셋 또는 분당 한도 해제 시 자동 복구)")
+    print(f"[INFO] 사용 모델: {' → '.join(get_model_tiers())}")
     print(f"[INFO] 배치 크기: {BATCH_SIZE}개")
     
     # 명령줄 인자 파싱
-    # 사용법: python llm_preprocess_full.py [limit] [batch_size] [start_batch] [--failed-only|--missing-only|--all]
+    # 사용법: python llm_preprocess_full.py [limit] [batch_size] [start_batch] [--failed-only|--missing-only|--all] [--resume]
+    # --resume: 중단된 실행의 체크포인트(checkpoints/outcome_preprocess.json)에서 이어서 처리 (start_batch 무시)
+    resume = '--resume' in sys.argv[1:]
     limit = None
     custom_batch_size = None
     start_batch = 1
@@ -563,7 +538,7 @@ def main():
             break
     
     # 숫자 인자 파싱 (옵션 제외)
-    num_args = [arg for arg in sys.argv[1:] if arg not in ['--failed-only', '--missing-only', '--all']]
+    num_args = [arg for arg in sys.argv[1:] if arg not in ['--failed-only', '--missing-only', '--all', '--resume']]
     
     if len(num_args) > 0:
         try:
@@ -607,6 +582,7 @@ def main():
         
         # 테이블 생성 확인
         create_table_if_not_exists(conn)
+        ensure_dead_letter_table(conn)
         
         # 처리할 항목 조회 (outcome_raw에서 전체 데이터)
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
@@ -621,8 +597,9 @@ def main():
                         or_data.measure_raw,
                         or_data.description_raw,
                         or_data.time_frame_raw,
-                        or_data.phase
+                        s.phase
                     FROM outcome_raw or_data
+                    INNER JOIN study_raw s ON s.nct_id = or_data.nct_id
                     INNER JOIN outcome_llm_preprocessed olp
                         ON or_data.nct_id = olp.nct_id
                         AND or_data.outcome_type = olp.outcome_type
@@ -646,8 +623,9 @@ def main():
                         or_data.measure_raw,
                         or_data.description_raw,
                         or_data.time_frame_raw,
-                        or_data.phase
+                        s.phase
                     FROM outcome_raw or_data
+                    INNER JOIN study_raw s ON s.nct_id = or_data.nct_id
                     LEFT JOIN outcome_llm_preprocessed olp
                         ON or_data.nct_id = olp.nct_id
                         AND or_data.outcome_type = olp.outcome_type
@@ -664,27 +642,41 @@ def main():
                 # 전체 처리 (기존 SUCCESS 항목은 건드리지 않음 - INSERT 시 CASE 문으로 처리)
                 query = """
                     SELECT 
-                        id,
-                        nct_id,
-                        outcome_type,
-                        outcome_order,
-                        measure_raw,
-                        description_raw,
-                        time_frame_raw,
-                        phase
-                    FROM outcome_raw
-                    ORDER BY id
+                        or_data.id,
+                        or_data.nct_id,
+                        or_data.outcome_type,
+                        or_data.outcome_order,
+                        or_data.measure_raw,
+                        or_data.description_raw,
+                        or_data.time_frame_raw,
+                        s.phase
+                    FROM outcome_raw or_data
+                    INNER JOIN study_raw s ON s.nct_id = or_data.nct_id
+                    ORDER BY or_data.id
                 """
                 if limit:
                     query += f" LIMIT {limit}"
                 cur.execute(query)
                 outcomes = cur.fetchall()
         
+        # 체크포인트: --resume이면 저장하지 못한 결과를 먼저 저장하고 마지막 처리 키 이후 항목만 처리
+        checkpoint = RunCheckpoint('outcome_preprocess', {'mode': mode, 'limit': limit})
+        if resume and checkpoint.resume():
+            pending = checkpoint.pending or {}
+            write_result_rows(conn, pending.get('results') or [])
+            write_result_rows(conn, pending.get('late_results') or [])
+            save_dead_letters(conn, 'outcome_preprocess', pending.get('dead_letters') or [])
+            checkpoint.advance(checkpoint.watermark)
+            outcomes = after_watermark(outcomes, lambda o: o['id'], checkpoint.watermark)
+            start_batch = 1
+        install_signal_handlers()
+        
         total_count = len(outcomes)
         print(f"\n[INFO] 처리할 항목: {total_count:,}개")
         
         if total_count == 0:
             print("[INFO] 처리할 항목이 없습니다.")
+            checkpoint.complete()
             conn.close()
             return
         
@@ -692,6 +684,22 @@ def main():
         import llm_config
         actual_batch_size = llm_config.BATCH_SIZE
         print(f"\n[STEP 1] LLM 전처리 시작 (배치 크기: {actual_batch_size})...")
+        # 결과 저장은 백그라운드 저장 버퍼가 별도 연결로 일괄 처리 (API 루프는 DB를 기다리지 않음)
+        # 저장이 끝난 결과까지 체크포인트 watermark를 옮기고, 종료 시 저장하지 못한 결과는 체크포인트에 보관
+        # late_results: 키 소진 배치에서 미완료 항목 뒤의 완료 결과 (저장만 하고 watermark는 옮기지 않음)
+        def on_flush(kind, rows):
+            if kind == 'results':
+                checkpoint.advance(rows[-1][0]['id'])
+        
+        def on_unsaved(pending):
+            results = pending.get('results')
+            checkpoint.hold(pending, results[-1][0]['id'] if results else checkpoint.watermark)
+        
+        writer = WriteBehindBuffer({
+            'results': write_result_rows,
+            'late_results': write_result_rows,
+            'dead_letters': lambda c, rows: save_dead_letters(c, 'outcome_preprocess', rows)
+        }, get_connection=get_db_connection, name='outcome_preprocess', on_flush=on_flush, on_unsaved=on_unsaved).start()
         all_results = []
         success_count = 0
         failed_count = 0
@@ -717,12 +725,29 @@ def main():
                 print(f"\n[ERROR] 모든 API 키가 소진되어 처리 중단합니다.")
                 break
             
-            # 배치 단위로 한번에 API 호출
-            batch_results = preprocess_batch_outcomes(batch_outcomes)
+            # 배치 단위로 한번에 API 호출 (API_FAILED/PARSE_ERROR는 재시도 큐에서 백오프 후 재처리)
+            # 모델 캐스케이드: 저비용 모델 결과 중 신뢰도 미달/파싱 실패 항목만 상위 모델로 승격
+            batch_results, dead_letters = process_with_retry(
+                batch_outcomes, cascade_batch_fn(preprocess_batch_outcomes, item_key='id', result_key='outcome_id'),
+                item_key='id', result_key='outcome_id'
+            )
+            writer.put('dead_letters', dead_letters)
             
             # 모든 키가 소진되었는지 다시 확인
+            # 이미 받은 완료 결과는 저장하고 중단 (watermark는 처음 미완료 항목 앞까지만 이동)
             if llm_config._all_keys_exhausted:
-                print(f"\n[ERROR] 모든 API 키가 소진되어 처리 중단합니다.")
+                done_rows, late_rows = split_completed_rows(batch_outcomes, batch_results, 'id', 'outcome_id')
+                writer.put('results', done_rows)
+                writer.put('late_results', late_rows)
+                for _, result in done_rows + late_rows:
+                    all_results.append(result)
+                    status = result.get('llm_status', '')
+                    if status == 'SUCCESS':
+                        success_count += 1
+                    else:
+                        partial_recovered_count += status == 'PARTIAL_RECOVERED'
+                        failed_count += 1
+                print(f"\n[ERROR] 모든 API 키가 소진되어 처리 중단합니다. (이번 배치 완료 결과 {len(done_rows) + len(late_rows)}개 저장)")
                 break
             
             # 결과 집계
@@ -740,10 +765,10 @@ def main():
             # Rate limiting
             time.sleep(60 / MAX_REQUESTS_PER_MINUTE)
             
-            # 배치마다 DB 저장
+            # 배치 결과는 저장 버퍼에 넣고 바로 다음 배치 진행
             if batch_results:
-                print(f"  배치 {batch_num} 결과 저장 중... ({len(batch_results)}개)")
-                insert_llm_results(conn, batch_outcomes, batch_results)
+                result_map = {r['outcome_id']: r for r in batch_results}
+                writer.put('results', [(outcome, result_map.get(outcome.get('id'))) for outcome in batch_outcomes])
             
             # 모든 키가 소진되었으면 배치 루프도 중단
             if llm_config._all_keys_exhausted:
@@ -756,6 +781,12 @@ def main():
         print(f"  실패: {failed_count:,}개 ({failed_count/total_count*100:.1f}%)")
         if partial_recovered_count > 0:
             print(f"  부분 복구: {partial_recovered_count:,}개")
+        print_cascade_stats()
+        
+        # 남은 결과를 모두 저장한 뒤 통계 조회 (키 소진으로 중단된 경우 체크포인트 유지)
+        writer.close()
+        if not llm_config._all_keys_exhausted and not writer.has_unsaved():
+            checkpoint.complete()
         
         # 최종 통계
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
@@ -767,6 +798,7 @@ def main():
                     COUNT(CASE WHEN llm_status = 'TIMEFRAME_FAILED' THEN 1 END) as timeframe_failed,
                     COUNT(CASE WHEN llm_status = 'BOTH_FAILED' THEN 1 END) as both_failed,
                     COUNT(CASE WHEN llm_status = 'API_FAILED' THEN 1 END) as api_failed,
+                    COUNT(CASE WHEN llm_status = 'PARSE_ERROR' THEN 1 END) as parse_error,
                     COUNT(CASE WHEN llm_status = 'PARTIAL_RECOVERED' THEN 1 END) as partial_recovered,
                     COUNT(llm_measure_code) as with_measure,
                     COUNT(llm_time_value) as with_time,
@@ -782,6 +814,7 @@ def main():
             print(f"  Timeframe 실패: {stats['timeframe_failed']:,}개 ({stats['timeframe_failed']/stats['total']*100:.1f}%)")
             print(f"  모두 실패: {stats['both_failed']:,}개 ({stats['both_failed']/stats['total']*100:.1f}%)")
             print(f"  API 실패: {stats['api_failed']:,}개 ({stats['api_failed']/stats['total']*100:.1f}%)")
+            print(f"  응답 파싱 실패: {stats['parse_error']:,}개 ({stats['parse_error']/stats['total']*100:.1f}%)")
             if stats['partial_recovered'] > 0:
                 print(f"  부분 복구: {stats['partial_recovered']:,}개 ({stats['partial_recovered']/stats['total']*100:.1f}%)")
             print(f"\n[추출 통계]")
@@ -797,6 +830,12 @@ def main():
         traceback.print_exc()
         if 'conn' in locals():
             conn.close()
+    finally:
+        # 오류/중단(Ctrl+C, SIGTERM) 시에도 대기 중인 결과 저장 후 재개 지점 기록
+        if 'writer' in locals():
+            writer.close()
+        if 'checkpoint' in locals():
+            checkpoint.save()
 
 
 if __name__ == "__main__":
@@ -3,371 +3,279 @@
 
 inclusion_exclusion_raw 테이블의 모든 데이터를 LLM으로 전처리하여 
 inclusion_exclusion_llm_preprocessed 테이블에 저장합니다.
+
+--segmented 옵션을 주면 inclusion_exclusion_segments 테이블(preprocessing/segment_eligibility_criteria.py)의
+분할된 기준 줄을 라벨(I1, E2 ...)과 함께 보내고, LLM 응답의 라벨로 original_text를 로컬에서 채웁니다.
+이때 다른 연구에서 이미 구조화된 기준 줄은 inclusion_exclusion_criterion_cache에서 재사용하고
+캐시되지 않은 줄만 LLM에 보냅니다 (--no-cache로 비활성화).
 """
 
 import os
+import sys
 import json
+import hashlib
 import time
 from typing import Dict, Optional, List
-import psycopg2
-from psycopg2.extras import RealDictCursor, execute_batch
+from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 from llm_config import (
-    get_api_keys, get_client, switch_to_next_api_key, GEMINI_MODEL,
+    get_api_keys,
     MAX_REQUESTS_PER_MINUTE, BATCH_SIZE, MAX_RETRIES, RETRY_DELAY
 )
-from llm_prompts import get_inclusion_exclusion_preprocess_prompt
+from llm_client import generate_text
+from llm_alignment import align_results
+import llm_criterion_cache as criterion_cache
+import llm_feature_normalizer as feature_normalizer
+from llm_rule_extractor import extract_criteria as extract_rule_criteria
+from llm_quota_ledger import get_usage_summary, purge_old_windows
+from llm_prompts import get_inclusion_exclusion_preprocess_prompt, get_inclusion_exclusion_segmented_prompt
+from llm_retry import process_with_retry, split_completed_rows, ensure_dead_letter_table, save_dead_letters
+import llm_cascade
+from llm_schemas import TASK_IE_PREPROCESS, TASK_IE_SEGMENTED, get_response_config, parse_structured_response
 
 load_dotenv()
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection, execute_prepared_batch
+from run_checkpoint import RunCheckpoint, after_watermark, install_signal_handlers
+from preprocessing.segment_eligibility_criteria import segment_label
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# 분할 입력에서 나이/성별/점수 범위 줄을 규칙으로 구조화 (--no-rules로 비활성화)
+USE_RULE_EXTRACTOR = True
 
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
 
+def call_gemini_api(prompt: str, nct_id_list: List[str] = None, task: str = TASK_IE_PREPROCESS) -> Optional[List]:
+    """
+    Gemini API 호출 (공유 클라이언트: 쿼터 원장 확인 후 키 로테이션, 429 에러 시 자동 전환)
 
-def call_gemini_api(prompt: str, nct_id_list: List[str] = None) -> Optional[List]:
-    """Gemini API 호출 (여러 API 키를 순차적으로 시도, 429 에러 시 자동 전환)"""
-    api_keys = get_api_keys()
-    if not api_keys:
-        print("[ERROR] GEMINI_API_KEY가 설정되지 않았습니다!")
+    nct_id_list는 하위 호환용 인자입니다. nct_id가 누락된 항목은 순서로 추정하지 않고
+    호출 측에서 llm_alignment로 매칭합니다.
+    task는 응답 스키마 종류입니다 (원문 입력: TASK_IE_PREPROCESS, 분할 입력: TASK_IE_SEGMENTED).
+    """
+    import llm_config
+    
+    response_text = generate_text(prompt, config=get_response_config(task, {'temperature': 0.0}))
+    if response_text is None:
         return None
     
-    # 현재 전역 키 인덱스부터 시작
-    import llm_config
-    start_key_index = llm_config._current_key_index
+    # structured output: 스키마 검증을 통과한 항목을 그대로 사용 (JSON으로 읽히지 않으면 아래 복구 경로)
+    parsed = parse_structured_response(task, response_text)
+    if parsed is not None:
+        return parsed or None
     
-    last_error = None
+    content = response_text.strip()
     
-    # 현재 키부터 시작 (429 에러 시에만 다음 키로 전환)
-    key_index = start_key_index
-    api_key = api_keys[key_index]
+    # 코드 블록 제거 (```json 또는 ```로 감싸진 경우)
+    if '```' in content:
+        import re
+        # 코드 블록 패턴 매칭
+        code_block_pattern = r'```(?:json)?\s*\n(.*?)\n```'
+        match = re.search(code_block_pattern, content, re.DOTALL)
+        if match:
+            content = match.group(1).strip()
+        else:
+            # 단순히 ``` 제거
+            content = re.sub(r'```(?:json)?', '', content).strip()
     
-    try:
-        client = get_client(api_key)
-        response = client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=prompt,
-            config={'temperature': 0.0}  # 전처리는 deterministic하게
-        )
-        
-        content = response.text.strip()
-        
-        # 코드 블록 제거 (```json 또는 ```로 감싸진 경우)
-        if '```' in content:
-            import re
-            # 코드 블록 패턴 매칭
-            code_block_pattern = r'```(?:json)?\s*\n(.*?)\n```'
-            match = re.search(code_block_pattern, content, re.DOTALL)
-            if match:
-                content = match.group(1).strip()
-            else:
-                # 단순히 ``` 제거
-                content = re.sub(r'```(?:json)?', '', content).strip()
-        
-        # JSON 배열 시작 부분 찾기 (첫 번째 '[' 위치)
-        json_start = content.find('[')
+    # JSON 배열 시작 부분 찾기 (첫 번째 '[' 위치)
+    json_start = content.find('[')
+    if json_start >= 0:
+        content = content[json_start:]
+    else:
+        # '['가 없으면 JSON 객체로 시작하는지 확인
+        json_start = content.find('{')
         if json_start >= 0:
-            content = content[json_start:]
-        else:
-            # '['가 없으면 JSON 객체로 시작하는지 확인
-            json_start = content.find('{')
-            if json_start >= 0:
-                # 단일 객체를 배열로 감싸기
-                content = '[' + content[json_start:]
-                # 마지막 '}' 뒤에 ']' 추가
-                json_end = content.rfind('}')
-                if json_end >= 0:
-                    content = content[:json_end + 1] + ']'
-        
-        # JSON 배열 끝 부분 찾기 (마지막 ']' 위치)
-        json_end = content.rfind(']')
-        if json_end >= 0:
-            content = content[:json_end + 1]
-        
-        # 앞뒤 공백 및 불필요한 텍스트 제거
-        content = content.strip()
-        
-        try:
-            parsed = json.loads(content)
-            # 배열이 아닌 경우 배열로 변환
-            if not isinstance(parsed, list):
-                parsed = [parsed]
-            # 성공 시 현재 키 인덱스 업데이트
-            llm_config._current_key_index = key_index
-            return parsed
-        except json.JSONDecodeError as e:
-            # "Extra data" 에러의 경우 첫 번째 JSON을 추출 시도
-            if "Extra data" in str(e) or "Expecting" in str(e):
-                try:
-                    import re
-                    # 첫 번째 완전한 JSON 배열만 추출 (더 robust한 패턴)
-                    # 중괄호와 대괄호 균형을 고려하여 완전한 배열 추출
-                    bracket_count = 0
-                    brace_count = 0
-                    array_start = -1
-                    array_end = -1
-                    
-                    for i, char in enumerate(content):
-                        if char == '[':
-                            if bracket_count == 0:
-                                array_start = i
-                            bracket_count += 1
-                        elif char == ']':
-                            bracket_count -= 1
-                            if bracket_count == 0 and array_start >= 0:
-                                array_end = i
-                                break
-                        elif char == '{':
-                            brace_count += 1
-                        elif char == '}':
-                            brace_count -= 1
-                    
-                    if array_start >= 0 and array_end >= 0:
-                        first_json = content[array_start:array_end + 1]
-                        parsed = json.loads(first_json)
-                        if not isinstance(parsed, list):
-                            parsed = [parsed]
-                        print(f"  [복구] Extra data/Expecting 에러에서 첫 번째 JSON 배열 추출 성공 ({len(parsed)}개 항목)")
-                        # 복구 성공 시 현재 키 인덱스 유지
-                        llm_config._current_key_index = key_index
-                        return parsed
-                except Exception as extra_data_error:
-                    print(f"  [Extra data 복구 실패] {extra_data_error}")
-            
-            # JSON 파싱 실패 시 부분 파싱 시도
-            print(f"[WARN] JSON 파싱 실패 (키 {key_index + 1}/{len(api_keys)}): {e}")
-            print(f"  응답 내용 (처음 500자): {content[:500]}")
-            
-            # 잘린 JSON 복구 시도
+            # 단일 객체를 배열로 감싸기
+            content = '[' + content[json_start:]
+            # 마지막 '}' 뒤에 ']' 추가
+            json_end = content.rfind('}')
+            if json_end >= 0:
+                content = content[:json_end + 1] + ']'
+    
+    # JSON 배열 끝 부분 찾기 (마지막 ']' 위치)
+    json_end = content.rfind(']')
+    if json_end >= 0:
+        content = content[:json_end + 1]
+    
+    # 앞뒤 공백 및 불필요한 텍스트 제거
+    content = content.strip()
+    
+    try:
+        parsed = json.loads(content)
+        # 배열이 아닌 경우 배열로 변환
+        if not isinstance(parsed, list):
+            parsed = [parsed]
+        return parsed
+    except json.JSONDecodeError as e:
+        # "Extra data" 에러의 경우 첫 번째 JSON을 추출 시도
+        if "Extra data" in str(e) or "Expecting" in str(e):
             try:
                 import re
-                parsed_items = []
-                
-                # 방법 1: 배열의 각 요소를 추출 (최상위 레벨 객체만)
-                # '{'와 '}'를 추적하여 완전한 최상위 레벨 JSON 객체 찾기
+                # 첫 번째 완전한 JSON 배열만 추출 (더 robust한 패턴)
+                # 중괄호와 대괄호 균형을 고려하여 완전한 배열 추출
+                bracket_count = 0
                 brace_count = 0
-                bracket_count = 0  # 배열 레벨 추적
-                start_pos = -1
-                current_obj = ""
-                in_array = False
+                array_start = -1
+                array_end = -1
                 
                 for i, char in enumerate(content):
                     if char == '[':
+                        if bracket_count == 0:
+                            array_start = i
                         bracket_count += 1
-                        if bracket_count == 1:
-                            in_array = True
                     elif char == ']':
                         bracket_count -= 1
-                        if bracket_count == 0:
-                            in_array = False
+                        if bracket_count == 0 and array_start >= 0:
+                            array_end = i
+                            break
                     elif char == '{':
-                        if brace_count == 0 and in_array:
-                            start_pos = i
                         brace_count += 1
-                        if start_pos >= 0:
-                            current_obj += char
                     elif char == '}':
-                        if start_pos >= 0:
-                            current_obj += char
                         brace_count -= 1
-                        if brace_count == 0 and start_pos >= 0:
-                            # 완전한 최상위 레벨 객체 발견
-                            try:
-                                obj = json.loads(current_obj)
-                                if isinstance(obj, dict) and 'nct_id' in obj:
-                                    parsed_items.append(obj)
-                            except json.JSONDecodeError:
-                                pass
-                            current_obj = ""
-                            start_pos = -1
-                    elif start_pos >= 0:
-                        current_obj += char
                 
-                # 방법 2: 정규식으로 최상위 레벨 객체 찾기 (중첩 구조 고려)
-                if not parsed_items:
-                    # 배열 내부의 최상위 객체만 매칭 (중괄호 균형 추적)
-                    pattern = r'\{[^{}]*(?:\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}[^{}]*)*\}'
-                    json_objects = re.findall(pattern, content, re.DOTALL)
-                    for obj_str in json_objects:
-                            try:
-                                obj = json.loads(obj_str)
-                                if isinstance(obj, dict):
-                                    # nct_id가 있고 유효한 경우만 추가
-                                    nct_id = obj.get('nct_id')
-                                    if nct_id and isinstance(nct_id, str):
-                                        # 중복 체크
-                                        if not any(item.get('nct_id') == nct_id for item in parsed_items):
-                                            parsed_items.append(obj)
-                            except json.JSONDecodeError:
-                                continue
-                
-                # 방법 3: 배열 시작부터 순차적으로 파싱 시도 (점진적 파싱)
-                if not parsed_items:
-                    # '[' 이후의 각 객체를 개별적으로 파싱 시도
-                    array_start = content.find('[')
-                    if array_start >= 0:
-                        remaining = content[array_start + 1:]
-                        brace_count = 0
-                        obj_start = -1
-                        obj_content = ""
-                        
-                        for i, char in enumerate(remaining):
-                            if char == '{':
-                                if brace_count == 0:
-                                    obj_start = i
-                                brace_count += 1
-                                if obj_start >= 0:
-                                    obj_content += char
-                            elif char == '}':
-                                if obj_start >= 0:
-                                    obj_content += char
-                                brace_count -= 1
-                                if brace_count == 0 and obj_start >= 0:
-                                    try:
-                                        obj = json.loads(obj_content)
-                                        if isinstance(obj, dict):
-                                            # nct_id가 있고 유효한 경우만 추가
-                                            nct_id = obj.get('nct_id')
-                                            if nct_id and isinstance(nct_id, str):
-                                                # 중복 체크
-                                                if not any(item.get('nct_id') == nct_id for item in parsed_items):
-                                                    parsed_items.append(obj)
-                                    except json.JSONDecodeError:
-                                        pass
-                                    obj_content = ""
-                                    obj_start = -1
-                            elif obj_start >= 0:
-                                obj_content += char
-                
-                if parsed_items:
-                    print(f"  [복구] {len(parsed_items)}개 항목을 부분 파싱하여 복구했습니다.")
-                    # 복구된 항목에 복구 표시 추가 및 nct_id 검증/복구
-                    valid_items = []
-                    for idx, item in enumerate(parsed_items):
-                        nct_id = item.get('nct_id')
-                        # nct_id가 없거나 유효하지 않으면 순서 기반으로 복구 시도
-                        if not nct_id or not isinstance(nct_id, str) or not nct_id.strip():
-                            # nct_id_list가 전달된 경우 순서 기반 복구
-                            if nct_id_list and idx < len(nct_id_list):
-                                nct_id = nct_id_list[idx]
-                                item['nct_id'] = nct_id
-                                print(f"  [복구] nct_id 누락 항목을 순서 기반으로 복구: {nct_id} (인덱스 {idx})")
-                            else:
-                                print(f"  [경고] 복구된 항목에서 유효하지 않은 nct_id 발견 (인덱스 {idx}): {nct_id}")
-                                continue
-                        
-                        if nct_id and isinstance(nct_id, str) and nct_id.strip():
-                            if 'llm_notes' in item:
-                                item['llm_notes'] = f"[PARTIAL_RECOVERED] {item.get('llm_notes', '')}"
-                            else:
-                                item['llm_notes'] = '[PARTIAL_RECOVERED] JSON 파싱 실패 후 부분 복구 성공.'
-                            valid_items.append(item)
-                    # 복구 성공 시 현재 키 인덱스 유지
-                    llm_config._current_key_index = key_index
-                    return valid_items if valid_items else None
-            except Exception as recover_error:
-                print(f"  [복구 실패] {recover_error}")
-            
-            # JSON 파싱 실패는 API 호출 성공이므로 같은 키를 계속 사용
-            # 키 인덱스를 업데이트하지 않고 None 반환
-            print(f"  [INFO] JSON 파싱 실패했지만 API 호출은 성공. 같은 키({key_index + 1}/{len(api_keys)})를 계속 사용합니다.")
-            return None
-    
-    except Exception as e:
-        error_str = str(e)
-        last_error = e
+                if array_start >= 0 and array_end >= 0:
+                    first_json = content[array_start:array_end + 1]
+                    parsed = json.loads(first_json)
+                    if not isinstance(parsed, list):
+                        parsed = [parsed]
+                    print(f"  [복구] Extra data/Expecting 에러에서 첫 번째 JSON 배열 추출 성공 ({len(parsed)}개 항목)")
+                    return parsed
+            except Exception as extra_data_error:
+                print(f"  [Extra data 복구 실패] {extra_data_error}")
+        
+        # JSON 파싱 실패 시 부분 파싱 시도
+        print(f"[WARN] JSON 파싱 실패 (키 {llm_config._current_key_index + 1}): {e}")
+        print(f"  응답 내용 (처음 500자): {content[:500]}")
         
-        # 429 에러 (RESOURCE_EXHAUSTED) 체크 - 이 경우에만 다음 키로 전환
-        if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str.upper():
-            print(f"⚠️  API 키 {key_index + 1}/{len(api_keys)}에서 429 에러 발생: {error_str}")
+        # 잘린 JSON 복구 시도
+        try:
+            import re
+            parsed_items = []
             
-            # 모든 키를 시도
-            for attempt in range(len(api_keys)):
-                next_key_index = (key_index + attempt + 1) % len(api_keys)
-                next_api_key = api_keys[next_key_index]
-                
-                try:
-                    print(f"🔄 다음 API 키로 전환합니다 (키 {next_key_index + 1}/{len(api_keys)})")
-                    client = get_client(next_api_key)
-                    response = client.models.generate_content(
-                        model=GEMINI_MODEL,
-                        contents=prompt,
-                        config={'temperature': 0.0}
-                    )
-                    
-                    content = response.text.strip()
-                    
-                    # 코드 블록 제거
-                    if '```' in content:
-                        import re
-                        code_block_pattern = r'```(?:json)?\s*\n(.*?)\n```'
-                        match = re.search(code_block_pattern, content, re.DOTALL)
-                        if match:
-                            content = match.group(1).strip()
-                        else:
-                            content = re.sub(r'```(?:json)?', '', content).strip()
-                    
-                    # JSON 배열 시작/끝 찾기
-                    json_start = content.find('[')
-                    if json_start >= 0:
-                        content = content[json_start:]
-                    else:
-                        json_start = content.find('{')
-                        if json_start >= 0:
-                            content = '[' + content[json_start:]
-                            json_end = content.rfind('}')
-                            if json_end >= 0:
-                                content = content[:json_end + 1] + ']'
-                    
-                    json_end = content.rfind(']')
-                    if json_end >= 0:
-                        content = content[:json_end + 1]
+            # 방법 1: 배열의 각 요소를 추출 (최상위 레벨 객체만)
+            # '{'와 '}'를 추적하여 완전한 최상위 레벨 JSON 객체 찾기
+            brace_count = 0
+            bracket_count = 0  # 배열 레벨 추적
+            start_pos = -1
+            current_obj = ""
+            in_array = False
+            
+            for i, char in enumerate(content):
+                if char == '[':
+                    bracket_count += 1
+                    if bracket_count == 1:
+                        in_array = True
+                elif char == ']':
+                    bracket_count -= 1
+                    if bracket_count == 0:
+                        in_array = False
+                elif char == '{':
+                    if brace_count == 0 and in_array:
+                        start_pos = i
+                    brace_count += 1
+                    if start_pos >= 0:
+                        current_obj += char
+                elif char == '}':
+                    if start_pos >= 0:
+                        current_obj += char
+                    brace_count -= 1
+                    if brace_count == 0 and start_pos >= 0:
+                        # 완전한 최상위 레벨 객체 발견
+                        try:
+                            obj = json.loads(current_obj)
+                            if isinstance(obj, dict) and ('nct_id' in obj or 'item_no' in obj):
+                                parsed_items.append(obj)
+                        except json.JSONDecodeError:
+                            pass
+                        current_obj = ""
+                        start_pos = -1
+                elif start_pos >= 0:
+                    current_obj += char
+            
+            # 방법 2: 정규식으로 최상위 레벨 객체 찾기 (중첩 구조 고려)
+            if not parsed_items:
+                # 배열 내부의 최상위 객체만 매칭 (중괄호 균형 추적)
+                pattern = r'\{[^{}]*(?:\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}[^{}]*)*\}'
+                json_objects = re.findall(pattern, content, re.DOTALL)
+                for obj_str in json_objects:
+                        try:
+                            obj = json.loads(obj_str)
+                            if isinstance(obj, dict):
+                                # nct_id가 있고 유효한 경우만 추가
+                                nct_id = obj.get('nct_id')
+                                if nct_id and isinstance(nct_id, str):
+                                    # 중복 체크
+                                    if not any(item.get('nct_id') == nct_id for item in parsed_items):
+                                        parsed_items.append(obj)
+                        except json.JSONDecodeError:
+                            continue
+            
+            # 방법 3: 배열 시작부터 순차적으로 파싱 시도 (점진적 파싱)
+            if not parsed_items:
+                # '[' 이후의 각 객체를 개별적으로 파싱 시도
+                array_start = content.find('[')
+                if array_start >= 0:
+                    remaining = content[array_start + 1:]
+                    brace_count = 0
+                    obj_start = -1
+                    obj_content = ""
                     
-                    content = content.strip()
+                    for i, char in enumerate(remaining):
+                        if char == '{':
+                            if brace_count == 0:
+                                obj_start = i
+                            brace_count += 1
+                            if obj_start >= 0:
+                                obj_content += char
+                        elif char == '}':
+                            if obj_start >= 0:
+                                obj_content += char
+                            brace_count -= 1
+                            if brace_count == 0 and obj_start >= 0:
+                                try:
+                                    obj = json.loads(obj_content)
+                                    if isinstance(obj, dict):
+                                        # nct_id가 있고 유효한 경우만 추가
+                                        nct_id = obj.get('nct_id')
+                                        if nct_id and isinstance(nct_id, str):
+                                            # 중복 체크
+                                            if not any(item.get('nct_id') == nct_id for item in parsed_items):
+                                                parsed_items.append(obj)
+                                except json.JSONDecodeError:
+                                    pass
+                                obj_content = ""
+                                obj_start = -1
+                        elif obj_start >= 0:
+                            obj_content += char
+            
+            if parsed_items:
+                print(f"  [복구] {len(parsed_items)}개 항목을 부분 파싱하여 복구했습니다.")
+                # 복구된 항목에 복구 표시 추가 및 nct_id 검증/복구
+                valid_items = []
+                for idx, item in enumerate(parsed_items):
+                    nct_id = item.get('nct_id')
+                    # nct_id가 없거나 유효하지 않은 항목은 정렬 단계에서 item_no/원문 대조로 매칭
+                    if not nct_id or not isinstance(nct_id, str) or not nct_id.strip():
+                        print(f"  [경고] 복구된 항목에서 유효하지 않은 nct_id 발견 (인덱스 {idx}): {nct_id}, 정렬 단계에서 매칭합니다.")
                     
-                    try:
-                        parsed = json.loads(content)
-                        if not isinstance(parsed, list):
-                            parsed = [parsed]
-                        # 성공 시 키 인덱스 업데이트
-                        llm_config._current_key_index = next_key_index
-                        return parsed
-                    except json.JSONDecodeError:
-                        # JSON 파싱 실패는 같은 키 계속 사용
-                        llm_config._current_key_index = next_key_index
-                        return None
-                        
-                except Exception as next_e:
-                    next_error_str = str(next_e)
-                    if "429" in next_error_str or "RESOURCE_EXHAUSTED" in next_error_str.upper():
-                        if attempt == len(api_keys) - 1:
-                            print(f"[ERROR] 모든 API 키({len(api_keys)}개)가 소진되었습니다.")
-                            llm_config._previous_key_index = llm_config._current_key_index
-                            llm_config._current_key_index = next_key_index
-                            llm_config._all_keys_exhausted = True
-                            return None
-                        continue
+                    if 'llm_notes' in item:
+                        item['llm_notes'] = f"[PARTIAL_RECOVERED] {item.get('llm_notes', '')}"
                     else:
-                        print(f"[ERROR] Gemini API 오류 (키 {next_key_index + 1}/{len(api_keys)}): {next_error_str}")
-                        return None
-            
-            print(f"[ERROR] 모든 API 키({len(api_keys)}개) 시도 실패.")
-            llm_config._all_keys_exhausted = True
-            return None
-        else:
-            print(f"[ERROR] Gemini API 오류 (키 {key_index + 1}/{len(api_keys)}): {error_str}")
-            return None
+                        item['llm_notes'] = '[PARTIAL_RECOVERED] JSON 파싱 실패 후 부분 복구 성공.'
+                    valid_items.append(item)
+                if valid_items:
+                    return valid_items
+        except Exception as recover_error:
+            print(f"  [복구 실패] {recover_error}")
+        
+        # JSON 파싱 실패는 API 호출 성공이므로 같은 키를 계속 사용
+        # 키 인덱스를 업데이트하지 않고 None 반환
+        print(f"  [INFO] JSON 파싱 실패했지만 API 호출은 성공. 같은 키({llm_config._current_key_index + 1})를 계속 사용합니다.")
+        llm_config._last_failure_kind = 'PARSE_ERROR'
+        return None
 
 
 def determine_llm_status(inclusion_result, exclusion_result, notes: str = None) -> tuple:
@@ -424,160 +332,307 @@ def determine_llm_status(inclusion_result, exclusion_result, notes: str = None)
     return status, failure_reason, formatted_notes
 
 
+def load_segments(conn, eligibility_list: List[Dict]) -> int:
+    """
+    inclusion_exclusion_segments의 분할 결과를 eligibility['segments']에 연결
+    
+    원문이 분할 이후 바뀐 연구(source_hash 불일치)는 연결하지 않고 원문 그대로 처리합니다.
+    
+    Returns:
+        분할 결과가 연결된 연구 수
+    """
+    nct_ids = [e['nct_id'] for e in eligibility_list]
+    if not nct_ids:
+        return 0
+    
+    segments_by_nct = {}
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("""
+            SELECT nct_id, section, criterion_seq, section_seq, parent_seq, depth, criterion_text, source_hash
+            FROM inclusion_exclusion_segments
+            WHERE nct_id = ANY(%s)
+            ORDER BY nct_id, criterion_seq
+        """, (nct_ids,))
+        for row in cur.fetchall():
+            segments_by_nct.setdefault(row['nct_id'], []).append(row)
+    
+    attached = 0
+    for eligibility in eligibility_list:
+        segments = segments_by_nct.get(eligibility['nct_id'])
+        if not segments:
+            continue
+        raw_hash = hashlib.sha256((eligibility.get('eligibility_criteria_raw') or '').encode('utf-8')).hexdigest()
+        if segments[0]['source_hash'] != raw_hash:
+            continue
+        eligibility['segments'] = segments
+        attached += 1
+    return attached
+
+
+def split_resolved_segments(segments: List[Dict]) -> tuple:
+    """
+    분할 기준 줄을 LLM 없이 구조화되는 줄(규칙 추출, 캐시 적중)과 LLM에 보낼 줄로 나눔
+    
+    Returns:
+        (resolved, send_segments, rule_seqs)
+        - resolved: {criterion_seq: 규칙 추출 또는 캐시된 구조화 결과 배열}
+        - send_segments: 구조화되지 않은 줄과 그 상위 줄(문맥용)
+        - rule_seqs: resolved 중 규칙으로 추출한 줄의 criterion_seq
+    """
+    resolved = {}
+    rule_seqs = set()
+    for segment in segments:
+        # 섹션 미지정 줄은 연구 문맥에 따라 Inclusion/Exclusion이 달라지므로 항상 LLM으로
+        # 하위 줄("a. within 12 months")은 상위 줄 문맥으로 구조화되므로 규칙/캐시 없이 항상 LLM으로
+        if segment['section'] == 'UNSPECIFIED' or segment['parent_seq'] is not None:
+            continue
+        criteria = extract_rule_criteria(segment['criterion_text']) if USE_RULE_EXTRACTOR else None
+        if criteria is not None:
+            resolved[segment['criterion_seq']] = criteria
+            rule_seqs.add(segment['criterion_seq'])
+            continue
+        criteria = criterion_cache.lookup(segment['criterion_text'])
+        if criteria is not None:
+            resolved[segment['criterion_seq']] = criteria
+    
+    by_seq = {s['criterion_seq']: s for s in segments}
+    send_seqs = set()
+    for segment in segments:
+        seq = segment['criterion_seq']
+        if seq in resolved:
+            continue
+        while seq is not None and seq not in send_seqs:
+            send_seqs.add(seq)
+            seq = by_seq[seq]['parent_seq'] if seq in by_seq else None
+    return resolved, [s for s in segments if s['criterion_seq'] in send_seqs], rule_seqs
+
+
+def assemble_segmented_criteria(segments: List[Dict], resolved: Dict, response: Optional[Dict]) -> tuple:
+    """
+    규칙/캐시로 구조화된 줄과 LLM 응답(line 라벨)을 원문 순서대로 합쳐 inclusion/exclusion 배열 생성
+    
+    original_text는 원본 줄로 채우고 criterion_id는 섹션별로 다시 매깁니다.
+    
+    Returns:
+        (inclusion_criteria, exclusion_criteria, new_entries)
+        - new_entries: [(기준 줄 텍스트, 구조화 결과 배열)] LLM이 새로 구조화한 줄 (캐시 저장용)
+    """
+    labels = {segment_label(s) for s in segments}
+    by_label = {}
+    unlabeled = {'inclusion_criteria': [], 'exclusion_criteria': []}
+    for field in unlabeled:
+        criteria = response.get(field) if response else None
+        if not isinstance(criteria, list):
+            continue
+        for criterion in criteria:
+            if not isinstance(criterion, dict):
+                continue
+            label = str(criterion.pop('line', '') or '').strip().upper()
+            if label in labels:
+                by_label.setdefault(label, []).append((field, criterion))
+            else:
+                unlabeled[field].append(criterion)
+    
+    parent_seqs = {s['parent_seq'] for s in segments if s['parent_seq']}
+    assembled = {'inclusion_criteria': [], 'exclusion_criteria': []}
+    new_entries = []
+    for segment in segments:
+        seq = segment['criterion_seq']
+        if seq in resolved:
+            field = 'exclusion_criteria' if segment['section'] == 'EXCLUSION' else 'inclusion_criteria'
+            entries = [(field, criterion) for criterion in resolved[seq]]
+        else:
+            entries = by_label.get(segment_label(segment), [])
+            # 구조화 결과가 있는 줄, 또는 결과가 없는 하위 기준 안내 문구(":"로 끝나는 상위 줄)만 캐시
+            # (하위 줄은 상위 줄 문맥에 따른 결과라 줄 텍스트만으로 재사용할 수 없으므로 캐시하지 않음)
+            if (response and segment['section'] != 'UNSPECIFIED' and segment['parent_seq'] is None
+                    and (entries or seq in parent_seqs)):
+                new_entries.append((segment['criterion_text'], [criterion for _, criterion in entries]))
+        for field, criterion in entries:
+            if not criterion.get('original_text'):
+                criterion['original_text'] = segment['criterion_text']
+            assembled[field].append(criterion)
+    
+    for field in assembled:
+        assembled[field].extend(unlabeled[field])
+        for criterion_id, criterion in enumerate(assembled[field], 1):
+            criterion['criterion_id'] = criterion_id
+    
+    inclusion_criteria = assembled['inclusion_criteria']
+    exclusion_criteria = assembled['exclusion_criteria']
+    # 캐시만으로 채워지지 않은 섹션은 LLM 응답의 null(구조화 실패)을 그대로 유지
+    if response is not None:
+        if response.get('inclusion_criteria') is None and not inclusion_criteria:
+            inclusion_criteria = None
+        if response.get('exclusion_criteria') is None and not exclusion_criteria:
+            exclusion_criteria = None
+    return inclusion_criteria, exclusion_criteria, new_entries
+
+
+def build_eligibility_result(nct_id: str, inclusion_criteria, exclusion_criteria, confidence, notes: str,
+                             parsing_method: str = 'LLM') -> Dict:
+    """구조화 결과로 저장용 결과 딕셔너리 생성 (상태/실패 이유 결정 포함)"""
+    # 빈 배열도 JSON으로 변환 (None이 아닌 빈 배열로 저장)
+    inclusion_json = json.dumps(inclusion_criteria) if inclusion_criteria is not None else None
+    exclusion_json = json.dumps(exclusion_criteria) if exclusion_criteria is not None else None
+    
+    # 상태 및 실패 이유 결정
+    status, failure_reason, formatted_notes = determine_llm_status(
+        inclusion_criteria, exclusion_criteria, notes
+    )
+    
+    return {
+        'nct_id': nct_id,
+        'inclusion_criteria': inclusion_json,
+        'exclusion_criteria': exclusion_json,
+        'llm_confidence': confidence,
+        'llm_notes': formatted_notes,
+        'llm_status': status,
+        'failure_reason': failure_reason,
+        'parsing_method': parsing_method
+    }
+
+
 def preprocess_batch_eligibility(eligibility_list: List[Dict]) -> List[Dict]:
     """배치 단위로 eligibilityCriteria를 LLM으로 전처리"""
     if not eligibility_list:
         return []
     
+    # 분할 결과가 있는 항목과 없는 항목이 섞이면 프롬프트 형식별로 나누어 처리
+    segmented_list = [e for e in eligibility_list if e.get('segments')]
+    if segmented_list and len(segmented_list) < len(eligibility_list):
+        raw_list = [e for e in eligibility_list if not e.get('segments')]
+        return preprocess_batch_eligibility(segmented_list) + preprocess_batch_eligibility(raw_list)
+    segmented = bool(segmented_list)
+    
+    # 분할 입력: 규칙 추출/캐시 적중 줄은 빼고 나머지 줄만 LLM에 전송 (모든 줄이 구조화된 연구는 호출 제외)
+    plans = {}
+    if segmented:
+        for eligibility in eligibility_list:
+            plans[eligibility['nct_id']] = split_resolved_segments(eligibility['segments'])
+    llm_list = [e for e in eligibility_list if not segmented or plans[e['nct_id']][1]]
+    
     # nct_id 목록 생성 (복구 시 사용)
-    nct_id_list = [e.get('nct_id') for e in eligibility_list if e.get('nct_id')]
+    nct_id_list = [e.get('nct_id') for e in llm_list if e.get('nct_id')]
     
-    # 배치 프롬프트 생성
+    # 배치 프롬프트 생성 (응답 정렬용 순번 item_no를 앞에 붙임)
     items = []
-    for eligibility in eligibility_list:
+    for item_no, eligibility in enumerate(llm_list, 1):
         nct_id = eligibility.get('nct_id')
+        if segmented:
+            # [item_no]|[nct_id] 다음 줄부터 라벨이 붙은 기준 줄 (중첩 깊이만큼 들여쓰기)
+            lines = [f"{item_no}|{nct_id}"]
+            for segment in plans[nct_id][1]:
+                indent = '  ' * (segment['depth'] or 0)
+                lines.append(f"{indent}{segment_label(segment)}: {segment['criterion_text']}")
+            items.append('\n'.join(lines))
+            continue
         criteria_raw = eligibility.get('eligibility_criteria_raw', '') or ''
         # 빈 값 생략하여 더 짧게
-        parts = [f"{nct_id}"]
+        parts = [f"{item_no}", f"{nct_id}"]
         if criteria_raw:
             parts.append(f"{criteria_raw}")
         item_str = "|".join(parts)
         items.append(item_str)
     
-    # 프롬프트 생성
-    items_text = '\n'.join(items)
-    prompt = get_inclusion_exclusion_preprocess_prompt(items_text)
-    
-    result = call_gemini_api(prompt, nct_id_list)
-    
-    if not result:
-        # API 실패 시 모두 null 처리
-        return [{
-            'nct_id': eligibility.get('nct_id'),
-            'inclusion_criteria': None,
-            'exclusion_criteria': None,
-            'llm_confidence': None,
-            'llm_notes': '[API_FAILED] LLM API 호출 실패.',
-            'llm_status': 'API_FAILED',
-            'failure_reason': 'API_FAILED'
-        } for eligibility in eligibility_list]
-    
-    # 결과 파싱 (배열로 응답 받음)
-    results = []
-    if isinstance(result, list):
-        # nct_id가 없는 항목들을 복구 시도
-        for r in result:
-            if not r.get('nct_id') or not isinstance(r.get('nct_id'), str):
-                # nct_id가 없으면, 원본 데이터와 순서를 매칭 시도
-                # (배치 내에서 순서가 유지된다고 가정)
-                idx = result.index(r)
-                if idx < len(nct_id_list):
-                    r['nct_id'] = nct_id_list[idx]
-                    print(f"  [복구] nct_id 누락 항목을 순서 기반으로 복구: {r['nct_id']}")
-        
-        # nct_id로 매핑 (nct_id가 있고 유효한 것만)
-        result_map = {}
-        unmatched_results = []  # nct_id가 없는 결과들
-        for idx, r in enumerate(result):
-            nct_id = r.get('nct_id')
-            if nct_id and isinstance(nct_id, str):
-                # 중복이 있으면 첫 번째 것만 사용
-                if nct_id not in result_map:
-                    result_map[nct_id] = r
-                else:
-                    print(f"  [경고] 중복된 nct_id 발견: {nct_id}, 첫 번째 항목 사용")
-            else:
-                # nct_id가 없으면 순서 기반으로 복구 시도
-                if idx < len(nct_id_list):
-                    recovered_nct_id = nct_id_list[idx]
-                    r['nct_id'] = recovered_nct_id
-                    result_map[recovered_nct_id] = r
-                    print(f"  [복구] 매핑 단계에서 nct_id 복구: {recovered_nct_id} (인덱스 {idx})")
-                else:
-                    unmatched_results.append((idx, r))
+    result_map = {}
+    failed_notes = None
+    if llm_list:
+        # 프롬프트 생성
+        items_text = '\n'.join(items)
+        if segmented:
+            prompt = get_inclusion_exclusion_segmented_prompt(items_text)
+        else:
+            prompt = get_inclusion_exclusion_preprocess_prompt(items_text)
         
-        # 매핑되지 않은 결과가 있으면 순서 기반으로 추가 복구 시도
-        if unmatched_results:
-            used_indices = set()
-            for idx, r in unmatched_results:
-                # 이미 사용된 인덱스 제외하고 순서대로 할당
-                for i, nct_id in enumerate(nct_id_list):
-                    if i not in used_indices and nct_id not in result_map:
-                        r['nct_id'] = nct_id
-                        result_map[nct_id] = r
-                        used_indices.add(i)
-                        print(f"  [복구] 매핑 실패 항목을 순서 기반으로 복구: {nct_id} (인덱스 {i})")
-                        break
+        result = call_gemini_api(prompt, nct_id_list, task=TASK_IE_SEGMENTED if segmented else TASK_IE_PREPROCESS)
         
-        for eligibility in eligibility_list:
-            nct_id = eligibility.get('nct_id')
-            if nct_id in result_map:
-                r = result_map[nct_id]
-                # inclusion_criteria와 exclusion_criteria를 JSONB로 변환
-                inclusion_criteria = r.get('inclusion_criteria')
-                exclusion_criteria = r.get('exclusion_criteria')
-                
-                # 빈 배열도 JSON으로 변환 (None이 아닌 빈 배열로 저장)
-                inclusion_json = json.dumps(inclusion_criteria) if inclusion_criteria is not None else None
-                exclusion_json = json.dumps(exclusion_criteria) if exclusion_criteria is not None else None
-                
-                notes = r.get('notes', '')
-                
-                # 상태 및 실패 이유 결정
-                status, failure_reason, formatted_notes = determine_llm_status(
-                    inclusion_criteria, exclusion_criteria, notes
-                )
-                
-                results.append({
-                    'nct_id': nct_id,
-                    'inclusion_criteria': inclusion_json,
-                    'exclusion_criteria': exclusion_json,
-                    'llm_confidence': r.get('confidence'),
-                    'llm_notes': formatted_notes,
-                    'llm_status': status,
-                    'failure_reason': failure_reason
-                })
+        if not result:
+            # API 실패 시 LLM 대상 항목 모두 null 처리 (응답 JSON 파싱 실패는 PARSE_ERROR로 구분)
+            import llm_config
+            if llm_config._last_failure_kind == 'PARSE_ERROR':
+                failed_notes = '[PARSE_ERROR] LLM 응답 JSON 파싱 실패.'
+                failed_status = 'PARSE_ERROR'
             else:
-                # 응답에 nct_id가 없는 경우 (모든 복구 시도 실패)
-                status, failure_reason, formatted_notes = determine_llm_status(
-                    None, None, '[PARSE_ERROR] LLM 응답에 nct_id가 없음. 모든 복구 시도 실패.'
-                )
-                results.append({
-                    'nct_id': nct_id,
-                    'inclusion_criteria': None,
-                    'exclusion_criteria': None,
-                    'llm_confidence': None,
-                    'llm_notes': formatted_notes,
-                    'llm_status': status,
-                    'failure_reason': failure_reason
-                })
-    else:
-        # 단일 응답인 경우 (하위 호환성)
-        if eligibility_list:
-            eligibility = eligibility_list[0]
-            inclusion_criteria = result.get('inclusion_criteria')
-            exclusion_criteria = result.get('exclusion_criteria')
-            
-            # 빈 배열도 JSON으로 변환 (None이 아닌 빈 배열로 저장)
-            inclusion_json = json.dumps(inclusion_criteria) if inclusion_criteria is not None else None
-            exclusion_json = json.dumps(exclusion_criteria) if exclusion_criteria is not None else None
-            
-            notes = result.get('notes', '')
-            
-            # 상태 및 실패 이유 결정
-            status, failure_reason, formatted_notes = determine_llm_status(
-                inclusion_criteria, exclusion_criteria, notes
-            )
-            
+                failed_notes = '[API_FAILED] LLM API 호출 실패.'
+                failed_status = 'API_FAILED'
+        elif isinstance(result, list):
+            # 응답 객체를 요청 항목에 정렬 (nct_id → item_no → original_text 원문 대조)
+            result_map, unmatched_items, align_stats = align_results(llm_list, result)
+            if align_stats['ordinal'] or align_stats['text']:
+                print(f"  [복구] nct_id 누락/오류 항목 정렬: item_no {align_stats['ordinal']}개, 원문 대조 {align_stats['text']}개")
+            if align_stats['duplicate']:
+                print(f"  [경고] 중복된 nct_id {align_stats['duplicate']}개 발견, 첫 번째 항목 사용")
+            if unmatched_items:
+                print(f"  [경고] 응답과 매칭되지 않은 항목 {len(unmatched_items)}개 (재시도 대상)")
+        else:
+            # 단일 응답인 경우 (하위 호환성)
+            result_map = {llm_list[0].get('nct_id'): result}
+    
+    llm_nct_ids = {e.get('nct_id') for e in llm_list}
+    results = []
+    for eligibility in eligibility_list:
+        nct_id = eligibility.get('nct_id')
+        
+        if nct_id in llm_nct_ids and failed_notes:
             results.append({
-                'nct_id': eligibility.get('nct_id'),
-                'inclusion_criteria': inclusion_json,
-                'exclusion_criteria': exclusion_json,
-                'llm_confidence': result.get('confidence'),
-                'llm_notes': formatted_notes,
-                'llm_status': status,
-                'failure_reason': failure_reason
+                'nct_id': nct_id,
+                'inclusion_criteria': None,
+                'exclusion_criteria': None,
+                'llm_confidence': None,
+                'llm_notes': failed_notes,
+                'llm_status': failed_status,
+                'failure_reason': failed_status
             })
+            continue
+        
+        if nct_id in llm_nct_ids and nct_id not in result_map:
+            # 응답에서 해당 항목을 확실하게 찾지 못한 경우 (재시도 큐에서 작은 배치로 재처리)
+            results.append(build_eligibility_result(
+                nct_id, None, None, None,
+                '[PARSE_ERROR] LLM 응답에서 해당 nct_id 항목을 찾지 못함 (정렬 실패).'
+            ))
+            continue
+        
+        r = result_map.get(nct_id)
+        if not segmented:
+            results.append(build_eligibility_result(
+                nct_id, r.get('inclusion_criteria'), r.get('exclusion_criteria'),
+                r.get('confidence'), r.get('notes', '')
+            ))
+            continue
+        
+        # 분할 입력: 규칙/캐시로 구조화된 줄과 LLM 응답 줄을 원문 순서대로 합침
+        resolved, _, rule_seqs = plans[nct_id]
+        inclusion_criteria, exclusion_criteria, new_entries = assemble_segmented_criteria(
+            eligibility['segments'], resolved, r
+        )
+        if r is not None:
+            confidence, notes = r.get('confidence'), r.get('notes', '')
+            # 규칙 추출 줄이 섞인 경우 HYBRID
+            parsing_method = 'HYBRID' if rule_seqs else 'LLM'
+        else:
+            confidences = [c.get('confidence') for c in (inclusion_criteria or []) + (exclusion_criteria or [])
+                           if isinstance(c.get('confidence'), (int, float))]
+            confidence = min(confidences) if confidences else None
+            cache_count = len(resolved) - len(rule_seqs)
+            notes = f'[SUCCESS] 기준 줄 {len(resolved)}개 모두 LLM 없이 구조화 (규칙 {len(rule_seqs)}개, 캐시 {cache_count}개).'
+            # 캐시 결과는 LLM 출력이므로 규칙만으로 구조화된 경우에만 RULE_BASED
+            parsing_method = 'RULE_BASED' if not cache_count else 'HYBRID'
+        item_result = build_eligibility_result(
+            nct_id, inclusion_criteria, exclusion_criteria, confidence, notes, parsing_method
+        )
+        if r is None:
+            # LLM을 호출하지 않은 결과 (캐스케이드가 모델을 기록하지 않도록 미리 설정)
+            item_result['llm_model'] = None
+        # 구조화에 성공한 연구의 새 기준 줄만 캐시에 저장
+        # (상위 모델로 승격될 결과는 저장하지 않음: 승격 시 캐시 적중으로 상위 모델 호출이 빠지지 않도록)
+        if item_result['llm_status'] == 'SUCCESS' and not (
+            llm_cascade.can_escalate() and llm_cascade.needs_preprocess_escalation(item_result)
+        ):
+            for text, criteria in new_entries:
+                criterion_cache.store(text, criteria, nct_id=nct_id, model=llm_cascade.get_active_model())
+        results.append(item_result)
     
     return results
 
@@ -606,25 +661,25 @@ def insert_llm_results(conn, eligibility_list: List[Dict], results: List[Dict]):
         
         insert_data.append({
             'nct_id': nct_id,
-            'eligibility_criteria_raw': eligibility.get('eligibility_criteria_raw'),
-            'phase': eligibility.get('phase'),
             'inclusion_criteria': result.get('inclusion_criteria'),
             'exclusion_criteria': result.get('exclusion_criteria'),
             'llm_confidence': result.get('llm_confidence'),
             'llm_notes': result.get('llm_notes'),
             'llm_status': llm_status,
-            'failure_reason': failure_reason
+            'failure_reason': failure_reason,
+            'parsing_method': result.get('parsing_method') or 'LLM',
+            'llm_model': result.get('llm_model')
         })
     
     insert_sql = """
         INSERT INTO inclusion_exclusion_llm_preprocessed (
-            nct_id, eligibility_criteria_raw, phase,
+            nct_id,
             inclusion_criteria, exclusion_criteria,
-            llm_confidence, llm_notes, llm_status, failure_reason, parsing_method
+            llm_confidence, llm_notes, llm_status, failure_reason, parsing_method, llm_model
         ) VALUES (
-            %(nct_id)s, %(eligibility_criteria_raw)s, %(phase)s,
+            %(nct_id)s,
             %(inclusion_criteria)s::jsonb, %(exclusion_criteria)s::jsonb,
-            %(llm_confidence)s, %(llm_notes)s, %(llm_status)s, %(failure_reason)s, 'LLM'
+            %(llm_confidence)s, %(llm_notes)s, %(llm_status)s, %(failure_reason)s, %(parsing_method)s, %(llm_model)s
         )
         ON CONFLICT (nct_id) 
         DO UPDATE SET
@@ -652,6 +707,14 @@ def insert_llm_results(conn, eligibility_list: List[Dict], results: List[Dict]):
                 WHEN inclusion_exclusion_llm_preprocessed.llm_status = 'SUCCESS' THEN inclusion_exclusion_llm_preprocessed.failure_reason
                 ELSE EXCLUDED.failure_reason
             END,
+            parsing_method = CASE 
+                WHEN inclusion_exclusion_llm_preprocessed.llm_status = 'SUCCESS' THEN inclusion_exclusion_llm_preprocessed.parsing_method
+                ELSE EXCLUDED.parsing_method
+            END,
+            llm_model = CASE 
+                WHEN inclusion_exclusion_llm_preprocessed.llm_status = 'SUCCESS' THEN inclusion_exclusion_llm_preprocessed.llm_model
+                ELSE EXCLUDED.llm_model
+            END,
             updated_at = CASE 
                 WHEN inclusion_exclusion_llm_preprocessed.llm_status = 'SUCCESS' THEN inclusion_exclusion_llm_preprocessed.updated_at
                 ELSE CURRENT_TIMESTAMP
@@ -659,12 +722,15 @@ def insert_llm_results(conn, eligibility_list: List[Dict], results: List[Dict]):
     """
     
     with conn.cursor() as cur:
-        execute_batch(cur, insert_sql, insert_data, page_size=100)
+        # 새 feature를 표준 feature 별칭으로 먼저 등록해야 팩트 테이블 트리거가 feature_id를 채움
+        new_features = feature_normalizer.register_features(conn, results)
+        execute_prepared_batch(cur, 'inclusion_exclusion_llm_preprocessed_upsert', insert_sql, insert_data, page_size=100)
         conn.commit()
+    feature_normalizer.mark_known(new_features)
 
 
 def create_table_if_not_exists(conn):
-    """inclusion_exclusion_llm_preprocessed 테이블 생성 (없는 경우)"""
+    """inclusion_exclusion_llm_preprocessed 테이블 생성 (없는 경우) 및 원본 조회 뷰 재생성"""
     with conn.cursor() as cur:
         # 테이블 존재 여부 확인
         cur.execute("""
@@ -692,6 +758,44 @@ def create_table_if_not_exists(conn):
         else:
             print("[INFO] inclusion_exclusion_llm_preprocessed 테이블이 이미 존재합니다.")
 
+        # *_with_raw 뷰는 r.*가 생성 시점 컬럼으로 고정되므로 매번 다시 생성 (멱등)
+        views_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sql', 'create_llm_preprocessed_views.sql')
+        with open(views_file, 'r', encoding='utf-8') as f:
+            cur.execute(f.read())
+        conn.commit()
+
+
+# (테이블, 동기화 트리거, 트리거가 걸린 테이블, 생성 SQL) - 순서대로 생성
+_CRITERIA_TABLES = [
+    ('inclusion_exclusion_criteria', 'sync_inclusion_exclusion_criteria_update',
+     'inclusion_exclusion_llm_preprocessed', 'create_inclusion_exclusion_criteria.sql'),
+    ('criterion_feature_dict', 'set_inclusion_exclusion_criteria_feature_id',
+     'inclusion_exclusion_criteria', 'create_criterion_feature_dict.sql'),
+    ('inclusion_exclusion_criteria_range', 'sync_inclusion_exclusion_criteria_ranges_update',
+     'inclusion_exclusion_criteria', 'create_inclusion_exclusion_criteria_ranges.sql'),
+]
+
+
+def ensure_criteria_table(conn):
+    """기준 팩트 테이블(inclusion_exclusion_criteria), 숫자 기준 구간 테이블과 동기화 트리거 생성 (트리거가 없는 경우, 기존 결과로 다시 채움)"""
+    sql_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sql')
+    with conn.cursor() as cur:
+        for table, trigger, trigger_table, sql_name in _CRITERIA_TABLES:
+            cur.execute("""
+                SELECT EXISTS (
+                    SELECT FROM pg_trigger
+                    WHERE tgname = %s
+                      AND tgrelid = to_regclass(%s)
+                )
+            """, (trigger, trigger_table))
+            if cur.fetchone()[0]:
+                continue
+            print(f"[INFO] {table} 동기화 트리거가 없습니다. 생성 후 기존 전처리 결과로 채웁니다...")
+            with open(os.path.join(sql_dir, sql_name), 'r', encoding='utf-8') as f:
+                cur.execute(f.read())
+            conn.commit()
+            print(f"[OK] {table} 생성 완료")
+
 
 def main():
     """메인 함수"""
@@ -708,15 +812,24 @@ def main():
         sys.exit(1)
     
     print(f"\n[INFO] 사용 가능한 API 키: {len(api_keys)}개")
-    print(f"[INFO] 사용 모델: {GEMINI_MODEL}")
+    purge_old_windows()
+    blocked_keys = [k for k in get_usage_summary(api_keys) if k['blocked_until']]
+    print(f"[INFO] 쿼터 원장: 차단된 키 {len(blocked_keys)}/{len(api_keys)}개 (일일 리셋 또는 분당 한도 해제 시 자동 복구)")
+    print(f"[INFO] 사용 모델: {' → '.join(llm_cascade.get_model_tiers())}")
     print(f"[INFO] 배치 크기: {BATCH_SIZE}개")
     
     # 명령줄 인자 파싱
-    # 사용법: python llm_preprocess_inclusion_exclusion.py [limit] [batch_size] [start_batch] [--failed-only|--missing-only|--all]
+    # 사용법: python llm_preprocess_inclusion_exclusion.py [limit] [batch_size] [start_batch] [--failed-only|--missing-only|--all] [--segmented [--no-cache] [--no-rules]] [--resume]
+    # --resume: 중단된 실행의 체크포인트(checkpoints/inclusion_exclusion_preprocess.json)에서 이어서 처리 (start_batch 무시)
+    resume = '--resume' in sys.argv[1:]
     limit = None
     custom_batch_size = None
     start_batch = 1
     mode = 'missing'  # 기본값: 누락된 항목만 처리
+    use_segments = '--segmented' in sys.argv[1:]
+    use_cache = use_segments and '--no-cache' not in sys.argv[1:]
+    global USE_RULE_EXTRACTOR
+    USE_RULE_EXTRACTOR = '--no-rules' not in sys.argv[1:]
     
     # 옵션 파싱 (--로 시작하는 인자 먼저 처리)
     for arg in sys.argv[1:]:
@@ -725,7 +838,7 @@ def main():
             break
     
     # 숫자 인자 파싱 (옵션 제외)
-    num_args = [arg for arg in sys.argv[1:] if arg not in ['--failed-only', '--missing-only', '--all']]
+    num_args = [arg for arg in sys.argv[1:] if arg not in ['--failed-only', '--missing-only', '--all', '--segmented', '--no-cache', '--no-rules', '--resume']]
     
     if len(num_args) > 0:
         try:
@@ -769,6 +882,14 @@ def main():
         
         # 테이블 생성 확인
         create_table_if_not_exists(conn)
+        ensure_criteria_table(conn)
+        ensure_dead_letter_table(conn)
+
+        # 표준 feature 사전 로드 (저장 시 새 feature 매핑), 기존 팩트 행의 미등록 feature 등록
+        normalizer = feature_normalizer.load_normalizer(conn)
+        alias_stats = feature_normalizer.sync_aliases(conn, normalizer)
+        if alias_stats['registered']:
+            print(f"[INFO] 기존 기준의 feature {alias_stats['registered']:,}개를 표준 feature 별칭으로 등록했습니다.")
         
         # 처리할 항목 조회 (inclusion_exclusion_raw에서 전체 데이터)
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
@@ -778,8 +899,9 @@ def main():
                     SELECT 
                         ier.nct_id,
                         ier.eligibility_criteria_raw,
-                        ier.phase
+                        s.phase
                     FROM inclusion_exclusion_raw ier
+                    INNER JOIN study_raw s ON s.nct_id = ier.nct_id
                     INNER JOIN inclusion_exclusion_llm_preprocessed iep
                         ON ier.nct_id = iep.nct_id
                     WHERE iep.llm_status != 'SUCCESS'
@@ -796,8 +918,9 @@ def main():
                     SELECT 
                         ier.nct_id,
                         ier.eligibility_criteria_raw,
-                        ier.phase
+                        s.phase
                     FROM inclusion_exclusion_raw ier
+                    INNER JOIN study_raw s ON s.nct_id = ier.nct_id
                     LEFT JOIN inclusion_exclusion_llm_preprocessed iep
                         ON ier.nct_id = iep.nct_id
                     WHERE iep.nct_id IS NULL
@@ -812,25 +935,49 @@ def main():
                 # 전체 처리 (기존 SUCCESS 항목은 건드리지 않음 - INSERT 시 CASE 문으로 처리)
                 query = """
                     SELECT 
-                        nct_id,
-                        eligibility_criteria_raw,
-                        phase
-                    FROM inclusion_exclusion_raw
-                    ORDER BY nct_id
+                        ier.nct_id,
+                        ier.eligibility_criteria_raw,
+                        s.phase
+                    FROM inclusion_exclusion_raw ier
+                    INNER JOIN study_raw s ON s.nct_id = ier.nct_id
+                    ORDER BY ier.nct_id
                 """
                 if limit:
                     query += f" LIMIT {limit}"
                 cur.execute(query)
                 eligibility_list = cur.fetchall()
         
+        # 체크포인트: --resume이면 저장하지 못한 결과를 먼저 저장하고 마지막 처리 키 이후 항목만 처리
+        checkpoint = RunCheckpoint('inclusion_exclusion_preprocess', {
+            'mode': mode, 'limit': limit, 'segmented': use_segments
+        })
+        if resume and checkpoint.resume():
+            pending = checkpoint.pending or []
+            insert_llm_results(conn, [e for e, _ in pending], [r for _, r in pending if r])
+            checkpoint.advance(checkpoint.watermark)
+            eligibility_list = after_watermark(eligibility_list, lambda e: e['nct_id'], checkpoint.watermark)
+            start_batch = 1
+        install_signal_handlers()
+        
         total_count = len(eligibility_list)
         print(f"\n[INFO] 처리할 항목: {total_count:,}개")
         
         if total_count == 0:
             print("[INFO] 처리할 항목이 없습니다.")
+            checkpoint.complete()
             conn.close()
             return
         
+        if use_segments:
+            segmented_count = load_segments(conn, eligibility_list)
+            print(f"[INFO] 분할 입력 사용: {segmented_count:,}/{total_count:,}개 (나머지는 원문 그대로 처리)")
+            if use_cache:
+                criterion_cache.ensure_cache_table(conn)
+                texts = [s['criterion_text'] for e in eligibility_list for s in e.get('segments', [])
+                         if s['parent_seq'] is None]
+                cached_count = criterion_cache.load_cache(conn, texts)
+                print(f"[INFO] 기준 줄 캐시: 처리 대상 줄 {len(texts):,}개 중 {cached_count:,}종류 캐시됨")
+        
         # LLM 전처리 (배치 처리)
         import llm_config
         actual_batch_size = llm_config.BATCH_SIZE
@@ -862,14 +1009,42 @@ def main():
                 print(f"\n[ERROR] 모든 API 키가 소진되어 처리 중단합니다.")
                 break
             
-            # 배치 단위로 한번에 API 호출
-            batch_results = preprocess_batch_eligibility(batch_eligibility)
+            # 배치 단위로 한번에 API 호출 (API_FAILED/PARSE_ERROR는 재시도 큐에서 백오프 후 재처리)
+            # 모델 캐스케이드: 저비용 모델 결과 중 신뢰도 미달/파싱 실패 항목만 상위 모델로 승격
+            batch_results, dead_letters = process_with_retry(
+                batch_eligibility,
+                llm_cascade.cascade_batch_fn(preprocess_batch_eligibility, item_key='nct_id', result_key='nct_id'),
+                item_key='nct_id', result_key='nct_id'
+            )
+            save_dead_letters(conn, 'inclusion_exclusion_preprocess', dead_letters)
             
             # 모든 키가 소진되었는지 다시 확인
+            # 이미 받은 완료 결과는 저장하고 중단 (watermark는 처음 미완료 항목 앞까지만 이동)
             if llm_config._all_keys_exhausted:
-                print(f"\n[ERROR] 모든 API 키가 소진되어 처리 중단합니다.")
+                done_rows, late_rows = split_completed_rows(batch_eligibility, batch_results, 'nct_id', 'nct_id')
+                saved_rows = done_rows + late_rows
+                watermark = done_rows[-1][0]['nct_id'] if done_rows else checkpoint.watermark
+                if saved_rows:
+                    checkpoint.hold(saved_rows, watermark)
+                    insert_llm_results(conn, [e for e, _ in saved_rows], [r for _, r in saved_rows])
+                    criterion_cache.flush_cache(conn)
+                    checkpoint.advance(watermark)
+                    for _, result in saved_rows:
+                        all_results.append(result)
+                        if result.get('llm_status') == 'SUCCESS':
+                            success_count += 1
+                        else:
+                            failed_count += 1
+                print(f"\n[ERROR] 모든 API 키가 소진되어 처리 중단합니다. (이번 배치 완료 결과 {len(saved_rows)}개 저장)")
                 break
             
+            # 저장 전 중단되면 이 배치 결과를 체크포인트에 보관
+            result_map = {r['nct_id']: r for r in batch_results}
+            checkpoint.hold(
+                [(e, result_map.get(e['nct_id'], {})) for e in batch_eligibility],
+                batch_eligibility[-1]['nct_id']
+            )
+            
             # 결과 집계
             for result in batch_results:
                 all_results.append(result)
@@ -895,6 +1070,8 @@ def main():
             if batch_results:
                 print(f"  배치 {batch_num} 결과 저장 중... ({len(batch_results)}개)")
                 insert_llm_results(conn, batch_eligibility, batch_results)
+                criterion_cache.flush_cache(conn)
+            checkpoint.advance(batch_eligibility[-1]['nct_id'])
             
             # 모든 키가 소진되었으면 배치 루프도 중단
             if llm_config._all_keys_exhausted:
@@ -911,6 +1088,16 @@ def main():
             print(f"    - Exclusion만 실패: {exclusion_failed_count:,}개")
         if both_failed_count > 0:
             print(f"    - 둘 다 실패: {both_failed_count:,}개")
+        if criterion_cache.is_enabled():
+            cache_stats = criterion_cache.get_cache_stats()
+            lookups = cache_stats['hit'] + cache_stats['miss']
+            hit_rate = cache_stats['hit'] / lookups * 100 if lookups else 0.0
+            print(f"  기준 줄 캐시: 적중 {cache_stats['hit']:,}회 / 조회 {lookups:,}회 ({hit_rate:.1f}%), 새로 저장 {cache_stats['stored']:,}개")
+        llm_cascade.print_cascade_stats()
+        
+        # 키 소진으로 중단된 경우 체크포인트 유지
+        if not llm_config._all_keys_exhausted:
+            checkpoint.complete()
         
         # 최종 통계
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
@@ -922,6 +1109,7 @@ def main():
                     COUNT(CASE WHEN llm_status = 'EXCLUSION_FAILED' THEN 1 END) as exclusion_failed,
                     COUNT(CASE WHEN llm_status = 'BOTH_FAILED' THEN 1 END) as both_failed,
                     COUNT(CASE WHEN llm_status = 'API_FAILED' THEN 1 END) as api_failed,
+                    COUNT(CASE WHEN llm_status = 'PARSE_ERROR' THEN 1 END) as parse_error,
                     COUNT(inclusion_criteria) as with_inclusion,
                     COUNT(exclusion_criteria) as with_exclusion,
                     COUNT(CASE WHEN inclusion_criteria IS NOT NULL AND exclusion_criteria IS NOT NULL THEN 1 END) as complete
@@ -936,6 +1124,7 @@ def main():
             print(f"  Exclusion 실패: {stats['exclusion_failed']:,}개 ({stats['exclusion_failed']/stats['total']*100:.1f}%)")
             print(f"  모두 실패: {stats['both_failed']:,}개 ({stats['both_failed']/stats['total']*100:.1f}%)")
             print(f"  API 실패: {stats['api_failed']:,}개 ({stats['api_failed']/stats['total']*100:.1f}%)")
+            print(f"  응답 파싱 실패: {stats['parse_error']:,}개 ({stats['parse_error']/stats['total']*100:.1f}%)")
             print(f"\n[추출 통계]")
             print(f"  Inclusion 추출: {stats['with_inclusion']:,}개 ({stats['with_inclusion']/stats['total']*100:.1f}%)")
             print(f"  Exclusion 추출: {stats['with_exclusion']:,}개 ({stats['with_exclusion']/stats['total']*100:.1f}%)")
@@ -949,6 +1138,10 @@ def main():
         traceback.print_exc()
         if 'conn' in locals():
             conn.close()
+    finally:
+        # 오류/중단(Ctrl+C, SIGTERM) 시 재개 지점과 저장하지 못한 결과 기록
+        if 'checkpoint' in locals():
+            checkpoint.save()
 
 
 if __name__ == "__main__":
@@ -411,7 +411,7 @@ def get_inclusion_exclusion_preprocess_prompt(items_text: str) -> str:
     """Inclusion/Exclusion 전처리 프롬프트 생성"""
     return f"""다음 Inclusion/Exclusion Criteria를 구조화하세요.
 
-데이터 형식: [nct_id]|[eligibility_criteria_raw]
+데이터 형식: [item_no]|[nct_id]|[eligibility_criteria_raw]
 
 {items_text}
 
@@ -422,6 +422,7 @@ def get_inclusion_exclusion_preprocess_prompt(items_text: str) -> str:
 응답 형식 (JSON 배열):
 [
   {{
+    "item_no": 1,
     "nct_id": "NCT12345678",
     "inclusion_criteria": [
       {{
@@ -474,6 +475,7 @@ def get_inclusion_exclusion_preprocess_prompt(items_text: str) -> str:
     ]
   }},
   {{
+    "item_no": 2,
     "nct_id": "NCT87654321",
     "inclusion_criteria": [
       {{
@@ -501,7 +503,7 @@ def get_inclusion_exclusion_preprocess_prompt(items_text: str) -> str:
 
 **반드시 위 형식의 JSON 배열만 반환하세요. 코드나 설명 텍스트는 포함하지 마세요.**
 
-**⚠️ 필수: 각 JSON 객체의 최상위 레벨에 반드시 "nct_id" 필드를 포함하세요. 입력 데이터의 첫 번째 부분(nct_id)을 그대로 사용하세요. nct_id가 없으면 응답이 무효화됩니다.**
+**⚠️ 필수: 각 JSON 객체의 최상위 레벨에 반드시 "item_no"와 "nct_id" 필드를 포함하세요. 입력 데이터의 첫 번째 부분(item_no)과 두 번째 부분(nct_id)을 그대로 사용하세요. nct_id가 없으면 응답이 무효화됩니다.**
 
 **절대 사용하지 마세요**:
 - logic_operator 필드
@@ -525,6 +527,53 @@ def get_inclusion_exclusion_preprocess_prompt(items_text: str) -> str:
 - feature = 주체(항목명), operator = 부등호, value = 조건/상태/값 (null 불가)
 """
 
+SEGMENTED_LINE_RULES = """분할 입력 규칙:
+- 각 항목은 "[item_no]|[nct_id]" 줄과 그 아래 분할된 기준 줄로 구성
+- 기준 줄 형식: [라벨]: [기준 텍스트]
+  * I로 시작하는 라벨(I1, I2 ...): Inclusion 기준 → inclusion_criteria
+  * E로 시작하는 라벨(E1, E2 ...): Exclusion 기준 → exclusion_criteria
+  * U로 시작하는 라벨(U1, U2 ...): 섹션 제목이 없는 기준 → 내용으로 판단 (판단이 어려우면 inclusion_criteria)
+- 들여쓴 줄은 바로 위 줄의 하위 기준 (상위 줄이 ":"로 끝나는 안내 문구면 하위 기준만 구조화)
+- 각 criterion에 원본 줄의 라벨을 "line" 필드로 반환 (original_text는 반환하지 마세요)
+- 범위 조건을 두 criterion으로 나누는 경우 두 객체 모두 같은 "line" 라벨 사용"""
+
+def get_inclusion_exclusion_segmented_prompt(items_text: str) -> str:
+    """Inclusion/Exclusion 전처리 프롬프트 생성 (로컬에서 기준 줄 단위로 분할된 입력)"""
+    return f"""다음 분할된 Inclusion/Exclusion Criteria 줄을 구조화하세요.
+
+데이터 형식: [item_no]|[nct_id] 다음 줄부터 [라벨]: [기준 텍스트]
+
+{items_text}
+
+{SEGMENTED_LINE_RULES}
+
+{INCLUSION_EXCLUSION_PREPROCESS_RULES}
+
+**중요: 반드시 JSON 배열만 반환하세요. 코드나 설명 없이 순수 JSON만 반환합니다.**
+
+응답 형식 (JSON 배열):
+[
+  {{
+    "item_no": 1,
+    "nct_id": "NCT12345678",
+    "inclusion_criteria": [
+      {{"criterion_id": 1, "line": "I1", "feature": "age", "operator": ">=", "value": 50, "unit": "years", "confidence": 0.95}},
+      {{"criterion_id": 2, "line": "I1", "feature": "age", "operator": "<=", "value": 85, "unit": "years", "confidence": 0.95}},
+      {{"criterion_id": 3, "line": "I3", "feature": "patient", "operator": "=", "value": "disrupted sleep", "unit": null, "confidence": 0.95}}
+    ],
+    "exclusion_criteria": [
+      {{"criterion_id": 1, "line": "E1", "feature": "T.I.A or Major infarction", "operator": "<=", "value": 12, "unit": "months", "confidence": 0.9}}
+    ]
+  }}
+]
+
+**⚠️ 필수: 각 JSON 객체의 최상위 레벨에 반드시 "item_no"와 "nct_id" 필드를 포함하세요.**
+- 하나의 기준 줄 = 하나의 JSON 객체 (범위 조건만 예외)
+- operator는 무조건 부등호만 사용 (=, !=, <, <=, >, >=)
+- **value는 절대 null이 될 수 없습니다**
+- notes, logic_operator, conditions, test_name 필드 절대 사용 금지
+"""
+
 # ============================================================================
 # Inclusion/Exclusion 검증 프롬프트
 # ============================================================================
@@ -0,0 +1,228 @@
+"""
+API 키별 쿼터 원장 (프로세스 간 공유)
+
+여러 스크립트가 동시에 실행되어도 같은 SQLite 파일을 통해 키별 사용량을 공유합니다.
+- 분/일 단위 요청 수, 토큰 수, 429 횟수 기록
+  (requests는 쿼터를 소비한 요청만, 429로 거부된 요청은 rate_limited에 따로 집계)
+- 429 발생 시 키를 다음 분 또는 다음 일일 리셋 시점까지 차단
+- 일일 윈도우는 제공자 리셋 시각(기본: America/Los_Angeles 자정) 기준
+
+API 키 원문은 저장하지 않고 SHA-256 해시 앞 12자리를 키 ID로 사용합니다.
+SQLite 연결은 프로세스당 하나를 재사용하며 스레드 간 접근은 잠금으로 직렬화합니다.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+from llm_config import (
+    QUOTA_LEDGER_PATH, QUOTA_RESET_TZ,
+    MAX_REQUESTS_PER_MINUTE, MAX_REQUESTS_PER_DAY,
+    LLM_BACKEND, MOCK_429_BLOCK_SECONDS
+)
+
+try:
+    from zoneinfo import ZoneInfo
+    _RESET_TZ = ZoneInfo(QUOTA_RESET_TZ)
+except Exception:
+    # tzdata가 없는 환경: 태평양 표준시 고정 오프셋으로 대체
+    _RESET_TZ = timezone(timedelta(hours=-8))
+
+# 오래된 윈도우 행 보관 기간 (일)
+RETENTION_DAYS = 7
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS key_usage (
+        key_id TEXT NOT NULL,
+        window_type TEXT NOT NULL,
+        window_start INTEGER NOT NULL,
+        requests INTEGER NOT NULL DEFAULT 0,
+        tokens INTEGER NOT NULL DEFAULT 0,
+        rate_limited INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (key_id, window_type, window_start)
+    );
+    CREATE TABLE IF NOT EXISTS key_block (
+        key_id TEXT PRIMARY KEY,
+        blocked_until INTEGER NOT NULL,
+        reason TEXT
+    );
+"""
+
+_conn = None
+_conn_pid = None
+_lock = threading.Lock()
+
+
+def key_id(api_key: str) -> str:
+    """API 키 원문 대신 원장에 저장할 키 ID"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+
+
+@contextmanager
+def _ledger(write: bool = False):
+    """
+    프로세스 공용 원장 연결 사용 (잠금 보유, 최초 사용 시 연결/스키마 생성)
+
+    fork된 자식 프로세스는 부모의 연결을 쓰지 않고 새로 엽니다.
+    write=True면 BEGIN IMMEDIATE 트랜잭션으로 감싸고 예외 시 ROLLBACK합니다.
+    """
+    global _conn, _conn_pid
+    with _lock:
+        if _conn is None or _conn_pid != os.getpid():
+            _conn = sqlite3.connect(QUOTA_LEDGER_PATH, timeout=30, isolation_level=None, check_same_thread=False)
+            _conn.execute('PRAGMA journal_mode=WAL')
+            _conn.executescript(_SCHEMA)
+            _conn_pid = os.getpid()
+        if not write:
+            yield _conn
+            return
+        _conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield _conn
+        except BaseException:
+            _conn.execute('ROLLBACK')
+            raise
+        _conn.execute('COMMIT')
+
+
+def minute_window_start(now: float = None) -> int:
+    """현재 분 윈도우 시작 (epoch 초)"""
+    now = time.time() if now is None else now
+    return int(now // 60 * 60)
+
+
+def day_window_start(now: float = None) -> int:
+    """현재 일일 윈도우 시작 (제공자 리셋 시각 기준 자정, epoch 초)"""
+    now = time.time() if now is None else now
+    local = datetime.fromtimestamp(now, _RESET_TZ)
+    midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    return int(midnight.timestamp())
+
+
+def next_day_boundary(now: float = None) -> int:
+    """다음 일일 리셋 시각 (epoch 초)"""
+    now = time.time() if now is None else now
+    local = datetime.fromtimestamp(now, _RESET_TZ)
+    midnight = local.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return int(midnight.timestamp())
+
+
+def _add_usage(conn, kid: str, now: float, requests: int = 0, tokens: int = 0, rate_limited: int = 0):
+    for window, start in (('minute', minute_window_start(now)), ('day', day_window_start(now))):
+        conn.execute("""
+            INSERT INTO key_usage (key_id, window_type, window_start, requests, tokens, rate_limited)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (key_id, window_type, window_start) DO UPDATE SET
+                requests = requests + excluded.requests,
+                tokens = tokens + excluded.tokens,
+                rate_limited = rate_limited + excluded.rate_limited
+        """, (kid, window, start, requests, tokens, rate_limited))
+
+
+def record_request(api_key: str, tokens: int = 0):
+    """성공한 요청 1건과 사용 토큰 기록"""
+    now = time.time()
+    with _ledger(write=True) as conn:
+        _add_usage(conn, key_id(api_key), now, requests=1, tokens=tokens or 0)
+
+
+def record_rate_limited(api_key: str, error_str: str = ''):
+    """
+    429 응답 기록 및 키 차단
+
+    거부된 요청은 쿼터를 소비하지 않으므로 requests가 아닌 rate_limited에만 집계합니다.
+    에러 메시지에 일 단위 쿼터(PerDay)가 언급되면 다음 일일 리셋까지,
+    그 외에는 다음 분 윈도우까지 차단합니다. (mock 백엔드는 MOCK_429_BLOCK_SECONDS만큼만 차단)
+    """
+    now = time.time()
+    daily = 'perday' in error_str.replace(' ', '').replace('_', '').lower()
+    if daily:
+        blocked_until = next_day_boundary(now)
+    elif LLM_BACKEND == 'mock':
+        blocked_until = now + MOCK_429_BLOCK_SECONDS
+    else:
+        blocked_until = minute_window_start(now) + 60
+    reason = 'DAILY_QUOTA' if daily else 'RATE_LIMIT'
+    with _ledger(write=True) as conn:
+        kid = key_id(api_key)
+        _add_usage(conn, kid, now, rate_limited=1)
+        conn.execute("""
+            INSERT INTO key_block (key_id, blocked_until, reason) VALUES (?, ?, ?)
+            ON CONFLICT (key_id) DO UPDATE SET
+                blocked_until = MAX(blocked_until, excluded.blocked_until),
+                reason = excluded.reason
+        """, (kid, blocked_until, reason))
+
+
+def available_at(api_key: str, now: float = None) -> float:
+    """
+    키를 다시 사용할 수 있는 시각 (epoch 초). 지금 사용 가능하면 now 반환
+
+    차단 기록, 분당/일일 요청 한도(MAX_REQUESTS_PER_MINUTE, MAX_REQUESTS_PER_DAY)를 고려합니다.
+    """
+    now = time.time() if now is None else now
+    kid = key_id(api_key)
+    with _ledger() as conn:
+        ready = now
+        row = conn.execute('SELECT blocked_until FROM key_block WHERE key_id = ?', (kid,)).fetchone()
+        if row and row[0] > now:
+            ready = max(ready, row[0])
+
+        row = conn.execute(
+            "SELECT requests FROM key_usage WHERE key_id = ? AND window_type = 'minute' AND window_start = ?",
+            (kid, minute_window_start(now))
+        ).fetchone()
+        if row and MAX_REQUESTS_PER_MINUTE > 0 and row[0] >= MAX_REQUESTS_PER_MINUTE:
+            ready = max(ready, minute_window_start(now) + 60)
+
+        if MAX_REQUESTS_PER_DAY > 0:
+            row = conn.execute(
+                "SELECT requests FROM key_usage WHERE key_id = ? AND window_type = 'day' AND window_start = ?",
+                (kid, day_window_start(now))
+            ).fetchone()
+            if row and row[0] >= MAX_REQUESTS_PER_DAY:
+                ready = max(ready, next_day_boundary(now))
+        return ready
+
+
+def is_available(api_key: str, now: float = None) -> bool:
+    """키가 지금 바로 사용 가능한지 여부"""
+    now = time.time() if now is None else now
+    return available_at(api_key, now) <= now
+
+
+def get_usage_summary(api_keys: List[str]) -> List[Dict]:
+    """키별 오늘/이번 분 사용량 요약 (로그 출력용)"""
+    now = time.time()
+    with _ledger() as conn:
+        summary = []
+        for index, api_key in enumerate(api_keys):
+            kid = key_id(api_key)
+            day = conn.execute(
+                "SELECT requests, tokens, rate_limited FROM key_usage WHERE key_id = ? AND window_type = 'day' AND window_start = ?",
+                (kid, day_window_start(now))
+            ).fetchone() or (0, 0, 0)
+            block = conn.execute('SELECT blocked_until, reason FROM key_block WHERE key_id = ?', (kid,)).fetchone()
+            summary.append({
+                'key_index': index,
+                'key_id': kid,
+                'requests_today': day[0],
+                'tokens_today': day[1],
+                'rate_limited_today': day[2],
+                'blocked_until': block[0] if block and block[0] > now else None,
+                'block_reason': block[1] if block and block[0] > now else None
+            })
+        return summary
+
+
+def purge_old_windows(retention_days: int = RETENTION_DAYS):
+    """보관 기간이 지난 윈도우 행과 만료된 차단 기록 삭제"""
+    now = time.time()
+    cutoff = int(now - retention_days * 86400)
+    with _ledger(write=True) as conn:
+        conn.execute('DELETE FROM key_usage WHERE window_start < ?', (cutoff,))
+        conn.execute('DELETE FROM key_block WHERE blocked_until < ?', (int(now),))
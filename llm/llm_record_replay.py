@@ -0,0 +1,110 @@
+"""
+LLM 응답 기록/재생 (오프라인 벤치마크용)
+
+- 기록: LLM_RECORD_PATH를 설정하면 성공한 호출의 프롬프트/응답/지연 시간을 gzip JSON Lines 아카이브에 추가
+- 재생: LLM_BACKEND=replay, LLM_REPLAY_PATH로 아카이브를 지정하면 API 대신 기록된 응답 반환
+  - LLM_REPLAY_TIMING=original: 기록된 지연 시간만큼 대기 후 반환
+  - LLM_REPLAY_TIMING=fast: 즉시 반환
+
+같은 프롬프트가 여러 번 기록된 경우(다중 검증 등) 기록된 순서대로 돌아가며 반환합니다.
+재생 시 아카이브에 없는 프롬프트는 REPLAY_MISS 오류로 처리됩니다 (API_FAILED).
+"""
+
+import gzip
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, List
+from llm_config import LLM_RECORD_PATH, LLM_REPLAY_PATH, LLM_REPLAY_TIMING
+
+_record_lock = threading.Lock()
+_replay_lock = threading.Lock()
+_replay_index = None  # {prompt_key: [entry, ...]}
+_replay_cursor = {}   # {prompt_key: 다음에 반환할 위치}
+
+
+def prompt_key(model: str, prompt: str, config: Dict = None) -> str:
+    """모델/프롬프트/설정으로 아카이브 조회 키 생성"""
+    config_text = json.dumps(config, sort_keys=True, default=str) if config else ''
+    raw = f"{model}\0{prompt}\0{config_text}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def is_recording() -> bool:
+    return bool(LLM_RECORD_PATH)
+
+
+def record(model: str, prompt: str, config: Dict, response_text: str, latency: float, tokens: int = 0):
+    """성공한 호출 1건을 아카이브에 추가 (gzip 멤버 추가 방식)"""
+    entry = {
+        'key': prompt_key(model, prompt, config),
+        'model': model,
+        'prompt': prompt,
+        'response': response_text,
+        'latency': round(latency, 4),
+        'tokens': tokens,
+        'recorded_at': time.time()
+    }
+    line = json.dumps(entry, ensure_ascii=False) + '\n'
+    with _record_lock:
+        with gzip.open(LLM_RECORD_PATH, 'at', encoding='utf-8') as f:
+            f.write(line)
+
+
+def load_archive(path: str) -> Dict[str, List[Dict]]:
+    """아카이브를 조회 키별 응답 리스트로 로드"""
+    index = {}
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            index.setdefault(entry['key'], []).append(entry)
+    return index
+
+
+def next_entry(key: str) -> Dict:
+    """조회 키의 다음 기록 반환 (없으면 None)"""
+    global _replay_index
+    with _replay_lock:
+        if _replay_index is None:
+            _replay_index = load_archive(LLM_REPLAY_PATH)
+            total = sum(len(entries) for entries in _replay_index.values())
+            print(f"[INFO] 재생 아카이브 로드: {LLM_REPLAY_PATH} (프롬프트 {len(_replay_index)}개, 응답 {total}개)")
+        entries = _replay_index.get(key)
+        if not entries:
+            return None
+        cursor = _replay_cursor.get(key, 0)
+        _replay_cursor[key] = cursor + 1
+        return entries[cursor % len(entries)]
+
+
+class _Usage:
+    def __init__(self, tokens: int):
+        self.total_token_count = tokens
+
+
+class _Response:
+    def __init__(self, entry: Dict):
+        self.text = entry['response']
+        self.usage_metadata = _Usage(entry.get('tokens', 0))
+
+
+class _Models:
+    def generate_content(self, model: str, contents, config=None):
+        prompt = contents if isinstance(contents, str) else str(contents)
+        entry = next_entry(prompt_key(model, prompt, config))
+        if entry is None:
+            raise Exception('REPLAY_MISS 아카이브에 기록되지 않은 프롬프트입니다.')
+        if LLM_REPLAY_TIMING == 'original':
+            time.sleep(entry.get('latency', 0))
+        return _Response(entry)
+
+
+class ReplayClient:
+    """genai.Client 대체 (기록된 응답 재생)"""
+
+    def __init__(self, api_key: str = None, **kwargs):
+        self.models = _Models()
@@ -31,14 +31,6 @@ from llm_config import (
 
 load_dotenv()
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
-
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
@@ -63,7 +55,7 @@ def get_reprocess_items(conn, limit: Optional[int] = None, check_validation_note
                 SELECT DISTINCT
                     ier.nct_id,
                     ier.eligibility_criteria_raw,
-                    ier.phase,
+                    s.phase,
                     iep.llm_status as current_status,
                     iep.llm_validation_status,
                     iep.needs_manual_review,
@@ -71,6 +63,8 @@ def get_reprocess_items(conn, limit: Optional[int] = None, check_validation_note
                 FROM inclusion_exclusion_llm_preprocessed iep
                 INNER JOIN inclusion_exclusion_raw ier
                     ON iep.nct_id = ier.nct_id
+                INNER JOIN study_raw s
+                    ON s.nct_id = ier.nct_id
                 INNER JOIN inclusion_exclusion_llm_validation_history h
                     ON iep.nct_id = h.nct_id
                 WHERE (
@@ -82,7 +76,7 @@ def get_reprocess_items(conn, limit: Optional[int] = None, check_validation_note
                 )
                   AND h.validation_notes IS NOT NULL
                   AND h.validation_notes != ''
-                GROUP BY ier.nct_id, ier.eligibility_criteria_raw, ier.phase, iep.llm_status, iep.llm_validation_status, iep.needs_manual_review
+                GROUP BY ier.nct_id, ier.eligibility_criteria_raw, s.phase, iep.llm_status, iep.llm_validation_status, iep.needs_manual_review
                 ORDER BY ier.nct_id
             """
         else:
@@ -91,7 +85,7 @@ def get_reprocess_items(conn, limit: Optional[int] = None, check_validation_note
                 SELECT DISTINCT
                     ier.nct_id,
                     ier.eligibility_criteria_raw,
-                    ier.phase,
+                    s.phase,
                     iep.llm_status as current_status,
                     iep.llm_validation_status,
                     iep.needs_manual_review,
@@ -99,6 +93,8 @@ def get_reprocess_items(conn, limit: Optional[int] = None, check_validation_note
                 FROM inclusion_exclusion_llm_preprocessed iep
                 INNER JOIN inclusion_exclusion_raw ier
                     ON iep.nct_id = ier.nct_id
+                INNER JOIN study_raw s
+                    ON s.nct_id = ier.nct_id
                 LEFT JOIN inclusion_exclusion_llm_validation_history h
                     ON iep.nct_id = h.nct_id
                 WHERE (
@@ -108,7 +104,7 @@ def get_reprocess_items(conn, limit: Optional[int] = None, check_validation_note
                     -- 수동 검토가 필요한 모든 항목들 (VERIFIED, UNCERTAIN 등 모든 상태 포함)
                     iep.needs_manual_review = TRUE
                 )
-                GROUP BY ier.nct_id, ier.eligibility_criteria_raw, ier.phase, iep.llm_status, iep.llm_validation_status, iep.needs_manual_review
+                GROUP BY ier.nct_id, ier.eligibility_criteria_raw, s.phase, iep.llm_status, iep.llm_validation_status, iep.needs_manual_review
                 ORDER BY ier.nct_id
             """
         
@@ -152,12 +148,14 @@ def get_failed_preprocess_items(conn, limit: Optional[int] = None) -> List[Dict]
             SELECT DISTINCT
                 ier.nct_id,
                 ier.eligibility_criteria_raw,
-                ier.phase,
+                s.phase,
                 iep.llm_status as current_status,
                 iep.failure_reason
             FROM inclusion_exclusion_llm_preprocessed iep
             INNER JOIN inclusion_exclusion_raw ier
                 ON iep.nct_id = ier.nct_id
+            INNER JOIN study_raw s
+                ON s.nct_id = ier.nct_id
             WHERE iep.llm_status != 'SUCCESS'
             ORDER BY ier.nct_id
         """
@@ -263,15 +261,14 @@ def preprocess_batch_eligibility_with_notes(eligibility_list: List[Dict]) -> Lis
     from llm_preprocess_inclusion_exclusion import determine_llm_status
     import json
     
+    from llm_alignment import align_results
+    
     results = []
     if isinstance(result, list):
-        # nct_id로 매핑
-        result_map = {}
-        for r in result:
-            nct_id = r.get('nct_id')
-            if nct_id and isinstance(nct_id, str):
-                if nct_id not in result_map:
-                    result_map[nct_id] = r
+        # nct_id 및 original_text 원문 대조로 응답 정렬
+        result_map, unmatched_items, align_stats = align_results(eligibility_list, result)
+        if align_stats['text']:
+            print(f"  [복구] nct_id 누락/오류 항목 원문 대조로 정렬: {align_stats['text']}개")
         
         for eligibility in eligibility_list:
             nct_id = eligibility.get('nct_id')
@@ -376,8 +373,6 @@ def insert_llm_results_reprocess(conn, eligibility_list: List[Dict], results: Li
         
         insert_data.append({
             'nct_id': nct_id,
-            'eligibility_criteria_raw': eligibility.get('eligibility_criteria_raw'),
-            'phase': eligibility.get('phase'),
             'inclusion_criteria': result.get('inclusion_criteria'),
             'exclusion_criteria': result.get('exclusion_criteria'),
             'llm_confidence': result.get('llm_confidence'),
@@ -389,11 +384,11 @@ def insert_llm_results_reprocess(conn, eligibility_list: List[Dict], results: Li
     # 재전처리용 INSERT (항상 덮어쓰기)
     insert_sql = """
         INSERT INTO inclusion_exclusion_llm_preprocessed (
-            nct_id, eligibility_criteria_raw, phase,
+            nct_id,
             inclusion_criteria, exclusion_criteria,
             llm_confidence, llm_notes, llm_status, failure_reason, parsing_method
         ) VALUES (
-            %(nct_id)s, %(eligibility_criteria_raw)s, %(phase)s,
+            %(nct_id)s,
             %(inclusion_criteria)s::jsonb, %(exclusion_criteria)s::jsonb,
             %(llm_confidence)s, %(llm_notes)s, %(llm_status)s, %(failure_reason)s, 'LLM'
         )
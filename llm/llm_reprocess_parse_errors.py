@@ -10,7 +10,6 @@ import json
 import time
 import sys
 from typing import Dict, Optional, List
-import psycopg2
 from psycopg2.extras import RealDictCursor, execute_batch
 from dotenv import load_dotenv
 from llm_config import (
@@ -23,18 +22,9 @@ load_dotenv()
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
-
-
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, ROOT_DIR)
+from db_access import get_db_connection
 
 
 def call_gemini_api(prompt: str) -> Optional[Dict]:
@@ -482,22 +472,23 @@ def main():
             placeholders = []
             params = []
             for item in parse_error_items:
-                placeholders.append("(nct_id = %s AND outcome_type = %s AND outcome_order = %s)")
+                placeholders.append("(o.nct_id = %s AND o.outcome_type = %s AND o.outcome_order = %s)")
                 params.extend([item['nct_id'], item['outcome_type'], item['outcome_order']])
             
             query = f"""
                 SELECT 
-                    id,
-                    nct_id,
-                    outcome_type,
-                    outcome_order,
-                    measure_raw,
-                    description_raw,
-                    time_frame_raw,
-                    phase
-                FROM outcome_raw
+                    o.id,
+                    o.nct_id,
+                    o.outcome_type,
+                    o.outcome_order,
+                    o.measure_raw,
+                    o.description_raw,
+                    o.time_frame_raw,
+                    s.phase
+                FROM outcome_raw o
+                INNER JOIN study_raw s ON s.nct_id = o.nct_id
                 WHERE ({' OR '.join(placeholders)})
-                ORDER BY nct_id, outcome_type, outcome_order
+                ORDER BY o.nct_id, o.outcome_type, o.outcome_order
             """
             cur.execute(query, params)
             outcomes = cur.fetchall()
@@ -0,0 +1,236 @@
+"""
+LLM 배치 재시도 큐
+
+API_FAILED / PARSE_ERROR 항목을 같은 실행 안에서 지수 백오프(+지터)로 재시도합니다.
+- API_FAILED: 같은 크기로 재시도
+- PARSE_ERROR: 실패한 항목만 더 작은 서브 배치로 분할하여 재시도
+- MAX_RETRIES회 시도 후에도 실패한 항목은 llm_dead_letter 테이블로 이동
+"""
+
+import os
+import json
+import time
+import heapq
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+from psycopg2.extras import execute_batch
+from llm_config import (
+    MAX_REQUESTS_PER_MINUTE, MAX_RETRIES, RETRY_DELAY,
+    RETRY_MAX_DELAY, RETRY_MIN_BATCH_SIZE
+)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FAILURE_API = 'API_FAILED'
+FAILURE_PARSE = 'PARSE_ERROR'
+
+
+def classify_failure(result: Dict, notes_key: str = 'llm_notes') -> Optional[str]:
+    """
+    결과 항목의 재시도 대상 실패 유형 판정
+
+    Returns:
+        'PARSE_ERROR', 'API_FAILED' 또는 None (재시도 불필요)
+    """
+    notes = result.get(notes_key) or ''
+    if '[PARSE_ERROR]' in notes:
+        return FAILURE_PARSE
+    if result.get('llm_status') == 'API_FAILED' or '[API_FAILED]' in notes:
+        return FAILURE_API
+    return None
+
+
+def compute_backoff_delay(attempt: int, base_delay: float = RETRY_DELAY, max_delay: float = RETRY_MAX_DELAY) -> float:
+    """
+    지수 백오프 + Full Jitter 대기 시간 계산
+
+    Args:
+        attempt: 재시도 횟수 (1부터 시작)
+
+    Returns:
+        대기 시간(초). 분당 요청 제한보다 짧아지지 않도록 보정
+    """
+    ceiling = min(max_delay, base_delay * (2 ** max(attempt - 1, 0)))
+    delay = random.uniform(0, ceiling)
+    return max(delay, 60 / MAX_REQUESTS_PER_MINUTE)
+
+
+def split_items(items: List[Dict], min_size: int = RETRY_MIN_BATCH_SIZE) -> List[List[Dict]]:
+    """실패한 항목들을 절반 크기의 서브 배치로 분할 (min_size 이하는 분할하지 않음)"""
+    if len(items) <= max(min_size, 1):
+        return [items]
+    mid = (len(items) + 1) // 2
+    return [items[:mid], items[mid:]]
+
+
+def process_with_retry(
+    items: List[Dict],
+    process_batch_fn: Callable[[List[Dict]], List[Dict]],
+    item_key: str,
+    result_key: str,
+    max_attempts: int = MAX_RETRIES,
+    notes_key: str = 'llm_notes'
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    배치를 처리하고 실패 항목을 재시도 큐에 넣어 같은 실행 안에서 재처리
+
+    Args:
+        items: 처리할 원본 항목 리스트
+        process_batch_fn: 배치 처리 함수 (preprocess_batch_outcomes 등)
+        item_key: 원본 항목의 키 이름 (예: 'id', 'nct_id')
+        result_key: 결과 항목의 키 이름 (예: 'outcome_id', 'nct_id')
+        max_attempts: 항목당 최대 시도 횟수 (첫 시도 포함)
+
+    Returns:
+        (results, dead_letters)
+        - results: 원본 항목 순서대로 정렬된 최종 결과 (최종 실패 결과 포함)
+        - dead_letters: 최대 시도 후에도 실패한 항목 정보
+    """
+    import llm_config
+
+    if not items:
+        return [], []
+
+    final_results = {}
+    dead_letters = []
+
+    # (ready_at, seq, attempt, batch) 형태의 재시도 큐
+    queue = [(0.0, 0, 1, list(items))]
+    seq = 1
+
+    while queue:
+        ready_at, _, attempt, batch = heapq.heappop(queue)
+        wait = ready_at - time.time()
+        if wait > 0:
+            time.sleep(wait)
+
+        batch_results = process_batch_fn(batch)
+        result_map = {r.get(result_key): r for r in batch_results}
+
+        failed_api = []
+        failed_parse = []
+        for item in batch:
+            key = item.get(item_key)
+            result = result_map.get(key)
+            if result is None:
+                continue
+            final_results[key] = result
+            kind = classify_failure(result, notes_key)
+            if kind == FAILURE_PARSE:
+                failed_parse.append(item)
+            elif kind == FAILURE_API:
+                failed_api.append(item)
+
+        if not failed_api and not failed_parse:
+            continue
+
+        # 모든 키가 소진된 경우 재시도하지 않음 (항목 자체의 문제가 아님)
+        if llm_config._all_keys_exhausted:
+            break
+
+        if attempt >= max_attempts:
+            for kind, failed in ((FAILURE_API, failed_api), (FAILURE_PARSE, failed_parse)):
+                for item in failed:
+                    key = item.get(item_key)
+                    dead_letters.append({
+                        'item_key': str(key),
+                        'failure_kind': kind,
+                        'attempts': attempt,
+                        'last_batch_size': len(batch),
+                        'last_notes': final_results[key].get(notes_key),
+                        'payload': item
+                    })
+            continue
+
+        next_at = time.time() + compute_backoff_delay(attempt)
+        if failed_api:
+            print(f"  [재시도] API_FAILED {len(failed_api)}개 재큐잉 (시도 {attempt + 1}/{max_attempts})")
+            heapq.heappush(queue, (next_at, seq, attempt + 1, failed_api))
+            seq += 1
+        if failed_parse:
+            sub_batches = split_items(failed_parse)
+            print(f"  [재시도] PARSE_ERROR {len(failed_parse)}개를 {len(sub_batches)}개 서브 배치로 분할 (시도 {attempt + 1}/{max_attempts})")
+            for sub_batch in sub_batches:
+                heapq.heappush(queue, (next_at, seq, attempt + 1, sub_batch))
+                seq += 1
+
+    results = [final_results[item.get(item_key)] for item in items if item.get(item_key) in final_results]
+    return results, dead_letters
+
+
+def split_completed_rows(
+    items: List[Dict],
+    results: List[Dict],
+    item_key: str,
+    result_key: str,
+    notes_key: str = 'llm_notes'
+) -> Tuple[List[Tuple[Dict, Dict]], List[Tuple[Dict, Dict]]]:
+    """
+    키 소진으로 중단된 배치에서 저장할 완료 결과(재시도 불필요) 분리
+
+    이미 비용을 쓴 결과는 버리지 않고 저장하되, 체크포인트 watermark는 처음 미완료 항목 앞까지만
+    옮겨야 --resume이 미완료 항목부터 다시 처리합니다.
+
+    Returns:
+        (prefix_rows, later_rows) - [(원본 항목, 결과)]
+        - prefix_rows: 원본 순서에서 처음 미완료 항목 앞까지의 완료 행 (watermark 이동 가능)
+        - later_rows: 그 뒤의 완료 행 (저장만 하고 watermark는 옮기지 않음)
+    """
+    result_map = {r.get(result_key): r for r in results}
+    prefix_rows, later_rows = [], []
+    gap = False
+    for item in items:
+        result = result_map.get(item.get(item_key))
+        if result is None or classify_failure(result, notes_key) is not None:
+            gap = True
+            continue
+        (later_rows if gap else prefix_rows).append((item, result))
+    return prefix_rows, later_rows
+
+
+def ensure_dead_letter_table(conn):
+    """llm_dead_letter 테이블 생성 (없는 경우)"""
+    sql_file = os.path.join(ROOT_DIR, 'sql', 'create_llm_dead_letter.sql')
+    with open(sql_file, 'r', encoding='utf-8') as f:
+        sql_content = f.read()
+    with conn.cursor() as cur:
+        cur.execute(sql_content)
+        conn.commit()
+
+
+def save_dead_letters(conn, pipeline: str, dead_letters: List[Dict]):
+    """최대 시도 후에도 실패한 항목을 llm_dead_letter 테이블에 저장"""
+    if not dead_letters:
+        return
+
+    insert_data = [{
+        'pipeline': pipeline,
+        'item_key': d['item_key'],
+        'failure_kind': d['failure_kind'],
+        'attempts': d['attempts'],
+        'last_batch_size': d['last_batch_size'],
+        'last_notes': d.get('last_notes'),
+        'payload': json.dumps(d.get('payload'), ensure_ascii=False, default=str)
+    } for d in dead_letters]
+
+    insert_sql = """
+        INSERT INTO llm_dead_letter (
+            pipeline, item_key, failure_kind, attempts, last_batch_size, last_notes, payload
+        ) VALUES (
+            %(pipeline)s, %(item_key)s, %(failure_kind)s, %(attempts)s,
+            %(last_batch_size)s, %(last_notes)s, %(payload)s::jsonb
+        )
+        ON CONFLICT (pipeline, item_key)
+        DO UPDATE SET
+            failure_kind = EXCLUDED.failure_kind,
+            attempts = llm_dead_letter.attempts + EXCLUDED.attempts,
+            last_batch_size = EXCLUDED.last_batch_size,
+            last_notes = EXCLUDED.last_notes,
+            payload = EXCLUDED.payload,
+            updated_at = CURRENT_TIMESTAMP
+    """
+
+    with conn.cursor() as cur:
+        execute_batch(cur, insert_sql, insert_data, page_size=100)
+        conn.commit()
+    print(f"  [DEAD_LETTER] {len(dead_letters)}개 항목을 llm_dead_letter에 저장했습니다.")
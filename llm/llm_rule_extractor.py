@@ -0,0 +1,234 @@
+"""
+Inclusion/Exclusion 기준 규칙 기반 추출기
+
+나이, 성별, MMSE/CDR 등 점수 범위처럼 형식이 정형화된 기준 줄을 LLM 없이 구조화합니다.
+INCLUSION_EXCLUSION_PREPROCESS_RULES(llm_prompts.py)와 같은 규칙을 따릅니다.
+- 범위 조건은 >=, <= 두 criterion으로 분리
+- 자연어 비교 표현은 부등호로 변환 (at least → >=, younger than → < 등)
+- 출력 형식은 LLM 응답과 같은 criterion 객체 (criterion_id, original_text, feature, operator, value, unit, confidence)
+
+줄 전체가 패턴과 일치하는 경우에만 추출하고, 조금이라도 남는 텍스트가 있으면 None을 반환하여 LLM으로 보냅니다.
+"""
+
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+RULE_CONFIDENCE = 0.95
+
+NUM = r'(\d+(?:\.\d+)?)'
+
+# 줄 앞의 주어 표현 ("Patients must be", "Subjects with an" 등)
+SUBJECT_PREFIX = (
+    r'(?:(?:male\s+or\s+female\s+|men\s+and\s+women\s+)?(?:patients?|subjects?|participants?|volunteers?|individuals?)\s+'
+    r'(?:must\s+(?:be|have)\s+|should\s+(?:be|have)\s+|who\s+are\s+|are\s+|with\s+)?)?'
+    r'(?:(?:an?|the)\s+)?'
+)
+
+# 줄 끝의 무시 가능한 수식어
+TRAILING_QUALIFIER = re.compile(
+    r'(?:\s*,?\s*(?:\(?inclusive\)?|at\s+(?:the\s+time\s+of\s+)?(?:screening|baseline|enrollment|enrolment|consent)(?:\s+visit)?))+$'
+)
+
+# 점수/검사 항목: (feature, 별칭 패턴, 기본 단위)
+# 더 구체적인 별칭(Global CDR, CDR-SB)을 CDR보다 먼저 검사
+SCORE_FEATURES = [
+    ('MMSE', r'(?:mini[\s-]mental\s+state\s+exam(?:ination)?(?:\s*\(mmse\))?|mmse)', None),
+    ('Global CDR', r'(?:global\s+cdr|cdr\s+global|global\s+clinical\s+dementia\s+rating(?:\s*\(cdr\))?)', None),
+    ('CDR-SB', r'(?:cdr[\s-]sb|cdr\s+sum\s+of\s+boxes|clinical\s+dementia\s+rating[\s-]sum\s+of\s+boxes(?:\s*\(cdr[\s-]sb\))?)', None),
+    ('CDR', r'(?:clinical\s+dementia\s+rating(?:\s*\(cdr\))?|cdr)', None),
+    ('MoCA', r'(?:montreal\s+cognitive\s+assessment(?:\s*\(moca\))?|moca)', None),
+    ('GDS', r'(?:geriatric\s+depression\s+scale(?:\s*\(gds\))?|gds)', None),
+    ('HAM-D', r'(?:hamilton\s+(?:depression\s+rating\s+scale|rating\s+scale\s+for\s+depression)(?:\s*\(ham-?d\))?|ham-?d)', None),
+    ('ADAS-Cog', r'(?:adas[\s-]cog(?:[\s-]?\d+)?)', None),
+    ('BMI', r'(?:body\s+mass\s+index(?:\s*\(bmi\))?|bmi)', 'kg/m²'),
+]
+
+SCORE_PATTERNS = [
+    (feature, re.compile(
+        r'^' + SUBJECT_PREFIX + alias +
+        r'(?:\s+(?:total\s+)?score)?(?:\s+(?:of|is|must\s+be|should\s+be|between)|\s*:)?\s*(?P<rest>.*)$'
+    ), unit)
+    for feature, alias, unit in SCORE_FEATURES
+]
+
+# 단위 표현 → 표준 단위
+UNIT_PATTERNS = [
+    (re.compile(r'\b(?:years?\s+of\s+age|years?\s+old|years?|yrs?|y/o)\b'), 'years'),
+    (re.compile(r'\bkg\s*/\s*m(?:2|²|\^2)'), 'kg/m²'),
+    (re.compile(r'\bpoints?\b'), None),
+]
+
+AGE_LEADING = re.compile(r'^' + SUBJECT_PREFIX + r'(?:aged?|age\s+at\s+(?:screening|enrollment|consent))(?:\s+(?:of|is|must\s+be|should\s+be|between)|\s*:)?\s*(?P<rest>.*)$')
+AGE_TRAILING = re.compile(r'^' + SUBJECT_PREFIX + r'(?:aged\s+)?(?P<rest>.*?\byears?\s+(?:of\s+age|old)\b.*)$')
+
+# 범위 표현 (>=a, <=b 두 criterion)
+RANGE_PATTERNS = [
+    re.compile(r'^(?:between\s+|from\s+)?' + NUM + r'\s*(?:-|to|and|through)\s*' + NUM + r'$'),
+    re.compile(r'^>=\s*' + NUM + r'\s*(?:and|,|to)?\s*<=\s*' + NUM + r'$'),
+]
+
+# 단일 비교 표현 (operator, 패턴)
+BOUND_PATTERNS = [
+    ('>=', re.compile(r'^(?:>=|greater\s+than\s+or\s+equal\s+to|(?:of\s+)?at\s+least|minimum(?:\s+of)?)\s*' + NUM + r'$')),
+    ('<=', re.compile(r'^(?:<=|less\s+than\s+or\s+equal\s+to|(?:of\s+)?at\s+most|no\s+more\s+than|not\s+more\s+than|maximum(?:\s+of)?)\s*' + NUM + r'$')),
+    ('>', re.compile(r'^(?:>|greater\s+than|more\s+than|higher\s+than|older\s+than|above|over)\s*' + NUM + r'$')),
+    ('<', re.compile(r'^(?:<|less\s+than|lower\s+than|younger\s+than|below|under)\s*' + NUM + r'$')),
+    ('!=', re.compile(r'^(?:!=|not\s+equal\s+to)\s*' + NUM + r'$')),
+    ('=', re.compile(r'^(?:=|equal\s+to|exactly|of)\s*' + NUM + r'$')),
+    ('>=', re.compile(r'^' + NUM + r'\s*(?:or|and)\s+(?:older|over|above|greater|higher|more)$')),
+    ('<=', re.compile(r'^' + NUM + r'\s*(?:or|and)\s+(?:younger|under|below|less|lower|fewer)$')),
+    ('>=', re.compile(r'^' + NUM + r'\s*\+$')),
+]
+# 연산자 없는 단일 값 ("Global CDR 0.5")은 점수 항목에만 '='로 허용 (나이는 모호하므로 제외)
+BARE_VALUE_PATTERN = re.compile(r'^' + NUM + r'$')
+
+GENDER_VALUES = {
+    'male': 'male', 'males': 'male', 'men': 'male', 'man': 'male',
+    'female': 'female', 'females': 'female', 'women': 'female', 'woman': 'female',
+}
+GENDER_PATTERN = re.compile(
+    r'^(?:(?:gender|sex)\s*:?\s*)?'
+    r'(?:(?:healthy\s+)?(?P<a>males?|men|man|females?|women|woman)'
+    r'(?:\s*(?:or|and|/|&)\s*(?P<b>males?|men|man|females?|women|woman))?'
+    r'|(?P<both>both\s+(?:sexes|genders)|either\s+(?:sex|gender)|all\s+genders))'
+    r'(?:\s+(?:patients?|subjects?|participants?|volunteers?))?$'
+)
+GENDER_LABEL_PATTERN = re.compile(r'^(?:gender|sex)\s*:?\s*(?:both|all|any)$')
+
+
+def normalize_line(text: str) -> str:
+    """비교 기호/대시 통일, 소문자, 공백 정리, 끝 구두점 제거"""
+    text = unicodedata.normalize('NFKC', text or '')
+    text = (text.replace('≥', '>=').replace('≤', '<=').replace('=>', '>=').replace('=<', '<=')
+            .replace('≠', '!=').replace('–', '-').replace('—', '-').replace('‐', '-'))
+    text = re.sub(r'\s+', ' ', text.lower()).strip()
+    return text.rstrip(' .;,')
+
+
+def _number(value: str):
+    return float(value) if '.' in value else int(value)
+
+
+def strip_units(rest: str, default_unit: Optional[str]) -> Tuple[str, Optional[str]]:
+    """범위/비교 표현에서 단위 표현을 제거하고 표준 단위 반환 (서로 다른 단위가 섞이면 단위 None, 나머지 그대로)"""
+    units = set()
+    for pattern, unit in UNIT_PATTERNS:
+        if pattern.search(rest):
+            rest = pattern.sub(' ', rest)
+            units.add(unit)
+    units.discard(None)
+    if len(units) > 1:
+        return rest, None
+    rest = re.sub(r'\s+', ' ', rest).strip()
+    return rest, units.pop() if units else default_unit
+
+
+def parse_bounds(rest: str, allow_bare_value: bool) -> Optional[List[Tuple[str, float]]]:
+    """남은 표현 전체를 (operator, value) 목록으로 변환 (전체 일치가 아니면 None)"""
+    rest = TRAILING_QUALIFIER.sub('', rest).strip(' ,')
+    for pattern in RANGE_PATTERNS:
+        match = pattern.match(rest)
+        if match:
+            low, high = _number(match.group(1)), _number(match.group(2))
+            if low >= high:
+                return None
+            return [('>=', low), ('<=', high)]
+    for operator, pattern in BOUND_PATTERNS:
+        match = pattern.match(rest)
+        if match:
+            return [(operator, _number(match.group(1)))]
+    if allow_bare_value:
+        match = BARE_VALUE_PATTERN.match(rest)
+        if match:
+            return [('=', _number(match.group(1)))]
+    return None
+
+
+def _criteria(original_text: str, feature: str, bounds: List[Tuple[str, float]], unit: Optional[str]) -> List[Dict]:
+    return [{
+        'criterion_id': i,
+        'original_text': original_text,
+        'feature': feature,
+        'operator': operator,
+        'value': value,
+        'unit': unit,
+        'confidence': RULE_CONFIDENCE
+    } for i, (operator, value) in enumerate(bounds, 1)]
+
+
+def extract_age(line: str, original_text: str) -> Optional[List[Dict]]:
+    """나이 조건 ("Age 50-85 years", "18 years of age or older", "Aged at least 65")"""
+    match = AGE_LEADING.match(line) or AGE_TRAILING.match(line)
+    if not match:
+        return None
+    rest, unit = strip_units(match.group('rest'), 'years')
+    if unit != 'years':
+        return None
+    bounds = parse_bounds(rest, allow_bare_value=False)
+    if not bounds:
+        return None
+    return _criteria(original_text, 'age', bounds, unit)
+
+
+def extract_gender(line: str, original_text: str) -> Optional[List[Dict]]:
+    """성별 조건 ("Male or female", "Women", "Both sexes")"""
+    if GENDER_LABEL_PATTERN.match(line):
+        value = 'male or female'
+    else:
+        match = GENDER_PATTERN.match(line)
+        if not match:
+            return None
+        if match.group('both'):
+            value = 'male or female'
+        else:
+            genders = {GENDER_VALUES[match.group('a')]}
+            if match.group('b'):
+                genders.add(GENDER_VALUES[match.group('b')])
+            value = 'male or female' if len(genders) > 1 else genders.pop()
+    return [{
+        'criterion_id': 1,
+        'original_text': original_text,
+        'feature': 'gender',
+        'operator': '=',
+        'value': value,
+        'unit': None,
+        'confidence': RULE_CONFIDENCE
+    }]
+
+
+def extract_score(line: str, original_text: str) -> Optional[List[Dict]]:
+    """점수/검사 범위 ("MMSE score between 18 and 26", "Global CDR = 0.5", "BMI 18-35 kg/m2")"""
+    for feature, pattern, default_unit in SCORE_PATTERNS:
+        match = pattern.match(line)
+        if not match:
+            continue
+        rest, unit = strip_units(match.group('rest'), default_unit)
+        if unit == 'years':
+            return None
+        bounds = parse_bounds(rest, allow_bare_value=True)
+        if bounds:
+            return _criteria(original_text, feature, bounds, unit)
+        return None
+    return None
+
+
+def extract_criteria(text: str) -> Optional[List[Dict]]:
+    """
+    기준 줄 하나를 규칙으로 구조화
+
+    Args:
+        text: 분할된 기준 줄 텍스트
+
+    Returns:
+        criterion 객체 배열 (규칙과 전체 일치하지 않으면 None → LLM 처리)
+    """
+    line = normalize_line(text)
+    if not line or len(line) > 120:
+        return None
+    original_text = (text or '').strip()
+    for extractor in (extract_gender, extract_age, extract_score):
+        criteria = extractor(line, original_text)
+        if criteria:
+            return criteria
+    return None
@@ -0,0 +1,212 @@
+"""
+LLM 응답 스키마 (structured output)
+
+작업 유형별 응답 JSON 스키마를 정의하고, Gemini structured output 모드
+(response_mime_type=application/json + response_schema)로 요청할 config를 만듭니다.
+모델이 스키마에 맞춘 순수 JSON을 반환하므로 코드 블록/설명 제거, 잘린 JSON 복구가 대부분 필요 없어집니다.
+
+- 응답은 로컬에서도 같은 스키마로 검증하여 스키마에 맞지 않는 항목만 제외 (제외된 항목은 PARSE_ERROR로 재시도)
+- 응답이 JSON으로 읽히지 않으면(출력 토큰 한도로 잘린 경우 등) None을 반환하여 기존 복구 경로 사용
+- STRUCTURED_OUTPUT=true 일 때만 사용 (기본값 false: 스키마 없이 기존 방식으로 호출)
+"""
+
+import json
+from typing import Dict, List, Optional, Tuple
+from llm_config import STRUCTURED_OUTPUT_ENABLED
+
+TASK_OUTCOME_PREPROCESS = 'outcome_preprocess'
+TASK_OUTCOME_VALIDATION = 'outcome_validation'
+TASK_IE_PREPROCESS = 'ie_preprocess'
+TASK_IE_SEGMENTED = 'ie_segmented'
+TASK_IE_VALIDATION = 'ie_validation'
+
+CRITERION_OPERATORS = ['=', '!=', '<', '<=', '>', '>=']
+
+
+def _array_of(item_schema: Dict) -> Dict:
+    return {'type': 'ARRAY', 'items': item_schema}
+
+
+def _criterion_schema(text_field: str) -> Dict:
+    """기준 항목 스키마 (원문 전체 입력: original_text, 분할 입력: line 라벨)"""
+    return {
+        'type': 'OBJECT',
+        'properties': {
+            'criterion_id': {'type': 'INTEGER'},
+            text_field: {'type': 'STRING'},
+            'feature': {'type': 'STRING'},
+            'operator': {'type': 'STRING', 'enum': CRITERION_OPERATORS},
+            # value는 숫자 또는 문자열 (null 불가)
+            'value': {'any_of': [{'type': 'NUMBER'}, {'type': 'STRING'}]},
+            'unit': {'type': 'STRING', 'nullable': True},
+            'confidence': {'type': 'NUMBER', 'nullable': True}
+        },
+        'required': [text_field, 'feature', 'operator', 'value']
+    }
+
+
+def _ie_preprocess_schema(text_field: str) -> Dict:
+    criterion = _criterion_schema(text_field)
+    return _array_of({
+        'type': 'OBJECT',
+        'properties': {
+            'item_no': {'type': 'INTEGER'},
+            'nct_id': {'type': 'STRING'},
+            'inclusion_criteria': _array_of(criterion),
+            'exclusion_criteria': _array_of(criterion),
+            'confidence': {'type': 'NUMBER', 'nullable': True},
+            'notes': {'type': 'STRING', 'nullable': True}
+        },
+        'required': ['item_no', 'nct_id', 'inclusion_criteria', 'exclusion_criteria']
+    })
+
+
+def _validation_schema(key_field: str, key_type: str, statuses: List[str]) -> Dict:
+    return _array_of({
+        'type': 'OBJECT',
+        'properties': {
+            key_field: {'type': key_type},
+            'status': {'type': 'STRING', 'enum': statuses},
+            'confidence': {'type': 'NUMBER', 'nullable': True},
+            'notes': {'type': 'STRING'}
+        },
+        'required': [key_field, 'status', 'confidence', 'notes']
+    })
+
+
+RESPONSE_SCHEMAS = {
+    TASK_OUTCOME_PREPROCESS: _array_of({
+        'type': 'OBJECT',
+        'properties': {
+            'outcome_id': {'type': 'INTEGER'},
+            'measure_code': {'type': 'STRING', 'nullable': True},
+            'time_value': {'type': 'NUMBER', 'nullable': True},
+            'time_unit': {'type': 'STRING', 'nullable': True},
+            'time_points': {
+                'type': 'ARRAY',
+                'nullable': True,
+                'items': {
+                    'type': 'OBJECT',
+                    'properties': {
+                        'value': {'type': 'NUMBER'},
+                        'unit': {'type': 'STRING'}
+                    },
+                    'required': ['value', 'unit']
+                }
+            },
+            'confidence': {'type': 'NUMBER', 'nullable': True},
+            'notes': {'type': 'STRING'}
+        },
+        'required': ['outcome_id', 'measure_code', 'time_value', 'time_unit', 'confidence', 'notes']
+    }),
+    TASK_OUTCOME_VALIDATION: _validation_schema(
+        'outcome_id', 'INTEGER',
+        ['VERIFIED', 'UNCERTAIN', 'MEASURE_FAILED', 'TIMEFRAME_FAILED', 'BOTH_FAILED']
+    ),
+    TASK_IE_PREPROCESS: _ie_preprocess_schema('original_text'),
+    TASK_IE_SEGMENTED: _ie_preprocess_schema('line'),
+    TASK_IE_VALIDATION: _validation_schema(
+        'nct_id', 'STRING',
+        ['VERIFIED', 'UNCERTAIN', 'INCLUSION_FAILED', 'EXCLUSION_FAILED', 'BOTH_FAILED']
+    ),
+}
+
+
+def get_response_config(task: str, config: Dict = None) -> Dict:
+    """작업 유형의 응답 스키마를 포함한 generate_content config (STRUCTURED_OUTPUT=true가 아니면 그대로 반환)"""
+    config = dict(config or {})
+    if STRUCTURED_OUTPUT_ENABLED:
+        config['response_mime_type'] = 'application/json'
+        config['response_schema'] = RESPONSE_SCHEMAS[task]
+    return config
+
+
+def validate_value(value, schema: Dict, path: str = '$') -> Optional[str]:
+    """스키마 검증 (Gemini 스키마 부분집합). 오류 메시지 또는 None"""
+    if value is None:
+        return None if schema.get('nullable') else f'{path}: null 불가'
+
+    if 'any_of' in schema:
+        for option in schema['any_of']:
+            if validate_value(value, option, path) is None:
+                return None
+        return f'{path}: 허용되지 않는 타입 {type(value).__name__}'
+
+    expected = schema.get('type')
+    if expected == 'OBJECT':
+        if not isinstance(value, dict):
+            return f'{path}: 객체가 아님'
+        for field in schema.get('required', []):
+            if field not in value:
+                return f'{path}.{field}: 필수 필드 누락'
+        for field, field_schema in schema.get('properties', {}).items():
+            if field in value:
+                error = validate_value(value[field], field_schema, f'{path}.{field}')
+                if error:
+                    return error
+        return None
+    if expected == 'ARRAY':
+        if not isinstance(value, list):
+            return f'{path}: 배열이 아님'
+        for index, element in enumerate(value):
+            error = validate_value(element, schema['items'], f'{path}[{index}]')
+            if error:
+                return error
+        return None
+    if expected == 'STRING':
+        if not isinstance(value, str):
+            return f'{path}: 문자열이 아님'
+    elif expected == 'INTEGER':
+        if isinstance(value, bool) or not (isinstance(value, int) or (isinstance(value, float) and value.is_integer())):
+            return f'{path}: 정수가 아님'
+    elif expected == 'NUMBER':
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return f'{path}: 숫자가 아님'
+    elif expected == 'BOOLEAN':
+        if not isinstance(value, bool):
+            return f'{path}: 불리언이 아님'
+
+    if 'enum' in schema and value not in schema['enum']:
+        return f'{path}: 허용되지 않는 값 {value!r}'
+    return None
+
+
+def validate_items(task: str, items: List) -> Tuple[List[Dict], List[str]]:
+    """응답 배열의 항목별 스키마 검증 → (유효 항목, 오류 메시지)"""
+    item_schema = RESPONSE_SCHEMAS[task]['items']
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        error = validate_value(item, item_schema, f'$[{index}]')
+        if error:
+            errors.append(error)
+        else:
+            valid.append(item)
+    return valid, errors
+
+
+def parse_structured_response(task: str, response_text: str) -> Optional[List[Dict]]:
+    """
+    structured output 응답을 파싱하고 스키마로 검증
+
+    Returns:
+        유효 항목 리스트. JSON으로 읽히지 않으면 None (호출 측의 기존 복구 경로 사용).
+        응답 항목이 모두 스키마에 맞지 않으면 빈 리스트 (llm_config._last_failure_kind = 'PARSE_ERROR')
+    """
+    if not STRUCTURED_OUTPUT_ENABLED:
+        return None
+    try:
+        data = json.loads(response_text)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        return None
+
+    valid, errors = validate_items(task, data)
+    if errors:
+        print(f"  [SCHEMA] 스키마에 맞지 않는 응답 항목 {len(errors)}/{len(data)}개 제외 (예: {errors[0]})")
+    if data and not valid:
+        import llm_config
+        llm_config._last_failure_kind = 'PARSE_ERROR'
+    return valid
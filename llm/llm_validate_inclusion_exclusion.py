@@ -6,187 +6,136 @@ LLM으로 검증하여 문서화합니다.
 """
 
 import os
+import sys
 import json
 import time
 from datetime import datetime
 from typing import Dict, Optional, List
-import psycopg2
-from psycopg2.extras import RealDictCursor, execute_batch
+from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 from llm_config import (
-    get_api_keys, GEMINI_MODEL,
-    MAX_REQUESTS_PER_MINUTE, BATCH_SIZE, MAX_RETRIES, RETRY_DELAY
+    get_api_keys,
+    MAX_REQUESTS_PER_MINUTE, BATCH_SIZE, MAX_RETRIES, RETRY_DELAY,
+    VALIDATION_HIGH_CONSISTENCY, VALIDATION_HIGH_CONFIDENCE, VALIDATION_LOW_CONFIDENCE
 )
+from llm_client import generate_text
+from llm_quota_ledger import get_usage_summary, purge_old_windows
+from llm_validation_history import insert_validation_history
+from llm_cascade import process_with_cascade, needs_validation_escalation, get_model_tiers, print_cascade_stats
+from llm_schemas import TASK_IE_VALIDATION, get_response_config, parse_structured_response
 from llm_prompts import get_inclusion_exclusion_validation_prompt
 
 load_dotenv()
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection, execute_prepared_batch
+from run_checkpoint import RunCheckpoint, after_watermark, install_signal_handlers
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
-
-
 def call_gemini_api(prompt: str) -> Optional[List]:
-    """Gemini API 호출 (여러 API 키를 순차적으로 시도, 429 에러 시 자동 전환)"""
-    api_keys = get_api_keys()
-    if not api_keys:
-        print("[ERROR] GEMINI_API_KEY가 설정되지 않았습니다!")
+    """Gemini API 호출 (공유 클라이언트: 쿼터 원장 확인 후 키 로테이션, 429 에러 시 자동 전환)"""
+    import llm_config
+    
+    response_text = generate_text(prompt, config=get_response_config(TASK_IE_VALIDATION, {'temperature': 0.0}))
+    if response_text is None:
         return None
     
-    import llm_config
-    start_key_index = llm_config._current_key_index
-    last_error = None
+    # structured output: 스키마 검증을 통과한 항목을 그대로 사용 (JSON으로 읽히지 않으면 아래 복구 경로)
+    parsed = parse_structured_response(TASK_IE_VALIDATION, response_text)
+    if parsed is not None:
+        return parsed or None
     
-    for attempt in range(len(api_keys)):
-        key_index = (start_key_index + attempt) % len(api_keys)
+    content = response_text.strip()
+    
+    # JSON 추출 (코드 블록 제거)
+    if '```' in content:
+        import re
+        code_block_pattern = r'```(?:json)?\s*\n(.*?)\n```'
+        match = re.search(code_block_pattern, content, re.DOTALL)
+        if match:
+            content = match.group(1).strip()
+        else:
+            content = re.sub(r'```(?:json)?', '', content).strip()
+    
+    # JSON 배열 시작 부분 찾기
+    json_start = content.find('[')
+    if json_start >= 0:
+        content = content[json_start:]
+    
+    json_end = content.rfind(']')
+    if json_end >= 0:
+        content = content[:json_end + 1]
+    
+    content = content.strip()
+    
+    try:
+        parsed = json.loads(content)
+        if not isinstance(parsed, list):
+            parsed = [parsed]
+        return parsed
+    except json.JSONDecodeError as e:
+        print(f"[WARN] JSON 파싱 실패 (키 {llm_config._current_key_index + 1}): {e}")
+        print(f"  응답 내용 (처음 500자): {content[:500]}")
         
+        # 부분 파싱 시도: 완전한 JSON 객체들만 추출
         try:
-            from google import genai
-            client = genai.Client(api_key=api_keys[key_index])
-            # 검증 시 Temperature를 0.0으로 설정하여 변동성 최소화
-            # generate_content에 temperature 파라미터 직접 전달 시도
-            try:
-                response = client.models.generate_content(
-                    model=GEMINI_MODEL,
-                    contents=prompt,
-                    temperature=0.0  # 결정론적 출력을 위해 최소값 설정
-                )
-            except TypeError:
-                # temperature 파라미터가 지원되지 않는 경우 기본 호출
-                response = client.models.generate_content(
-                    model=GEMINI_MODEL,
-                    contents=prompt
-                )
+            import re
+            parsed_items = []
             
-            if llm_config._current_key_index != key_index:
-                llm_config._previous_key_index = llm_config._current_key_index
-                llm_config._current_key_index = key_index
-            else:
-                llm_config._current_key_index = key_index
+            # 완전한 JSON 객체 패턴 찾기 (중첩 구조 지원)
+            # { ... } 형태의 완전한 객체를 찾음
+            brace_count = 0
+            start_pos = -1
+            current_obj = ""
             
-            content = response.text.strip()
+            for i, char in enumerate(content):
+                if char == '{':
+                    if brace_count == 0:
+                        start_pos = i
+                    brace_count += 1
+                    current_obj += char
+                elif char == '}':
+                    current_obj += char
+                    brace_count -= 1
+                    if brace_count == 0 and start_pos >= 0:
+                        # 완전한 객체 발견
+                        try:
+                            obj = json.loads(current_obj)
+                            if isinstance(obj, dict) and 'nct_id' in obj:
+                                parsed_items.append(obj)
+                        except json.JSONDecodeError:
+                            pass
+                        current_obj = ""
+                        start_pos = -1
+                elif start_pos >= 0:
+                    current_obj += char
             
-            # JSON 추출 (코드 블록 제거)
-            if '```' in content:
-                import re
-                code_block_pattern = r'```(?:json)?\s*\n(.*?)\n```'
-                match = re.search(code_block_pattern, content, re.DOTALL)
-                if match:
-                    content = match.group(1).strip()
-                else:
-                    content = re.sub(r'```(?:json)?', '', content).strip()
-            
-            # JSON 배열 시작 부분 찾기
-            json_start = content.find('[')
-            if json_start >= 0:
-                content = content[json_start:]
-            
-            json_end = content.rfind(']')
-            if json_end >= 0:
-                content = content[:json_end + 1]
-            
-            content = content.strip()
-            
-            try:
-                parsed = json.loads(content)
-                if not isinstance(parsed, list):
-                    parsed = [parsed]
-                return parsed
-            except json.JSONDecodeError as e:
-                print(f"[WARN] JSON 파싱 실패 (키 {key_index + 1}/{len(api_keys)}): {e}")
-                print(f"  응답 내용 (처음 500자): {content[:500]}")
+            if parsed_items:
+                print(f"  [복구] {len(parsed_items)}개 항목을 부분 파싱하여 복구했습니다.")
+                return parsed_items
+            else:
+                # 정규식으로도 시도
+                json_objects = re.findall(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
+                for obj_str in json_objects:
+                    try:
+                        obj = json.loads(obj_str)
+                        if isinstance(obj, dict) and 'nct_id' in obj:
+                            parsed_items.append(obj)
+                    except json.JSONDecodeError:
+                        continue
                 
-                # 부분 파싱 시도: 완전한 JSON 객체들만 추출
-                try:
-                    import re
-                    parsed_items = []
-                    
-                    # 완전한 JSON 객체 패턴 찾기 (중첩 구조 지원)
-                    # { ... } 형태의 완전한 객체를 찾음
-                    brace_count = 0
-                    start_pos = -1
-                    current_obj = ""
-                    
-                    for i, char in enumerate(content):
-                        if char == '{':
-                            if brace_count == 0:
-                                start_pos = i
-                            brace_count += 1
-                            current_obj += char
-                        elif char == '}':
-                            current_obj += char
-                            brace_count -= 1
-                            if brace_count == 0 and start_pos >= 0:
-                                # 완전한 객체 발견
-                                try:
-                                    obj = json.loads(current_obj)
-                                    if isinstance(obj, dict) and 'nct_id' in obj:
-                                        parsed_items.append(obj)
-                                except json.JSONDecodeError:
-                                    pass
-                                current_obj = ""
-                                start_pos = -1
-                        elif start_pos >= 0:
-                            current_obj += char
-                    
-                    if parsed_items:
-                        print(f"  [복구] {len(parsed_items)}개 항목을 부분 파싱하여 복구했습니다.")
-                        return parsed_items
-                    else:
-                        # 정규식으로도 시도
-                        json_objects = re.findall(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
-                        for obj_str in json_objects:
-                            try:
-                                obj = json.loads(obj_str)
-                                if isinstance(obj, dict) and 'nct_id' in obj:
-                                    parsed_items.append(obj)
-                            except json.JSONDecodeError:
-                                continue
-                        
-                        if parsed_items:
-                            print(f"  [복구] {len(parsed_items)}개 항목을 정규식으로 복구했습니다.")
-                            return parsed_items
-                        
-                except Exception as recover_error:
-                    print(f"  [복구 실패] {recover_error}")
+                if parsed_items:
+                    print(f"  [복구] {len(parsed_items)}개 항목을 정규식으로 복구했습니다.")
+                    return parsed_items
                 
-                return None
-            
-        except Exception as e:
-            error_str = str(e)
-            last_error = e
-            
-            if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str.upper():
-                print(f"⚠️  API 키 {key_index + 1}/{len(api_keys)}에서 429 에러 발생 (시도 {attempt + 1}/{len(api_keys)}): {error_str}")
-                
-                if attempt == len(api_keys) - 1:
-                    print(f"[ERROR] 모든 API 키({len(api_keys)}개)가 소진되었습니다.")
-                    llm_config._previous_key_index = llm_config._current_key_index
-                    llm_config._current_key_index = key_index
-                    llm_config._all_keys_exhausted = True
-                    return None
-                else:
-                    next_key_index = (start_key_index + attempt + 1) % len(api_keys)
-                    print(f"🔄 다음 API 키로 전환합니다 (키 {next_key_index + 1}/{len(api_keys)})")
-                    continue
-            else:
-                print(f"[ERROR] Gemini API 오류 (키 {key_index + 1}/{len(api_keys)}): {error_str}")
-                return None
-    
-    print(f"[ERROR] 모든 API 키({len(api_keys)}개) 시도 실패. 마지막 에러: {str(last_error)}")
-    llm_config._all_keys_exhausted = True
-    return None
+        except Exception as recover_error:
+            print(f"  [복구 실패] {recover_error}")
+        
+        llm_config._last_failure_kind = 'PARSE_ERROR'
+        return None
 
 
 def format_criteria(criteria) -> str:
@@ -397,9 +346,9 @@ def majority_voting(validation_results: List[Dict]) -> Dict:
 def apply_confidence_consistency_filtering(
     final_result: Dict,
     consistency_score: float,
-    high_consistency_threshold: float = 0.67,
-    high_confidence_threshold: float = 0.80,
-    low_confidence_threshold: float = 0.50
+    high_consistency_threshold: float = VALIDATION_HIGH_CONSISTENCY,
+    high_confidence_threshold: float = VALIDATION_HIGH_CONFIDENCE,
+    low_confidence_threshold: float = VALIDATION_LOW_CONFIDENCE
 ) -> Dict:
     """Confidence + Consistency 기반 필터링 적용"""
     confidence = final_result.get('confidence')
@@ -463,6 +412,7 @@ def validate_with_multi_run_for_eligibility(
     if not all_validation_results:
         return {
             'nct_id': nct_id,
+            'output_fingerprint': eligibility.get('output_fingerprint'),
             'final_status': 'UNCERTAIN',
             'consistency_score': 0.0,
             'validation_results': [],
@@ -491,6 +441,7 @@ def validate_with_multi_run_for_eligibility(
     
     return {
         'nct_id': nct_id,
+        'output_fingerprint': eligibility.get('output_fingerprint'),
         'final_status': filtered_result['status'],
         'consistency_score': consistency_score,
         'validation_results': new_validation_results,  # 새로 수행한 검증만
@@ -532,7 +483,7 @@ def validate_batch_eligibility(eligibility_list: List[Dict], num_validations: in
         for eligibility in eligibility_list:
             nct_id = eligibility.get('nct_id')
             if nct_id:
-                existing_results = get_existing_validation_history(conn, nct_id)
+                existing_results = get_existing_validation_history(conn, nct_id, eligibility.get('output_fingerprint'))
                 if existing_results:
                     existing_results_by_eligibility[nct_id] = existing_results
     
@@ -547,7 +498,11 @@ def validate_batch_eligibility(eligibility_list: List[Dict], num_validations: in
             break
         
         # 배치 단위로 1회 검증
-        run_results = validate_batch_single_run(eligibility_list)
+        # 모델 캐스케이드: UNCERTAIN/신뢰도 미달 항목만 상위 모델로 다시 검증 (사용 모델은 결과의 'model')
+        run_results = process_with_cascade(
+            eligibility_list, validate_batch_single_run, item_key='nct_id',
+            needs_escalation_fn=needs_validation_escalation, notes_key='notes', model_key='model'
+        )
         validation_results_by_run[run_num] = run_results
         
         # 모든 키가 소진되었는지 다시 확인
@@ -575,8 +530,8 @@ def validate_batch_eligibility(eligibility_list: List[Dict], num_validations: in
     return results, validation_results_by_run
 
 
-def get_existing_validation_history(conn, nct_id: str) -> List[Dict]:
-    """기존 검증 이력을 조회"""
+def get_existing_validation_history(conn, nct_id: str, output_fingerprint: str = None) -> List[Dict]:
+    """기존 검증 이력을 조회 (현재 전처리 결과 fingerprint를 검증한 이력만)"""
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute("""
             SELECT 
@@ -585,80 +540,41 @@ def get_existing_validation_history(conn, nct_id: str) -> List[Dict]:
                 validation_notes as notes
             FROM inclusion_exclusion_llm_validation_history
             WHERE nct_id = %s
+              AND output_fingerprint IS NOT DISTINCT FROM %s
             ORDER BY validation_run
-        """, (nct_id,))
+        """, (nct_id, output_fingerprint))
         results = cur.fetchall()
         return [dict(r) for r in results]
 
 
-def save_validation_history_batch(conn, validation_results_by_run: Dict[int, Dict]):
+def save_validation_history_batch(conn, validation_results_by_run: Dict[int, Dict], fingerprints: Dict = None):
     """
-    배치 단위로 검증 이력을 데이터베이스에 저장 (전처리와 동일한 방식)
+    배치 단위로 검증 이력을 데이터베이스에 저장 (validation_run은 DB에서 nct_id별로 부여)
     
     Args:
         conn: 데이터베이스 연결
         validation_results_by_run: {run_number: {nct_id: result}} 형태
+        fingerprints: {nct_id: 검증한 전처리 결과의 output_fingerprint}
     """
     if not validation_results_by_run:
         return
+    fingerprints = fingerprints or {}
     
-    # 모든 nct_id 수집
-    all_nct_ids = set()
-    for run_results in validation_results_by_run.values():
-        all_nct_ids.update(run_results.keys())
-    
-    if not all_nct_ids:
-        return
-    
-    # 각 nct_id별로 기존 이력의 최대 validation_run 조회 (배치로)
-    nct_id_max_runs = {}
-    with conn.cursor() as cur:
-        placeholders = ','.join(['%s'] * len(all_nct_ids))
-        cur.execute(f"""
-            SELECT 
-                nct_id,
-                COALESCE(MAX(validation_run), 0) as max_run
-            FROM inclusion_exclusion_llm_validation_history
-            WHERE nct_id IN ({placeholders})
-            GROUP BY nct_id
-        """, list(all_nct_ids))
-        
-        for row in cur.fetchall():
-            nct_id_max_runs[row[0]] = row[1]
-    
-    # nct_id별로 다음 run 번호 설정
-    nct_id_next_runs = {}
-    for nct_id in all_nct_ids:
-        nct_id_next_runs[nct_id] = nct_id_max_runs.get(nct_id, 0) + 1
-    
-    # 모든 검증 이력 데이터 수집
+    # run 순서대로 이력 행 구성 (같은 nct_id 안에서 행 순서가 validation_run 순서가 됨)
     history_data = []
     for run_num in sorted(validation_results_by_run.keys()):
         run_results = validation_results_by_run[run_num]
         for nct_id, result in run_results.items():
             history_data.append({
                 'nct_id': nct_id,
-                'validation_run': nct_id_next_runs[nct_id],
                 'validation_status': result.get('status'),
                 'validation_confidence': result.get('confidence'),
-                'validation_notes': result.get('notes', '')
+                'validation_notes': result.get('notes', ''),
+                'output_fingerprint': fingerprints.get(nct_id),
+                'validation_model': result.get('model')
             })
-            # 다음 run 번호 증가
-            nct_id_next_runs[nct_id] += 1
     
-    if not history_data:
-        return
-    
-    # 배치로 저장
-    history_sql = """
-        INSERT INTO inclusion_exclusion_llm_validation_history 
-        (nct_id, validation_run, validation_status, validation_confidence, validation_notes)
-        VALUES (%(nct_id)s, %(validation_run)s, %(validation_status)s, %(validation_confidence)s, %(validation_notes)s)
-    """
-    
-    with conn.cursor() as cur:
-        execute_batch(cur, history_sql, history_data, page_size=100)
-        conn.commit()
+    insert_validation_history(conn, 'inclusion_exclusion_llm_validation_history', history_data)
 
 
 def update_validation_results(conn, results: List[Dict], validation_results_by_run: Dict[int, Dict] = None):
@@ -674,45 +590,29 @@ def update_validation_results(conn, results: List[Dict], validation_results_by_r
     if not results:
         return
     
+    # 검증한 전처리 결과 fingerprint (검증 이력과 validated_fingerprint에 기록)
+    fingerprints = {r.get('nct_id'): r.get('output_fingerprint') for r in results}
+    
     # 검증 이력 저장 (배치 단위로)
     if validation_results_by_run:
-        save_validation_history_batch(conn, validation_results_by_run)
+        save_validation_history_batch(conn, validation_results_by_run, fingerprints)
     else:
-        # 기존 방식 (개별 검증 결과) - 하위 호환성
+        # 기존 방식 (개별 검증 결과) - 하위 호환성: 결과별 검증 이력을 모아 한 번에 저장
+        history_data = []
         for result in results:
             nct_id = result.get('nct_id')
-            validation_results = result.get('validation_results', [])
-            if nct_id and validation_results:
-                # 개별 저장 (하위 호환성)
-                nct_id_max_runs = {}
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        SELECT COALESCE(MAX(validation_run), 0) as max_run
-                        FROM inclusion_exclusion_llm_validation_history
-                        WHERE nct_id = %s
-                    """, (nct_id,))
-                    result_row = cur.fetchone()
-                    start_run = (result_row[0] if result_row else 0) + 1
-                
-                history_sql = """
-                    INSERT INTO inclusion_exclusion_llm_validation_history 
-                    (nct_id, validation_run, validation_status, validation_confidence, validation_notes)
-                    VALUES (%(nct_id)s, %(validation_run)s, %(validation_status)s, %(validation_confidence)s, %(validation_notes)s)
-                """
-                
-                history_data = []
-                for idx, val_result in enumerate(validation_results, start_run):
-                    history_data.append({
-                        'nct_id': nct_id,
-                        'validation_run': idx,
-                        'validation_status': val_result.get('status'),
-                        'validation_confidence': val_result.get('confidence'),
-                        'validation_notes': val_result.get('notes', '')
-                    })
-                
-                with conn.cursor() as cur:
-                    execute_batch(cur, history_sql, history_data, page_size=100)
-                    conn.commit()
+            if not nct_id:
+                continue
+            for val_result in result.get('validation_results', []):
+                history_data.append({
+                    'nct_id': nct_id,
+                    'validation_status': val_result.get('status'),
+                    'validation_confidence': val_result.get('confidence'),
+                    'validation_notes': val_result.get('notes', ''),
+                    'output_fingerprint': fingerprints.get(nct_id),
+                    'validation_model': val_result.get('model')
+                })
+        insert_validation_history(conn, 'inclusion_exclusion_llm_validation_history', history_data)
     
     # 메인 테이블 업데이트
     update_sql = """
@@ -725,6 +625,7 @@ def update_validation_results(conn, results: List[Dict], validation_results_by_r
             validation_count = %(validation_count)s,
             needs_manual_review = %(needs_manual_review)s,
             avg_validation_confidence = %(average_confidence)s,
+            validated_fingerprint = COALESCE(%(validated_fingerprint)s, validated_fingerprint),
             updated_at = CURRENT_TIMESTAMP
         WHERE nct_id = %(nct_id)s
     """
@@ -739,11 +640,13 @@ def update_validation_results(conn, results: List[Dict], validation_results_by_r
             'consistency_score': result.get('consistency_score'),
             'validation_count': result.get('validation_count', 1),
             'needs_manual_review': result.get('needs_manual_review', False),
-            'average_confidence': result.get('average_confidence')
+            'average_confidence': result.get('average_confidence'),
+            # 이번 실행에서 실제로 검증한 경우에만 validated_fingerprint 갱신
+            'validated_fingerprint': result.get('output_fingerprint') if result.get('validation_results') else None
         })
     
     with conn.cursor() as cur:
-        execute_batch(cur, update_sql, update_data, page_size=100)
+        execute_prepared_batch(cur, 'inclusion_exclusion_llm_validation_update', update_sql, update_data, page_size=100)
         conn.commit()
 
 
@@ -912,7 +815,11 @@ def main():
         sys.exit(1)
     
     # 명령줄 인자 파싱
-    # 사용법: python llm_validate_inclusion_exclusion.py [limit] [num_validations] [batch_size] [start_batch]
+    # 사용법: python llm_validate_inclusion_exclusion.py [limit] [num_validations] [batch_size] [start_batch] [--changed-only] [--resume]
+    # --changed-only: 전처리 결과(output_fingerprint)가 마지막 검증 이후 바뀌었거나 검증되지 않은 항목만 검증
+    # --resume: 중단된 실행의 체크포인트(checkpoints/inclusion_exclusion_validation.json)에서 이어서 검증 (start_batch 무시)
+    changed_only = '--changed-only' in sys.argv[1:]
+    resume = '--resume' in sys.argv[1:]
     limit = None
     num_validations = 3  # 기본값: 3회
     custom_batch_size = None
@@ -937,8 +844,13 @@ def main():
             start_batch = 1
     
     print(f"\n[INFO] 사용 가능한 API 키: {len(api_keys)}개")
-    print(f"[INFO] 사용 모델: {GEMINI_MODEL}")
+    purge_old_windows()
+    blocked_keys = [k for k in get_usage_summary(api_keys) if k['blocked_until']]
+    print(f"[INFO] 쿼터 원장: 차단된 키 {len(blocked_keys)}/{len(api_keys)}개 (일일 리셋 또는 분당 한도 해제 시 자동 복구)")
+    print(f"[INFO] 사용 모델: {' → '.join(get_model_tiers())}")
     print(f"[INFO] 다중 검증 횟수: {num_validations}회")
+    if changed_only:
+        print("[INFO] 검증 모드: 전처리 결과가 바뀐 항목만 (fingerprint 비교)")
     
     # 배치 크기 조정
     if custom_batch_size and custom_batch_size > 0:
@@ -959,11 +871,14 @@ def main():
                     nct_id,
                     eligibility_criteria_raw,
                     inclusion_criteria,
-                    exclusion_criteria
-                FROM inclusion_exclusion_llm_preprocessed
+                    exclusion_criteria,
+                    output_fingerprint
+                FROM inclusion_exclusion_llm_preprocessed_with_raw
                 WHERE llm_status = 'SUCCESS'
-                ORDER BY nct_id
             """
+            if changed_only:
+                query += " AND validated_fingerprint IS DISTINCT FROM output_fingerprint"
+            query += " ORDER BY nct_id"
             
             if limit:
                 query += f" LIMIT {limit}"
@@ -971,11 +886,24 @@ def main():
             cur.execute(query)
             eligibility_list = cur.fetchall()
         
+        # 체크포인트: --resume이면 저장하지 못한 검증 결과를 먼저 저장하고 마지막 처리 키 이후 항목만 검증
+        checkpoint = RunCheckpoint('inclusion_exclusion_validation', {
+            'limit': limit, 'num_validations': num_validations, 'changed_only': changed_only
+        })
+        if resume and checkpoint.resume():
+            # 보관된 결과의 validation_results(이번 실행 검증분)로 검증 이력도 함께 저장
+            update_validation_results(conn, checkpoint.pending or [], None)
+            checkpoint.advance(checkpoint.watermark)
+            eligibility_list = after_watermark(eligibility_list, lambda e: e['nct_id'], checkpoint.watermark)
+            start_batch = 1
+        install_signal_handlers()
+        
         total_count = len(eligibility_list)
         print(f"\n[INFO] 처리할 SUCCESS 항목: {total_count:,}개")
         
         if total_count == 0:
             print("[INFO] 처리할 항목이 없습니다.")
+            checkpoint.complete()
             # 리포트만 생성
             print("\n[STEP] 검증 결과 리포트 생성 중...")
             generate_validation_report(conn)
@@ -1025,6 +953,9 @@ def main():
                 print(f"\n[ERROR] 모든 API 키가 소진되어 처리 중단합니다.")
                 break
             
+            # 저장 전 중단되면 이 배치 검증 결과를 체크포인트에 보관
+            checkpoint.hold(batch_results, batch_eligibility[-1]['nct_id'])
+            
             # 결과 집계
             for result in batch_results:
                 status = result.get('final_status', '')
@@ -1058,6 +989,7 @@ def main():
             if batch_results:
                 print(f"  배치 {batch_num} 결과 저장 중... ({len(batch_results)}개)")
                 update_validation_results(conn, batch_results, validation_results_by_run)
+            checkpoint.advance(batch_eligibility[-1]['nct_id'])
             
             # 모든 키가 소진되었으면 배치 루프도 중단
             if llm_config._all_keys_exhausted:
@@ -1076,6 +1008,11 @@ def main():
         print(f"  중간 일관성 (0.33~0.67): {medium_consistency_count:,}개 ({medium_consistency_count/total_count*100:.1f}%)")
         print(f"  낮은 일관성 (<0.33): {low_consistency_count:,}개 ({low_consistency_count/total_count*100:.1f}%)")
         print(f"\n[INFO] 수동 검토 필요: {manual_review_count:,}개 ({manual_review_count/total_count*100:.1f}%)")
+        print_cascade_stats()
+        
+        # 키 소진으로 중단된 경우 체크포인트 유지
+        if not llm_config._all_keys_exhausted:
+            checkpoint.complete()
         
         # 리포트 생성
         print("\n[STEP 2] 검증 결과 리포트 생성 중...")
@@ -1089,6 +1026,10 @@ def main():
         traceback.print_exc()
         if 'conn' in locals():
             conn.close()
+    finally:
+        # 오류/중단(Ctrl+C, SIGTERM) 시 재개 지점과 저장하지 못한 검증 결과 기록
+        if 'checkpoint' in locals():
+            checkpoint.save()
 
 
 if __name__ == "__main__":
@@ -33,14 +33,6 @@ from llm_config import (
 
 load_dotenv()
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
-
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
@@ -60,12 +52,14 @@ def get_reprocessed_items(conn, limit: Optional[int] = None) -> List[Dict]:
             SELECT 
                 ier.nct_id,
                 ier.eligibility_criteria_raw,
-                ier.phase,
+                s.phase,
                 iep.inclusion_criteria,
                 iep.exclusion_criteria,
                 iep.llm_status,
                 iep.llm_validation_status
             FROM inclusion_exclusion_raw ier
+            INNER JOIN study_raw s
+                ON s.nct_id = ier.nct_id
             INNER JOIN inclusion_exclusion_llm_preprocessed iep
                 ON ier.nct_id = iep.nct_id
             WHERE iep.llm_status = 'SUCCESS'
@@ -6,10 +6,10 @@ Gemini API를 사용하여 파싱 결과를 검증합니다.
 """
 
 import os
+import sys
 import json
 import time
 from typing import Dict, Optional, List
-import psycopg2
 from psycopg2.extras import RealDictCursor, execute_batch
 from dotenv import load_dotenv
 from llm_config import (
@@ -20,18 +20,9 @@ from llm_prompts import get_validation_prompt
 
 load_dotenv()
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
-
-
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection
 
 
 def call_gemini_api(prompt: str) -> Optional[Dict]:
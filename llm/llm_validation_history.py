@@ -0,0 +1,87 @@
+"""
+검증 이력 일괄 저장 (outcome / Inclusion/Exclusion 공통)
+
+배치의 검증 이력 행을 배열 파라미터 하나로 보내고, validation_run 번호는 DB가
+기존 최대값 + ROW_NUMBER() OVER (PARTITION BY 키)로 매깁니다. 배치당 SQL 1문장입니다.
+
+행 순서(run 순서)가 같은 키 안에서의 validation_run 순서가 됩니다.
+"""
+
+from typing import Dict, List
+
+# 이력 테이블별 (키 컬럼, 키 배열 타입)
+HISTORY_TABLES = {
+    'outcome_llm_validation_history': ('outcome_id', 'integer'),
+    'inclusion_exclusion_llm_validation_history': ('nct_id', 'varchar'),
+}
+
+
+def insert_validation_history(conn, table: str, rows: List[Dict]) -> int:
+    """
+    검증 이력 행을 한 문장으로 저장 (validation_run은 DB에서 키별로 부여)
+
+    Args:
+        conn: 데이터베이스 연결
+        table: 이력 테이블 이름 (HISTORY_TABLES)
+        rows: [{키 컬럼, 'validation_status', 'validation_confidence', 'validation_notes', 'output_fingerprint',
+                'validation_model'}, ...]
+              같은 키의 행은 run 순서대로 정렬되어 있어야 함
+
+    Returns:
+        저장된 행 수
+    """
+    if not rows:
+        return 0
+    key_column, key_type = HISTORY_TABLES[table]
+
+    sql = f"""
+        WITH v AS (
+            SELECT *
+            FROM unnest(
+                %(keys)s::{key_type}[],
+                %(statuses)s::varchar[],
+                %(confidences)s::numeric[],
+                %(notes)s::text[],
+                %(fingerprints)s::varchar[],
+                %(models)s::varchar[]
+            ) WITH ORDINALITY AS t(
+                {key_column}, validation_status, validation_confidence, validation_notes, output_fingerprint,
+                validation_model, row_order
+            )
+        ),
+        max_runs AS (
+            SELECT h.{key_column}, MAX(h.validation_run) AS max_run
+            FROM {table} h
+            WHERE h.{key_column} IN (SELECT DISTINCT {key_column} FROM v)
+            GROUP BY h.{key_column}
+        )
+        INSERT INTO {table}
+        ({key_column}, validation_run, validation_status, validation_confidence, validation_notes, output_fingerprint,
+         validation_model)
+        SELECT
+            v.{key_column},
+            COALESCE(m.max_run, 0) + ROW_NUMBER() OVER (PARTITION BY v.{key_column} ORDER BY v.row_order),
+            v.validation_status,
+            v.validation_confidence,
+            v.validation_notes,
+            v.output_fingerprint,
+            v.validation_model
+        FROM v
+        LEFT JOIN max_runs m ON m.{key_column} = v.{key_column}
+    """
+    params = {
+        'keys': [row[key_column] for row in rows],
+        'statuses': [row.get('validation_status') for row in rows],
+        'confidences': [row.get('validation_confidence') for row in rows],
+        'notes': [row.get('validation_notes') or '' for row in rows],
+        'fingerprints': [row.get('output_fingerprint') for row in rows],
+        'models': [row.get('validation_model') for row in rows],
+    }
+
+    with conn.cursor() as cur:
+        # 같은 테이블에 동시에 쓰는 검증 프로세스가 같은 run 번호를 받지 않도록 트랜잭션 단위 잠금
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (table,))
+        cur.execute(sql, params)
+        inserted = cur.rowcount
+    conn.commit()
+    return inserted
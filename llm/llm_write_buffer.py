@@ -0,0 +1,189 @@
+"""
+LLM 결과 지연 쓰기 버퍼 (write-behind)
+
+API 루프는 배치 결과를 메모리 대기열에 넣기만 하고, 백그라운드 저장 스레드가 자체 DB 연결(공유 연결 풀)로
+누적된 결과를 한 번에 upsert합니다. API 호출과 DB 저장이 겹쳐 실행되므로 배치마다 DB 왕복을 기다리지 않습니다.
+
+- 누적 항목 수가 WRITE_BUFFER_FLUSH_SIZE 이상이거나 WRITE_BUFFER_FLUSH_INTERVAL초가 지나면 저장
+- 대기열은 WRITE_BUFFER_MAX_QUEUE 배치로 제한 (DB가 계속 느리면 API 루프가 대기하여 메모리 사용 제한)
+- close() 시 남은 결과를 모두 저장. SIGTERM은 SystemExit으로 바꿔 호출 측 finally에서 close()가 실행되도록 함
+- 저장 실패 시 결과를 보존하고 다음 주기에 재시도. 종료 시에도 실패하면 on_unsaved(체크포인트)로 넘기거나
+  data/ 아래 JSON 파일로 남김
+- on_flush(kind, rows)는 저장이 끝난 행으로 호출됨 (체크포인트 watermark 갱신용, 저장 스레드에서 실행)
+
+사용 예:
+    writer = WriteBehindBuffer({'results': write_fn}, get_connection=get_db_connection, name='outcome_preprocess')
+    writer.start()
+    try:
+        writer.put('results', rows)
+    finally:
+        writer.close()
+"""
+
+import os
+import json
+import time
+import queue
+import signal
+import atexit
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from llm_config import WRITE_BUFFER_FLUSH_SIZE, WRITE_BUFFER_FLUSH_INTERVAL, WRITE_BUFFER_MAX_QUEUE
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_STOP = object()
+
+
+class WriteBehindBuffer:
+    """종류별 저장 함수 writers[kind](conn, rows)로 누적된 행을 일괄 저장하는 백그라운드 버퍼"""
+
+    def __init__(
+        self,
+        writers: Dict[str, Callable[[object, List], None]],
+        get_connection: Callable,
+        name: str = 'llm',
+        flush_size: int = WRITE_BUFFER_FLUSH_SIZE,
+        flush_interval: float = WRITE_BUFFER_FLUSH_INTERVAL,
+        max_queue: int = WRITE_BUFFER_MAX_QUEUE,
+        on_flush: Optional[Callable[[str, List], None]] = None,
+        on_unsaved: Optional[Callable[[Dict[str, List]], None]] = None
+    ):
+        self.writers = writers
+        self.get_connection = get_connection
+        self.name = name
+        self.flush_size = max(flush_size, 1)
+        self.flush_interval = max(flush_interval, 0.1)
+        self.on_flush = on_flush
+        self.on_unsaved = on_unsaved
+        self._queue = queue.Queue(maxsize=max(max_queue, 1))
+        self._pending = {kind: [] for kind in writers}
+        self._thread = None
+        self._closed = False
+        self._previous_sigterm = None
+        self.stats = {'queued': 0, 'written': 0, 'flushes': 0, 'failed_flushes': 0}
+
+    def start(self) -> 'WriteBehindBuffer':
+        """저장 스레드 시작 (메인 스레드면 SIGTERM 시에도 남은 결과를 저장하도록 설정)"""
+        self._thread = threading.Thread(target=self._run, name=f'write-buffer-{self.name}', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        if threading.current_thread() is threading.main_thread():
+            self._previous_sigterm = signal.signal(signal.SIGTERM, _raise_system_exit)
+        return self
+
+    def put(self, kind: str, rows: List):
+        """저장할 행을 대기열에 추가 (대기열이 가득 찬 경우에만 대기)"""
+        if not rows:
+            return
+        if self._closed:
+            raise RuntimeError(f"[{self.name}] 이미 종료된 저장 버퍼입니다.")
+        self.stats['queued'] += len(rows)
+        self._queue.put((kind, list(rows)))
+
+    def flush(self):
+        """지금까지 넣은 행이 모두 저장될 때까지 대기"""
+        if self._thread is None or self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        """남은 행을 모두 저장하고 저장 스레드 종료 (여러 번 호출해도 안전)"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+        if self._previous_sigterm is not None:
+            signal.signal(signal.SIGTERM, self._previous_sigterm)
+            self._previous_sigterm = None
+
+        remaining = sum(len(rows) for rows in self._pending.values())
+        if remaining and self.on_unsaved is not None:
+            self.on_unsaved({kind: rows for kind, rows in self._pending.items() if rows})
+        elif remaining:
+            self._dump_pending()
+        print(f"  [저장 버퍼] {self.stats['written']:,}개 저장 ({self.stats['flushes']:,}회 일괄 저장"
+              + (f", 실패 {self.stats['failed_flushes']:,}회" if self.stats['failed_flushes'] else '') + ")")
+
+    def has_unsaved(self) -> bool:
+        """저장하지 못하고 남은 행이 있는지 (close() 이후 확인)"""
+        return any(self._pending.values())
+
+    def _run(self):
+        conn = None
+        last_flush = time.monotonic()
+        waiters = []
+        stop = False
+        while not stop:
+            timeout = max(self.flush_interval - (time.monotonic() - last_flush), 0)
+            try:
+                job = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                job = None
+
+            if job is _STOP:
+                stop = True
+            elif isinstance(job, threading.Event):
+                waiters.append(job)
+            elif job is not None:
+                kind, rows = job
+                self._pending[kind].extend(rows)
+
+            pending_count = sum(len(rows) for rows in self._pending.values())
+            due = time.monotonic() - last_flush >= self.flush_interval
+            if pending_count and (stop or waiters or due or pending_count >= self.flush_size):
+                conn = self._write_pending(conn)
+            if stop or waiters or due:
+                last_flush = time.monotonic()
+            for done in waiters:
+                done.set()
+            waiters = []
+
+        if conn is not None:
+            conn.close()
+
+    def _write_pending(self, conn):
+        """누적된 행을 종류별로 한 번에 저장 (실패 시 행을 보존하고 연결을 새로 받음)"""
+        try:
+            if conn is None or conn.closed:
+                conn = self.get_connection()
+            for kind, rows in self._pending.items():
+                if rows:
+                    self.writers[kind](conn, rows)
+                    self.stats['written'] += len(rows)
+                    self._pending[kind] = []
+                    if self.on_flush is not None:
+                        self.on_flush(kind, rows)
+            self.stats['flushes'] += 1
+        except Exception as e:
+            self.stats['failed_flushes'] += 1
+            print(f"  [ERROR] [{self.name}] 결과 일괄 저장 실패, 다음 주기에 재시도: {e}")
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                conn.close()
+            conn = None
+        return conn
+
+    def _dump_pending(self):
+        """종료 시까지 저장하지 못한 행을 JSON 파일로 보존"""
+        path = os.path.join(
+            ROOT_DIR, 'data', f"write_buffer_failed_{self.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self._pending, f, ensure_ascii=False, default=str, indent=2)
+        counts = ', '.join(f"{kind} {len(rows):,}개" for kind, rows in self._pending.items() if rows)
+        print(f"  [경고] [{self.name}] 저장하지 못한 결과를 파일로 보존했습니다 ({counts}): {path}")
+
+
+def _raise_system_exit(signum, frame):
+    """SIGTERM → SystemExit (finally 블록과 atexit가 실행되어 버퍼가 비워짐)"""
+    raise SystemExit(128 + signum)
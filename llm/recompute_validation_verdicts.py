@@ -0,0 +1,285 @@
+"""
+검증 이력 기반 최종 판정 일괄 재계산 스크립트
+
+검증기(llm_validate_preprocessed_success.py, llm_validate_inclusion_exclusion.py)가 항목별로 수행하는
+majority_voting / calculate_consistency_score / apply_confidence_consistency_filtering을
+검증 이력 테이블 전체에 대해 SQL 한 문장(GROUP BY + 윈도 함수)으로 재현합니다.
+LLM 호출 없이 임계값만 바꿔 전체 코퍼스의 판정을 다시 계산할 수 있습니다.
+
+판정 규칙 (검증기와 동일):
+1. 현재 결과(output_fingerprint)와 같은 이력 중 마지막 판정에 쓰인 최근 validation_count회만 집계
+   (판정 없이 이력만 추가된 회차가 있어도 임계값이 같으면 저장된 판정이 그대로 재현됨)
+2. 가장 많이 나온 상태가 최종 상태, 동률이면 UNCERTAIN ([TIE] 노트, 상태는 처음 나온 순서)
+3. 일관성 점수 = 최다 상태 횟수 / 전체 검증 횟수
+4. 최종 신뢰도 = 최종 상태 이력의 평균 신뢰도 (최종 상태 이력이 없으면 전체 평균)
+5. 일관성 ≥ HIGH_CONSISTENCY 이고 신뢰도 ≥ LOW_CONFIDENCE 가 아니면 수동 검토
+   (ACCEPT / REVALIDATE 구분은 HIGH_CONFIDENCE 기준, 통계 출력용)
+
+사용법:
+    python llm/recompute_validation_verdicts.py                          # 통계만 확인 (dry run)
+    python llm/recompute_validation_verdicts.py --execute                # 판정 재계산 반영
+    python llm/recompute_validation_verdicts.py --low-confidence 0.6 --execute
+"""
+
+import os
+import sys
+from psycopg2.extras import RealDictCursor
+from dotenv import load_dotenv
+from llm_config import (
+    VALIDATION_HIGH_CONSISTENCY, VALIDATION_HIGH_CONFIDENCE, VALIDATION_LOW_CONFIDENCE
+)
+
+load_dotenv()
+
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection
+
+# 파이프라인별 (전처리 테이블, 전처리 키 컬럼, 이력 테이블, 이력 키 컬럼)
+PIPELINES = {
+    'outcome': ('outcome_llm_preprocessed', 'id', 'outcome_llm_validation_history', 'outcome_id'),
+    'inclusion_exclusion': ('inclusion_exclusion_llm_preprocessed', 'nct_id', 'inclusion_exclusion_llm_validation_history', 'nct_id'),
+}
+
+
+def build_verdict_cte(pipeline: str) -> str:
+    """이력 → 항목별 최종 판정(verdicts)을 계산하는 CTE (임계값은 %(...)s 파라미터)"""
+    table, key_column, history_table, history_key = PIPELINES[pipeline]
+    return f"""
+        WITH ranked AS (
+            SELECT
+                h.{history_key} AS item_key,
+                COALESCE(h.validation_status, '') AS status,
+                h.validation_confidence::float8 AS confidence,
+                h.validation_run,
+                p.validation_count,
+                ROW_NUMBER() OVER (PARTITION BY h.{history_key} ORDER BY h.validation_run DESC) AS recency
+            FROM {history_table} h
+            JOIN {table} p ON p.{key_column} = h.{history_key}
+            WHERE p.llm_status = 'SUCCESS'
+              AND h.output_fingerprint IS NOT DISTINCT FROM p.output_fingerprint
+        ),
+        -- 마지막 판정에 쓰인 최근 validation_count회 (판정 기록이 없으면 전체 이력)
+        h AS (
+            SELECT item_key, status, confidence, validation_run
+            FROM ranked
+            WHERE validation_count IS NULL OR validation_count < 1 OR recency <= validation_count
+        ),
+        status_counts AS (
+            SELECT
+                item_key,
+                status,
+                COUNT(*) AS cnt,
+                AVG(confidence) AS avg_conf,
+                MIN(validation_run) AS first_run,
+                MAX(COUNT(*)) OVER (PARTITION BY item_key) AS max_cnt
+            FROM h
+            GROUP BY item_key, status
+        ),
+        totals AS (
+            SELECT item_key, COUNT(*) AS n, AVG(confidence) AS avg_all
+            FROM h
+            GROUP BY item_key
+        ),
+        winners AS (
+            SELECT
+                item_key,
+                MAX(max_cnt) AS max_cnt,
+                COUNT(*) AS n_winners,
+                MIN(status) AS winner_status,
+                string_agg(status, ', ' ORDER BY first_run, status) AS tied_statuses
+            FROM status_counts
+            WHERE cnt = max_cnt
+            GROUP BY item_key
+        ),
+        voted AS (
+            SELECT
+                t.item_key,
+                t.n,
+                t.avg_all,
+                w.max_cnt::float8 / t.n AS consistency,
+                CASE WHEN w.n_winners > 1 THEN 'UNCERTAIN' ELSE w.winner_status END AS final_status,
+                CASE
+                    WHEN w.n_winners > 1 THEN '[TIE] 동률 발생: ' || w.tied_statuses || '. 보수적으로 UNCERTAIN 처리.'
+                    ELSE '[MAJORITY] ' || w.max_cnt || '/' || t.n || '회 일치'
+                END AS notes
+            FROM totals t
+            JOIN winners w ON w.item_key = t.item_key
+        ),
+        scored AS (
+            SELECT
+                v.*,
+                -- 최종 상태 이력이 없으면(동률 → UNCERTAIN) 전체 평균 신뢰도
+                CASE WHEN fs.item_key IS NOT NULL THEN fs.avg_conf ELSE v.avg_all END AS final_confidence
+            FROM voted v
+            LEFT JOIN status_counts fs ON fs.item_key = v.item_key AND fs.status = v.final_status
+        ),
+        verdicts AS (
+            SELECT
+                s.*,
+                CASE
+                    WHEN s.consistency >= %(high_consistency)s
+                         AND COALESCE(s.final_confidence, 0) >= %(high_confidence)s THEN 'ACCEPT'
+                    WHEN s.consistency >= %(high_consistency)s
+                         AND COALESCE(s.final_confidence, 0) >= %(low_confidence)s THEN 'REVALIDATE'
+                    ELSE 'MANUAL_REVIEW'
+                END AS action
+            FROM scored s
+        )
+    """
+
+
+def recompute_verdicts(conn, pipeline: str, thresholds: dict, dry_run: bool = True) -> int:
+    """
+    검증 이력으로 파이프라인 전체 항목의 최종 판정을 재계산
+
+    Args:
+        conn: 데이터베이스 연결
+        pipeline: 'outcome' 또는 'inclusion_exclusion'
+        thresholds: {'high_consistency', 'high_confidence', 'low_confidence'}
+        dry_run: True면 실제 업데이트하지 않고 통계만 출력
+
+    Returns:
+        판정이 바뀐(또는 바뀔) 항목 수
+    """
+    table, key_column, _, _ = PIPELINES[pipeline]
+    verdict_cte = build_verdict_cte(pipeline)
+    # 저장 컬럼 정밀도(NUMERIC(3,2))로 맞춘 뒤 비교해야 값이 그대로인 항목을 다시 쓰지 않음
+    changed_condition = """
+        p.llm_validation_status IS DISTINCT FROM s.final_status
+        OR p.llm_validation_notes IS DISTINCT FROM s.notes
+        OR p.llm_validation_confidence IS DISTINCT FROM ROUND(s.final_confidence::numeric, 2)
+        OR p.validation_consistency_score IS DISTINCT FROM ROUND(s.consistency::numeric, 2)
+        OR p.validation_count IS DISTINCT FROM s.n
+        OR p.needs_manual_review IS DISTINCT FROM (s.action = 'MANUAL_REVIEW')
+        OR p.avg_validation_confidence IS DISTINCT FROM ROUND(s.avg_all::numeric, 2)
+    """
+
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(f"""
+            {verdict_cte}
+            SELECT
+                s.final_status,
+                s.action,
+                COUNT(*) AS total,
+                COUNT(*) FILTER (WHERE {changed_condition}) AS changed,
+                COUNT(*) FILTER (WHERE p.needs_manual_review IS DISTINCT FROM (s.action = 'MANUAL_REVIEW')) AS review_flag_changed
+            FROM verdicts s
+            JOIN {table} p ON p.{key_column} = s.item_key
+            GROUP BY s.final_status, s.action
+            ORDER BY s.final_status, s.action
+        """, thresholds)
+        rows = cur.fetchall()
+
+        total = sum(row['total'] for row in rows)
+        changed = sum(row['changed'] for row in rows)
+        print(f"\n[{pipeline}] 이력이 있는 항목: {total:,}개, 판정 변경: {changed:,}개")
+        for row in rows:
+            print(f"  {row['final_status']:<12} {row['action']:<14} {row['total']:>8,}개 "
+                  f"(변경 {row['changed']:,}개, 수동 검토 플래그 변경 {row['review_flag_changed']:,}개)")
+
+        if dry_run or changed == 0:
+            return changed
+
+        cur.execute(f"""
+            {verdict_cte}
+            UPDATE {table} p
+            SET
+                llm_validation_status = s.final_status,
+                llm_validation_confidence = s.final_confidence,
+                llm_validation_notes = s.notes,
+                validation_consistency_score = s.consistency,
+                validation_count = s.n,
+                needs_manual_review = (s.action = 'MANUAL_REVIEW'),
+                avg_validation_confidence = s.avg_all,
+                updated_at = CURRENT_TIMESTAMP
+            FROM verdicts s
+            WHERE p.{key_column} = s.item_key
+              AND ({changed_condition})
+        """, thresholds)
+        updated = cur.rowcount
+    conn.commit()
+    print(f"  [OK] {updated:,}개 항목 판정 갱신")
+    return updated
+
+
+def main():
+    """메인 함수"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='검증 이력 기반 최종 판정 일괄 재계산 (LLM 호출 없음)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+사용 예시:
+  python llm/recompute_validation_verdicts.py                                   # 통계만 확인 (dry run)
+  python llm/recompute_validation_verdicts.py --execute                         # 판정 재계산 반영
+  python llm/recompute_validation_verdicts.py --pipeline outcome --high-consistency 0.6 --execute
+        """
+    )
+    parser.add_argument(
+        '--pipeline',
+        choices=['all'] + list(PIPELINES.keys()),
+        default='all',
+        help='재계산할 파이프라인 (기본값: all)'
+    )
+    parser.add_argument(
+        '--high-consistency',
+        type=float,
+        default=VALIDATION_HIGH_CONSISTENCY,
+        help=f'일관성 임계값 (기본값: {VALIDATION_HIGH_CONSISTENCY})'
+    )
+    parser.add_argument(
+        '--high-confidence',
+        type=float,
+        default=VALIDATION_HIGH_CONFIDENCE,
+        help=f'자동 수용 신뢰도 임계값 (기본값: {VALIDATION_HIGH_CONFIDENCE})'
+    )
+    parser.add_argument(
+        '--low-confidence',
+        type=float,
+        default=VALIDATION_LOW_CONFIDENCE,
+        help=f'수동 검토 신뢰도 임계값 (기본값: {VALIDATION_LOW_CONFIDENCE})'
+    )
+    parser.add_argument(
+        '--execute',
+        action='store_true',
+        help='실제로 업데이트 수행 (기본값: dry run)'
+    )
+
+    args = parser.parse_args()
+    thresholds = {
+        'high_consistency': args.high_consistency,
+        'high_confidence': args.high_confidence,
+        'low_confidence': args.low_confidence
+    }
+    pipelines = list(PIPELINES.keys()) if args.pipeline == 'all' else [args.pipeline]
+
+    print("=" * 80)
+    print("[START] 검증 이력 기반 최종 판정 재계산")
+    print("=" * 80)
+    print(f"[INFO] 임계값: 일관성 ≥ {args.high_consistency}, 신뢰도 ACCEPT ≥ {args.high_confidence}, "
+          f"수동 검토 < {args.low_confidence}")
+    if not args.execute:
+        print("[DRY RUN] 실제 업데이트는 수행하지 않습니다.")
+
+    try:
+        conn = get_db_connection()
+
+        for pipeline in pipelines:
+            recompute_verdicts(conn, pipeline, thresholds, dry_run=not args.execute)
+
+        print("\n[완료] 작업이 완료되었습니다.")
+
+    except Exception as e:
+        print(f"\n[ERROR] 오류 발생: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
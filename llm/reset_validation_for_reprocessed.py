@@ -2,23 +2,21 @@
 재전처리 완료 항목의 검증 상태 초기화 스크립트
 
 이미 재전처리 완료된 항목들 중 검증 상태가 남아있는 항목의 검증 관련 필드를 초기화합니다.
+
+참고: sql/add_output_fingerprint_columns.sql 적용 후에는 초기화 없이
+llm_validate_inclusion_exclusion.py --changed-only로 결과가 바뀐 항목만 재검증할 수 있습니다.
 """
 
 import os
 import sys
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
 load_dotenv()
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection
 
 
 def reset_validation_for_reprocessed(conn, dry_run: bool = True):
@@ -149,7 +147,7 @@ def main():
     print("=" * 80)
     
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_db_connection()
         
         reset_validation_for_reprocessed(conn, dry_run=not args.execute)
         
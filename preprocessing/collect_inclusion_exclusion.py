@@ -13,13 +13,11 @@ ClinicalTrials.gov API를 통한 Inclusion/Exclusion Criteria 데이터 수집 
 """
 
 import os
-import json
+import sys
 import time
 import requests
 from typing import List, Dict, Optional
 from pathlib import Path
-import psycopg2
-from psycopg2.extras import execute_batch
 
 
 # API 설정
@@ -27,19 +25,10 @@ API_BASE_URL = "https://clinicaltrials.gov/api/v2/studies"
 PAGE_SIZE = 500  # API 최대값 (1000까지 가능하지만 안정성을 위해 500)
 REQUEST_DELAY = 0.5  # API 호출 간 딜레이 (초) - Rate limiting 방지
 
-# DB 연결 설정
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', 'tests1234')
-}
-
-
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection, execute_prepared_batch
+from study_raw import extract_study, upsert_studies
 
 
 def fetch_studies_page(query_params: Dict, page_token: Optional[str] = None) -> Dict:
@@ -69,26 +58,6 @@ def fetch_studies_page(query_params: Dict, page_token: Optional[str] = None) ->
         raise
 
 
-def extract_phase(study: Dict) -> str:
-    """
-    Study JSON에서 phase 정보 추출
-    
-    Returns:
-        phase 문자열 (예: "PHASE1", "PHASE2", "PHASE3", "PHASE4", "NA" 등)
-        phase 정보가 없으면 'NA' 반환
-    """
-    design_module = study.get('protocolSection', {}).get('designModule', {})
-    phases = design_module.get('phases', [])
-    
-    if not phases:
-        return 'NA'
-    
-    # phases는 배열이므로 여러 phase가 있을 수 있음
-    # 예: ["PHASE1", "PHASE2"] -> "PHASE1,PHASE2"로 결합
-    phase_str = ','.join(phases)
-    return phase_str if phase_str else 'NA'
-
-
 def extract_eligibility_criteria(study: Dict) -> Optional[str]:
     """
     Study JSON에서 eligibilityCriteria 추출
@@ -131,6 +100,7 @@ def is_drug_only_study(study: Dict) -> bool:
 def extract_eligibility_data(study: Dict) -> Optional[Dict]:
     """
     Study JSON에서 eligibilityCriteria 데이터 추출
+    (phase 등 study 레벨 정보와 원본 JSON은 study_raw에 저장)
     
     Returns:
         eligibility 데이터 딕셔너리 (eligibilityCriteria가 없어도 null로 수집)
@@ -149,42 +119,29 @@ def extract_eligibility_data(study: Dict) -> Optional[Dict]:
     else:
         criteria_text = None
     
-    # source_version 추출 (derivedSection.miscInfoModule.versionHolder)
-    source_version = study.get('derivedSection', {}).get('miscInfoModule', {}).get('versionHolder')
-    
-    # phase 정보 추출
-    phase = extract_phase(study)
-    
     return {
         'nct_id': nct_id,
-        'eligibility_criteria_raw': criteria_text,  # None일 수 있음
-        'phase': phase,
-        'source_version': source_version,
-        'raw_json': json.dumps(study)  # 원본 study JSON 보존
+        'eligibility_criteria_raw': criteria_text  # None일 수 있음
     }
 
 
 def insert_eligibility_criteria(conn, eligibility_list: List[Dict]):
-    """inclusion_exclusion_raw 테이블에 eligibilityCriteria 삽입"""
+    """inclusion_exclusion_raw 테이블에 eligibilityCriteria 삽입 (study_raw에 해당 연구가 먼저 있어야 함)"""
     if not eligibility_list:
         return
     
     insert_sql = """
         INSERT INTO inclusion_exclusion_raw 
-        (nct_id, eligibility_criteria_raw, phase, source_version, raw_json)
-        VALUES (%(nct_id)s, %(eligibility_criteria_raw)s, %(phase)s, 
-                %(source_version)s, %(raw_json)s::jsonb)
+        (nct_id, eligibility_criteria_raw)
+        VALUES (%(nct_id)s, %(eligibility_criteria_raw)s)
         ON CONFLICT (nct_id) 
         DO UPDATE SET
             eligibility_criteria_raw = EXCLUDED.eligibility_criteria_raw,
-            phase = EXCLUDED.phase,
-            source_version = EXCLUDED.source_version,
-            raw_json = EXCLUDED.raw_json,
             ingested_at = CURRENT_TIMESTAMP
     """
     
     with conn.cursor() as cur:
-        execute_batch(cur, insert_sql, eligibility_list, page_size=100)
+        execute_prepared_batch(cur, 'inclusion_exclusion_raw_upsert', insert_sql, eligibility_list, page_size=100)
     conn.commit()
 
 
@@ -197,15 +154,11 @@ def collect_all_eligibility_criteria(query_params: Dict):
     """
     conn = get_db_connection()
     
-    # 기존 데이터 삭제 (재수집)
-    print("=" * 60)
-    print("Clearing existing data...")
-    with conn.cursor() as cur:
-        cur.execute("DELETE FROM inclusion_exclusion_raw")
-        deleted_count = cur.rowcount
-        conn.commit()
-    print(f"[OK] Deleted {deleted_count:,} existing records")
-    print("=" * 60)
+    # 재수집: 기존 행은 UPSERT로 갱신하고, 이번 수집에 없는 연구만 마지막에 삭제
+    # (inclusion_exclusion_llm_preprocessed가 원본을 참조하므로 전체 삭제 후 재삽입하면 LLM 결과까지 삭제됨)
+    # 삭제는 마지막 페이지까지 받고 받은 study 수가 API totalCount와 같을 때만 실행 (중간에 멈춘 수집으로 대량 삭제 방지)
+    collected_nct_ids = set()
+    crawl_complete = False
     
     total_collected = 0
     total_filtered = 0  # drug가 아닌 intervention을 가진 study 개수
@@ -245,6 +198,7 @@ def collect_all_eligibility_criteria(query_params: Dict):
             
             # 각 study에서 eligibilityCriteria 추출
             # API 필터는 drug가 포함된 study를 가져오지만, drug만 단독으로 있는 것만 수집
+            all_study_rows = []
             all_eligibility = []
             filtered_count = 0
             
@@ -255,14 +209,22 @@ def collect_all_eligibility_criteria(query_params: Dict):
                     filtered_count += 1
                     continue
                 
+                study_row = extract_study(study)
+                if study_row:
+                    all_study_rows.append(study_row)
+                
                 eligibility_data = extract_eligibility_data(study)
                 if eligibility_data:
                     all_eligibility.append(eligibility_data)
+                    collected_nct_ids.add(eligibility_data['nct_id'])
             
             if filtered_count > 0:
                 print(f"  [FILTERED] Skipped {filtered_count} studies (has non-drug interventions like biomarker)")
             
-            # DB에 삽입 (배치 처리)
+            # DB에 삽입 (배치 처리, inclusion_exclusion_raw가 study_raw를 참조하므로 study 먼저)
+            if all_study_rows:
+                upsert_studies(conn, all_study_rows)
+            
             if all_eligibility:
                 insert_eligibility_criteria(conn, all_eligibility)
                 total_eligibility += len(all_eligibility)
@@ -280,6 +242,7 @@ def collect_all_eligibility_criteria(query_params: Dict):
             # 다음 페이지가 없으면 종료
             if not next_page_token:
                 print("\n모든 페이지 수집 완료!")
+                crawl_complete = True
                 break
             
             page_token = next_page_token
@@ -287,6 +250,21 @@ def collect_all_eligibility_criteria(query_params: Dict):
             # Rate limiting 방지
             time.sleep(REQUEST_DELAY)
         
+        # 이번 수집에 없는 연구 삭제 (LLM 결과도 함께 삭제됨, 완전한 수집이 확인된 경우만)
+        total_seen = total_collected + total_filtered
+        if not (crawl_complete and total_count and total_seen == total_count and collected_nct_ids):
+            print(f"[WARN] 수집이 완전하지 않아 기존 행 삭제를 건너뜁니다 "
+                  f"(마지막 페이지 도달: {crawl_complete}, 받은 study: {total_seen:,}, API totalCount: {total_count})")
+        else:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "DELETE FROM inclusion_exclusion_raw WHERE NOT (nct_id = ANY(%s))",
+                    (list(collected_nct_ids),)
+                )
+                deleted_count = cur.rowcount
+            conn.commit()
+            print(f"[OK] Deleted {deleted_count:,} records no longer in the collection")
+        
         print("\n" + "=" * 60)
         print("Collection Summary")
         print("=" * 60)
@@ -13,12 +13,12 @@ ClinicalTrials.gov API를 통한 Outcomes 데이터 수집 스크립트
 """
 
 import os
+import sys
 import json
 import time
 import requests
 from typing import List, Dict, Optional
 from pathlib import Path
-import psycopg2
 from psycopg2.extras import execute_batch
 
 
@@ -27,19 +27,10 @@ API_BASE_URL = "https://clinicaltrials.gov/api/v2/studies"
 PAGE_SIZE = 500  # API 최대값 (1000까지 가능하지만 안정성을 위해 500)
 REQUEST_DELAY = 0.5  # API 호출 간 딜레이 (초) - Rate limiting 방지
 
-# DB 연결 설정
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', 'tests1234')
-}
-
-
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection, execute_prepared_batch
+from study_raw import extract_study, upsert_studies
 
 
 def fetch_studies_page(query_params: Dict, page_token: Optional[str] = None) -> Dict:
@@ -69,28 +60,6 @@ def fetch_studies_page(query_params: Dict, page_token: Optional[str] = None) ->
         raise
 
 
-def extract_phase(study: Dict) -> str:
-    """
-    Study JSON에서 phase 정보 추출
-    
-    Returns:
-        phase 문자열 (예: "PHASE1", "PHASE2", "PHASE3", "PHASE4", "NA" 등)
-        phase 정보가 없으면 'NA' 반환
-    """
-    design_module = study.get('protocolSection', {}).get('designModule', {})
-    phases = design_module.get('phases', [])
-    
-    if not phases:
-        return 'NA'
-    
-    # phases는 배열이므로 여러 phase가 있을 수 있음
-    # 예: ["PHASE1", "PHASE2"] -> "PHASE1,PHASE2"로 결합
-    # 또는 가장 높은 phase만 사용할 수도 있음
-    # 여기서는 모든 phase를 쉼표로 구분하여 저장
-    phase_str = ','.join(phases)
-    return phase_str if phase_str else 'NA'
-
-
 def is_drug_only_study(study: Dict) -> bool:
     """
     Study의 intervention이 drug만 있는지 확인
@@ -122,6 +91,7 @@ def is_drug_only_study(study: Dict) -> bool:
 def extract_outcomes(study: Dict) -> List[Dict]:
     """
     Study JSON에서 outcomes 추출
+    (phase, intervention 등 study 레벨 정보와 원본 JSON은 study_raw에 연구당 한 번 저장)
     
     Returns:
         outcomes 리스트 (각 outcome은 딕셔너리)
@@ -132,17 +102,6 @@ def extract_outcomes(study: Dict) -> List[Dict]:
     if not nct_id:
         return outcomes
     
-    # source_version 추출 (derivedSection.miscInfoModule.versionHolder)
-    source_version = study.get('derivedSection', {}).get('miscInfoModule', {}).get('versionHolder')
-    
-    # phase 정보 추출 (study 레벨이므로 모든 outcome에 동일하게 적용)
-    phase = extract_phase(study)
-    
-    # intervention 정보 추출 (study 레벨이므로 모든 outcome에 동일하게 적용)
-    arms_interventions_module = study.get('protocolSection', {}).get('armsInterventionsModule', {})
-    interventions_list = arms_interventions_module.get('interventions', [])
-    intervention_json = json.dumps(interventions_list) if interventions_list else None
-    
     outcomes_module = study.get('protocolSection', {}).get('outcomesModule', {})
     
     # Primary Outcomes 추출
@@ -154,11 +113,7 @@ def extract_outcomes(study: Dict) -> List[Dict]:
             'outcome_order': idx,
             'measure_raw': outcome.get('measure'),
             'description_raw': outcome.get('description'),
-            'time_frame_raw': outcome.get('timeFrame'),
-            'phase': phase,
-            'source_version': source_version,
-            'raw_json': json.dumps(outcome),  # 원본 outcome JSON 보존
-            'intervention_json': intervention_json  # 해당 study의 intervention 정보 (원본 JSON 배열)
+            'time_frame_raw': outcome.get('timeFrame')
         })
     
     # Secondary Outcomes 추출
@@ -170,11 +125,7 @@ def extract_outcomes(study: Dict) -> List[Dict]:
             'outcome_order': idx,
             'measure_raw': outcome.get('measure'),
             'description_raw': outcome.get('description'),
-            'time_frame_raw': outcome.get('timeFrame'),
-            'phase': phase,
-            'source_version': source_version,
-            'raw_json': json.dumps(outcome),
-            'intervention_json': intervention_json  # 해당 study의 intervention 정보 (원본 JSON 배열)
+            'time_frame_raw': outcome.get('timeFrame')
         })
     
     return outcomes
@@ -246,32 +197,26 @@ def extract_party_info(study: Dict) -> List[Dict]:
 
 
 def insert_outcomes(conn, outcomes: List[Dict]):
-    """outcome_raw 테이블에 outcomes 삽입"""
+    """outcome_raw 테이블에 outcomes 삽입 (study_raw에 해당 연구가 먼저 있어야 함)"""
     if not outcomes:
         return
     
     insert_sql = """
         INSERT INTO outcome_raw 
         (nct_id, outcome_type, outcome_order, measure_raw, description_raw, 
-         time_frame_raw, phase, raw_json, source_version, intervention_json)
+         time_frame_raw)
         VALUES (%(nct_id)s, %(outcome_type)s, %(outcome_order)s, %(measure_raw)s, 
-                %(description_raw)s, %(time_frame_raw)s, %(phase)s, %(raw_json)s::jsonb, 
-                %(source_version)s,
-                CASE WHEN %(intervention_json)s IS NOT NULL THEN %(intervention_json)s::jsonb ELSE NULL END)
+                %(description_raw)s, %(time_frame_raw)s)
         ON CONFLICT (nct_id, outcome_type, outcome_order) 
         DO UPDATE SET
             measure_raw = EXCLUDED.measure_raw,
             description_raw = EXCLUDED.description_raw,
             time_frame_raw = EXCLUDED.time_frame_raw,
-            phase = EXCLUDED.phase,
-            raw_json = EXCLUDED.raw_json,
-            source_version = EXCLUDED.source_version,
-            intervention_json = EXCLUDED.intervention_json,
             ingested_at = CURRENT_TIMESTAMP
     """
     
     with conn.cursor() as cur:
-        execute_batch(cur, insert_sql, outcomes)
+        execute_prepared_batch(cur, 'outcome_raw_upsert', insert_sql, outcomes)
     conn.commit()
 
 
@@ -411,6 +356,7 @@ def collect_all_studies(query_params: Dict):
             
             # 각 study 처리
             # API 필터는 drug가 포함된 study를 가져오지만, drug만 단독으로 있는 것만 수집
+            all_study_rows = []
             all_outcomes = []
             all_parties = []
             all_studies = []  # 전체 study JSON 저장용
@@ -432,7 +378,12 @@ def collect_all_studies(query_params: Dict):
                 # Study 전체 원본 JSON 저장
                 all_studies.append(study)
                 
-                # Outcomes 추출 (intervention 정보 포함)
+                # Study 레벨 정보 추출 (phase, intervention, 원본 JSON)
+                study_row = extract_study(study)
+                if study_row:
+                    all_study_rows.append(study_row)
+                
+                # Outcomes 추출
                 outcomes = extract_outcomes(study)
                 all_outcomes.extend(outcomes)
                 
@@ -440,7 +391,11 @@ def collect_all_studies(query_params: Dict):
                 parties = extract_party_info(study)
                 all_parties.extend(parties)
             
-            # DB에 삽입
+            # DB에 삽입 (outcome_raw가 study_raw를 참조하므로 study 먼저)
+            if all_study_rows:
+                upsert_studies(conn, all_study_rows)
+                print(f"  [OK] Upserted {len(all_study_rows)} studies")
+            
             if all_outcomes:
                 insert_outcomes(conn, all_outcomes)
                 total_outcomes += len(all_outcomes)
@@ -3,20 +3,16 @@ CSV 파일에서 outcome_measure_dict 테이블로 데이터 삽입
 """
 
 import os
+import sys
 import csv
-import psycopg2
 from psycopg2.extras import execute_batch
 from dotenv import load_dotenv
 
 load_dotenv()
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection
 
 
 def import_dictionary(csv_file: str = 'dic.csv'):
@@ -28,7 +24,7 @@ def import_dictionary(csv_file: str = 'dic.csv'):
     print("=" * 80)
     
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_db_connection()
         
         # CSV 파일 읽기
         print(f"\n[1] CSV 파일 읽기: {csv_file}")
@@ -10,16 +10,18 @@ outcome_raw 테이블의 데이터를 읽어서 정규화하여 outcome_normaliz
 4. Failure Reason 설정
 
 사용법:
-    python preprocessing/normalize_phase1.py
+    python preprocessing/normalize_phase1.py [--resume]
+
+    --resume: 중단된 실행의 체크포인트(checkpoints/outcome_normalize.json)에서 이어서 처리
 """
 
 import os
+import sys
 import re
 import json
 from typing import Dict, List, Optional, Tuple
-from psycopg2.extras import RealDictCursor, execute_batch
+from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
-import psycopg2
 
 # 같은 디렉토리의 모듈 import (직접 실행 시)
 try:
@@ -38,22 +40,14 @@ except ImportError:
 
 load_dotenv()
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection, execute_prepared_batch
+from run_checkpoint import RunCheckpoint, install_signal_handlers
 
 BATCH_SIZE = 1000
 
 
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
-
-
 def clean_text(text: str) -> str:
     """텍스트 클리닝 (공백 정리, 특수문자 처리)"""
     if not text:
@@ -589,17 +583,26 @@ def insert_normalized(conn, normalized_data: List[Dict]):
     """
     
     with conn.cursor() as cur:
-        execute_batch(cur, insert_sql, normalized_data)
+        execute_prepared_batch(cur, 'outcome_normalized_insert', insert_sql, normalized_data)
     conn.commit()
 
 
+def _row_key(row: Dict) -> Tuple:
+    """처리 순서 키 (ORDER BY nct_id, outcome_type, outcome_order)"""
+    return (row['nct_id'], row['outcome_type'], row['outcome_order'])
+
+
 def main():
     """메인 함수"""
     print("=" * 80)
     print("[START] Outcome 정규화 시작")
     print("=" * 80)
     
+    resume = '--resume' in sys.argv[1:]
     conn = get_db_connection()
+    # 배치 저장이 끝날 때마다 마지막 (nct_id, outcome_type, outcome_order)를 기록
+    checkpoint = RunCheckpoint('outcome_normalize', {})
+    install_signal_handlers()
     
     try:
         # 전체 데이터 개수 확인
@@ -616,13 +619,22 @@ def main():
         processed = 0
         batch = []
         
+        # --resume: 마지막으로 저장한 키 이후부터 처리
+        where = ''
+        params = None
+        if resume and checkpoint.resume() and checkpoint.watermark:
+            where = 'WHERE (o.nct_id, o.outcome_type, o.outcome_order) > (%s, %s, %s)'
+            params = tuple(checkpoint.watermark)
+        
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("""
-                SELECT id, nct_id, outcome_type, outcome_order,
-                       measure_raw, description_raw, time_frame_raw, phase
-                FROM outcome_raw
-                ORDER BY nct_id, outcome_type, outcome_order
-            """)
+            cur.execute(f"""
+                SELECT o.id, o.nct_id, o.outcome_type, o.outcome_order,
+                       o.measure_raw, o.description_raw, o.time_frame_raw, s.phase
+                FROM outcome_raw o
+                INNER JOIN study_raw s ON s.nct_id = o.nct_id
+                {where}
+                ORDER BY o.nct_id, o.outcome_type, o.outcome_order
+            """, params)
             
             for row in cur:
                 batch.append(dict(row))
@@ -630,6 +642,7 @@ def main():
                 if len(batch) >= BATCH_SIZE:
                     normalized_batch = normalize_batch(conn, batch)
                     insert_normalized(conn, normalized_batch)
+                    checkpoint.advance(_row_key(batch[-1]))
                     processed += len(batch)
                     print(f"  처리 중: {processed:,}/{total_count:,}건 ({processed/total_count*100:.1f}%)")
                     batch = []
@@ -640,6 +653,7 @@ def main():
                 insert_normalized(conn, normalized_batch)
                 processed += len(batch)
         
+        checkpoint.complete()
         print(f"\n[OK] 정규화 완료: {processed:,}건")
         
         # 통계 출력
@@ -671,6 +685,8 @@ def main():
         traceback.print_exc()
         conn.rollback()
     finally:
+        # 오류/중단(Ctrl+C, SIGTERM) 시 재개 지점 기록 (끝까지 처리했으면 무시)
+        checkpoint.save()
         conn.close()
 
 
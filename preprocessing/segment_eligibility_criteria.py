@@ -0,0 +1,263 @@
+"""
+Inclusion/Exclusion 기준 분할 스크립트
+
+inclusion_exclusion_raw 테이블의 eligibility_criteria_raw를 규칙 기반으로
+Inclusion/Exclusion 섹션과 개별 기준 줄로 분할하여 inclusion_exclusion_segments 테이블에 저장합니다.
+LLM 전처리(--segmented)는 원문 대신 분할된 짧은 줄만 구조화하므로 출력 토큰이 줄고 긴 프로토콜의 응답 잘림이 줄어듭니다.
+
+주요 기능:
+1. "Inclusion Criteria:", "Exclusion Criteria:" 제목으로 섹션 구분
+2. 불릿(*, -, •), 번호(1., 1), (1)), 알파벳(a., a)) 단위로 기준 분리
+3. 들여쓰기 기반 중첩 깊이/상위 기준 추적
+4. 줄바꿈된 연속 줄은 직전 기준에 병합
+5. 원문 해시(source_hash)로 변경된 연구만 재분할
+
+사용법:
+    python preprocessing/segment_eligibility_criteria.py          # 분할되지 않았거나 원문이 바뀐 연구만
+    python preprocessing/segment_eligibility_criteria.py --all    # 전체 재분할
+"""
+
+import os
+import re
+import sys
+import hashlib
+from typing import Dict, List, Optional
+from psycopg2.extras import RealDictCursor, execute_batch
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection
+
+BATCH_SIZE = 1000
+
+SECTION_INCLUSION = 'INCLUSION'
+SECTION_EXCLUSION = 'EXCLUSION'
+SECTION_UNSPECIFIED = 'UNSPECIFIED'
+
+# 프롬프트 라벨 접두어 (I1, E2, U3)
+SECTION_LABELS = {SECTION_INCLUSION: 'I', SECTION_EXCLUSION: 'E', SECTION_UNSPECIFIED: 'U'}
+
+# "Inclusion Criteria:", "Key Exclusion Criteria for Part A:" 등 (콜론 뒤 텍스트는 첫 기준)
+HEADING_WITH_COLON_PATTERN = re.compile(
+    r'^\s*(?:key\s+|main\s+|general\s+)?(inclusion|exclusion)\s+criteria\b[^:]{0,40}:\s*(.*)$',
+    re.IGNORECASE
+)
+# 콜론 없이 제목만 있는 줄 ("INCLUSION CRITERIA")
+HEADING_ONLY_PATTERN = re.compile(
+    r'^\s*(?:key\s+|main\s+|general\s+)?(inclusion|exclusion)\s+criteria\s*$',
+    re.IGNORECASE
+)
+# 불릿/번호 표시 (표시 뒤에 공백이 있어야 함: "1.5 mg" 같은 숫자는 제외)
+BULLET_PATTERN = re.compile(
+    r'^(\s*)([*\-•·]|\d{1,2}[.)]|\(\d{1,2}\)|[a-zA-Z][.)]|\([a-zA-Z]\))\s+(.*)$'
+)
+
+
+def source_hash(text: str) -> str:
+    """원문 SHA-256 (변경 감지용)"""
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+def match_heading(line: str) -> Optional[tuple]:
+    """섹션 제목이면 (section, 제목 뒤 텍스트) 반환"""
+    match = HEADING_WITH_COLON_PATTERN.match(line)
+    if match:
+        return match.group(1).upper(), match.group(2).strip()
+    match = HEADING_ONLY_PATTERN.match(line)
+    if match:
+        return match.group(1).upper(), ''
+    return None
+
+
+def segment_criteria(text: str) -> List[Dict]:
+    """
+    eligibility_criteria_raw를 기준 줄 단위로 분할
+
+    Args:
+        text: 원문 eligibilityCriteria
+
+    Returns:
+        [{'section', 'criterion_seq', 'section_seq', 'parent_seq', 'depth', 'marker', 'criterion_text'}, ...]
+    """
+    segments = []
+    if not text:
+        return segments
+
+    section = SECTION_UNSPECIFIED
+    section_counts = {}
+    stack = []          # [(들여쓰기, criterion_seq)] 현재 중첩 경로
+    current = None      # 연속 줄을 병합할 직전 기준
+    after_blank = False
+
+    def add_segment(criterion_text, marker, indent):
+        nonlocal current
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        seq = len(segments) + 1
+        section_counts[section] = section_counts.get(section, 0) + 1
+        current = {
+            'section': section,
+            'criterion_seq': seq,
+            'section_seq': section_counts[section],
+            'parent_seq': stack[-1][1] if stack else None,
+            'depth': len(stack),
+            'marker': marker,
+            'criterion_text': criterion_text
+        }
+        segments.append(current)
+        stack.append((indent, seq))
+
+    for line in text.replace('\r\n', '\n').replace('\r', '\n').split('\n'):
+        if not line.strip():
+            after_blank = True
+            continue
+
+        heading = match_heading(line)
+        if heading:
+            section, rest = heading
+            stack.clear()
+            current = None
+            after_blank = False
+            if rest:
+                add_segment(rest, None, 0)
+            continue
+
+        bullet = BULLET_PATTERN.match(line)
+        if bullet:
+            add_segment(bullet.group(3).strip(), bullet.group(2), len(bullet.group(1).expandtabs(4)))
+        elif current is None or after_blank:
+            # 불릿 없는 문단은 최상위 기준으로 처리
+            stack.clear()
+            add_segment(line.strip(), None, 0)
+        else:
+            # 줄바꿈된 연속 줄
+            current['criterion_text'] = f"{current['criterion_text']} {line.strip()}"
+        after_blank = False
+
+    return segments
+
+
+def segment_label(segment: Dict) -> str:
+    """프롬프트 라벨 (I1, E2, U3)"""
+    return f"{SECTION_LABELS.get(segment['section'], 'U')}{segment['section_seq']}"
+
+
+def ensure_segments_table(conn):
+    """inclusion_exclusion_segments 테이블 생성 (없는 경우)"""
+    sql_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql', 'create_inclusion_exclusion_segments.sql')
+    with open(sql_file, 'r', encoding='utf-8') as f:
+        sql_content = f.read()
+    with conn.cursor() as cur:
+        cur.execute(sql_content)
+        conn.commit()
+
+
+def save_segments(conn, rows: List[Dict]) -> int:
+    """연구별 기존 분할 결과를 지우고 새 분할 결과 삽입"""
+    nct_ids = [row['nct_id'] for row in rows]
+    insert_data = []
+    for row in rows:
+        raw_hash = source_hash(row['eligibility_criteria_raw'])
+        for segment in segment_criteria(row['eligibility_criteria_raw']):
+            insert_data.append({**segment, 'nct_id': row['nct_id'], 'source_hash': raw_hash})
+
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM inclusion_exclusion_segments WHERE nct_id = ANY(%s)", (nct_ids,))
+        insert_sql = """
+            INSERT INTO inclusion_exclusion_segments (
+                nct_id, section, criterion_seq, section_seq, parent_seq,
+                depth, marker, criterion_text, source_hash
+            ) VALUES (
+                %(nct_id)s, %(section)s, %(criterion_seq)s, %(section_seq)s, %(parent_seq)s,
+                %(depth)s, %(marker)s, %(criterion_text)s, %(source_hash)s
+            )
+        """
+        execute_batch(cur, insert_sql, insert_data, page_size=100)
+    conn.commit()
+    return len(insert_data)
+
+
+def main():
+    """메인 함수"""
+    resegment_all = '--all' in sys.argv[1:]
+
+    print("=" * 80)
+    print("[START] Inclusion/Exclusion 기준 분할 시작")
+    print("=" * 80)
+
+    conn = get_db_connection()
+
+    try:
+        ensure_segments_table(conn)
+
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            query = """
+                SELECT ier.nct_id, ier.eligibility_criteria_raw
+                FROM inclusion_exclusion_raw ier
+                WHERE ier.eligibility_criteria_raw IS NOT NULL
+            """
+            if not resegment_all:
+                # 분할 결과가 없거나 원문 해시가 달라진 연구만
+                query += """
+                  AND NOT EXISTS (
+                      SELECT 1 FROM inclusion_exclusion_segments ies
+                      WHERE ies.nct_id = ier.nct_id
+                        AND ies.source_hash = encode(sha256(convert_to(ier.eligibility_criteria_raw, 'UTF8')), 'hex')
+                  )
+                """
+            query += " ORDER BY ier.nct_id"
+            cur.execute(query)
+            rows = cur.fetchall()
+
+        total_count = len(rows)
+        print(f"\n[INFO] 분할 대상: {total_count:,}개 연구 ({'전체 재분할' if resegment_all else '신규/변경분'})")
+        if total_count == 0:
+            print("[INFO] 분할할 항목이 없습니다.")
+            return
+
+        segment_count = 0
+        for batch_start in range(0, total_count, BATCH_SIZE):
+            batch = rows[batch_start:batch_start + BATCH_SIZE]
+            segment_count += save_segments(conn, batch)
+            processed = batch_start + len(batch)
+            print(f"  처리 중: {processed:,}/{total_count:,}건 ({processed/total_count*100:.1f}%)")
+
+        print(f"\n[OK] 분할 완료: {total_count:,}개 연구, 기준 {segment_count:,}줄")
+
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT
+                    COUNT(DISTINCT nct_id) as studies,
+                    COUNT(*) as total,
+                    COUNT(CASE WHEN section = 'INCLUSION' THEN 1 END) as inclusion,
+                    COUNT(CASE WHEN section = 'EXCLUSION' THEN 1 END) as exclusion,
+                    COUNT(CASE WHEN section = 'UNSPECIFIED' THEN 1 END) as unspecified,
+                    COUNT(CASE WHEN depth > 0 THEN 1 END) as nested
+                FROM inclusion_exclusion_segments
+            """)
+            stats = cur.fetchone()
+
+            print("\n" + "=" * 80)
+            print("[STATISTICS] 분할 결과 통계")
+            print("=" * 80)
+            print(f"연구: {stats['studies']:,}개, 기준: {stats['total']:,}줄")
+            print(f"Inclusion: {stats['inclusion']:,}줄")
+            print(f"Exclusion: {stats['exclusion']:,}줄")
+            print(f"섹션 미지정: {stats['unspecified']:,}줄")
+            print(f"중첩 기준: {stats['nested']:,}줄")
+            print("=" * 80)
+
+    except Exception as e:
+        print(f"\n[ERROR] 오류 발생: {e}")
+        import traceback
+        traceback.print_exc()
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -11,24 +11,15 @@
 """
 
 import os
+import sys
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
-import psycopg2
 
 load_dotenv()
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'clinicaltrials'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '')
-}
-
-
-def get_db_connection():
-    """PostgreSQL 연결 생성"""
-    return psycopg2.connect(**DB_CONFIG)
+# 공유 DB 연결 풀 (db_access.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_access import get_db_connection
 
 
 
@@ -102,11 +93,21 @@ def separate_data(conn):
         print(f"    성공한 outcome: {stats['success_count']:,}건")
         print(f"    실패한 outcome: {stats['failed_count']:,}건")
         
+        # 생성 컬럼(time_value_days 등)은 INSERT할 수 없으므로 일반 컬럼만 복사
+        cur.execute("""
+            SELECT STRING_AGG(column_name, ', ' ORDER BY ordinal_position) as columns
+            FROM information_schema.columns
+            WHERE table_schema = 'public'
+              AND table_name = 'outcome_normalized'
+              AND is_generated = 'NEVER'
+        """)
+        columns = cur.fetchone()['columns']
+        
         # 성공한 outcome만 success 테이블에 삽입
         print("\n  [2] 성공한 outcome 분리 중...")
-        cur.execute("""
-            INSERT INTO outcome_normalized_success
-            SELECT *
+        cur.execute(f"""
+            INSERT INTO outcome_normalized_success ({columns})
+            SELECT {columns}
             FROM outcome_normalized
             WHERE measure_code IS NOT NULL 
               AND failure_reason IS NULL
@@ -117,9 +118,9 @@ def separate_data(conn):
         
         # 실패한 outcome을 failed 테이블에 삽입
         print("\n  [3] 실패한 outcome 분리 중...")
-        cur.execute("""
-            INSERT INTO outcome_normalized_failed
-            SELECT *
+        cur.execute(f"""
+            INSERT INTO outcome_normalized_failed ({columns})
+            SELECT {columns}
             FROM outcome_normalized
             WHERE measure_code IS NULL 
                OR failure_reason IS NOT NULL
@@ -0,0 +1,98 @@
+"""
+Study 차원 테이블(study_raw) 저장
+
+outcome/eligibility 수집 스크립트가 공유하는 연구 단위 정보 추출과 UPSERT.
+phase, source_version, overall_status, lead sponsor, intervention_json, 원본 study JSON을
+nct_id당 한 번만 저장하고, outcome_raw / inclusion_exclusion_raw는 nct_id로 참조합니다.
+(스키마: sql/create_study_raw.sql)
+
+outcome_raw / inclusion_exclusion_raw가 study_raw를 참조하므로 행을 저장하기 전에 upsert_studies를 먼저 호출하세요.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+from db_access import execute_prepared_batch
+
+
+def extract_phase(study: Dict) -> str:
+    """
+    Study JSON에서 phase 정보 추출
+
+    Returns:
+        phase 문자열 (예: "PHASE1", "PHASE2", "PHASE3", "PHASE4", "NA" 등)
+        phase 정보가 없으면 'NA' 반환
+    """
+    design_module = study.get('protocolSection', {}).get('designModule', {})
+    phases = design_module.get('phases', [])
+
+    if not phases:
+        return 'NA'
+
+    # phases는 배열이므로 여러 phase가 있을 수 있음
+    # 예: ["PHASE1", "PHASE2"] -> "PHASE1,PHASE2"로 결합
+    phase_str = ','.join(phases)
+    return phase_str if phase_str else 'NA'
+
+
+def extract_study(study: Dict) -> Optional[Dict]:
+    """
+    Study JSON에서 study_raw 행 추출
+
+    Returns:
+        study_raw 행 딕셔너리 (nct_id가 없으면 None)
+    """
+    protocol_section = study.get('protocolSection', {})
+    nct_id = protocol_section.get('identificationModule', {}).get('nctId')
+
+    if not nct_id:
+        return None
+
+    lead_sponsor = protocol_section.get('sponsorCollaboratorsModule', {}).get('leadSponsor') or {}
+    interventions_list = protocol_section.get('armsInterventionsModule', {}).get('interventions', [])
+
+    return {
+        'nct_id': nct_id,
+        'phase': extract_phase(study),
+        'source_version': study.get('derivedSection', {}).get('miscInfoModule', {}).get('versionHolder'),
+        'overall_status': protocol_section.get('statusModule', {}).get('overallStatus'),
+        'lead_sponsor_name': lead_sponsor.get('name'),
+        'lead_sponsor_class': lead_sponsor.get('class'),
+        'intervention_json': json.dumps(interventions_list) if interventions_list else None,
+        'raw_json': json.dumps(study)  # 원본 study JSON 보존 (연구당 한 번)
+    }
+
+
+def upsert_studies(conn, studies: List[Dict]):
+    """
+    study_raw 테이블에 연구 정보 UPSERT
+
+    source_version이 같고 원본 JSON이 이미 있으면 다시 쓰지 않습니다
+    (outcome/eligibility 수집이 같은 연구를 각각 저장해도 큰 JSON 행을 한 번만 기록).
+    """
+    if not studies:
+        return
+
+    insert_sql = """
+        INSERT INTO study_raw
+        (nct_id, phase, source_version, overall_status, lead_sponsor_name,
+         lead_sponsor_class, intervention_json, raw_json)
+        VALUES (%(nct_id)s, %(phase)s, %(source_version)s, %(overall_status)s, %(lead_sponsor_name)s,
+                %(lead_sponsor_class)s, %(intervention_json)s::jsonb, %(raw_json)s::jsonb)
+        ON CONFLICT (nct_id)
+        DO UPDATE SET
+            phase = EXCLUDED.phase,
+            source_version = EXCLUDED.source_version,
+            overall_status = EXCLUDED.overall_status,
+            lead_sponsor_name = EXCLUDED.lead_sponsor_name,
+            lead_sponsor_class = EXCLUDED.lead_sponsor_class,
+            intervention_json = EXCLUDED.intervention_json,
+            raw_json = EXCLUDED.raw_json,
+            ingested_at = CURRENT_TIMESTAMP
+        WHERE study_raw.source_version IS DISTINCT FROM EXCLUDED.source_version
+           OR study_raw.raw_json IS NULL
+    """
+
+    with conn.cursor() as cur:
+        execute_prepared_batch(cur, 'study_raw_upsert', insert_sql, studies, page_size=100)
+    conn.commit()
@@ -1,37 +1,8 @@
 -- 전체 Feature 통계 (Inclusion/Exclusion/Total Top 100)
 -- 숫자형 여부와 관계없이 모든 feature의 통계
+-- 기준 팩트 테이블(inclusion_exclusion_criteria)의 (feature, criteria_type, nct_id) 인덱스 사용
 
-WITH all_expanded AS (
-    SELECT 
-        iep.nct_id,
-        'INCLUSION' as criteria_type,
-        jsonb_array_elements(iep.inclusion_criteria)::jsonb as criterion
-    FROM inclusion_exclusion_llm_preprocessed iep
-    WHERE iep.llm_status = 'SUCCESS'
-      AND iep.inclusion_criteria IS NOT NULL
-      AND jsonb_typeof(iep.inclusion_criteria) = 'array'
-      AND iep.inclusion_criteria != '[]'::jsonb
-    UNION ALL
-    SELECT 
-        iep.nct_id,
-        'EXCLUSION' as criteria_type,
-        jsonb_array_elements(iep.exclusion_criteria)::jsonb as criterion
-    FROM inclusion_exclusion_llm_preprocessed iep
-    WHERE iep.llm_status = 'SUCCESS'
-      AND iep.exclusion_criteria IS NOT NULL
-      AND jsonb_typeof(iep.exclusion_criteria) = 'array'
-      AND iep.exclusion_criteria != '[]'::jsonb
-),
-all_features AS (
-    SELECT 
-        nct_id,
-        criteria_type,
-        criterion->>'feature' as feature,
-        criterion->>'operator' as operator
-    FROM all_expanded
-    WHERE criterion->>'feature' IS NOT NULL
-),
-feature_stats AS (
+WITH feature_stats AS (
     SELECT 
         feature,
         COUNT(*) FILTER (WHERE criteria_type = 'INCLUSION') as inclusion_count,
@@ -42,7 +13,8 @@ feature_stats AS (
         COUNT(DISTINCT nct_id) as total_study_count,
         COUNT(DISTINCT operator) as operator_count,
         STRING_AGG(DISTINCT operator, ', ' ORDER BY operator) as operators_used
-    FROM all_features
+    FROM inclusion_exclusion_criteria
+    WHERE feature IS NOT NULL
     GROUP BY feature
 )
 SELECT * FROM (
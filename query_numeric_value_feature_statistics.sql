@@ -1,44 +1,9 @@
 -- 숫자형 Value를 가진 Feature 통계 (Inclusion/Exclusion/Total Top 100)
--- value가 숫자(int/float)이고 비교 연산자(>, <, >=, <=, =, !=)를 사용하는 항목
+-- value가 숫자(숫자형 또는 숫자 문자열)이고 비교 연산자(>, <, >=, <=, =, !=)를 사용하는 항목
+-- 기준 팩트 테이블(inclusion_exclusion_criteria)의 (feature, value_numeric) 인덱스 사용
 
-WITH all_expanded AS (
-    SELECT 
-        iep.nct_id,
-        'INCLUSION' as criteria_type,
-        jsonb_array_elements(iep.inclusion_criteria)::jsonb as criterion
-    FROM inclusion_exclusion_llm_preprocessed iep
-    WHERE iep.llm_status = 'SUCCESS'
-      AND iep.inclusion_criteria IS NOT NULL
-      AND jsonb_typeof(iep.inclusion_criteria) = 'array'
-      AND iep.inclusion_criteria != '[]'::jsonb
-    UNION ALL
-    SELECT 
-        iep.nct_id,
-        'EXCLUSION' as criteria_type,
-        jsonb_array_elements(iep.exclusion_criteria)::jsonb as criterion
-    FROM inclusion_exclusion_llm_preprocessed iep
-    WHERE iep.llm_status = 'SUCCESS'
-      AND iep.exclusion_criteria IS NOT NULL
-      AND jsonb_typeof(iep.exclusion_criteria) = 'array'
-      AND iep.exclusion_criteria != '[]'::jsonb
-),
-numeric_features AS (
-    SELECT 
-        nct_id,
-        criteria_type,
-        criterion->>'feature' as feature,
-        criterion->>'operator' as operator,
-        CASE 
-            WHEN jsonb_typeof(criterion->'value') = 'number' 
-            THEN (criterion->>'value')::numeric 
-            ELSE NULL 
-        END as value_numeric
-    FROM all_expanded
-    WHERE criterion->>'operator' IN ('>', '<', '>=', '<=', '=', '!=')
-      AND criterion->>'feature' IS NOT NULL
-),
-feature_stats AS (
-    SELECT 
+WITH feature_stats AS (
+    SELECT
         feature,
         COUNT(*) FILTER (WHERE criteria_type = 'INCLUSION') as inclusion_count,
         COUNT(*) FILTER (WHERE criteria_type = 'EXCLUSION') as exclusion_count,
@@ -52,11 +17,13 @@ feature_stats AS (
         PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY value_numeric) as median_value,
         COUNT(DISTINCT operator) as operator_count,
         STRING_AGG(DISTINCT operator, ', ' ORDER BY operator) as operators_used
-    FROM numeric_features
-    WHERE feature IS NOT NULL AND value_numeric IS NOT NULL
+    FROM inclusion_exclusion_criteria
+    WHERE operator IN ('>', '<', '>=', '<=', '=', '!=')
+      AND feature IS NOT NULL
+      AND value_numeric IS NOT NULL
     GROUP BY feature
 )
-SELECT 
+SELECT
     feature,
     inclusion_count,
     exclusion_count,
@@ -73,3 +40,18 @@ SELECT
 FROM feature_stats
 ORDER BY total_count DESC
 LIMIT 100;
+
+-- 임계값 조회 예시: 특정 feature의 숫자 조건이 있는 연구
+-- (feature, value_numeric) 인덱스 범위 검색
+
+SELECT
+    nct_id,
+    criteria_type,
+    operator,
+    value_numeric,
+    unit,
+    criterion_text
+FROM inclusion_exclusion_criteria
+WHERE feature = 'age'
+  AND value_numeric >= 50
+ORDER BY value_numeric, nct_id;
@@ -0,0 +1,159 @@
+"""
+장시간 실행 파이프라인 체크포인트 (중단 후 --resume 재개)
+
+LLM 전처리/검증, 정규화처럼 키 순서(ORDER BY)로 배치를 처리하는 스크립트가
+"DB에 저장이 끝난 마지막 키(watermark)"와 "결과는 받았지만 아직 저장하지 못한 행(pending)"을
+checkpoints/<pipeline>.json에 기록합니다.
+
+- 배치 저장이 끝날 때마다 advance(마지막 키)로 watermark 기록 (원자적 파일 교체)
+- API 결과를 받은 뒤 저장 전까지는 hold(행, 마지막 키)로 메모리에 보관.
+  Ctrl+C / SIGTERM / 오류로 중단되면 finally에서 save()가 pending 행까지 파일에 기록
+- LLM 스크립트는 현재 API 키 인덱스(쿼터 상태)도 함께 기록 (키별 사용량은 쿼터 원장에 이미 보존됨)
+- --resume 실행 시 pending 행을 먼저 저장하고 watermark 이후 항목부터 처리 → 처리한 항목을 다시 호출하지 않음
+- 끝까지 처리하면 complete()로 체크포인트 삭제
+
+실행 인자(모드, limit 등)가 체크포인트와 다르면 재개하지 않습니다.
+"""
+
+import os
+import sys
+import json
+import signal
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT_DIR = os.getenv('CHECKPOINT_DIR', os.path.join(ROOT_DIR, 'checkpoints'))
+
+
+class RunCheckpoint:
+    """파이프라인 하나의 재개 지점 (watermark + 미저장 결과 + 쿼터 상태)"""
+
+    def __init__(self, pipeline: str, params: Dict[str, Any], directory: str = CHECKPOINT_DIR):
+        self.pipeline = pipeline
+        self.params = params
+        self.path = os.path.join(directory, f'{pipeline}.json')
+        self.watermark = None
+        self.pending = None
+        self._pending_key = None
+        self._completed = False
+        self._lock = threading.Lock()
+
+    def resume(self) -> Optional[Dict]:
+        """
+        저장된 체크포인트를 읽어 watermark/pending 복원
+
+        Returns:
+            체크포인트 상태 딕셔너리. 없으면 None (실행 인자가 다르면 ValueError)
+        """
+        if not os.path.exists(self.path):
+            print(f"[INFO] 체크포인트가 없습니다: {self.path} (처음부터 처리)")
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('params') != _json_roundtrip(self.params):
+            raise ValueError(
+                f"체크포인트의 실행 인자가 다릅니다: {state.get('params')} (현재: {self.params}). "
+                f"같은 인자로 --resume 하거나 체크포인트를 삭제하세요: {self.path}"
+            )
+        self.watermark = state.get('watermark')
+        self.pending = state.get('pending')
+        self._pending_key = self.watermark if self.pending else None
+        _restore_quota_state(state.get('quota') or {})
+        print(f"[INFO] 체크포인트에서 재개: 마지막 처리 키 {self.watermark} ({state.get('updated_at')})"
+              + (f", 미저장 결과 {_count_rows(self.pending):,}개" if self.pending else ''))
+        return state
+
+    def hold(self, rows: Any, key: Any):
+        """API 결과를 받았지만 아직 저장하지 않은 행 보관 (중단 시 save()가 파일에 기록)"""
+        with self._lock:
+            self.pending = rows
+            self._pending_key = key
+
+    def advance(self, key: Any):
+        """key까지의 결과가 DB에 저장됨 → watermark 갱신 후 파일 기록"""
+        with self._lock:
+            self.watermark = key
+            self.pending = None
+            self._pending_key = None
+            self._write()
+
+    def save(self):
+        """현재 상태(보관 중인 pending 포함)를 파일에 기록 (완료됐거나 기록할 진행 상황이 없으면 무시)"""
+        with self._lock:
+            if self._completed or (self.watermark is None and not self.pending):
+                return
+            self._write()
+        print(f"[체크포인트] 저장: {self.path} (마지막 처리 키 {self._pending_key or self.watermark})")
+
+    def complete(self):
+        """끝까지 처리한 경우 체크포인트 삭제"""
+        with self._lock:
+            self._completed = True
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _write(self):
+        state = {
+            'pipeline': self.pipeline,
+            'params': self.params,
+            'watermark': self._pending_key if self.pending else self.watermark,
+            'pending': self.pending or None,
+            'quota': _quota_state(),
+            'updated_at': datetime.now().isoformat(timespec='seconds')
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, self.path)
+
+
+def after_watermark(items: List[Dict], key_fn, watermark) -> List[Dict]:
+    """키 순서로 정렬된 항목 중 watermark 이후 항목만 반환"""
+    if watermark is None:
+        return items
+    if isinstance(watermark, list):
+        watermark = tuple(watermark)
+    return [item for item in items if key_fn(item) > watermark]
+
+
+def install_signal_handlers():
+    """SIGTERM도 Ctrl+C처럼 예외로 바꿔 finally에서 체크포인트가 저장되도록 함 (메인 스레드에서 호출)"""
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _raise_system_exit)
+
+
+def _raise_system_exit(signum, frame):
+    raise SystemExit(128 + signum)
+
+
+def _quota_state() -> Dict:
+    """LLM 스크립트면 현재 API 키 위치 기록"""
+    llm_config = sys.modules.get('llm_config')
+    if llm_config is None:
+        return {}
+    return {
+        'current_key_index': llm_config._current_key_index,
+        'all_keys_exhausted': llm_config._all_keys_exhausted
+    }
+
+
+def _restore_quota_state(quota: Dict):
+    """저장된 API 키 위치에서 이어서 사용 (키 소진 여부는 쿼터 원장이 다시 판단)"""
+    llm_config = sys.modules.get('llm_config')
+    if llm_config is None or 'current_key_index' not in quota:
+        return
+    if quota['current_key_index'] < len(llm_config.get_api_keys()):
+        llm_config._current_key_index = quota['current_key_index']
+
+
+def _json_roundtrip(value):
+    return json.loads(json.dumps(value, default=str))
+
+
+def _count_rows(pending) -> int:
+    if isinstance(pending, dict):
+        return sum(len(rows) for rows in pending.values())
+    return len(pending)
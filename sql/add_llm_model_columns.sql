@@ -0,0 +1,25 @@
+-- 모델 캐스케이드(llm/llm_cascade.py) 사용 모델 기록 컬럼 추가
+-- llm_model: 전처리 결과를 만든 모델 (규칙/캐시만으로 구조화된 경우 NULL)
+-- validation_model: 검증 1회 실행 결과를 만든 모델 (승격된 경우 상위 모델)
+
+ALTER TABLE outcome_llm_preprocessed
+ADD COLUMN IF NOT EXISTS llm_model VARCHAR(100);
+
+ALTER TABLE inclusion_exclusion_llm_preprocessed
+ADD COLUMN IF NOT EXISTS llm_model VARCHAR(100);
+
+ALTER TABLE outcome_llm_validation_history
+ADD COLUMN IF NOT EXISTS validation_model VARCHAR(100);
+
+ALTER TABLE inclusion_exclusion_llm_validation_history
+ADD COLUMN IF NOT EXISTS validation_model VARCHAR(100);
+
+-- 모델별 결과 분포 조회용 인덱스
+CREATE INDEX IF NOT EXISTS idx_outcome_llm_preprocessed_llm_model ON outcome_llm_preprocessed(llm_model);
+CREATE INDEX IF NOT EXISTS idx_inclusion_exclusion_llm_preprocessed_llm_model ON inclusion_exclusion_llm_preprocessed(llm_model);
+
+-- 코멘트 추가
+COMMENT ON COLUMN outcome_llm_preprocessed.llm_model IS '전처리 결과를 만든 LLM 모델 (캐스케이드 사용 시 최종 단계 모델)';
+COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.llm_model IS '전처리 결과를 만든 LLM 모델 (규칙/캐시만으로 구조화된 경우 NULL)';
+COMMENT ON COLUMN outcome_llm_validation_history.validation_model IS '검증 실행 결과를 만든 LLM 모델 (캐스케이드 승격 시 상위 모델)';
+COMMENT ON COLUMN inclusion_exclusion_llm_validation_history.validation_model IS '검증 실행 결과를 만든 LLM 모델 (캐스케이드 승격 시 상위 모델)';
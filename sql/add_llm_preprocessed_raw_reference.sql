@@ -0,0 +1,111 @@
+-- LLM 전처리 결과 테이블이 원본 행을 키로 참조하도록 변경
+-- 기존에는 원본 텍스트를 결과 테이블에 복사해 두어 LLM UPSERT마다 큰 텍스트 컬럼이 함께 다시 쓰였음
+--   - outcome_llm_preprocessed: measure_raw, description_raw, time_frame_raw, phase (outcome_raw에서 복사)
+--   - inclusion_exclusion_llm_preprocessed: eligibility_criteria_raw, phase (inclusion_exclusion_raw에서 복사)
+-- 결과 테이블에는 LLM 결과만 남기고 (nct_id, outcome_type, outcome_order) / nct_id로 원본을 참조합니다.
+-- UPSERT 행이 좁아져 dead tuple/TOAST 쓰기가 줄고 VACUUM, 백업 비용이 감소합니다.
+--
+-- 원본 텍스트가 필요한 조회는 *_with_raw 뷰를 사용하세요 (sql/create_llm_preprocessed_views.sql).
+-- 이 파일은 컬럼/참조만 변경하며, 컬럼 삭제 전에 기존 뷰를 지웁니다.
+-- 실행 후 sql/create_llm_preprocessed_views.sql로 뷰를 다시 만드세요 (전처리 스크립트도 시작할 때 다시 만듦).
+--
+-- sql/create_study_raw.sql을 먼저 실행하세요.
+-- 마지막의 VACUUM FULL은 트랜잭션 밖에서 실행해야 합니다 (psql -f, --single-transaction 사용 금지).
+
+-- ============================================
+-- 1. 원본이 없는 결과 행은 복사된 텍스트로 원본 복원 (참조 무결성 전에)
+-- ============================================
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'outcome_llm_preprocessed' AND column_name = 'measure_raw'
+    ) THEN
+        INSERT INTO study_raw (nct_id, phase)
+        SELECT DISTINCT ON (olp.nct_id) olp.nct_id, olp.phase
+        FROM outcome_llm_preprocessed olp
+        WHERE NOT EXISTS (SELECT 1 FROM study_raw s WHERE s.nct_id = olp.nct_id)
+        ORDER BY olp.nct_id, olp.updated_at DESC
+        ON CONFLICT (nct_id) DO NOTHING;
+
+        INSERT INTO outcome_raw (nct_id, outcome_type, outcome_order, measure_raw, description_raw, time_frame_raw)
+        SELECT olp.nct_id, olp.outcome_type, olp.outcome_order, olp.measure_raw, olp.description_raw, olp.time_frame_raw
+        FROM outcome_llm_preprocessed olp
+        WHERE NOT EXISTS (
+            SELECT 1 FROM outcome_raw o
+            WHERE o.nct_id = olp.nct_id
+              AND o.outcome_type = olp.outcome_type
+              AND o.outcome_order = olp.outcome_order
+        )
+        ON CONFLICT (nct_id, outcome_type, outcome_order) DO NOTHING;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'inclusion_exclusion_llm_preprocessed' AND column_name = 'eligibility_criteria_raw'
+    ) THEN
+        INSERT INTO study_raw (nct_id, phase)
+        SELECT iep.nct_id, iep.phase
+        FROM inclusion_exclusion_llm_preprocessed iep
+        WHERE NOT EXISTS (SELECT 1 FROM study_raw s WHERE s.nct_id = iep.nct_id)
+        ON CONFLICT (nct_id) DO NOTHING;
+
+        INSERT INTO inclusion_exclusion_raw (nct_id, eligibility_criteria_raw)
+        SELECT iep.nct_id, iep.eligibility_criteria_raw
+        FROM inclusion_exclusion_llm_preprocessed iep
+        WHERE NOT EXISTS (SELECT 1 FROM inclusion_exclusion_raw ier WHERE ier.nct_id = iep.nct_id)
+        ON CONFLICT (nct_id) DO NOTHING;
+    END IF;
+END $$;
+
+-- ============================================
+-- 2. 원본 참조 (원본 행이 삭제되면 결과도 삭제)
+-- ============================================
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fk_outcome_llm_raw') THEN
+        ALTER TABLE outcome_llm_preprocessed
+        ADD CONSTRAINT fk_outcome_llm_raw
+        FOREIGN KEY (nct_id, outcome_type, outcome_order)
+        REFERENCES outcome_raw(nct_id, outcome_type, outcome_order) ON DELETE CASCADE;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fk_inclusion_exclusion_llm_raw') THEN
+        ALTER TABLE inclusion_exclusion_llm_preprocessed
+        ADD CONSTRAINT fk_inclusion_exclusion_llm_raw
+        FOREIGN KEY (nct_id) REFERENCES inclusion_exclusion_raw(nct_id) ON DELETE CASCADE;
+    END IF;
+END $$;
+
+-- ============================================
+-- 3. 복사된 원본 컬럼 삭제 (phase 인덱스도 함께 삭제됨)
+-- ============================================
+-- 뷰가 삭제할 컬럼을 참조하므로 먼저 삭제 (sql/create_llm_preprocessed_views.sql로 다시 생성)
+DROP VIEW IF EXISTS outcome_llm_preprocessed_with_raw;
+DROP VIEW IF EXISTS inclusion_exclusion_llm_preprocessed_with_raw;
+
+ALTER TABLE outcome_llm_preprocessed
+DROP COLUMN IF EXISTS measure_raw,
+DROP COLUMN IF EXISTS description_raw,
+DROP COLUMN IF EXISTS time_frame_raw,
+DROP COLUMN IF EXISTS phase;
+
+ALTER TABLE inclusion_exclusion_llm_preprocessed
+DROP COLUMN IF EXISTS eligibility_criteria_raw,
+DROP COLUMN IF EXISTS phase;
+
+-- ============================================
+-- 4. 삭제한 컬럼 공간 회수
+-- ============================================
+VACUUM FULL outcome_llm_preprocessed;
+VACUUM FULL inclusion_exclusion_llm_preprocessed;
+
+ANALYZE outcome_llm_preprocessed;
+ANALYZE inclusion_exclusion_llm_preprocessed;
+
+-- 확인
+SELECT
+    relname AS table_name,
+    pg_size_pretty(pg_total_relation_size(relid)) AS total_size
+FROM pg_catalog.pg_statio_user_tables
+WHERE relname IN ('outcome_llm_preprocessed', 'inclusion_exclusion_llm_preprocessed')
+ORDER BY relname;
@@ -0,0 +1,80 @@
+-- 전처리 결과 fingerprint 기반 증분 재검증을 위한 스키마 확장
+-- output_fingerprint: LLM 전처리 결과 컬럼의 md5 (결과가 바뀌면 DB가 자동으로 다시 계산, PostgreSQL 12+)
+-- validated_fingerprint: 마지막 검증 시점의 output_fingerprint
+-- 검증 스크립트의 --changed-only 모드는 두 값이 다른 항목만 검증합니다 (수동 초기화 불필요)
+
+-- 1. outcome_llm_preprocessed
+ALTER TABLE outcome_llm_preprocessed
+ADD COLUMN IF NOT EXISTS output_fingerprint VARCHAR(32) GENERATED ALWAYS AS (
+    md5(
+        COALESCE(llm_measure_code, '') || '|' ||
+        COALESCE(llm_time_value::text, '') || '|' ||
+        COALESCE(llm_time_unit, '') || '|' ||
+        COALESCE(llm_time_points::text, '')
+    )
+) STORED,
+ADD COLUMN IF NOT EXISTS validated_fingerprint VARCHAR(32);
+
+ALTER TABLE outcome_llm_validation_history
+ADD COLUMN IF NOT EXISTS output_fingerprint VARCHAR(32);
+
+-- 2. inclusion_exclusion_llm_preprocessed
+ALTER TABLE inclusion_exclusion_llm_preprocessed
+ADD COLUMN IF NOT EXISTS output_fingerprint VARCHAR(32) GENERATED ALWAYS AS (
+    md5(
+        COALESCE(inclusion_criteria::text, '') || '|' ||
+        COALESCE(exclusion_criteria::text, '')
+    )
+) STORED,
+ADD COLUMN IF NOT EXISTS validated_fingerprint VARCHAR(32);
+
+ALTER TABLE inclusion_exclusion_llm_validation_history
+ADD COLUMN IF NOT EXISTS output_fingerprint VARCHAR(32);
+
+-- 3. 기존 검증 결과 이관 (이미 검증된 항목은 현재 결과를 검증한 것으로 간주)
+UPDATE outcome_llm_preprocessed
+SET validated_fingerprint = output_fingerprint
+WHERE llm_validation_status IS NOT NULL
+  AND validated_fingerprint IS NULL;
+
+UPDATE outcome_llm_validation_history h
+SET output_fingerprint = p.validated_fingerprint
+FROM outcome_llm_preprocessed p
+WHERE h.outcome_id = p.id
+  AND h.output_fingerprint IS NULL
+  AND p.validated_fingerprint IS NOT NULL;
+
+UPDATE inclusion_exclusion_llm_preprocessed
+SET validated_fingerprint = output_fingerprint
+WHERE llm_validation_status IS NOT NULL
+  AND validated_fingerprint IS NULL;
+
+UPDATE inclusion_exclusion_llm_validation_history h
+SET output_fingerprint = p.validated_fingerprint
+FROM inclusion_exclusion_llm_preprocessed p
+WHERE h.nct_id = p.nct_id
+  AND h.output_fingerprint IS NULL
+  AND p.validated_fingerprint IS NOT NULL;
+
+-- 인덱스 생성 (검증 대상: 결과가 바뀌었거나 검증되지 않은 SUCCESS 항목)
+CREATE INDEX IF NOT EXISTS idx_outcome_llm_fingerprint_changed
+ON outcome_llm_preprocessed(id)
+WHERE llm_status = 'SUCCESS' AND validated_fingerprint IS DISTINCT FROM output_fingerprint;
+
+CREATE INDEX IF NOT EXISTS idx_inclusion_exclusion_llm_fingerprint_changed
+ON inclusion_exclusion_llm_preprocessed(nct_id)
+WHERE llm_status = 'SUCCESS' AND validated_fingerprint IS DISTINCT FROM output_fingerprint;
+
+CREATE INDEX IF NOT EXISTS idx_validation_history_outcome_fingerprint
+ON outcome_llm_validation_history(outcome_id, output_fingerprint);
+
+CREATE INDEX IF NOT EXISTS idx_inclusion_exclusion_validation_history_fingerprint
+ON inclusion_exclusion_llm_validation_history(nct_id, output_fingerprint);
+
+-- 코멘트 추가
+COMMENT ON COLUMN outcome_llm_preprocessed.output_fingerprint IS 'LLM 전처리 결과(measure_code, time_value, time_unit, time_points)의 md5';
+COMMENT ON COLUMN outcome_llm_preprocessed.validated_fingerprint IS '마지막 검증 시점의 output_fingerprint (다르면 재검증 대상)';
+COMMENT ON COLUMN outcome_llm_validation_history.output_fingerprint IS '검증한 전처리 결과의 output_fingerprint';
+COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.output_fingerprint IS 'LLM 전처리 결과(inclusion_criteria, exclusion_criteria)의 md5';
+COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.validated_fingerprint IS '마지막 검증 시점의 output_fingerprint (다르면 재검증 대상)';
+COMMENT ON COLUMN inclusion_exclusion_llm_validation_history.output_fingerprint IS '검증한 전처리 결과의 output_fingerprint';
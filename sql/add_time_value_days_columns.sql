@@ -0,0 +1,74 @@
+-- Outcome 시점 표준 컬럼 추가 (일 단위 환산 + 표준 단위)
+-- time_value/time_unit은 단위가 섞여 있어(weeks, week, months, days, hours ...) 연구 간 시점 비교마다 쿼리 안에서 단위를 환산해야 했음
+-- 생성 컬럼(GENERATED ALWAYS ... STORED)이라 파서(normalize_phase1.py)와 모든 LLM 저장 스크립트가 코드 변경 없이 같은 값을 남기고,
+-- 컬럼을 추가할 때 기존 행도 한 번에 채워집니다 (PostgreSQL 12+, 테이블 재작성)
+--
+-- 표준 단위: MINUTE, HOUR, DAY, WEEK, MONTH, YEAR (그 외/NULL → NULL)
+-- 일 환산: MINUTE 1/1440, HOUR 1/24, DAY 1, WEEK 7, MONTH 30.4375, YEAR 365.25 (1일 미만은 소수)
+--   환자-임상시험 매칭(llm/eligibility_matcher.py)의 시간 단위 환산과 같은 값
+--
+-- 예: 주 52~78에 측정한 Primary outcome
+--   WHERE outcome_type = 'PRIMARY' AND time_value_days BETWEEN 52 * 7 AND 78 * 7
+--
+-- 주의: 아래 함수를 바꾸면 기존 행은 다시 계산되지 않습니다. 함수를 바꾼 뒤에는 컬럼을 DROP 후 이 파일을 다시 실행하세요.
+
+-- 단위 표준화 (소문자, 끝의 s/(s) 제거 후 매핑)
+CREATE OR REPLACE FUNCTION normalize_time_unit(unit TEXT)
+RETURNS VARCHAR AS $$
+    SELECT CASE REGEXP_REPLACE(LOWER(BTRIM(unit)), '(\(s\)|s)$', '')
+        WHEN 'min' THEN 'MINUTE' WHEN 'minute' THEN 'MINUTE'
+        WHEN 'h' THEN 'HOUR' WHEN 'hr' THEN 'HOUR' WHEN 'hour' THEN 'HOUR'
+        WHEN 'd' THEN 'DAY' WHEN 'day' THEN 'DAY'
+        WHEN 'w' THEN 'WEEK' WHEN 'wk' THEN 'WEEK' WHEN 'week' THEN 'WEEK'
+        WHEN 'mo' THEN 'MONTH' WHEN 'mon' THEN 'MONTH' WHEN 'month' THEN 'MONTH'
+        WHEN 'y' THEN 'YEAR' WHEN 'yr' THEN 'YEAR' WHEN 'year' THEN 'YEAR'
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+-- 단위 1개의 일 수
+CREATE OR REPLACE FUNCTION time_unit_days(unit TEXT)
+RETURNS DOUBLE PRECISION AS $$
+    SELECT CASE normalize_time_unit(unit)
+        WHEN 'MINUTE' THEN 1.0 / 1440
+        WHEN 'HOUR' THEN 1.0 / 24
+        WHEN 'DAY' THEN 1.0
+        WHEN 'WEEK' THEN 7.0
+        WHEN 'MONTH' THEN 30.4375
+        WHEN 'YEAR' THEN 365.25
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+-- 1. outcome_normalized (규칙 기반 파서)
+ALTER TABLE outcome_normalized
+ADD COLUMN IF NOT EXISTS time_unit_norm VARCHAR(10)
+    GENERATED ALWAYS AS (normalize_time_unit(time_unit_main)) STORED,
+ADD COLUMN IF NOT EXISTS time_value_days DOUBLE PRECISION
+    GENERATED ALWAYS AS (time_value_main::DOUBLE PRECISION * time_unit_days(time_unit_main)) STORED;
+
+-- 2. outcome_llm_preprocessed (LLM 전처리)
+ALTER TABLE outcome_llm_preprocessed
+ADD COLUMN IF NOT EXISTS llm_time_unit_norm VARCHAR(10)
+    GENERATED ALWAYS AS (normalize_time_unit(llm_time_unit)) STORED,
+ADD COLUMN IF NOT EXISTS llm_time_value_days DOUBLE PRECISION
+    GENERATED ALWAYS AS (llm_time_value::DOUBLE PRECISION * time_unit_days(llm_time_unit)) STORED;
+
+-- 인덱스 생성
+-- 시점 범위 조회: outcome_type = ? AND time_value_days BETWEEN ? AND ?
+CREATE INDEX IF NOT EXISTS idx_outcome_normalized_time_days
+ON outcome_normalized(outcome_type, time_value_days)
+WHERE time_value_days IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_outcome_llm_time_days
+ON outcome_llm_preprocessed(outcome_type, llm_time_value_days)
+WHERE llm_time_value_days IS NOT NULL;
+
+-- 코멘트 추가
+COMMENT ON FUNCTION normalize_time_unit(TEXT) IS '시간 단위 표준화: MINUTE, HOUR, DAY, WEEK, MONTH, YEAR (그 외 NULL)';
+COMMENT ON FUNCTION time_unit_days(TEXT) IS '시간 단위 1개의 일 수 (MONTH 30.4375, YEAR 365.25)';
+COMMENT ON COLUMN outcome_normalized.time_unit_norm IS '표준 단위 (MINUTE, HOUR, DAY, WEEK, MONTH, YEAR), time_unit_main에서 자동 계산';
+COMMENT ON COLUMN outcome_normalized.time_value_days IS 'time_value_main의 일 단위 환산값 (1일 미만은 소수), 자동 계산';
+COMMENT ON COLUMN outcome_llm_preprocessed.llm_time_unit_norm IS '표준 단위 (MINUTE, HOUR, DAY, WEEK, MONTH, YEAR), llm_time_unit에서 자동 계산';
+COMMENT ON COLUMN outcome_llm_preprocessed.llm_time_value_days IS 'llm_time_value의 일 단위 환산값 (1일 미만은 소수), 자동 계산';
+
+ANALYZE outcome_normalized;
+ANALYZE outcome_llm_preprocessed;
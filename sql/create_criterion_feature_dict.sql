@@ -0,0 +1,139 @@
+-- Inclusion/Exclusion feature 사전 (표준 feature 어휘) 생성
+-- LLM이 자유 형식으로 내는 feature("MMSE", "Mini-Mental State Exam score", "AGE", "Global CDR")를
+-- outcome_measure_dict처럼 표준 feature(feature_id)로 묶어 집계/조회를 정수 키로 처리
+--
+-- criterion_feature_dict: 표준 feature 사전 (feature_code, canonical_name, abbreviation, keywords)
+-- criterion_feature_alias: 정규화된 feature 문자열 → feature_id 매핑 (검토 큐 겸용)
+--   - 매칭은 llm/llm_feature_normalizer.py가 메모리에서 수행하고 결과를 별칭으로 저장 (AUTO)
+--   - 매칭되지 않은 feature는 feature_id NULL, review_status = 'PENDING'으로 쌓임
+--   - 검토자가 feature_id를 지정(MAPPED)하거나 제외(IGNORED)하면 트리거가 팩트 테이블에 반영
+-- inclusion_exclusion_criteria.feature_id: 행 INSERT 시 별칭 테이블에서 채움
+--
+-- sql/create_inclusion_exclusion_criteria.sql 다음, sql/create_inclusion_exclusion_criteria_ranges.sql 전에 실행하세요.
+
+CREATE TABLE IF NOT EXISTS criterion_feature_dict (
+    feature_id SERIAL PRIMARY KEY,
+    feature_code VARCHAR(50) NOT NULL UNIQUE,
+    canonical_name TEXT NOT NULL,
+    abbreviation VARCHAR(100),
+    keywords TEXT,  -- 세미콜론으로 구분된 키워드 리스트
+    domain VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS criterion_feature_alias (
+    feature VARCHAR(200) PRIMARY KEY,    -- 정규화된 feature (normalize_criterion_feature)
+    feature_id INTEGER REFERENCES criterion_feature_dict(feature_id) ON DELETE SET NULL,
+    match_type VARCHAR(20),              -- FEATURE_CODE, ABBREVIATION, CANONICAL_NAME, KEYWORD, MANUAL
+    match_keyword TEXT,                  -- 매칭에 사용된 키워드
+    review_status VARCHAR(20) NOT NULL DEFAULT 'PENDING'
+        CHECK (review_status IN ('AUTO', 'PENDING', 'MAPPED', 'IGNORED')),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_criterion_feature_alias_feature_id ON criterion_feature_alias(feature_id);
+CREATE INDEX IF NOT EXISTS idx_criterion_feature_alias_pending
+ON criterion_feature_alias(feature) WHERE review_status = 'PENDING';
+
+-- 팩트 테이블에 표준 feature 컬럼 추가
+ALTER TABLE inclusion_exclusion_criteria ADD COLUMN IF NOT EXISTS feature_id INTEGER;
+
+-- 표준 feature 분포: (feature_id, criteria_type, nct_id)만 읽는 index-only scan
+CREATE INDEX IF NOT EXISTS idx_inclusion_exclusion_criteria_feature_id
+ON inclusion_exclusion_criteria(feature_id, criteria_type, nct_id);
+
+-- 표준 feature 임계값 조회: feature_id = ? AND value_numeric >= ?
+CREATE INDEX IF NOT EXISTS idx_inclusion_exclusion_criteria_feature_id_value
+ON inclusion_exclusion_criteria(feature_id, value_numeric)
+WHERE value_numeric IS NOT NULL;
+
+-- 팩트 행 INSERT 시 별칭 테이블에서 feature_id 채움
+CREATE OR REPLACE FUNCTION set_inclusion_exclusion_criteria_feature_id()
+RETURNS TRIGGER AS $$
+BEGIN
+    SELECT a.feature_id INTO NEW.feature_id
+    FROM criterion_feature_alias a
+    WHERE a.feature = NEW.feature;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS set_inclusion_exclusion_criteria_feature_id ON inclusion_exclusion_criteria;
+CREATE TRIGGER set_inclusion_exclusion_criteria_feature_id
+    BEFORE INSERT ON inclusion_exclusion_criteria
+    FOR EACH ROW
+    EXECUTE FUNCTION set_inclusion_exclusion_criteria_feature_id();
+
+-- 별칭 추가/검토 결과를 팩트 테이블에 반영
+CREATE OR REPLACE FUNCTION sync_criterion_feature_alias()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE inclusion_exclusion_criteria
+    SET feature_id = NEW.feature_id
+    WHERE feature = NEW.feature
+      AND feature_id IS DISTINCT FROM NEW.feature_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sync_criterion_feature_alias ON criterion_feature_alias;
+CREATE TRIGGER sync_criterion_feature_alias
+    AFTER INSERT OR UPDATE OF feature_id ON criterion_feature_alias
+    FOR EACH ROW
+    EXECUTE FUNCTION sync_criterion_feature_alias();
+
+-- 검토 큐: 매칭되지 않은 feature (사용 빈도순)
+CREATE OR REPLACE VIEW criterion_feature_review_queue AS
+SELECT
+    a.feature,
+    COUNT(c.id) AS usage_count,
+    COUNT(DISTINCT c.nct_id) AS study_count,
+    MIN(c.feature_raw) AS example_raw,
+    a.created_at
+FROM criterion_feature_alias a
+LEFT JOIN inclusion_exclusion_criteria c ON c.feature = a.feature
+WHERE a.review_status = 'PENDING'
+GROUP BY a.feature, a.created_at
+ORDER BY usage_count DESC, a.feature;
+
+-- 코멘트 추가
+COMMENT ON TABLE criterion_feature_dict IS 'Inclusion/Exclusion 표준 feature 사전 (outcome_measure_dict와 같은 구조)';
+COMMENT ON COLUMN criterion_feature_dict.keywords IS '세미콜론으로 구분된 별칭/키워드 (llm_feature_normalizer가 매칭에 사용)';
+COMMENT ON TABLE criterion_feature_alias IS '정규화된 feature 문자열 → 표준 feature 매핑 (매칭 실패 항목은 검토 큐)';
+COMMENT ON COLUMN criterion_feature_alias.review_status IS 'AUTO: 자동 매칭, PENDING: 검토 대기, MAPPED: 검토 후 매핑, IGNORED: 표준 feature 없음';
+COMMENT ON COLUMN inclusion_exclusion_criteria.feature_id IS '표준 feature (criterion_feature_dict.feature_id, 매칭 안 되면 NULL)';
+COMMENT ON VIEW criterion_feature_review_queue IS '표준 feature에 매칭되지 않은 feature 검토 큐 (사용 빈도순)';
+
+-- 기본 표준 feature (이미 있으면 유지)
+INSERT INTO criterion_feature_dict (feature_code, canonical_name, abbreviation, domain, keywords) VALUES
+    ('AGE', 'Age', NULL, 'DEMOGRAPHIC', 'age;patient age;subject age;age at screening;age at baseline;age at enrollment;age at consent'),
+    ('GENDER', 'Gender', NULL, 'DEMOGRAPHIC', 'gender;sex;biological sex'),
+    ('EDUCATION', 'Years of Education', NULL, 'DEMOGRAPHIC', 'education;years of education;education years;formal education'),
+    ('PATIENT', 'Patient Characteristic', NULL, 'DEMOGRAPHIC', 'patient;patients;subject;subjects;participant;participants'),
+    ('STUDY_PARTNER', 'Study Partner / Caregiver', NULL, 'DEMOGRAPHIC', 'study partner;caregiver;informant;care partner'),
+    ('BMI', 'Body Mass Index', 'BMI', 'ANTHROPOMETRIC', 'bmi;body mass index'),
+    ('BODY_WEIGHT', 'Body Weight', NULL, 'ANTHROPOMETRIC', 'weight;body weight'),
+    ('MMSE', 'Mini-Mental State Examination', 'MMSE', 'COGNITION', 'mmse;mini mental state examination;mini mental state exam;mini mental status examination;mini mental status exam;folstein mini mental state examination'),
+    ('MOCA', 'Montreal Cognitive Assessment', 'MoCA', 'COGNITION', 'moca;montreal cognitive assessment'),
+    ('CDR_GLOBAL', 'Clinical Dementia Rating - Global Score', 'CDR', 'COGNITION', 'cdr;global cdr;cdr global;cdr global score;clinical dementia rating;global clinical dementia rating;clinical dementia rating global'),
+    ('CDR_SB', 'Clinical Dementia Rating - Sum of Boxes', 'CDR-SB', 'COGNITION', 'cdr sb;cdr-sb;cdr sum of boxes;clinical dementia rating sum of boxes'),
+    ('ADAS_COG', 'Alzheimer''s Disease Assessment Scale - Cognitive Subscale', 'ADAS-Cog', 'COGNITION', 'adas cog;adas-cog;adascog;alzheimer''s disease assessment scale cognitive;alzheimer disease assessment scale cognitive'),
+    ('GDS', 'Geriatric Depression Scale', 'GDS', 'PSYCHIATRIC', 'gds;geriatric depression scale'),
+    ('HAM_D', 'Hamilton Depression Rating Scale', 'HAM-D', 'PSYCHIATRIC', 'ham-d;hamd;hamilton depression rating scale;hamilton rating scale for depression'),
+    ('NPI', 'Neuropsychiatric Inventory', 'NPI', 'PSYCHIATRIC', 'npi;neuropsychiatric inventory'),
+    ('HACHINSKI', 'Hachinski Ischemic Score', 'HIS', 'NEUROLOGY', 'hachinski;hachinski ischemic score;hachinski ischemia score;modified hachinski ischemic score'),
+    ('AMYLOID', 'Amyloid Status', NULL, 'BIOMARKER', 'amyloid;amyloid pet;amyloid positivity;amyloid status;amyloid beta;csf amyloid'),
+    ('APOE4', 'APOE e4 Carrier Status', 'APOE4', 'GENETIC', 'apoe4;apoe e4;apoe ε4;apolipoprotein e4;apoe genotype'),
+    ('HBA1C', 'Hemoglobin A1c', 'HbA1c', 'LABORATORY', 'hba1c;hemoglobin a1c;glycated hemoglobin;glycosylated hemoglobin'),
+    ('EGFR', 'Estimated Glomerular Filtration Rate', 'eGFR', 'LABORATORY', 'egfr;estimated glomerular filtration rate;glomerular filtration rate'),
+    ('CREATININE_CLEARANCE', 'Creatinine Clearance', 'CrCl', 'LABORATORY', 'crcl;creatinine clearance'),
+    ('QTC', 'QTc Interval', 'QTc', 'CARDIAC', 'qtc;qtcf;qtcb;qtc interval;corrected qt interval'),
+    ('SYSTOLIC_BP', 'Systolic Blood Pressure', 'SBP', 'CARDIAC', 'sbp;systolic blood pressure;systolic bp'),
+    ('DIASTOLIC_BP', 'Diastolic Blood Pressure', 'DBP', 'CARDIAC', 'dbp;diastolic blood pressure;diastolic bp'),
+    ('PREGNANCY', 'Pregnancy', NULL, 'REPRODUCTIVE', 'pregnancy;pregnant;pregnancy status'),
+    ('STROKE', 'Stroke / TIA', NULL, 'NEUROLOGY', 'stroke;tia;t i a;transient ischemic attack;major infarction;t i a or major infarction')
+ON CONFLICT (feature_code) DO NOTHING;
+
+ANALYZE criterion_feature_dict;
@@ -0,0 +1,141 @@
+-- Inclusion/Exclusion 기준 팩트 테이블 생성
+-- inclusion_exclusion_llm_preprocessed의 inclusion_criteria/exclusion_criteria JSONB 배열을 기준 1개당 1행으로 펼쳐 저장
+-- Feature 분포, 임계값(숫자 value) 조회를 JSONB 전개 없이 B-tree 인덱스로 처리
+--
+-- 전처리 결과가 INSERT/UPDATE될 때 트리거가 해당 연구의 행을 다시 만듭니다 (llm_status = 'SUCCESS'인 연구만).
+-- inclusion_exclusion_llm_preprocessed 테이블을 생성한 뒤 실행하세요. 기존 데이터는 마지막 단계에서 한 번에 채웁니다.
+
+CREATE TABLE IF NOT EXISTS inclusion_exclusion_criteria (
+    id BIGSERIAL PRIMARY KEY,
+    nct_id VARCHAR(20) NOT NULL,
+    criteria_type VARCHAR(10) NOT NULL,  -- INCLUSION, EXCLUSION
+    criterion_order INTEGER NOT NULL,    -- 배열 안의 순서 (1부터)
+    criterion_id INTEGER,                -- LLM 응답의 criterion_id
+    feature VARCHAR(200),                -- 정규화된 feature (normalize_criterion_feature)
+    feature_raw TEXT,                    -- LLM 응답의 feature 원문
+    operator VARCHAR(5),                 -- =, !=, <, <=, >, >=
+    value_numeric NUMERIC,               -- 숫자 value (숫자형 또는 숫자 문자열인 경우)
+    value_text TEXT,                     -- value 원문 (문자열)
+    unit VARCHAR(50),
+    criterion_text TEXT,                 -- 기준 원문 (original_text)
+    confidence NUMERIC(3,2),
+    FOREIGN KEY (nct_id) REFERENCES inclusion_exclusion_llm_preprocessed(nct_id) ON DELETE CASCADE
+);
+
+-- 인덱스 생성
+-- Feature 분포: (feature, criteria_type, nct_id)만 읽는 index-only scan
+CREATE INDEX IF NOT EXISTS idx_inclusion_exclusion_criteria_feature
+ON inclusion_exclusion_criteria(feature, criteria_type, nct_id);
+
+-- 임계값 조회: feature = ? AND value_numeric >= ?
+CREATE INDEX IF NOT EXISTS idx_inclusion_exclusion_criteria_feature_value
+ON inclusion_exclusion_criteria(feature, value_numeric)
+WHERE value_numeric IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_inclusion_exclusion_criteria_nct_id
+ON inclusion_exclusion_criteria(nct_id);
+
+-- feature 정규화 (앞뒤 공백 제거, 연속 공백 정리, 소문자)
+CREATE OR REPLACE FUNCTION normalize_criterion_feature(feature TEXT)
+RETURNS TEXT AS $$
+    SELECT NULLIF(LOWER(REGEXP_REPLACE(BTRIM(feature), '\s+', ' ', 'g')), '')
+$$ LANGUAGE sql IMMUTABLE;
+
+-- 기준 JSONB 배열 → 팩트 행 (배열이 아니거나 객체가 아닌 항목은 제외)
+CREATE OR REPLACE FUNCTION explode_inclusion_exclusion_criteria(
+    p_nct_id VARCHAR, p_criteria_type VARCHAR, p_criteria JSONB
+)
+RETURNS TABLE (
+    nct_id VARCHAR, criteria_type VARCHAR, criterion_order INTEGER, criterion_id INTEGER,
+    feature VARCHAR, feature_raw TEXT, operator VARCHAR, value_numeric NUMERIC, value_text TEXT,
+    unit VARCHAR, criterion_text TEXT, confidence NUMERIC
+) AS $$
+    SELECT
+        p_nct_id,
+        p_criteria_type,
+        c.ord::INTEGER,
+        CASE WHEN c.item->>'criterion_id' ~ '^\d+$' THEN (c.item->>'criterion_id')::INTEGER END,
+        LEFT(normalize_criterion_feature(c.item->>'feature'), 200),
+        c.item->>'feature',
+        LEFT(c.item->>'operator', 5),
+        CASE
+            WHEN jsonb_typeof(c.item->'value') = 'number' THEN (c.item->>'value')::NUMERIC
+            WHEN c.item->>'value' ~ '^\s*[-+]?(\d+\.?\d*|\.\d+)\s*$' THEN BTRIM(c.item->>'value')::NUMERIC
+        END,
+        c.item->>'value',
+        LEFT(c.item->>'unit', 50),
+        COALESCE(c.item->>'original_text', c.item->>'line'),
+        CASE
+            WHEN jsonb_typeof(c.item->'confidence') = 'number' AND (c.item->>'confidence')::NUMERIC BETWEEN 0 AND 1
+            THEN ROUND((c.item->>'confidence')::NUMERIC, 2)
+        END
+    FROM jsonb_array_elements(
+        CASE WHEN jsonb_typeof(p_criteria) = 'array' THEN p_criteria ELSE '[]'::jsonb END
+    ) WITH ORDINALITY AS c(item, ord)
+    WHERE jsonb_typeof(c.item) = 'object'
+$$ LANGUAGE sql IMMUTABLE;
+
+-- 전처리 결과 변경 시 해당 연구의 팩트 행 재생성
+CREATE OR REPLACE FUNCTION sync_inclusion_exclusion_criteria()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        DELETE FROM inclusion_exclusion_criteria WHERE nct_id = OLD.nct_id;
+    END IF;
+    IF NEW.llm_status = 'SUCCESS' THEN
+        INSERT INTO inclusion_exclusion_criteria (
+            nct_id, criteria_type, criterion_order, criterion_id, feature, feature_raw,
+            operator, value_numeric, value_text, unit, criterion_text, confidence
+        )
+        SELECT * FROM explode_inclusion_exclusion_criteria(NEW.nct_id, 'INCLUSION', NEW.inclusion_criteria)
+        UNION ALL
+        SELECT * FROM explode_inclusion_exclusion_criteria(NEW.nct_id, 'EXCLUSION', NEW.exclusion_criteria);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sync_inclusion_exclusion_criteria_insert ON inclusion_exclusion_llm_preprocessed;
+CREATE TRIGGER sync_inclusion_exclusion_criteria_insert
+    AFTER INSERT ON inclusion_exclusion_llm_preprocessed
+    FOR EACH ROW
+    EXECUTE FUNCTION sync_inclusion_exclusion_criteria();
+
+-- SUCCESS 항목을 보존하는 upsert처럼 값이 그대로인 UPDATE는 건너뜀
+DROP TRIGGER IF EXISTS sync_inclusion_exclusion_criteria_update ON inclusion_exclusion_llm_preprocessed;
+CREATE TRIGGER sync_inclusion_exclusion_criteria_update
+    AFTER UPDATE OF inclusion_criteria, exclusion_criteria, llm_status ON inclusion_exclusion_llm_preprocessed
+    FOR EACH ROW
+    WHEN (
+        OLD.inclusion_criteria IS DISTINCT FROM NEW.inclusion_criteria
+        OR OLD.exclusion_criteria IS DISTINCT FROM NEW.exclusion_criteria
+        OR OLD.llm_status IS DISTINCT FROM NEW.llm_status
+    )
+    EXECUTE FUNCTION sync_inclusion_exclusion_criteria();
+
+-- 코멘트 추가
+COMMENT ON TABLE inclusion_exclusion_criteria IS 'Inclusion/Exclusion 기준 팩트 테이블 (llm_status = SUCCESS 연구의 기준 1개당 1행, 트리거로 동기화)';
+COMMENT ON COLUMN inclusion_exclusion_criteria.criteria_type IS 'INCLUSION 또는 EXCLUSION';
+COMMENT ON COLUMN inclusion_exclusion_criteria.criterion_order IS 'inclusion_criteria/exclusion_criteria 배열 안의 순서 (1부터)';
+COMMENT ON COLUMN inclusion_exclusion_criteria.feature IS '정규화된 feature (소문자, 공백 정리): 분포/임계값 조회 기준';
+COMMENT ON COLUMN inclusion_exclusion_criteria.feature_raw IS 'LLM 응답의 feature 원문';
+COMMENT ON COLUMN inclusion_exclusion_criteria.value_numeric IS '숫자 value (숫자형 또는 숫자 문자열, 그 외 NULL)';
+COMMENT ON COLUMN inclusion_exclusion_criteria.value_text IS 'value 원문';
+COMMENT ON COLUMN inclusion_exclusion_criteria.criterion_text IS '기준 원문 (original_text)';
+
+-- 기존 전처리 결과로 채우기
+TRUNCATE inclusion_exclusion_criteria;
+INSERT INTO inclusion_exclusion_criteria (
+    nct_id, criteria_type, criterion_order, criterion_id, feature, feature_raw,
+    operator, value_numeric, value_text, unit, criterion_text, confidence
+)
+SELECT e.*
+FROM inclusion_exclusion_llm_preprocessed iep
+CROSS JOIN LATERAL (
+    SELECT * FROM explode_inclusion_exclusion_criteria(iep.nct_id, 'INCLUSION', iep.inclusion_criteria)
+    UNION ALL
+    SELECT * FROM explode_inclusion_exclusion_criteria(iep.nct_id, 'EXCLUSION', iep.exclusion_criteria)
+) e
+WHERE iep.llm_status = 'SUCCESS';
+
+ANALYZE inclusion_exclusion_criteria;
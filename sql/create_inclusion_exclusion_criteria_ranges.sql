@@ -0,0 +1,156 @@
+-- Inclusion/Exclusion 숫자 기준 구간 테이블 생성
+-- 기준 팩트 테이블(inclusion_exclusion_criteria)의 숫자 기준을 연구 × feature별 허용 구간(NUMRANGE)으로 합쳐 저장
+-- "MMSE 하한 ≤ 20", "나이 상한 ≥ 85", 코호트 범위와 겹치는 연구 조회를 GiST 인덱스로 처리
+--
+-- 허용 구간 = Inclusion 조건(>=, >, <=, <, =)과 Exclusion 조건의 반대(Exclusion "age < 50" → age >= 50)의 교집합
+--   예: Inclusion age >= 50, Inclusion age <= 85 → [50, 85]
+--       Inclusion MMSE >= 10, Exclusion MMSE > 26 → [10, 26]
+-- 조건이 서로 모순이면(하한 > 상한) 빈 구간('empty')으로 저장합니다. Exclusion의 = 조건은 구간으로 표현할 수 없어 제외합니다.
+-- 표준 feature(criterion_feature_dict)에 매핑된 기준은 feature_id별로 합칩니다 ("MMSE"와 "Mini-Mental State Exam score"는 한 구간).
+--
+-- inclusion_exclusion_criteria가 바뀔 때마다 트리거가 해당 연구의 구간을 다시 계산합니다.
+-- sql/create_inclusion_exclusion_criteria.sql, sql/create_criterion_feature_dict.sql을 먼저 실행하세요.
+
+CREATE TABLE IF NOT EXISTS inclusion_exclusion_criteria_range (
+    nct_id VARCHAR(20) NOT NULL,
+    feature VARCHAR(200) NOT NULL,       -- 표준 feature면 소문자 feature_code, 아니면 정규화된 feature
+    feature_id INTEGER,                  -- 표준 feature (criterion_feature_dict.feature_id)
+    value_range NUMRANGE NOT NULL,       -- 허용 구간 (하한/상한이 없으면 무한대)
+    unit VARCHAR(50),                    -- 기준 단위 (여러 개면 첫 번째)
+    criterion_count INTEGER NOT NULL,    -- 구간을 만든 기준 수
+    PRIMARY KEY (nct_id, feature),
+    FOREIGN KEY (nct_id) REFERENCES inclusion_exclusion_llm_preprocessed(nct_id) ON DELETE CASCADE
+);
+
+ALTER TABLE inclusion_exclusion_criteria_range ADD COLUMN IF NOT EXISTS feature_id INTEGER;
+
+-- 인덱스 생성
+-- 구간 조회 (value_range && / @> / <@): GiST
+-- btree_gist 확장 없이 쓸 수 있도록 feature는 별도 B-tree 인덱스로 두고 플래너가 두 인덱스를 결합합니다.
+CREATE INDEX IF NOT EXISTS idx_inclusion_exclusion_criteria_range_value
+ON inclusion_exclusion_criteria_range USING GIST (value_range);
+
+CREATE INDEX IF NOT EXISTS idx_inclusion_exclusion_criteria_range_feature
+ON inclusion_exclusion_criteria_range(feature);
+
+CREATE INDEX IF NOT EXISTS idx_inclusion_exclusion_criteria_range_feature_id
+ON inclusion_exclusion_criteria_range(feature_id);
+
+-- 연구 목록의 허용 구간 계산
+DROP FUNCTION IF EXISTS derive_inclusion_exclusion_criteria_ranges(VARCHAR[]);
+CREATE FUNCTION derive_inclusion_exclusion_criteria_ranges(p_nct_ids VARCHAR[])
+RETURNS TABLE (
+    nct_id VARCHAR, feature VARCHAR, feature_id INTEGER, value_range NUMRANGE, unit VARCHAR, criterion_count INTEGER
+) AS $$
+    WITH bounds AS (
+        -- Exclusion 조건은 반대 연산자로 바꿔 허용 조건으로 사용
+        SELECT
+            c.nct_id,
+            COALESCE(LOWER(d.feature_code), c.feature)::VARCHAR AS feature,
+            c.feature_id,
+            c.value_numeric AS value,
+            c.unit,
+            CASE WHEN c.criteria_type = 'INCLUSION' THEN c.operator
+                 ELSE CASE c.operator WHEN '<' THEN '>=' WHEN '<=' THEN '>' WHEN '>' THEN '<=' WHEN '>=' THEN '<' END
+            END AS operator
+        FROM inclusion_exclusion_criteria c
+        LEFT JOIN criterion_feature_dict d ON d.feature_id = c.feature_id
+        WHERE c.nct_id = ANY(p_nct_ids)
+          AND c.feature IS NOT NULL
+          AND c.value_numeric IS NOT NULL
+          AND (c.operator IN ('<', '<=', '>', '>=') OR (c.operator = '=' AND c.criteria_type = 'INCLUSION'))
+    ),
+    limits AS (
+        -- 가장 큰 하한, 가장 작은 상한 (같은 값이면 초과/미만 조건이 더 엄격)
+        -- 키는 (nct_id, feature): 매핑 안 된 'age'(feature_id NULL)와 AGE로 매핑된 'patient age'는 같은 구간으로 합침
+        SELECT
+            b.nct_id,
+            b.feature,
+            MAX(b.feature_id) AS feature_id,
+            (ARRAY_AGG(b.value ORDER BY b.value DESC, b.operator = '>' DESC) FILTER (WHERE b.operator IN ('>', '>=', '=')))[1] AS lower_value,
+            (ARRAY_AGG(b.operator ORDER BY b.value DESC, b.operator = '>' DESC) FILTER (WHERE b.operator IN ('>', '>=', '=')))[1] AS lower_operator,
+            (ARRAY_AGG(b.value ORDER BY b.value ASC, b.operator = '<' DESC) FILTER (WHERE b.operator IN ('<', '<=', '=')))[1] AS upper_value,
+            (ARRAY_AGG(b.operator ORDER BY b.value ASC, b.operator = '<' DESC) FILTER (WHERE b.operator IN ('<', '<=', '=')))[1] AS upper_operator,
+            MIN(b.unit) AS unit,
+            COUNT(*)::INTEGER AS criterion_count
+        FROM bounds b
+        GROUP BY b.nct_id, b.feature
+    )
+    SELECT
+        l.nct_id,
+        l.feature,
+        l.feature_id,
+        CASE
+            WHEN l.lower_value > l.upper_value THEN 'empty'::NUMRANGE
+            ELSE NUMRANGE(
+                l.lower_value,
+                l.upper_value,
+                CASE WHEN l.lower_operator = '>' THEN '(' ELSE '[' END
+                || CASE WHEN l.upper_operator = '<' THEN ')' ELSE ']' END
+            )
+        END,
+        l.unit,
+        l.criterion_count
+    FROM limits l
+$$ LANGUAGE sql STABLE;
+
+-- 기준 팩트 테이블 변경 시 바뀐 연구의 구간 재계산 (문장 단위)
+CREATE OR REPLACE FUNCTION sync_inclusion_exclusion_criteria_ranges()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed VARCHAR[];
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT ARRAY_AGG(DISTINCT nct_id) INTO changed FROM new_rows;
+    ELSE
+        SELECT ARRAY_AGG(DISTINCT nct_id) INTO changed FROM old_rows;
+    END IF;
+    IF changed IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    DELETE FROM inclusion_exclusion_criteria_range WHERE nct_id = ANY(changed);
+    INSERT INTO inclusion_exclusion_criteria_range (nct_id, feature, feature_id, value_range, unit, criterion_count)
+    SELECT * FROM derive_inclusion_exclusion_criteria_ranges(changed);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sync_inclusion_exclusion_criteria_ranges_insert ON inclusion_exclusion_criteria;
+CREATE TRIGGER sync_inclusion_exclusion_criteria_ranges_insert
+    AFTER INSERT ON inclusion_exclusion_criteria
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION sync_inclusion_exclusion_criteria_ranges();
+
+-- 표준 feature 매핑 변경 (criterion_feature_alias 검토 결과 반영)
+DROP TRIGGER IF EXISTS sync_inclusion_exclusion_criteria_ranges_update ON inclusion_exclusion_criteria;
+CREATE TRIGGER sync_inclusion_exclusion_criteria_ranges_update
+    AFTER UPDATE ON inclusion_exclusion_criteria
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION sync_inclusion_exclusion_criteria_ranges();
+
+DROP TRIGGER IF EXISTS sync_inclusion_exclusion_criteria_ranges_delete ON inclusion_exclusion_criteria;
+CREATE TRIGGER sync_inclusion_exclusion_criteria_ranges_delete
+    AFTER DELETE ON inclusion_exclusion_criteria
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION sync_inclusion_exclusion_criteria_ranges();
+
+-- 코멘트 추가
+COMMENT ON TABLE inclusion_exclusion_criteria_range IS '연구 × feature별 숫자 기준 허용 구간 (Inclusion 조건과 Exclusion 조건의 반대의 교집합, 트리거로 동기화)';
+COMMENT ON COLUMN inclusion_exclusion_criteria_range.feature IS '표준 feature면 소문자 feature_code, 아니면 정규화된 feature';
+COMMENT ON COLUMN inclusion_exclusion_criteria_range.feature_id IS '표준 feature (criterion_feature_dict.feature_id, 매칭 안 되면 NULL)';
+COMMENT ON COLUMN inclusion_exclusion_criteria_range.value_range IS '허용 구간 (NUMRANGE, 하한/상한이 없으면 무한대, 모순된 조건이면 empty)';
+COMMENT ON COLUMN inclusion_exclusion_criteria_range.unit IS '기준 단위 (여러 개면 첫 번째)';
+COMMENT ON COLUMN inclusion_exclusion_criteria_range.criterion_count IS '구간을 만든 숫자 기준 수';
+
+-- 기존 기준 팩트 테이블로 채우기
+TRUNCATE inclusion_exclusion_criteria_range;
+INSERT INTO inclusion_exclusion_criteria_range (nct_id, feature, feature_id, value_range, unit, criterion_count)
+SELECT * FROM derive_inclusion_exclusion_criteria_ranges(
+    ARRAY(SELECT DISTINCT nct_id FROM inclusion_exclusion_criteria)
+);
+
+ANALYZE inclusion_exclusion_criteria_range;
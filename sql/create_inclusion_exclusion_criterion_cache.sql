@@ -0,0 +1,38 @@
+-- Inclusion/Exclusion 기준 줄 구조화 결과 캐시 테이블 생성
+-- 여러 연구에 반복되는 기준 줄("Age 50 to 85 years" 등)의 LLM 구조화 결과를 정규화된 줄 텍스트 기준으로 재사용
+
+CREATE TABLE IF NOT EXISTS inclusion_exclusion_criterion_cache (
+    criterion_key VARCHAR(64) PRIMARY KEY,  -- 정규화된 기준 줄 텍스트의 SHA-256
+    normalized_text TEXT NOT NULL,          -- 정규화된 기준 줄 텍스트 (소문자, 공백 정리, 끝 구두점 제거)
+    criteria JSONB NOT NULL,                -- 구조화 결과 배열 (feature/operator/value/unit/confidence, 빈 배열: 하위 기준 안내 문구)
+    source_nct_id VARCHAR(20),              -- 처음 구조화된 연구
+    model VARCHAR(100),                     -- 구조화에 사용한 모델
+    hit_count INTEGER NOT NULL DEFAULT 0,   -- 캐시 재사용 횟수
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 인덱스 생성
+CREATE INDEX IF NOT EXISTS idx_inclusion_exclusion_criterion_cache_hit_count ON inclusion_exclusion_criterion_cache(hit_count);
+
+-- 코멘트 추가
+COMMENT ON TABLE inclusion_exclusion_criterion_cache IS '기준 줄 단위 LLM 구조화 결과 캐시 (연구 간 재사용)';
+COMMENT ON COLUMN inclusion_exclusion_criterion_cache.criterion_key IS '정규화된 기준 줄 텍스트의 SHA-256';
+COMMENT ON COLUMN inclusion_exclusion_criterion_cache.criteria IS '구조화 결과 배열 (criterion_id/original_text 제외, 재사용 시 연구별로 채움)';
+COMMENT ON COLUMN inclusion_exclusion_criterion_cache.hit_count IS '캐시 재사용 횟수';
+
+-- 기존 DB: 하위 줄(parent_seq 있음)로 저장된 캐시 항목 삭제
+-- 하위 줄은 상위 줄 문맥으로 구조화되므로 줄 텍스트만으로 재사용하면 다른 상위 줄의 feature가 붙음
+-- (처음 구조화한 연구에서 같은 정규화 텍스트가 하위 줄인 항목, 이후에는 하위 줄을 저장하지 않음)
+DO $$
+BEGIN
+    IF to_regclass('inclusion_exclusion_segments') IS NOT NULL THEN
+        DELETE FROM inclusion_exclusion_criterion_cache c
+        WHERE EXISTS (
+            SELECT 1 FROM inclusion_exclusion_segments s
+            WHERE s.nct_id = c.source_nct_id
+              AND s.parent_seq IS NOT NULL
+              AND rtrim(btrim(regexp_replace(lower(normalize(s.criterion_text, NFKC)), '\s+', ' ', 'g')), ' .;,') = c.normalized_text
+        );
+    END IF;
+END $$;
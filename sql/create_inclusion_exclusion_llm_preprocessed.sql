@@ -1,14 +1,14 @@
 -- LLM 전처리 결과 저장용 테이블 생성
 -- inclusion_exclusion_raw의 모든 데이터를 LLM으로 전처리한 결과를 저장
+-- 원본 텍스트/phase는 복사하지 않고 inclusion_exclusion_raw를 nct_id로 참조
+-- (원본과 함께 조회: inclusion_exclusion_llm_preprocessed_with_raw 뷰, sql/create_llm_preprocessed_views.sql)
 
 DROP TABLE IF EXISTS inclusion_exclusion_llm_preprocessed CASCADE;
 
 CREATE TABLE inclusion_exclusion_llm_preprocessed (
-    -- 원본 데이터 (inclusion_exclusion_raw에서 복사)
+    -- 원본 키 (inclusion_exclusion_raw 참조)
     id SERIAL PRIMARY KEY,
     nct_id VARCHAR(20) NOT NULL,
-    eligibility_criteria_raw TEXT,  -- 원본 텍스트
-    phase VARCHAR(50),
     
     -- LLM 전처리 결과: Inclusion Criteria (JSONB 배열)
     inclusion_criteria JSONB,  -- Inclusion 항목 배열
@@ -19,8 +19,9 @@ CREATE TABLE inclusion_exclusion_llm_preprocessed (
     -- 메타데이터
     llm_confidence NUMERIC(3,2),  -- LLM 신뢰도 (0.00 ~ 1.00)
     llm_notes TEXT,  -- LLM 처리 노트
-    parsing_method VARCHAR(20) DEFAULT 'LLM',  -- 파싱 방법 (LLM)
-    llm_status VARCHAR(20),  -- LLM 처리 상태: SUCCESS, INCLUSION_FAILED, EXCLUSION_FAILED, BOTH_FAILED, API_FAILED
+    parsing_method VARCHAR(20) DEFAULT 'LLM',  -- 파싱 방법: LLM, RULE_BASED (규칙 추출만), HYBRID (규칙/캐시 + LLM)
+    llm_model VARCHAR(100),  -- 결과를 만든 LLM 모델 (규칙/캐시만으로 구조화된 경우 NULL)
+    llm_status VARCHAR(20),  -- LLM 처리 상태: SUCCESS, INCLUSION_FAILED, EXCLUSION_FAILED, BOTH_FAILED, API_FAILED, PARSE_ERROR
     failure_reason VARCHAR(50),  -- 실패 이유 (llm_status가 FAILED인 경우)
     
     -- 검증 결과 (LLM으로 검증한 결과)
@@ -37,12 +38,13 @@ CREATE TABLE inclusion_exclusion_llm_preprocessed (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     
-    CONSTRAINT unique_inclusion_exclusion_llm UNIQUE (nct_id)
+    CONSTRAINT unique_inclusion_exclusion_llm UNIQUE (nct_id),
+    CONSTRAINT fk_inclusion_exclusion_llm_raw FOREIGN KEY (nct_id)
+        REFERENCES inclusion_exclusion_raw(nct_id) ON DELETE CASCADE
 );
 
 -- 인덱스 생성
 CREATE INDEX idx_inclusion_exclusion_llm_nct_id ON inclusion_exclusion_llm_preprocessed(nct_id);
-CREATE INDEX idx_inclusion_exclusion_llm_phase ON inclusion_exclusion_llm_preprocessed(phase);
 CREATE INDEX idx_inclusion_exclusion_llm_status ON inclusion_exclusion_llm_preprocessed(llm_status);
 CREATE INDEX idx_inclusion_exclusion_llm_validation_status ON inclusion_exclusion_llm_preprocessed(llm_validation_status);
 CREATE INDEX idx_inclusion_exclusion_llm_inclusion ON inclusion_exclusion_llm_preprocessed USING GIN (inclusion_criteria);
@@ -70,7 +72,7 @@ COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.inclusion_criteria IS 'In
 COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.exclusion_criteria IS 'Exclusion 항목 배열 (JSONB): [{"criterion_id": 1, "feature": "AGE", "operator": "<", "value": 50, ...}, ...]';
 COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.llm_confidence IS 'LLM 처리 신뢰도 (0.00 ~ 1.00)';
 COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.llm_notes IS 'LLM 처리 노트';
-COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.llm_status IS 'LLM 처리 상태: SUCCESS, INCLUSION_FAILED, EXCLUSION_FAILED, BOTH_FAILED, API_FAILED';
+COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.llm_status IS 'LLM 처리 상태: SUCCESS, INCLUSION_FAILED, EXCLUSION_FAILED, BOTH_FAILED, API_FAILED, PARSE_ERROR';
 COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.failure_reason IS '실패 이유 (llm_status가 FAILED인 경우)';
 COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.llm_validation_status IS 'LLM 검증 상태: VERIFIED, UNCERTAIN, INCLUSION_FAILED, EXCLUSION_FAILED, BOTH_FAILED';
 COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.llm_validation_confidence IS 'LLM 검증 신뢰도 (0.00 ~ 1.00)';
@@ -79,5 +81,6 @@ COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.validation_consistency_sc
 COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.validation_count IS '검증 실행 횟수';
 COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.needs_manual_review IS '수동 검토 필요 여부';
 COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.avg_validation_confidence IS '평균 검증 신뢰도';
-COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.parsing_method IS '파싱 방법 (LLM)';
+COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.parsing_method IS '파싱 방법: LLM, RULE_BASED (규칙 추출만), HYBRID (규칙/캐시 + LLM)';
+COMMENT ON COLUMN inclusion_exclusion_llm_preprocessed.llm_model IS '전처리 결과를 만든 LLM 모델 (규칙/캐시만으로 구조화된 경우 NULL)';
 
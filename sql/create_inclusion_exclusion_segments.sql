@@ -0,0 +1,29 @@
+-- Inclusion/Exclusion 기준 분할 결과 테이블 생성
+-- preprocessing/segment_eligibility_criteria.py가 eligibility_criteria_raw를 섹션/기준 줄 단위로 분할하여 저장
+
+CREATE TABLE IF NOT EXISTS inclusion_exclusion_segments (
+    id BIGSERIAL PRIMARY KEY,
+    nct_id VARCHAR(20) NOT NULL,
+    section VARCHAR(20) NOT NULL,         -- INCLUSION, EXCLUSION, UNSPECIFIED (제목 이전 텍스트)
+    criterion_seq INTEGER NOT NULL,       -- 연구 내 기준 순번 (1부터, 섹션 구분 없이 원문 순서)
+    section_seq INTEGER NOT NULL,         -- 섹션 내 순번 (프롬프트 라벨 I1, E2 등에 사용)
+    parent_seq INTEGER,                   -- 상위 기준의 criterion_seq (중첩 불릿인 경우)
+    depth SMALLINT NOT NULL DEFAULT 0,    -- 중첩 깊이 (0: 최상위)
+    marker VARCHAR(10),                   -- 원문 불릿 표시 (*, -, 1., a) 등)
+    criterion_text TEXT NOT NULL,         -- 불릿 표시를 제거한 기준 텍스트 (줄바꿈된 연속 줄 포함)
+    source_hash VARCHAR(64) NOT NULL,     -- 분할에 사용한 eligibility_criteria_raw의 SHA-256 (원문 변경 감지)
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT unique_inclusion_exclusion_segment UNIQUE (nct_id, criterion_seq)
+);
+
+-- 인덱스 생성
+CREATE INDEX IF NOT EXISTS idx_inclusion_exclusion_segments_nct_id ON inclusion_exclusion_segments(nct_id);
+CREATE INDEX IF NOT EXISTS idx_inclusion_exclusion_segments_section ON inclusion_exclusion_segments(section);
+
+-- 코멘트 추가
+COMMENT ON TABLE inclusion_exclusion_segments IS 'eligibility_criteria_raw를 Inclusion/Exclusion 섹션과 기준 줄 단위로 분할한 결과 (LLM 입력 재사용)';
+COMMENT ON COLUMN inclusion_exclusion_segments.section IS '섹션: INCLUSION, EXCLUSION, UNSPECIFIED';
+COMMENT ON COLUMN inclusion_exclusion_segments.criterion_seq IS '연구 내 기준 순번 (원문 순서)';
+COMMENT ON COLUMN inclusion_exclusion_segments.section_seq IS '섹션 내 순번 (프롬프트 라벨 I1, E2 등)';
+COMMENT ON COLUMN inclusion_exclusion_segments.parent_seq IS '상위 기준의 criterion_seq (중첩 불릿)';
+COMMENT ON COLUMN inclusion_exclusion_segments.source_hash IS '분할 시점 eligibility_criteria_raw의 SHA-256 (원문 변경 시 재분할)';
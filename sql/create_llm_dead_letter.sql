@@ -0,0 +1,28 @@
+-- LLM 재시도 큐 dead-letter 테이블 생성
+-- 같은 실행 안에서 MAX_RETRIES회 재시도 후에도 실패한 항목을 저장
+
+CREATE TABLE IF NOT EXISTS llm_dead_letter (
+    id BIGSERIAL PRIMARY KEY,
+    pipeline VARCHAR(50) NOT NULL,      -- 파이프라인 이름: outcome_preprocess, inclusion_exclusion_preprocess
+    item_key VARCHAR(100) NOT NULL,     -- 항목 키 (outcome_raw.id 또는 nct_id)
+    failure_kind VARCHAR(20) NOT NULL,  -- 실패 유형: API_FAILED, PARSE_ERROR
+    attempts INTEGER NOT NULL,          -- 누적 시도 횟수
+    last_batch_size INTEGER,            -- 마지막 시도 시 (서브) 배치 크기
+    last_notes TEXT,                    -- 마지막 시도 결과 노트
+    payload JSONB,                      -- 원본 항목 (재처리용)
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT unique_llm_dead_letter UNIQUE (pipeline, item_key)
+);
+
+-- 인덱스 생성
+CREATE INDEX IF NOT EXISTS idx_llm_dead_letter_pipeline ON llm_dead_letter(pipeline);
+CREATE INDEX IF NOT EXISTS idx_llm_dead_letter_failure_kind ON llm_dead_letter(failure_kind);
+
+-- 코멘트 추가
+COMMENT ON TABLE llm_dead_letter IS 'LLM 재시도 큐에서 최대 시도 후에도 실패한 항목';
+COMMENT ON COLUMN llm_dead_letter.pipeline IS '파이프라인 이름 (outcome_preprocess, inclusion_exclusion_preprocess)';
+COMMENT ON COLUMN llm_dead_letter.item_key IS '항목 키 (outcome_raw.id 또는 nct_id)';
+COMMENT ON COLUMN llm_dead_letter.failure_kind IS '실패 유형: API_FAILED, PARSE_ERROR';
+COMMENT ON COLUMN llm_dead_letter.attempts IS '누적 시도 횟수';
+COMMENT ON COLUMN llm_dead_letter.payload IS '원본 항목 JSON (재처리용)';
@@ -0,0 +1,55 @@
+-- LLM 전처리 결과 + 원본 텍스트 조회용 뷰 생성 (여러 번 실행해도 안전)
+-- 결과 테이블에는 LLM 결과만 저장하고 원본은 키로 참조하므로 (sql/add_llm_preprocessed_raw_reference.sql)
+-- 원본 텍스트가 필요한 조회는 아래 뷰를 사용합니다 (이전 테이블과 같은 컬럼 이름):
+--   - outcome_llm_preprocessed_with_raw: outcome_llm_preprocessed + outcome_raw 원본 텍스트 + study_raw.phase
+--   - inclusion_exclusion_llm_preprocessed_with_raw: inclusion_exclusion_llm_preprocessed + eligibility_criteria_raw + study_raw.phase
+-- 뷰는 LEFT JOIN(고유 키)이라 원본 컬럼을 쓰지 않는 조회에서는 플래너가 조인을 생략합니다.
+-- UPDATE/INSERT는 결과 테이블에 직접 하세요.
+--
+-- 뷰의 r.*는 생성 시점 컬럼으로 고정되므로 매번 삭제 후 다시 만듭니다.
+-- llm/llm_preprocess_full.py, llm/llm_preprocess_inclusion_exclusion.py가 시작할 때 실행하며,
+-- 결과 테이블에 컬럼을 추가한 뒤 직접 실행해도 됩니다. 결과 테이블이 없으면 해당 뷰는 건너뜁니다.
+
+-- 1. Outcome
+DO $$
+BEGIN
+    IF to_regclass('outcome_llm_preprocessed') IS NOT NULL THEN
+        DROP VIEW IF EXISTS outcome_llm_preprocessed_with_raw;
+        CREATE VIEW outcome_llm_preprocessed_with_raw AS
+        SELECT
+            r.*,
+            o.measure_raw,
+            o.description_raw,
+            o.time_frame_raw,
+            s.phase
+        FROM outcome_llm_preprocessed r
+        LEFT JOIN outcome_raw o
+            ON o.nct_id = r.nct_id
+            AND o.outcome_type = r.outcome_type
+            AND o.outcome_order = r.outcome_order
+        LEFT JOIN study_raw s
+            ON s.nct_id = r.nct_id;
+
+        COMMENT ON VIEW outcome_llm_preprocessed_with_raw IS 'outcome LLM 전처리 결과 + 원본 텍스트(outcome_raw) + phase(study_raw), 조회 전용';
+    END IF;
+END $$;
+
+-- 2. Inclusion/Exclusion
+DO $$
+BEGIN
+    IF to_regclass('inclusion_exclusion_llm_preprocessed') IS NOT NULL THEN
+        DROP VIEW IF EXISTS inclusion_exclusion_llm_preprocessed_with_raw;
+        CREATE VIEW inclusion_exclusion_llm_preprocessed_with_raw AS
+        SELECT
+            r.*,
+            ier.eligibility_criteria_raw,
+            s.phase
+        FROM inclusion_exclusion_llm_preprocessed r
+        LEFT JOIN inclusion_exclusion_raw ier
+            ON ier.nct_id = r.nct_id
+        LEFT JOIN study_raw s
+            ON s.nct_id = r.nct_id;
+
+        COMMENT ON VIEW inclusion_exclusion_llm_preprocessed_with_raw IS 'Inclusion/Exclusion LLM 전처리 결과 + 원본 텍스트(inclusion_exclusion_raw) + phase(study_raw), 조회 전용';
+    END IF;
+END $$;
@@ -1,18 +1,16 @@
 -- LLM 전처리 결과 저장용 테이블 생성
 -- outcome_raw의 모든 데이터를 LLM으로 전처리한 결과를 저장
+-- 원본 텍스트/phase는 복사하지 않고 outcome_raw를 키로 참조 (원본과 함께 조회: outcome_llm_preprocessed_with_raw 뷰,
+-- sql/create_llm_preprocessed_views.sql)
 
 DROP TABLE IF EXISTS outcome_llm_preprocessed CASCADE;
 
 CREATE TABLE outcome_llm_preprocessed (
-    -- 원본 데이터 (outcome_raw에서 복사)
+    -- 원본 키 (outcome_raw 참조)
     id SERIAL PRIMARY KEY,
     nct_id VARCHAR(20) NOT NULL,
     outcome_type VARCHAR(50) NOT NULL,
     outcome_order INTEGER NOT NULL,
-    measure_raw TEXT,
-    description_raw TEXT,
-    time_frame_raw TEXT,
-    phase VARCHAR(50),
     
     -- LLM 전처리 결과
     llm_measure_code VARCHAR(50),  -- LLM이 추출한 measure_code
@@ -24,7 +22,8 @@ CREATE TABLE outcome_llm_preprocessed (
     llm_confidence NUMERIC(3,2),  -- LLM 신뢰도 (0.00 ~ 1.00)
     llm_notes TEXT,                -- LLM 처리 노트 (일관된 형식)
     parsing_method VARCHAR(20) DEFAULT 'LLM',  -- 파싱 방법 (LLM)
-    llm_status VARCHAR(20),       -- LLM 처리 상태: SUCCESS, MEASURE_FAILED, TIMEFRAME_FAILED, BOTH_FAILED, API_FAILED, PARTIAL_RECOVERED
+    llm_model VARCHAR(100),        -- 결과를 만든 LLM 모델 (모델 캐스케이드 최종 단계)
+    llm_status VARCHAR(20),       -- LLM 처리 상태: SUCCESS, MEASURE_FAILED, TIMEFRAME_FAILED, BOTH_FAILED, API_FAILED, PARSE_ERROR, PARTIAL_RECOVERED
     failure_reason VARCHAR(50),   -- 실패 이유 (llm_status가 FAILED인 경우)
     
     -- 검증 결과 (LLM으로 검증한 결과)
@@ -36,7 +35,9 @@ CREATE TABLE outcome_llm_preprocessed (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     
     -- 원본 데이터와의 관계
-    CONSTRAINT unique_outcome_llm UNIQUE (nct_id, outcome_type, outcome_order)
+    CONSTRAINT unique_outcome_llm UNIQUE (nct_id, outcome_type, outcome_order),
+    CONSTRAINT fk_outcome_llm_raw FOREIGN KEY (nct_id, outcome_type, outcome_order)
+        REFERENCES outcome_raw(nct_id, outcome_type, outcome_order) ON DELETE CASCADE
 );
 
 -- 인덱스 생성
@@ -44,7 +45,6 @@ CREATE INDEX idx_outcome_llm_nct_id ON outcome_llm_preprocessed(nct_id);
 CREATE INDEX idx_outcome_llm_type ON outcome_llm_preprocessed(outcome_type);
 CREATE INDEX idx_outcome_llm_measure_code ON outcome_llm_preprocessed(llm_measure_code);
 CREATE INDEX idx_outcome_llm_time_value ON outcome_llm_preprocessed(llm_time_value, llm_time_unit);
-CREATE INDEX idx_outcome_llm_phase ON outcome_llm_preprocessed(phase);
 CREATE INDEX idx_outcome_llm_parsing_method ON outcome_llm_preprocessed(parsing_method);
 CREATE INDEX idx_outcome_llm_status ON outcome_llm_preprocessed(llm_status);
 CREATE INDEX idx_outcome_llm_failure_reason ON outcome_llm_preprocessed(failure_reason);
@@ -72,10 +72,11 @@ COMMENT ON COLUMN outcome_llm_preprocessed.llm_time_unit IS 'LLM이 추출한 ti
 COMMENT ON COLUMN outcome_llm_preprocessed.llm_time_points IS '복수 시점인 경우 JSON 배열 [{"value": 숫자, "unit": "단위"}, ...]';
 COMMENT ON COLUMN outcome_llm_preprocessed.llm_confidence IS 'LLM 처리 신뢰도 (0.00 ~ 1.00)';
 COMMENT ON COLUMN outcome_llm_preprocessed.llm_notes IS 'LLM 처리 노트 (형식: [CATEGORY] 설명. 상세내용)';
-COMMENT ON COLUMN outcome_llm_preprocessed.llm_status IS 'LLM 처리 상태: SUCCESS, MEASURE_FAILED, TIMEFRAME_FAILED, BOTH_FAILED, API_FAILED, PARTIAL_RECOVERED';
+COMMENT ON COLUMN outcome_llm_preprocessed.llm_status IS 'LLM 처리 상태: SUCCESS, MEASURE_FAILED, TIMEFRAME_FAILED, BOTH_FAILED, API_FAILED, PARSE_ERROR, PARTIAL_RECOVERED';
 COMMENT ON COLUMN outcome_llm_preprocessed.failure_reason IS '실패 이유 (llm_status가 FAILED인 경우)';
 COMMENT ON COLUMN outcome_llm_preprocessed.llm_validation_status IS 'LLM 검증 상태: VERIFIED, UNCERTAIN, MEASURE_FAILED, TIMEFRAME_FAILED, BOTH_FAILED';
 COMMENT ON COLUMN outcome_llm_preprocessed.llm_validation_confidence IS 'LLM 검증 신뢰도 (0.00 ~ 1.00)';
 COMMENT ON COLUMN outcome_llm_preprocessed.llm_validation_notes IS 'LLM 검증 노트';
 COMMENT ON COLUMN outcome_llm_preprocessed.parsing_method IS '파싱 방법 (LLM)';
+COMMENT ON COLUMN outcome_llm_preprocessed.llm_model IS '전처리 결과를 만든 LLM 모델 (캐스케이드 사용 시 최종 단계 모델)';
 
@@ -0,0 +1,201 @@
+-- Study 차원 테이블 생성 (연구 단위 정보를 nct_id당 1행으로 저장)
+-- 기존에는 study 레벨 정보가 행마다 중복 저장되었음
+--   - outcome_raw: 모든 outcome 행에 같은 phase, source_version, intervention_json + outcome별 raw_json
+--   - inclusion_exclusion_raw: 연구 전체 JSON(raw_json) + phase, source_version
+-- study_raw가 phase, source_version, overall_status, lead sponsor, intervention_json과
+-- 원본 study JSON(raw_json, outcome JSON도 이 안에 포함)을 연구당 한 번만 보관하고
+-- outcome_raw / inclusion_exclusion_raw는 nct_id로 참조합니다 (테이블/TOAST 크기, 백업 시간, 스캔 비용 감소).
+--
+-- 수집 스크립트(preprocessing/collect_outcomes.py, collect_inclusion_exclusion.py)는
+-- preprocessing/study_raw.py로 study_raw를 먼저 UPSERT한 뒤 outcome/eligibility 행을 저장합니다.
+-- phase 등은 JOIN으로 조회하세요:
+--   SELECT o.*, s.phase FROM outcome_raw o JOIN study_raw s ON s.nct_id = o.nct_id
+--
+-- 기존 DB: 아래 마이그레이션이 기존 컬럼으로 study_raw를 채우고 중복 컬럼을 삭제한 뒤
+-- VACUUM FULL로 공간을 회수합니다 (테이블 잠금, 트랜잭션 밖에서 실행: psql -f, --single-transaction 사용 금지).
+
+CREATE TABLE IF NOT EXISTS study_raw (
+    nct_id VARCHAR(20) PRIMARY KEY,
+    phase VARCHAR(50),               -- Phase 정보 (예: "PHASE1", "PHASE2", "PHASE1,PHASE2", "NA")
+    source_version VARCHAR(50),      -- derivedSection.miscInfoModule.versionHolder
+    overall_status VARCHAR(50),      -- protocolSection.statusModule.overallStatus
+    lead_sponsor_name TEXT,          -- protocolSection.sponsorCollaboratorsModule.leadSponsor.name
+    lead_sponsor_class VARCHAR(50),  -- leadSponsor.class (INDUSTRY, NIH, OTHER 등)
+    intervention_json JSONB,         -- armsInterventionsModule.interventions (원본 JSON 배열)
+    raw_json JSONB,                  -- 원본 study JSON (전체)
+    ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 인덱스 생성
+CREATE INDEX IF NOT EXISTS idx_study_raw_phase ON study_raw(phase);
+CREATE INDEX IF NOT EXISTS idx_study_raw_overall_status ON study_raw(overall_status);
+CREATE INDEX IF NOT EXISTS idx_study_raw_intervention ON study_raw USING GIN (intervention_json);
+
+-- 코멘트 추가
+COMMENT ON TABLE study_raw IS '연구 단위 원본 데이터 (nct_id당 1행, outcome_raw/inclusion_exclusion_raw가 참조)';
+COMMENT ON COLUMN study_raw.phase IS 'Phase 정보 (PHASE1, PHASE2, PHASE3, PHASE4, NA 등, 여러 개면 쉼표 구분)';
+COMMENT ON COLUMN study_raw.source_version IS '데이터 소스 버전 (derivedSection.miscInfoModule.versionHolder)';
+COMMENT ON COLUMN study_raw.overall_status IS '연구 진행 상태 (protocolSection.statusModule.overallStatus)';
+COMMENT ON COLUMN study_raw.lead_sponsor_name IS 'Lead Sponsor 이름';
+COMMENT ON COLUMN study_raw.lead_sponsor_class IS 'Lead Sponsor 유형 (INDUSTRY, NIH, OTHER 등)';
+COMMENT ON COLUMN study_raw.intervention_json IS '연구의 intervention 정보 (원본 JSON 배열)';
+COMMENT ON COLUMN study_raw.raw_json IS '원본 study JSON (전체, 연구당 한 번만 저장)';
+
+-- ============================================
+-- 기존 DB 마이그레이션
+-- ============================================
+
+-- 1. Inclusion/Exclusion 원본의 study JSON으로 채우기 (연구 전체 JSON이 있으므로 우선)
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'inclusion_exclusion_raw' AND column_name = 'raw_json'
+    ) THEN
+        INSERT INTO study_raw (nct_id, phase, source_version, overall_status,
+                               lead_sponsor_name, lead_sponsor_class, intervention_json, raw_json, ingested_at)
+        SELECT
+            ier.nct_id,
+            ier.phase,
+            ier.source_version,
+            ier.raw_json #>> '{protocolSection,statusModule,overallStatus}',
+            ier.raw_json #>> '{protocolSection,sponsorCollaboratorsModule,leadSponsor,name}',
+            ier.raw_json #>> '{protocolSection,sponsorCollaboratorsModule,leadSponsor,class}',
+            NULLIF(ier.raw_json #> '{protocolSection,armsInterventionsModule,interventions}', '[]'::jsonb),
+            ier.raw_json,
+            ier.ingested_at
+        FROM inclusion_exclusion_raw ier
+        ON CONFLICT (nct_id) DO NOTHING;
+        RAISE NOTICE 'study_raw: inclusion_exclusion_raw에서 채움';
+    END IF;
+END $$;
+
+-- 2. Outcome 원본에만 있는 연구 (sponsor는 study_party_raw의 LEAD_SPONSOR)
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'outcome_raw' AND column_name = 'phase'
+    ) THEN
+        INSERT INTO study_raw (nct_id, phase, source_version, lead_sponsor_name, lead_sponsor_class,
+                               intervention_json, ingested_at)
+        SELECT DISTINCT ON (o.nct_id)
+            o.nct_id,
+            o.phase,
+            o.source_version,
+            sp.name_raw,
+            sp.class_raw,
+            o.intervention_json,
+            o.ingested_at
+        FROM outcome_raw o
+        LEFT JOIN study_party_raw sp
+            ON sp.nct_id = o.nct_id AND sp.party_type = 'LEAD_SPONSOR'
+        ORDER BY o.nct_id, o.ingested_at DESC
+        ON CONFLICT (nct_id) DO NOTHING;
+        RAISE NOTICE 'study_raw: outcome_raw에서 채움';
+
+        -- 원본 study JSON이 없는 연구는 outcome별 JSON으로 study JSON을 재구성 (outcome_raw.raw_json 삭제 전 보존)
+        -- outcomesModule의 primary/secondary 배열은 outcome_order 순서, phase/intervention/source_version도 같은 위치에 기록
+        UPDATE study_raw s
+        SET raw_json = rebuilt.raw_json
+        FROM (
+            SELECT
+                o.nct_id,
+                jsonb_build_object(
+                    'protocolSection', jsonb_build_object(
+                        'identificationModule', jsonb_build_object('nctId', o.nct_id),
+                        'designModule', jsonb_build_object(
+                            'phases', CASE WHEN MAX(o.phase) IS NULL OR MAX(o.phase) = 'NA' THEN '[]'::jsonb
+                                           ELSE to_jsonb(string_to_array(MAX(o.phase), ',')) END
+                        ),
+                        'armsInterventionsModule', jsonb_build_object(
+                            'interventions', COALESCE((ARRAY_AGG(o.intervention_json) FILTER (WHERE o.intervention_json IS NOT NULL))[1], '[]'::jsonb)
+                        ),
+                        'outcomesModule', jsonb_build_object(
+                            'primaryOutcomes', COALESCE(
+                                jsonb_agg(o.raw_json ORDER BY o.outcome_order) FILTER (WHERE o.outcome_type = 'PRIMARY' AND o.raw_json IS NOT NULL),
+                                '[]'::jsonb),
+                            'secondaryOutcomes', COALESCE(
+                                jsonb_agg(o.raw_json ORDER BY o.outcome_order) FILTER (WHERE o.outcome_type = 'SECONDARY' AND o.raw_json IS NOT NULL),
+                                '[]'::jsonb)
+                        )
+                    ),
+                    'derivedSection', jsonb_build_object(
+                        'miscInfoModule', jsonb_build_object('versionHolder', MAX(o.source_version))
+                    )
+                ) AS raw_json
+            FROM outcome_raw o
+            GROUP BY o.nct_id
+            HAVING COUNT(o.raw_json) > 0
+        ) rebuilt
+        WHERE s.nct_id = rebuilt.nct_id
+          AND s.raw_json IS NULL;
+        RAISE NOTICE 'study_raw: 원본 study JSON이 없는 연구의 raw_json을 outcome JSON으로 재구성';
+    END IF;
+END $$;
+
+-- 3. 참조 무결성 (study_raw 행이 먼저 있어야 함)
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fk_outcome_raw_study') THEN
+        ALTER TABLE outcome_raw
+        ADD CONSTRAINT fk_outcome_raw_study
+        FOREIGN KEY (nct_id) REFERENCES study_raw(nct_id) ON DELETE CASCADE;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fk_inclusion_exclusion_raw_study') THEN
+        ALTER TABLE inclusion_exclusion_raw
+        ADD CONSTRAINT fk_inclusion_exclusion_raw_study
+        FOREIGN KEY (nct_id) REFERENCES study_raw(nct_id) ON DELETE CASCADE;
+    END IF;
+END $$;
+
+-- 4. 중복 컬럼 삭제 (관련 인덱스도 함께 삭제됨)
+-- outcome JSON이 study_raw.raw_json에 보존되지 않은 연구가 남아 있으면 outcome_raw 컬럼을 삭제하지 않고 중단
+-- (ON_ERROR_STOP 없이 실행해도 삭제되지 않도록 같은 블록 안에서 확인 후 삭제)
+DO $$
+DECLARE
+    missing_count INTEGER;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'outcome_raw' AND column_name = 'raw_json'
+    ) THEN
+        EXECUTE '
+            SELECT COUNT(DISTINCT o.nct_id)
+            FROM outcome_raw o
+            LEFT JOIN study_raw s ON s.nct_id = o.nct_id
+            WHERE o.raw_json IS NOT NULL
+              AND s.raw_json IS NULL'
+        INTO missing_count;
+        IF missing_count > 0 THEN
+            RAISE EXCEPTION 'study_raw.raw_json이 없는 연구 %개에 outcome JSON이 남아 있어 outcome_raw 컬럼을 삭제하지 않습니다', missing_count;
+        END IF;
+    END IF;
+
+    ALTER TABLE outcome_raw
+    DROP COLUMN IF EXISTS phase,
+    DROP COLUMN IF EXISTS source_version,
+    DROP COLUMN IF EXISTS raw_json,
+    DROP COLUMN IF EXISTS intervention_json;
+END $$;
+
+ALTER TABLE inclusion_exclusion_raw
+DROP COLUMN IF EXISTS phase,
+DROP COLUMN IF EXISTS source_version,
+DROP COLUMN IF EXISTS raw_json;
+
+-- 5. 삭제한 컬럼 공간 회수 (DROP COLUMN만으로는 기존 행/TOAST 크기가 줄지 않음)
+VACUUM FULL outcome_raw;
+VACUUM FULL inclusion_exclusion_raw;
+
+ANALYZE study_raw;
+ANALYZE outcome_raw;
+ANALYZE inclusion_exclusion_raw;
+
+-- 확인
+SELECT
+    relname AS table_name,
+    pg_size_pretty(pg_total_relation_size(relid)) AS total_size
+FROM pg_catalog.pg_statio_user_tables
+WHERE relname IN ('study_raw', 'outcome_raw', 'inclusion_exclusion_raw')
+ORDER BY relname;
@@ -8,9 +8,9 @@
 SELECT 
     COUNT(*) as total_outcomes,
     COUNT(*) FILTER (WHERE llm_status = 'SUCCESS') as success_count,
-    COUNT(*) FILTER (WHERE llm_status IN ('MEASURE_FAILED', 'TIMEFRAME_FAILED', 'BOTH_FAILED', 'API_FAILED')) as failed_count,
+    COUNT(*) FILTER (WHERE llm_status IN ('MEASURE_FAILED', 'TIMEFRAME_FAILED', 'BOTH_FAILED', 'API_FAILED', 'PARSE_ERROR')) as failed_count,
     ROUND(COUNT(*) FILTER (WHERE llm_status = 'SUCCESS')::NUMERIC / COUNT(*)::NUMERIC * 100, 2) as success_rate,
-    ROUND(COUNT(*) FILTER (WHERE llm_status IN ('MEASURE_FAILED', 'TIMEFRAME_FAILED', 'BOTH_FAILED', 'API_FAILED'))::NUMERIC / COUNT(*)::NUMERIC * 100, 2) as failed_rate
+    ROUND(COUNT(*) FILTER (WHERE llm_status IN ('MEASURE_FAILED', 'TIMEFRAME_FAILED', 'BOTH_FAILED', 'API_FAILED', 'PARSE_ERROR'))::NUMERIC / COUNT(*)::NUMERIC * 100, 2) as failed_rate
 FROM outcome_llm_preprocessed;
 
 -- 상태별 상세 통계
@@ -67,20 +67,54 @@ LIMIT 20;
 -- 4. Time Unit별 통계
 -- ============================================================================
 
--- Time Unit별 통계
+-- Time Unit별 통계 (표준 단위로 묶음, 표준화되지 않은 단위는 원문 그대로)
 SELECT 
-    llm_time_unit,
+    COALESCE(llm_time_unit_norm, llm_time_unit) as llm_time_unit,
     COUNT(*) as total_count,
     COUNT(*) FILTER (WHERE llm_status = 'SUCCESS') as success_count,
     ROUND(COUNT(*) FILTER (WHERE llm_status = 'SUCCESS')::NUMERIC / COUNT(*)::NUMERIC * 100, 2) as success_rate,
     AVG(llm_time_value) FILTER (WHERE llm_status = 'SUCCESS') as avg_time_value,
     MIN(llm_time_value) FILTER (WHERE llm_status = 'SUCCESS') as min_time_value,
-    MAX(llm_time_value) FILTER (WHERE llm_status = 'SUCCESS') as max_time_value
+    MAX(llm_time_value) FILTER (WHERE llm_status = 'SUCCESS') as max_time_value,
+    ROUND(AVG(llm_time_value_days) FILTER (WHERE llm_status = 'SUCCESS')::NUMERIC, 1) as avg_time_days
 FROM outcome_llm_preprocessed
 WHERE llm_time_unit IS NOT NULL
-GROUP BY llm_time_unit
+GROUP BY 1
 ORDER BY total_count DESC;
 
+-- 측정 시점 구간별 분포 (일 단위 환산, 단위가 달라도 같은 구간으로 집계)
+SELECT 
+    CASE 
+        WHEN llm_time_value_days < 1 THEN '1일 미만'
+        WHEN llm_time_value_days <= 28 THEN '4주 이하'
+        WHEN llm_time_value_days <= 91.3125 THEN '3개월 이하'
+        WHEN llm_time_value_days <= 182.625 THEN '6개월 이하'
+        WHEN llm_time_value_days <= 365.25 THEN '1년 이하'
+        WHEN llm_time_value_days <= 730.5 THEN '2년 이하'
+        ELSE '2년 초과'
+    END as time_window,
+    outcome_type,
+    COUNT(*) as outcome_count,
+    COUNT(DISTINCT nct_id) as study_count
+FROM outcome_llm_preprocessed
+WHERE llm_status = 'SUCCESS'
+  AND llm_time_value_days IS NOT NULL
+GROUP BY 1, outcome_type
+ORDER BY MIN(llm_time_value_days), outcome_type;
+
+-- 시점 범위 조회 예시: 52~78주에 측정한 Primary outcome (idx_outcome_llm_time_days 인덱스 범위 검색)
+SELECT 
+    nct_id,
+    outcome_order,
+    llm_measure_code,
+    llm_time_value,
+    llm_time_unit,
+    llm_time_value_days
+FROM outcome_llm_preprocessed
+WHERE outcome_type = 'PRIMARY'
+  AND llm_time_value_days BETWEEN 52 * 7 AND 78 * 7
+ORDER BY llm_time_value_days, nct_id;
+
 -- ============================================================================
 -- 5. 검증 상태별 통계 (SUCCESS 항목 기준)
 -- ============================================================================
@@ -121,7 +155,7 @@ SELECT
     COUNT(*) as total_count,
     COUNT(*) FILTER (WHERE llm_status = 'SUCCESS') as success_count,
     ROUND(COUNT(*) FILTER (WHERE llm_status = 'SUCCESS')::NUMERIC / COUNT(*)::NUMERIC * 100, 2) as success_rate
-FROM outcome_llm_preprocessed
+FROM outcome_llm_preprocessed_with_raw
 WHERE phase IS NOT NULL
 GROUP BY phase
 ORDER BY total_count DESC;
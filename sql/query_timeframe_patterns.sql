@@ -57,6 +57,33 @@ WHERE time_value_main IS NOT NULL
 GROUP BY time_value_main, time_unit_main, change_from_baseline_flag
 ORDER BY frequency DESC;
 
+-- 0-4. 일 단위 환산값(time_value_days) 기준 집계
+-- "12 weeks", "12 week", "84 days"처럼 단위만 다른 같은 시점을 하나로 묶음
+SELECT 
+    time_value_days,
+    outcome_type,
+    COUNT(*) as frequency,
+    COUNT(DISTINCT nct_id) as study_count,
+    STRING_AGG(DISTINCT time_value_main || ' ' || time_unit_main, ' | ') as unit_variants
+FROM outcome_normalized
+WHERE time_value_days IS NOT NULL
+GROUP BY time_value_days, outcome_type
+ORDER BY frequency DESC;
+
+-- 0-5. 시점 범위 조회: 52~78주에 측정한 Primary outcome (idx_outcome_normalized_time_days 인덱스 범위 검색)
+SELECT 
+    nct_id,
+    outcome_order,
+    measure_code,
+    time_frame_raw,
+    time_value_main,
+    time_unit_main,
+    time_value_days
+FROM outcome_normalized
+WHERE outcome_type = 'PRIMARY'
+  AND time_value_days BETWEEN 52 * 7 AND 78 * 7
+ORDER BY time_value_days, nct_id;
+
 -- ============================================
 -- 1. Time Frame 패턴별 분류 및 통계
 -- ============================================
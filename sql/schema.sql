@@ -12,7 +12,25 @@ DROP TABLE IF EXISTS outcome_measure_dict CASCADE;
 -- 함수 삭제 (있는 경우)
 DROP FUNCTION IF EXISTS update_updated_at_column() CASCADE;
 
--- 1. outcome_raw: 원본 outcomes 보존용 테이블
+-- 0. study_raw: 연구 단위 원본 (nct_id당 1행, Inclusion/Exclusion 원본과 공유하므로 삭제하지 않음)
+-- 기존 DB 마이그레이션은 sql/create_study_raw.sql 참고
+CREATE TABLE IF NOT EXISTS study_raw (
+    nct_id VARCHAR(20) PRIMARY KEY,
+    phase VARCHAR(50),  -- Phase 정보 (예: "PHASE1", "PHASE2", "PHASE3", "PHASE4", "NA" 등)
+    source_version VARCHAR(50),
+    overall_status VARCHAR(50),
+    lead_sponsor_name TEXT,
+    lead_sponsor_class VARCHAR(50),
+    intervention_json JSONB,  -- study의 intervention 정보 (원본 JSON 배열)
+    raw_json JSONB,  -- 원본 study JSON (전체)
+    ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_study_raw_phase ON study_raw(phase);
+CREATE INDEX IF NOT EXISTS idx_study_raw_overall_status ON study_raw(overall_status);
+CREATE INDEX IF NOT EXISTS idx_study_raw_intervention ON study_raw USING GIN (intervention_json);  -- JSONB 인덱스
+
+-- 1. outcome_raw: 원본 outcomes 보존용 테이블 (study 레벨 정보는 study_raw 참조)
 CREATE TABLE outcome_raw (
     id BIGSERIAL PRIMARY KEY,
     nct_id VARCHAR(20) NOT NULL,
@@ -21,18 +39,13 @@ CREATE TABLE outcome_raw (
     measure_raw TEXT,
     description_raw TEXT,
     time_frame_raw TEXT,
-    phase VARCHAR(50),  -- Phase 정보 (예: "PHASE1", "PHASE2", "PHASE3", "PHASE4", "NA" 등)
-    source_version VARCHAR(50),
-    raw_json JSONB,  -- 원본 outcome JSON
-    intervention_json JSONB,  -- 해당 study의 intervention 정보 (원본 JSON 배열)
     ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    CONSTRAINT unique_outcome_raw UNIQUE (nct_id, outcome_type, outcome_order)
+    CONSTRAINT unique_outcome_raw UNIQUE (nct_id, outcome_type, outcome_order),
+    CONSTRAINT fk_outcome_raw_study FOREIGN KEY (nct_id) REFERENCES study_raw(nct_id) ON DELETE CASCADE
 );
 
 CREATE INDEX idx_outcome_raw_nct_id ON outcome_raw(nct_id);
 CREATE INDEX idx_outcome_raw_type ON outcome_raw(outcome_type);
-CREATE INDEX idx_outcome_raw_phase ON outcome_raw(phase);
-CREATE INDEX idx_outcome_raw_intervention ON outcome_raw USING GIN (intervention_json);  -- JSONB 인덱스
 
 -- 2. outcome_measure_dict: Measure 사전 테이블 (외래키 참조를 위해 먼저 생성)
 CREATE TABLE outcome_measure_dict (